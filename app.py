@@ -1,7 +1,13 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, g, has_app_context, send_file
+import copy
+import json
+from collections import OrderedDict
 import os
+import queue
 import sqlite3
 import sys
+import threading
+import time
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
 # Password disimpan sebagai plain text (tidak di-hash)
@@ -9,16 +15,16 @@ from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from flask_wtf.csrf import CSRFProtect
 import re
-from PIL import Image, ImageOps, ImageStat
+from PIL import Image
 import io
 import base64
-import tempfile
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage, KeepTogether, PageBreak
-from reportlab.lib import colors
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+import logging
+from pdf_report import FIELD_LABELS_RINGKAS, render_biodata_pdf, report_cache_version, report_spec, siapkan_tanda_tangan_pdf
+from excel_report import EXCEL_MIMETYPE, ExcelColumnStats, biodata_excel_fields, write_biodata_workbook
+from export_file import cached_export_response, export_cache_key, export_file_response, new_export_cache_file, new_export_file, store_export_cache
+from logging_setup import setup_logging
+from profiling import connection_factory, init_profiling, profile_span
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, METRICS_ENABLED, init_metrics, metrics_token_valid, render_metrics
 
 # Pastikan stdout mendukung UTF-8 (hindari UnicodeEncodeError di Windows)
 try:
@@ -27,6 +33,10 @@ try:
 except Exception:
     pass
 
+# Logging (level & format dari env LOG_LEVEL / LOG_LEVELS / LOG_FORMAT / LOG_FILE)
+setup_logging()
+logger = logging.getLogger(__name__)
+
 
 # =========================
 # Konfigurasi Database SQLite (WAJIB di PythonAnywhere)
@@ -45,6 +55,11 @@ load_dotenv()
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', os.urandom(24).hex())  # Secret key untuk session
 
+# Profiling request & SQL (opt-in lewat env PROFILE_REQUESTS=1, lihat profiling.py)
+init_profiling(app)
+# Metrics Prometheus di /metrics, dikumpulkan lintas worker (lihat metrics.py)
+init_metrics(app)
+
 # Konfigurasi session permanen (30 hari)
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=30)
 app.config['SESSION_COOKIE_HTTPONLY'] = True
@@ -67,22 +82,185 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 DB_NAME = os.getenv('DB_NAME', 'bgtk_db.db')
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), DB_NAME)
 
-# Konstanta untuk ukuran kertas PDF (F4)
-F4_SIZE = (8.27 * inch, 13 * inch)
+# Profil PRAGMA SQLite (bisa diatur lewat environment variable)
+DB_JOURNAL_MODE = os.getenv('DB_JOURNAL_MODE', 'WAL').upper()
+DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL').upper()
+DB_BUSY_TIMEOUT = int(os.getenv('DB_BUSY_TIMEOUT', '5000'))  # milidetik
+DB_CACHE_SIZE = int(os.getenv('DB_CACHE_SIZE', '-20000'))  # negatif = KiB (default ~20MB)
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', str(128 * 1024 * 1024)))  # byte
+DB_TEMP_STORE = os.getenv('DB_TEMP_STORE', 'MEMORY').upper()
+
+# PRAGMA tidak mendukung parameter binding, jadi nilai teks dibatasi ke daftar ini
+_VALID_JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+_VALID_SYNCHRONOUS = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+_VALID_TEMP_STORE = {'DEFAULT', 'FILE', 'MEMORY'}
+
+def _valid_pragma_value(env_name, value, valid_values, default):
+    """Nilai PRAGMA dari env jika ada di daftar valid; selain itu default + warning berisi nilai yang ditolak"""
+    if value in valid_values:
+        return value
+    logger.warning(
+        "⚠️  %s=%r tidak valid (pilihan: %s), memakai %s",
+        env_name, value, ', '.join(sorted(valid_values)), default
+    )
+    return default
+
+DB_JOURNAL_MODE = _valid_pragma_value('DB_JOURNAL_MODE', DB_JOURNAL_MODE, _VALID_JOURNAL_MODES, 'WAL')
+DB_SYNCHRONOUS = _valid_pragma_value('DB_SYNCHRONOUS', DB_SYNCHRONOUS, _VALID_SYNCHRONOUS, 'NORMAL')
+DB_TEMP_STORE = _valid_pragma_value('DB_TEMP_STORE', DB_TEMP_STORE, _VALID_TEMP_STORE, 'MEMORY')
+
+# =========================
+# Connection pool SQLite
+# =========================
+# Jumlah maksimal koneksi "hangat" yang disimpan per worker (per proses)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+
+_db_pool = queue.LifoQueue(maxsize=max(DB_POOL_SIZE, 0) or 1)
+_db_pool_pid = os.getpid()
+_db_pool_lock = threading.Lock()
+
+def _create_db_connection():
+    """Membuka koneksi SQLite baru dengan PRAGMA yang sudah diset"""
+    connection = sqlite3.connect(DB_PATH, timeout=DB_BUSY_TIMEOUT / 1000.0, check_same_thread=False, factory=connection_factory())
+    connection.row_factory = sqlite3.Row  # Enable dictionary-like access
+    # Enable foreign key constraints
+    connection.execute('PRAGMA foreign_keys = ON')
+    apply_db_pragmas(connection)
+    return connection
+
+def apply_db_pragmas(connection):
+    """Menerapkan profil PRAGMA (journal, synchronous, cache, mmap, temp_store)"""
+    connection.execute(f'PRAGMA busy_timeout = {DB_BUSY_TIMEOUT}')
+    try:
+        connection.execute(f'PRAGMA journal_mode = {DB_JOURNAL_MODE}')
+    except sqlite3.OperationalError as e:
+        # Pergantian journal mode butuh lock eksklusif; coba lagi di koneksi berikutnya
+        logger.warning("⚠️  Gagal set journal_mode=%s: %s", DB_JOURNAL_MODE, e)
+    connection.execute(f'PRAGMA synchronous = {DB_SYNCHRONOUS}')
+    connection.execute(f'PRAGMA cache_size = {DB_CACHE_SIZE}')
+    connection.execute(f'PRAGMA mmap_size = {DB_MMAP_SIZE}')
+    connection.execute(f'PRAGMA temp_store = {DB_TEMP_STORE}')
+
+def get_effective_db_pragmas(connection):
+    """Membaca nilai PRAGMA yang benar-benar aktif pada koneksi"""
+    effective = {}
+    for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size', 'temp_store', 'foreign_keys'):
+        row = connection.execute(f'PRAGMA {name}').fetchone()
+        effective[name] = row[0] if row else None
+    # Tampilkan nama, bukan angka internal SQLite
+    effective['synchronous'] = {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'}.get(effective['synchronous'], effective['synchronous'])
+    effective['temp_store'] = {0: 'DEFAULT', 1: 'FILE', 2: 'MEMORY'}.get(effective['temp_store'], effective['temp_store'])
+    return effective
+
+def _reset_pool_after_fork():
+    """Buang koneksi warisan proses induk (mis. setelah fork worker gunicorn)"""
+    global _db_pool, _db_pool_pid
+    if _db_pool_pid == os.getpid():
+        return
+    with _db_pool_lock:
+        if _db_pool_pid != os.getpid():
+            # Koneksi SQLite tidak boleh dipakai lintas fork, jangan ditutup di sini
+            _db_pool = queue.LifoQueue(maxsize=max(DB_POOL_SIZE, 0) or 1)
+            _db_pool_pid = os.getpid()
+
+def _acquire_pooled_connection():
+    """Ambil koneksi dari pool, atau buat baru jika pool kosong"""
+    _reset_pool_after_fork()
+    try:
+        return _db_pool.get_nowait()
+    except queue.Empty:
+        return _create_db_connection()
+
+def _release_pooled_connection(connection):
+    """Kembalikan koneksi ke pool; tutup jika pool penuh atau koneksi rusak"""
+    try:
+        if connection.in_transaction:
+            connection.rollback()
+        connection.row_factory = sqlite3.Row
+    except sqlite3.Error:
+        connection.close()
+        return
+    if DB_POOL_SIZE <= 0 or _db_pool_pid != os.getpid():
+        connection.close()
+        return
+    try:
+        _db_pool.put_nowait(connection)
+    except queue.Full:
+        connection.close()
+
+class PooledConnection:
+    """Pembungkus koneksi dari pool.
+
+    close() tidak menutup koneksi fisik. Di luar request: transaksi yang belum di-commit
+    dibatalkan (sama seperti sqlite3 close), lalu koneksi dikembalikan ke pool. Di dalam
+    request koneksi dipakai bersama beberapa pembungkus (mis. route + helper), jadi transaksi
+    hanya dibatalkan saat pembungkus terakhir yang masih terbuka ditutup; close() helper tidak
+    membatalkan transaksi route yang belum di-commit. Sisanya dibatalkan saat teardown.
+    """
+
+    def __init__(self, connection, request_scoped=False):
+        object.__setattr__(self, '_connection', connection)
+        object.__setattr__(self, '_request_scoped', request_scoped)
+        object.__setattr__(self, '_closed', False)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._connection, name, value)
+
+    def __enter__(self):
+        return self._connection.__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._connection.__exit__(exc_type, exc_value, traceback)
+
+    def close(self):
+        if self._closed:
+            return
+        object.__setattr__(self, '_closed', True)
+        if self._request_scoped:
+            # Koneksi tetap milik request ini, dikembalikan ke pool saat teardown
+            if not has_app_context() or g.get('_db_connection') is not self._connection:
+                return
+            g._db_open_wrappers -= 1
+            if g._db_open_wrappers > 0:
+                return
+            try:
+                if self._connection.in_transaction:
+                    self._connection.rollback()
+            except sqlite3.Error:
+                pass
+        else:
+            _release_pooled_connection(self._connection)
 
 def get_db_connection():
-    """Membuat koneksi ke database SQLite"""
+    """Mengambil koneksi database SQLite.
+
+    Di dalam request, satu koneksi dipakai bersama lewat flask.g dan dikembalikan
+    ke pool saat request selesai. Di luar request (startup, script) koneksi
+    diambil langsung dari pool.
+    """
     try:
-        connection = sqlite3.connect(DB_PATH, check_same_thread=False)
-        connection.row_factory = sqlite3.Row  # Enable dictionary-like access
-        # Enable foreign key constraints
-        connection.execute('PRAGMA foreign_keys = ON')
-        return connection
+        if has_app_context():
+            if '_db_connection' not in g:
+                g._db_connection = _acquire_pooled_connection()
+                g._db_open_wrappers = 0
+            g._db_open_wrappers += 1
+            return PooledConnection(g._db_connection, request_scoped=True)
+        return PooledConnection(_acquire_pooled_connection())
     except sqlite3.Error as e:
-        print(f"❌ Error connecting to SQLite: {e}")
-        print(f"   Database path: {DB_PATH}")
+        logger.error("❌ Error connecting to SQLite: %s (database path: %s)", e, DB_PATH)
         return None
 
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    """Kembalikan koneksi request ke pool"""
+    connection = g.pop('_db_connection', None)
+    g.pop('_db_open_wrappers', None)
+    if connection is not None:
+        _release_pooled_connection(connection)
+
 def get_db_cursor_dict(connection):
     """Membuat cursor yang mengembalikan dictionary (untuk kompatibilitas dengan kode lama)"""
     connection.row_factory = sqlite3.Row
@@ -103,7 +281,8 @@ def column_exists(connection, table_name, column_name):
         cursor = connection.cursor()
         # Sanitize table_name untuk mencegah SQL injection (hanya alphanumeric dan underscore)
         safe_table_name = ''.join(c for c in table_name if c.isalnum() or c == '_')
-        cursor.execute(f"PRAGMA table_info({safe_table_name})")
+        # table_xinfo (bukan table_info) agar generated column juga terdeteksi
+        cursor.execute(f"PRAGMA table_xinfo({safe_table_name})")
         columns = cursor.fetchall()
         for col in columns:
             if col[1] == column_name:  # Column name is at index 1
@@ -124,14 +303,835 @@ def table_exists(connection, table_name):
     except sqlite3.Error:
         return False
 
+def get_kegiatan_id_by_nama(cursor, nama_kegiatan):
+    """Cari id kegiatan_master berdasarkan nama kegiatan (untuk kolom biodata_kegiatan.kegiatan_id)"""
+    if not nama_kegiatan or not str(nama_kegiatan).strip():
+        return None
+    cursor.execute("""
+        SELECT id FROM kegiatan_master
+        WHERE TRIM(nama_kegiatan) = TRIM(?)
+        ORDER BY id
+        LIMIT 1
+    """, (nama_kegiatan,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def link_biodata_to_kegiatan(cursor, kegiatan_id, nama_kegiatan):
+    """Hubungkan biodata yang belum punya kegiatan_id ke kegiatan dengan nama yang sama"""
+    return biodata_write(cursor, """
+        UPDATE biodata_kegiatan
+        SET kegiatan_id = ?
+        WHERE kegiatan_id IS NULL
+          AND TRIM(nama_kegiatan) = TRIM(?)
+    """, (kegiatan_id, nama_kegiatan))
+
+# =========================
+# Skema peserta_profile (opsional): profil per NIK berversi + participation
+# =========================
+# Skema lama menyalin 26 kolom data pribadi/rekening/berkas ke setiap baris biodata_kegiatan.
+# Setelah scripts/migrate_peserta_profile.py dijalankan:
+# - peserta_profile    : satu baris per versi profil NIK (nik, versi, kolom pribadi/rekening,
+#                        path buku tabungan & tanda tangan).
+#                        Profil yang isinya sama dipakai bersama; perubahan membuat versi baru,
+#                        sehingga kegiatan lama tetap menunjuk data saat peserta mendaftar.
+# - participation      : satu baris per keikutsertaan (profile_version_id, kegiatan, peran, waktu);
+#                        id sama dengan id biodata_kegiatan lama.
+# - biodata_kegiatan   : VIEW dengan kolom yang sama persis seperti tabel lama. INSERT/UPDATE/DELETE
+#                        ke view diteruskan INSTEAD OF trigger, jadi query aplikasi tidak berubah.
+# Trigger ringkasan (kabupaten_counts, FTS, nik_latest_profile, updated_at) dipasang di participation.
+# Mode dideteksi dari database saat init_database() (biodata_kegiatan berupa view).
+# Ukuran file turun, tapi setiap query biodata membayar join ke peserta_profile: rekap dengan
+# COUNT/urut nama di puluhan ribu baris lebih lambat dibanding skema lama.
+PESERTA_PROFILE_SCHEMA = False
+
+PESERTA_PROFILE_COLUMNS = (
+    'nik', 'nama_lengkap', 'nip_nippk', 'tempat_lahir', 'tanggal_lahir', 'jenis_kelamin', 'agama',
+    'pendidikan_terakhir', 'jurusan', 'alamat_domisili', 'alamat_email', 'no_hp', 'npwp', 'status_asn',
+    'pangkat_golongan', 'jabatan', 'instansi', 'alamat_instansi', 'kabupaten_kota', 'kabko_lainnya',
+    'nama_bank', 'nama_bank_lainnya', 'no_rekening', 'nama_pemilik_rekening',
+    # Path buku tabungan & tanda tangan diisi ulang dari autofill saat peserta mendaftar lagi,
+    # jadi ikut versi profil (upload baru = versi baru)
+    'buku_tabungan_path', 'tanda_tangan'
+)
+# Kolom per pendaftaran: user_id = akun pendaftar (FK, ON DELETE CASCADE; satu NIK bisa didaftarkan
+# beberapa akun), nama/waktu/tempat kegiatan = salinan saat mendaftar (dipakai filter TRIM(nama_kegiatan)
+# dan tetap ada jika kegiatan_master dihapus/diubah, kegiatan_id menjadi NULL)
+PARTICIPATION_COLUMNS = (
+    'user_id', 'kegiatan_id', 'nama_kegiatan', 'waktu_pelaksanaan', 'tempat_pelaksanaan', 'peran',
+    'created_at', 'updated_at'
+)
+# Urutan kolom view biodata_kegiatan = urutan kolom tabel lama (SELECT * tetap sama)
+BIODATA_VIEW_COLUMNS = (
+    'id', 'nik', 'user_id', 'nama_lengkap', 'nip_nippk', 'tempat_lahir', 'tanggal_lahir', 'jenis_kelamin',
+    'agama', 'pendidikan_terakhir', 'jurusan', 'alamat_domisili', 'alamat_email', 'no_hp', 'npwp',
+    'status_asn', 'pangkat_golongan', 'jabatan', 'instansi', 'alamat_instansi', 'kabupaten_kota',
+    'kabko_lainnya', 'peran', 'nama_kegiatan', 'waktu_pelaksanaan', 'tempat_pelaksanaan', 'nama_bank',
+    'nama_bank_lainnya', 'no_rekening', 'nama_pemilik_rekening', 'buku_tabungan_path', 'tanda_tangan',
+    'created_at', 'updated_at', 'kegiatan_id', 'tahun', 'bulan'
+)
+
+def peserta_profile_schema_aktif(connection):
+    """Cek apakah database memakai skema peserta_profile (biodata_kegiatan berupa view)"""
+    row = connection.execute(
+        "SELECT type FROM sqlite_master WHERE name = 'biodata_kegiatan'"
+    ).fetchone()
+    return bool(row) and row[0] == 'view'
+
+def biodata_trigger_table(normalized):
+    """Tabel tempat trigger ringkasan biodata dipasang"""
+    return 'participation' if normalized else 'biodata_kegiatan'
+
+def biodata_col(prefix, column, normalized):
+    """Ekspresi kolom biodata untuk baris NEW/OLD di trigger (kolom profil diambil dari peserta_profile)"""
+    if normalized and column in PESERTA_PROFILE_COLUMNS:
+        return f"(SELECT {column} FROM peserta_profile WHERE id = {prefix}.profile_version_id)"
+    return f"{prefix}.{column}"
+
+def biodata_update_of(columns, normalized):
+    """Daftar kolom untuk AFTER UPDATE OF (kolom profil -> profile_version_id)"""
+    hasil = []
+    for column in columns:
+        if normalized and column in PESERTA_PROFILE_COLUMNS:
+            column = 'profile_version_id'
+        if column not in hasil:
+            hasil.append(column)
+    return ', '.join(hasil)
+
+def biodata_write(cursor, query, params=()):
+    """Jalankan INSERT/UPDATE/DELETE ke biodata_kegiatan dan return jumlah baris yang terkena
+
+    Pada skema peserta_profile perubahan lewat INSTEAD OF trigger tidak dihitung SQLite
+    (cursor.rowcount selalu 0), jadi jumlahnya dibaca dari penghitung biodata_view_changes.
+    """
+    if not PESERTA_PROFILE_SCHEMA:
+        cursor.execute(query, params)
+        return cursor.rowcount
+    cursor.execute("UPDATE biodata_view_changes SET jumlah = 0")
+    cursor.execute(query, params)
+    cursor.execute("SELECT jumlah FROM biodata_view_changes")
+    return cursor.fetchone()[0]
+
+def _profile_match_sql(prefix):
+    """Kondisi peserta_profile yang isinya sama persis dengan kolom profil baris NEW"""
+    return ' AND '.join(f"{column} IS {prefix}.{column}" for column in PESERTA_PROFILE_COLUMNS)
+
+def _profile_upsert_sql():
+    """Statement trigger: buat versi profil baru untuk NEW jika belum ada versi yang isinya sama"""
+    kolom = ', '.join(PESERTA_PROFILE_COLUMNS)
+    nilai = ', '.join(f"NEW.{column}" for column in PESERTA_PROFILE_COLUMNS)
+    return f"""
+            INSERT INTO peserta_profile (versi, {kolom})
+            SELECT COALESCE((SELECT MAX(versi) FROM peserta_profile WHERE nik = NEW.nik), 0) + 1, {nilai}
+            WHERE NOT EXISTS (SELECT 1 FROM peserta_profile WHERE nik = NEW.nik AND {_profile_match_sql('NEW')});"""
+
+def _profile_version_sql():
+    """Subquery id versi profil yang cocok dengan NEW"""
+    return f"(SELECT id FROM peserta_profile WHERE nik = NEW.nik AND {_profile_match_sql('NEW')} ORDER BY versi DESC LIMIT 1)"
+
+def _profile_cleanup_sql(nik_expr):
+    """Statement trigger: hapus versi profil NIK yang tidak dipakai participation mana pun"""
+    return f"""
+            DELETE FROM peserta_profile
+            WHERE nik = {nik_expr}
+              AND NOT EXISTS (SELECT 1 FROM participation pa WHERE pa.profile_version_id = peserta_profile.id);"""
+
+def _participation_values_sql():
+    """Nilai kolom participation dari NEW (created_at/updated_at default waktu sekarang seperti tabel lama)"""
+    return ', '.join(
+        f"COALESCE(NEW.{column}, CURRENT_TIMESTAMP)" if column in ('created_at', 'updated_at') else f"NEW.{column}"
+        for column in PARTICIPATION_COLUMNS
+    )
+
+PESERTA_PROFILE_VIEW_TRIGGERS = [
+    ('trg_biodata_view_insert', f"""
+        INSTEAD OF INSERT ON biodata_kegiatan
+        BEGIN{_profile_upsert_sql()}
+            INSERT INTO participation (id, profile_version_id, {', '.join(PARTICIPATION_COLUMNS)})
+            VALUES (NEW.id, {_profile_version_sql()}, {_participation_values_sql()});
+            UPDATE biodata_view_changes SET jumlah = jumlah + 1;
+        END
+    """),
+    ('trg_biodata_view_update', f"""
+        INSTEAD OF UPDATE ON biodata_kegiatan
+        BEGIN{_profile_upsert_sql()}
+            UPDATE participation
+            SET profile_version_id = {_profile_version_sql()},
+                {', '.join(f'{column} = NEW.{column}' for column in PARTICIPATION_COLUMNS)}
+            WHERE id = OLD.id;{_profile_cleanup_sql('OLD.nik')}
+            UPDATE biodata_view_changes SET jumlah = jumlah + 1;
+        END
+    """),
+    ('trg_biodata_view_delete', f"""
+        INSTEAD OF DELETE ON biodata_kegiatan
+        BEGIN
+            DELETE FROM participation WHERE id = OLD.id;{_profile_cleanup_sql('OLD.nik')}
+            UPDATE biodata_view_changes SET jumlah = jumlah + 1;
+        END
+    """),
+]
+
+# Index skema peserta_profile (pengganti DB_INDEXES untuk tabel biodata_kegiatan lama)
+PESERTA_PROFILE_INDEXES = [
+    # Lookup per NIK + cek versi profil yang sama (trigger view)
+    ('idx_peserta_profile_nik', 'peserta_profile (nik, versi)'),
+    ('idx_peserta_profile_kabupaten_trim', 'peserta_profile (TRIM(kabupaten_kota))'),
+    ('idx_peserta_profile_kabupaten', 'peserta_profile (kabupaten_kota)'),
+    ('idx_peserta_profile_nama_lengkap', 'peserta_profile (nama_lengkap)'),
+    # Join view + cek duplikat NIK/user + kegiatan
+    ('idx_participation_profile_kegiatan', 'participation (profile_version_id, TRIM(nama_kegiatan))'),
+    ('idx_participation_user_kegiatan', 'participation (user_id, TRIM(nama_kegiatan))'),
+    ('idx_participation_user_created', 'participation (user_id, created_at DESC)'),
+    ('idx_participation_kegiatan_trim', 'participation (TRIM(nama_kegiatan))'),
+    # profile_version_id ikut di index filter agar join ke peserta_profile tidak perlu membaca tabel
+    ('idx_participation_kegiatan_id', 'participation (kegiatan_id, profile_version_id)'),
+    ('idx_participation_tahun_bulan_kegiatan', 'participation (tahun, bulan, kegiatan_id, profile_version_id)'),
+    ('idx_kegiatan_master_nama_trim', 'kegiatan_master (TRIM(nama_kegiatan))'),
+]
+
+def ensure_peserta_profile_view(connection):
+    """Membuat view biodata_kegiatan + INSTEAD OF trigger di atas peserta_profile/participation"""
+    cursor = connection.cursor()
+    kolom = ', '.join(
+        f"pp.{column}" if column in PESERTA_PROFILE_COLUMNS else f"pa.{column}"
+        for column in BIODATA_VIEW_COLUMNS
+    )
+    cursor.execute(f"""
+        CREATE VIEW IF NOT EXISTS biodata_kegiatan AS
+        SELECT {kolom}
+        FROM participation pa
+        INNER JOIN peserta_profile pp ON pp.id = pa.profile_version_id
+    """)
+    for trigger_name, definition in PESERTA_PROFILE_VIEW_TRIGGERS:
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger_name} {definition}")
+    cursor.close()
+
+def migrate_to_peserta_profile(connection):
+    """Pindahkan tabel biodata_kegiatan ke peserta_profile + participation (satu transaksi)
+
+    Tabel ringkasan (kabupaten_counts, biodata_fts, nik_latest_profile) harus sudah dibuat
+    init_database(); trigger-nya dipindah ke participation. Return (jumlah participation,
+    jumlah versi profil).
+    """
+    if peserta_profile_schema_aktif(connection):
+        raise ValueError('Database sudah memakai skema peserta_profile')
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        profil_kolom = ', '.join(PESERTA_PROFILE_COLUMNS)
+        # Tipe & NOT NULL kolom profil disalin dari tabel lama (affinity nilai tetap sama)
+        cursor.execute("PRAGMA table_info(biodata_kegiatan)")
+        tipe_kolom = {row[1]: (row[2], row[3]) for row in cursor.fetchall()}
+        profil_definisi = ',\n'.join(
+            f"                {column} {tipe_kolom[column][0]} {'NOT NULL' if tipe_kolom[column][1] else 'DEFAULT NULL'}"
+            for column in PESERTA_PROFILE_COLUMNS
+        )
+        cursor.execute(f"""
+            CREATE TABLE peserta_profile (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                versi INTEGER NOT NULL,
+{profil_definisi},
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (nik, versi)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE participation (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                profile_version_id INTEGER NOT NULL REFERENCES peserta_profile(id),
+                user_id INTEGER NOT NULL,
+                kegiatan_id INTEGER DEFAULT NULL REFERENCES kegiatan_master(id) ON DELETE SET NULL,
+                nama_kegiatan TEXT NOT NULL,
+                waktu_pelaksanaan VARCHAR(100) NOT NULL,
+                tempat_pelaksanaan VARCHAR(200) NOT NULL,
+                peran VARCHAR(100) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                tahun INTEGER GENERATED ALWAYS AS (CAST(strftime('%Y', created_at) AS INTEGER)) STORED,
+                bulan INTEGER GENERATED ALWAYS AS (CAST(strftime('%m', created_at) AS INTEGER)) STORED,
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            )
+        """)
+        cursor.execute("CREATE TABLE biodata_view_changes (jumlah INTEGER NOT NULL)")
+        cursor.execute("INSERT INTO biodata_view_changes (jumlah) VALUES (0)")
+
+        # Satu versi per isi profil yang berbeda, diberi nomor urut sesuai kemunculan pertamanya
+        cursor.execute(f"""
+            INSERT INTO peserta_profile (versi, {profil_kolom}, created_at)
+            SELECT ROW_NUMBER() OVER (PARTITION BY nik ORDER BY pertama, id_pertama), {profil_kolom}, pertama
+            FROM (
+                SELECT {profil_kolom}, MIN(created_at) AS pertama, MIN(id) AS id_pertama
+                FROM biodata_kegiatan
+                GROUP BY {profil_kolom}
+            )
+        """)
+        cursor.execute("CREATE INDEX idx_peserta_profile_nik ON peserta_profile (nik, versi)")
+        cursor.execute(f"""
+            INSERT INTO participation (id, profile_version_id, {', '.join(PARTICIPATION_COLUMNS)})
+            SELECT bk.id, (
+                       SELECT pp.id FROM peserta_profile pp
+                       WHERE pp.nik = bk.nik AND {' AND '.join(f'pp.{column} IS bk.{column}' for column in PESERTA_PROFILE_COLUMNS)}
+                   ),
+                   {', '.join(f'bk.{column}' for column in PARTICIPATION_COLUMNS)}
+            FROM biodata_kegiatan bk
+        """)
+        cursor.execute("SELECT COUNT(*) FROM biodata_kegiatan")
+        jumlah_biodata = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM participation")
+        jumlah_participation = cursor.fetchone()[0]
+        if jumlah_participation != jumlah_biodata:
+            raise sqlite3.IntegrityError(f'Jumlah participation ({jumlah_participation}) != biodata ({jumlah_biodata})')
+
+        # id participation melanjutkan AUTOINCREMENT biodata_kegiatan (id yang pernah dihapus tidak dipakai ulang)
+        cursor.execute("""
+            SELECT MAX(
+                COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'biodata_kegiatan'), 0),
+                COALESCE((SELECT MAX(id) FROM participation), 0)
+            )
+        """)
+        seq = cursor.fetchone()[0]
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'participation'")
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('participation', ?)", (seq,))
+
+        # Index & trigger tabel lama ikut terhapus; isi biodata_fts, kabupaten_counts dan
+        # nik_latest_profile tetap berlaku karena id dan isi baris tidak berubah
+        cursor.execute("DROP TABLE biodata_kegiatan")
+        ensure_peserta_profile_view(connection)
+        triggers = [biodata_updated_at_trigger(True)]
+        for table_name, builder in (('kabupaten_counts', kabupaten_counts_triggers),
+                                    ('biodata_fts', biodata_fts_triggers),
+                                    ('nik_latest_profile', nik_profile_triggers)):
+            if table_exists(connection, table_name):
+                triggers.extend(builder(True))
+        for trigger_name, definition in triggers:
+            cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger_name} {definition}")
+        for index_name, definition in PESERTA_PROFILE_INDEXES:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {definition}")
+        cursor.execute("SELECT COUNT(*) FROM peserta_profile")
+        jumlah_profil = cursor.fetchone()[0]
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return jumlah_participation, jumlah_profil
+
+# Index untuk lookup yang sering dipakai route (dibuat idempotent saat startup).
+# Ekspresi TRIM(...) harus sama persis dengan yang dipakai di query agar index terpakai.
+DB_INDEXES = [
+    # get_latest_by_nik, check_nik_exists, get_or_create_user_by_nik
+    ('idx_biodata_nik_created', 'biodata_kegiatan (nik, created_at DESC)'),
+    # Cek duplikat NIK + kegiatan (tambah_data, admin_update_biodata, export_biodata_pdf)
+    ('idx_biodata_nik_kegiatan', 'biodata_kegiatan (nik, TRIM(nama_kegiatan))'),
+    # Cek duplikat user + kegiatan (insert_biodata_data, save_biodata_data)
+    ('idx_biodata_user_kegiatan', 'biodata_kegiatan (user_id, TRIM(nama_kegiatan))'),
+    # Biodata terakhir user; juga index foreign key user_id (pengganti idx_biodata_user_id)
+    ('idx_biodata_user_created', 'biodata_kegiatan (user_id, created_at DESC)'),
+    # Filter kabupaten (rekap kabupaten export)
+    ('idx_biodata_kabupaten_trim', 'biodata_kegiatan (TRIM(kabupaten_kota))'),
+    # Covering index untuk GROUP BY kabupaten (dashboard & kabupaten summary)
+    ('idx_biodata_kabupaten', 'biodata_kegiatan (kabupaten_kota)'),
+    # Filter kegiatan_id (+ kabupaten); juga index foreign key kegiatan_id (pengganti idx_biodata_kegiatan_id)
+    ('idx_biodata_kegiatan_kabupaten', 'biodata_kegiatan (kegiatan_id, kabupaten_kota)'),
+    # Filter tahun/bulan rekap (admin_rekap_filter, admin_rekap_tahunan, export tahunan)
+    ('idx_biodata_tahun_bulan_kegiatan', 'biodata_kegiatan (tahun, bulan, kegiatan_id)'),
+    # Urut + keyset (nama_lengkap, id) tabel rekap filter (api_rekap_filter_data)
+    ('idx_biodata_nama_lengkap', 'biodata_kegiatan (nama_lengkap)'),
+    # Filter nama kegiatan (rekap filter, export per kegiatan) dan detail kegiatan:
+    # jumlah per kabupaten (GROUP BY) dan tabel peserta per kabupaten
+    ('idx_biodata_kegiatan_trim_kabupaten', 'biodata_kegiatan (TRIM(nama_kegiatan), kabupaten_kota)'),
+    # Lookup kegiatan_master berdasarkan nama
+    ('idx_kegiatan_master_nama_trim', 'kegiatan_master (TRIM(nama_kegiatan))'),
+]
+
+# Index lama yang sudah tercakup sebagai prefix index lain di DB_INDEXES; dihapus saat startup
+# agar setiap write ke biodata_kegiatan tidak memperbarui index ganda
+REDUNDANT_DB_INDEXES = (
+    'idx_biodata_user_id',        # prefix idx_biodata_user_created / idx_biodata_user_kegiatan
+    'idx_biodata_kegiatan_id',    # prefix idx_biodata_kegiatan_kabupaten
+    'idx_biodata_kegiatan_trim',  # prefix idx_biodata_kegiatan_trim_kabupaten
+)
+
+def ensure_db_indexes(connection):
+    """Membuat semua index di DB_INDEXES (atau PESERTA_PROFILE_INDEXES) jika belum ada"""
+    cursor = connection.cursor()
+    indexes = PESERTA_PROFILE_INDEXES if peserta_profile_schema_aktif(connection) else DB_INDEXES
+    for index_name in REDUNDANT_DB_INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+    for index_name, definition in indexes:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {definition}")
+    connection.commit()
+    cursor.close()
+
+# Ringkasan jumlah peserta per (kegiatan_id, kabupaten_kota) untuk dashboard & popup kabupaten.
+# Dijaga oleh trigger pada biodata_kegiatan (participation di skema peserta_profile); kegiatan_id NULL disimpan sebagai 0 dan
+# kabupaten_kota NULL sebagai '' agar bisa jadi PRIMARY KEY. Penugasan operator tidak
+# disalin ke sini, tapi di-join saat baca (operator_kegiatan x kabupaten_counts tetap kecil).
+def kabupaten_counts_triggers(normalized=False):
+    """Trigger kabupaten_counts (pada participation jika skema peserta_profile aktif)"""
+    table = biodata_trigger_table(normalized)
+    new_kabupaten = biodata_col('NEW', 'kabupaten_kota', normalized)
+    old_kabupaten = biodata_col('OLD', 'kabupaten_kota', normalized)
+    return [
+        ('trg_biodata_counts_insert', f"""
+            AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO kabupaten_counts (kegiatan_id, kabupaten_kota, jumlah_peserta)
+                VALUES (COALESCE(NEW.kegiatan_id, 0), COALESCE({new_kabupaten}, ''), 1)
+                ON CONFLICT (kegiatan_id, kabupaten_kota)
+                DO UPDATE SET jumlah_peserta = jumlah_peserta + 1;
+            END
+        """),
+        ('trg_biodata_counts_delete', f"""
+            AFTER DELETE ON {table}
+            BEGIN
+                UPDATE kabupaten_counts SET jumlah_peserta = jumlah_peserta - 1
+                WHERE kegiatan_id = COALESCE(OLD.kegiatan_id, 0)
+                  AND kabupaten_kota = COALESCE({old_kabupaten}, '');
+                DELETE FROM kabupaten_counts WHERE jumlah_peserta <= 0;
+            END
+        """),
+        ('trg_biodata_counts_update', f"""
+            AFTER UPDATE OF {biodata_update_of(('kegiatan_id', 'kabupaten_kota'), normalized)} ON {table}
+            WHEN COALESCE(OLD.kegiatan_id, 0) != COALESCE(NEW.kegiatan_id, 0)
+              OR COALESCE({old_kabupaten}, '') != COALESCE({new_kabupaten}, '')
+            BEGIN
+                UPDATE kabupaten_counts SET jumlah_peserta = jumlah_peserta - 1
+                WHERE kegiatan_id = COALESCE(OLD.kegiatan_id, 0)
+                  AND kabupaten_kota = COALESCE({old_kabupaten}, '');
+                DELETE FROM kabupaten_counts WHERE jumlah_peserta <= 0;
+                INSERT INTO kabupaten_counts (kegiatan_id, kabupaten_kota, jumlah_peserta)
+                VALUES (COALESCE(NEW.kegiatan_id, 0), COALESCE({new_kabupaten}, ''), 1)
+                ON CONFLICT (kegiatan_id, kabupaten_kota)
+                DO UPDATE SET jumlah_peserta = jumlah_peserta + 1;
+            END
+        """),
+    ]
+
+def ensure_kabupaten_counts(connection):
+    """Membuat tabel ringkasan kabupaten_counts + trigger, dan mengisinya jika baru dibuat"""
+    cursor = connection.cursor()
+    baru = not table_exists(connection, 'kabupaten_counts')
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS kabupaten_counts (
+            kegiatan_id INTEGER NOT NULL,
+            kabupaten_kota TEXT NOT NULL,
+            jumlah_peserta INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (kegiatan_id, kabupaten_kota)
+        ) WITHOUT ROWID
+    """)
+    for trigger_name, definition in kabupaten_counts_triggers(peserta_profile_schema_aktif(connection)):
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger_name} {definition}")
+    if baru:
+        rebuild_kabupaten_counts(connection)
+    connection.commit()
+    cursor.close()
+
+def rebuild_kabupaten_counts(connection):
+    """Hitung ulang seluruh isi kabupaten_counts dari biodata_kegiatan"""
+    cursor = connection.cursor()
+    cursor.execute("DELETE FROM kabupaten_counts")
+    cursor.execute("""
+        INSERT INTO kabupaten_counts (kegiatan_id, kabupaten_kota, jumlah_peserta)
+        SELECT COALESCE(kegiatan_id, 0), COALESCE(kabupaten_kota, ''), COUNT(*)
+        FROM biodata_kegiatan
+        GROUP BY COALESCE(kegiatan_id, 0), COALESCE(kabupaten_kota, '')
+    """)
+    cursor.close()
+
+# =========================
+# Cache proses untuk lookup yang jarang berubah (dropdown kegiatan, dropdown rekap)
+# =========================
+# Setiap entry menyimpan versi namespace dari tabel cache_version. Writer memanggil
+# invalidate_cache() di transaksi yang sama dengan perubahan data, sehingga worker
+# gunicorn lain ikut membuang entry lama begitu melihat versi yang naik.
+CACHE_TTL = int(os.getenv('CACHE_TTL', '300'))
+CACHE_NAMESPACES = ('kegiatan', 'biodata')
+
+_cache_entries = {}
+_cache_lock = threading.Lock()
+
+# LRU profil NIK terakhir untuk autofill (lihat get_nik_latest_profile): nik -> (kedaluwarsa,
+# JSON atau None jika NIK belum terdaftar). Tidak memakai versi 'biodata' global: writer membuang
+# entry NIK yang ditulisnya lewat invalidate_cache(..., niks=...), worker lain menunggu TTL pendek.
+NIK_PROFILE_CACHE_SIZE = int(os.getenv('NIK_PROFILE_CACHE_SIZE', '4096'))
+NIK_PROFILE_CACHE_TTL = int(os.getenv('NIK_PROFILE_CACHE_TTL', '30'))
+_nik_profile_cache = OrderedDict()
+
+def get_cache_version(cursor, namespace):
+    """Ambil versi namespace cache dari tabel cache_version"""
+    cursor.execute("SELECT versi FROM cache_version WHERE nama = ?", (namespace,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+def cached_query(cursor, namespace, key, loader, ttl=None):
+    """Ambil hasil loader(cursor) dari cache proses; dimuat ulang jika TTL habis atau versi berubah"""
+    ttl = CACHE_TTL if ttl is None else ttl
+    versi = get_cache_version(cursor, namespace)
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache_entries.get((namespace, key))
+    if entry and entry[0] == versi and entry[1] > now:
+        return copy.deepcopy(entry[2])
+
+    value = loader(cursor)
+    if ttl > 0:
+        with _cache_lock:
+            _cache_entries[(namespace, key)] = (versi, now + ttl, value)
+    return copy.deepcopy(value)
+
+def invalidate_cache(cursor, *namespaces, niks=None):
+    """Buang cache namespace di proses ini dan naikkan versinya (commit dilakukan oleh pemanggil)
+
+    niks: NIK yang barisnya ditulis; hanya entry LRU autofill NIK tersebut yang dibuang.
+    None (perubahan massal, misalnya rename/hapus kegiatan) membuang seluruh LRU NIK.
+    """
+    with _cache_lock:
+        for cache_key in [k for k in _cache_entries if k[0] in namespaces]:
+            del _cache_entries[cache_key]
+        if 'biodata' in namespaces:
+            if niks is None:
+                _nik_profile_cache.clear()
+            else:
+                for nik in niks:
+                    if nik:
+                        _nik_profile_cache.pop(str(nik).strip(), None)
+    cursor.executemany(
+        "UPDATE cache_version SET versi = versi + 1 WHERE nama = ?",
+        [(namespace,) for namespace in namespaces]
+    )
+
+def ensure_cache_version(connection):
+    """Membuat tabel cache_version beserta baris untuk setiap namespace cache"""
+    cursor = connection.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cache_version (
+            nama TEXT PRIMARY KEY,
+            versi INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.executemany(
+        "INSERT OR IGNORE INTO cache_version (nama, versi) VALUES (?, 0)",
+        [(namespace,) for namespace in CACHE_NAMESPACES]
+    )
+    connection.commit()
+    cursor.close()
+
+# =========================
+# Antrian export (background job)
+# =========================
+# Export besar dimasukkan ke tabel export_jobs lalu dikerjakan oleh export_worker.py
+# (proses terpisah). Hasil disimpan di EXPORT_JOB_FOLDER dan dihapus setelah masa simpan habis.
+EXPORT_JOB_FOLDER = os.path.join(BASE_DIR, 'exports')
+EXPORT_JOB_RETENTION_HOURS = int(os.getenv('EXPORT_JOB_RETENTION_HOURS', '24'))
+# Batas baris export saat dikerjakan worker (export langsung tetap memakai batas per route)
+EXPORT_JOB_MAX_ROWS = int(os.getenv('EXPORT_JOB_MAX_ROWS', '20000'))
+# Worker dianggap mati jika heartbeat lebih lama dari ini (detik)
+EXPORT_WORKER_TIMEOUT = 30
+# Jeda minimal antar update progres ke database (detik)
+EXPORT_PROGRESS_INTERVAL = 1.0
+# Data session yang dibawa ke worker agar route export berjalan dengan hak akses yang sama
+EXPORT_JOB_SESSION_KEYS = ('logged_in', 'user_id', 'user_role', 'is_admin', 'username', 'user_nama')
+
+def ensure_export_jobs(connection):
+    """Membuat tabel antrian export_jobs dan heartbeat export_workers"""
+    cursor = connection.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS export_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            path TEXT NOT NULL,
+            query_string TEXT NOT NULL DEFAULT '',
+            session_data TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'antri',
+            rows_rendered INTEGER NOT NULL DEFAULT 0,
+            total_rows INTEGER NOT NULL DEFAULT 0,
+            file_path TEXT,
+            mimetype TEXT,
+            content_disposition TEXT,
+            error TEXT,
+            worker_id TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_export_jobs_status ON export_jobs (status, id)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS export_workers (
+            worker_id TEXT PRIMARY KEY,
+            pid INTEGER,
+            last_seen TIMESTAMP NOT NULL
+        )
+    """)
+    connection.commit()
+    cursor.close()
+
+# Versi data cache export memakai updated_at baris biodata, tapi UPDATE biodata di aplikasi
+# tidak mengisinya; trigger ini mengisi waktu (presisi milidetik) setiap kali baris berubah.
+# Trigger tidak memicu dirinya sendiri (recursive_triggers default OFF di SQLite).
+def biodata_updated_at_trigger(normalized=False):
+    """Trigger updated_at (pada participation jika skema peserta_profile aktif)"""
+    table = biodata_trigger_table(normalized)
+    return ('trg_biodata_updated_at', f"""
+        AFTER UPDATE ON {table}
+        WHEN NEW.updated_at IS OLD.updated_at
+        BEGIN
+            UPDATE {table}
+            SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+            WHERE id = NEW.id;
+        END
+    """)
+
+def ensure_biodata_updated_at(connection):
+    """Membuat trigger yang menjaga biodata_kegiatan.updated_at"""
+    cursor = connection.cursor()
+    trigger_name, definition = biodata_updated_at_trigger(peserta_profile_schema_aktif(connection))
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger_name} {definition}")
+    connection.commit()
+    cursor.close()
+
+# =========================
+# Pencarian full-text peserta (FTS5)
+# =========================
+# biodata_fts adalah index FTS5 "external content": teks diambil dari biodata_kegiatan
+# (rowid = biodata_kegiatan.id), index-nya dijaga trigger. Trigger update hanya berjalan
+# jika kolom yang di-index berubah, jadi update updated_at oleh trg_biodata_updated_at
+# tidak ikut menulis ulang index.
+# nama_kegiatan & peran hanya dipakai pencarian DataTables (datatables_search_clause).
+BIODATA_FTS_COLUMNS = (
+    'nama_lengkap', 'nik', 'nip_nippk', 'instansi', 'jabatan', 'kabupaten_kota', 'nama_kegiatan', 'peran'
+)
+# Kolom yang dicari /api/search (pencarian peserta, bukan nama kegiatan)
+BIODATA_SEARCH_COLUMNS = ('nama_lengkap', 'nik', 'nip_nippk', 'instansi', 'jabatan', 'kabupaten_kota')
+# Bobot bm25 per kolom (urutan sama dengan BIODATA_FTS_COLUMNS): kecocokan nama paling penting
+BIODATA_FTS_WEIGHTS = (10.0, 8.0, 8.0, 2.0, 1.0, 1.0, 1.0, 1.0)
+# Jumlah kata maksimal dalam satu query pencarian
+SEARCH_MAX_TERMS = 8
+
+def _biodata_fts_values(prefix, normalized=False):
+    return ', '.join(biodata_col(prefix, column, normalized) for column in BIODATA_FTS_COLUMNS)
+
+def biodata_fts_triggers(normalized=False):
+    """Trigger index biodata_fts (pada participation jika skema peserta_profile aktif)"""
+    table = biodata_trigger_table(normalized)
+    columns = ', '.join(BIODATA_FTS_COLUMNS)
+    return [
+        ('trg_biodata_fts_insert', f"""
+            AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO biodata_fts (rowid, {columns})
+                VALUES (NEW.id, {_biodata_fts_values('NEW', normalized)});
+            END
+        """),
+        ('trg_biodata_fts_delete', f"""
+            AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO biodata_fts (biodata_fts, rowid, {columns})
+                VALUES ('delete', OLD.id, {_biodata_fts_values('OLD', normalized)});
+            END
+        """),
+        ('trg_biodata_fts_update', f"""
+            AFTER UPDATE OF {biodata_update_of(BIODATA_FTS_COLUMNS, normalized)} ON {table}
+            BEGIN
+                INSERT INTO biodata_fts (biodata_fts, rowid, {columns})
+                VALUES ('delete', OLD.id, {_biodata_fts_values('OLD', normalized)});
+                INSERT INTO biodata_fts (rowid, {columns})
+                VALUES (NEW.id, {_biodata_fts_values('NEW', normalized)});
+            END
+        """),
+    ]
+
+def ensure_biodata_fts(connection):
+    """Membuat index FTS5 biodata_fts + trigger, dan mengisinya dari biodata_kegiatan jika baru dibuat"""
+    cursor = connection.cursor()
+    baru = not table_exists(connection, 'biodata_fts')
+    # Daftar kolom index berubah: tabel FTS5 tidak bisa di-ALTER, jadi index & trigger dibuat ulang
+    if not baru:
+        cursor.execute("PRAGMA table_info(biodata_fts)")
+        if tuple(row[1] for row in cursor.fetchall()) != BIODATA_FTS_COLUMNS:
+            for trigger_name, _ in biodata_fts_triggers():
+                cursor.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+            cursor.execute("DROP TABLE biodata_fts")
+            baru = True
+    # Prefix index 2-4 huruf agar pencarian "awalan*" tidak perlu memindai seluruh daftar kata
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS biodata_fts USING fts5 (
+            {', '.join(BIODATA_FTS_COLUMNS)},
+            content='biodata_kegiatan',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3 4'
+        )
+    """)
+    for trigger_name, definition in biodata_fts_triggers(peserta_profile_schema_aktif(connection)):
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger_name} {definition}")
+    if baru:
+        cursor.execute("INSERT INTO biodata_fts (biodata_fts) VALUES ('rebuild')")
+    connection.commit()
+    cursor.close()
+
+def fts_match_query(search_value, columns=BIODATA_SEARCH_COLUMNS):
+    """Query MATCH FTS5 dari teks pencarian: setiap kata dicari sebagai awalan, semua kata harus cocok
+
+    Pencarian dibatasi ke kolom columns (filter kolom FTS5). Tanda baca dan operator FTS5
+    dari input dibuang, sehingga input apa pun aman dipakai. Return None jika tidak ada
+    kata yang bisa dicari.
+    """
+    kata = re.findall(r'\w+', search_value)[:SEARCH_MAX_TERMS]
+    if not kata:
+        return None
+    terms = ' '.join(f'"{k}"*' for k in kata)
+    return f"{{{' '.join(columns)}}} : ({terms})"
+
+# =========================
+# Profil NIK terakhir untuk autofill form pendaftaran (/api/get-latest-by-nik)
+# =========================
+# nik_latest_profile menyimpan satu baris per NIK: id biodata terbaru (created_at terakhir)
+# dan JSON seluruh kolom baris itu, sehingga endpoint publik cukup satu lookup PRIMARY KEY.
+# Form pendaftaran memakai semua field (termasuk rekening, buku tabungan dan tanda tangan
+# untuk peserta yang mendaftar lagi). Dijaga trigger pada biodata_kegiatan.
+NIK_PROFILE_FIELDS = BIODATA_VIEW_COLUMNS
+
+def _nik_profile_json_sql():
+    """Ekspresi json_object() field autofill (tanggal_lahir dipotong ke YYYY-MM-DD)"""
+    items = []
+    for field in NIK_PROFILE_FIELDS:
+        if field == 'tanggal_lahir':
+            expr = "CASE WHEN length(tanggal_lahir) >= 10 THEN substr(tanggal_lahir, 1, 10) ELSE tanggal_lahir END"
+        else:
+            expr = field
+        items.append(f"'{field}', {expr}")
+    return f"json_object({', '.join(items)})"
+
+def _nik_profile_refresh_sql(nik_expr):
+    """Statement trigger: hitung ulang baris nik_latest_profile untuk satu NIK"""
+    return f"""
+            DELETE FROM nik_latest_profile WHERE nik = {nik_expr};
+            INSERT INTO nik_latest_profile (nik, biodata_id, data)
+            SELECT nik, id, {_nik_profile_json_sql()}
+            FROM biodata_kegiatan
+            WHERE nik = {nik_expr}
+            ORDER BY created_at DESC
+            LIMIT 1;"""
+
+def nik_profile_triggers(normalized=False):
+    """Trigger nik_latest_profile (pada participation jika skema peserta_profile aktif)"""
+    table = biodata_trigger_table(normalized)
+    new_nik = biodata_col('NEW', 'nik', normalized)
+    old_nik = biodata_col('OLD', 'nik', normalized)
+    return [
+        ('trg_nik_profile_insert', f"""
+            AFTER INSERT ON {table}
+            BEGIN{_nik_profile_refresh_sql(new_nik)}
+            END
+        """),
+        ('trg_nik_profile_delete', f"""
+            AFTER DELETE ON {table}
+            BEGIN{_nik_profile_refresh_sql(old_nik)}
+            END
+        """),
+        ('trg_nik_profile_update', f"""
+            AFTER UPDATE ON {table}
+            BEGIN{_nik_profile_refresh_sql(old_nik)}{_nik_profile_refresh_sql(new_nik)}
+            END
+        """),
+    ]
+
+def ensure_nik_latest_profile(connection):
+    """Membuat tabel nik_latest_profile + trigger, dan mengisinya jika baru dibuat atau triggernya berubah"""
+    cursor = connection.cursor()
+    baru = not table_exists(connection, 'nik_latest_profile')
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS nik_latest_profile (
+            nik TEXT PRIMARY KEY,
+            biodata_id INTEGER NOT NULL,
+            data TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+    # sqlite_master menyimpan teks CREATE TRIGGER apa adanya: jika berbeda (daftar field berubah),
+    # trigger dibuat ulang dan isi tabel dihitung ulang
+    triggers = nik_profile_triggers(peserta_profile_schema_aktif(connection))
+    cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_nik_profile_%'")
+    trigger_lama = {row[0]: row[1] for row in cursor.fetchall()}
+    for trigger_name, definition in triggers:
+        sql = f"CREATE TRIGGER {trigger_name} {definition}"
+        if trigger_name in trigger_lama and trigger_lama[trigger_name] != sql:
+            cursor.execute(f"DROP TRIGGER {trigger_name}")
+            baru = True
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger_name} {definition}")
+    if baru:
+        cursor.execute("DELETE FROM nik_latest_profile")
+        # Kolom "bare" bersama MAX() diambil dari baris dengan created_at terbesar per NIK
+        cursor.execute(f"""
+            INSERT INTO nik_latest_profile (nik, biodata_id, data)
+            SELECT nik, id, data FROM (
+                SELECT nik, id, {_nik_profile_json_sql()} AS data, MAX(created_at)
+                FROM biodata_kegiatan
+                GROUP BY nik
+            )
+        """)
+    connection.commit()
+    cursor.close()
+
+def _static_upload_url(path):
+    """Path file upload (uploads/..., static/uploads/... atau nama file) sebagai URL static/uploads/..."""
+    path = normalize_buku_tabungan_path(path)
+    if path.startswith('static/'):
+        return path
+    if path.startswith('uploads/'):
+        return 'static/' + path
+    return 'static/uploads/' + path
+
+def nik_profile_payload(data):
+    """JSON nik_latest_profile -> JSON response autofill (path buku tabungan & tanda tangan jadi URL)"""
+    biodata = json.loads(data)
+    if biodata.get('buku_tabungan_path'):
+        biodata['buku_tabungan_path'] = _static_upload_url(biodata['buku_tabungan_path'])
+    tanda_tangan = biodata.get('tanda_tangan')
+    if tanda_tangan:
+        tanda_tangan = str(tanda_tangan)
+        # Tanda tangan base64 (data lama) dikirim apa adanya
+        if tanda_tangan.startswith('data:image'):
+            biodata['tanda_tangan'] = tanda_tangan
+        elif 'uploads/' in tanda_tangan or tanda_tangan.startswith('static/'):
+            biodata['tanda_tangan'] = _static_upload_url(tanda_tangan)
+        else:
+            biodata['tanda_tangan'] = 'static/uploads/' + tanda_tangan
+    return app.json.dumps(biodata)
+
+def get_nik_latest_profile(cursor, nik):
+    """JSON autofill biodata terakhir untuk NIK (None jika belum terdaftar), lewat LRU proses
+
+    Hit tidak menjalankan query sama sekali. Entry dibuang saat NIK tersebut ditulis di proses
+    ini (invalidate_cache niks=...) dan kedaluwarsa setelah NIK_PROFILE_CACHE_TTL detik untuk
+    perubahan dari worker lain.
+    """
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _nik_profile_cache.get(nik)
+        if entry and entry[0] > now:
+            _nik_profile_cache.move_to_end(nik)
+            return entry[1]
+
+    cursor.execute("SELECT data FROM nik_latest_profile WHERE nik = ?", (nik,))
+    row = cursor.fetchone()
+    data = nik_profile_payload(row[0]) if row else None
+    if NIK_PROFILE_CACHE_SIZE > 0 and NIK_PROFILE_CACHE_TTL > 0:
+        with _cache_lock:
+            _nik_profile_cache[nik] = (now + NIK_PROFILE_CACHE_TTL, data)
+            _nik_profile_cache.move_to_end(nik)
+            while len(_nik_profile_cache) > NIK_PROFILE_CACHE_SIZE:
+                _nik_profile_cache.popitem(last=False)
+    return data
+
 def init_database():
     """Menginisialisasi database dan membuat tabel users jika belum ada"""
+    global PESERTA_PROFILE_SCHEMA
     connection = get_db_connection()
     if connection is None:
-        print("❌ Gagal membuat koneksi ke SQLite!")
-        print("   Pastikan:")
-        print("   1. Folder aplikasi memiliki permission write")
-        print("   2. Konfigurasi di .env atau app.py sudah benar")
+        logger.error("❌ Gagal membuat koneksi ke SQLite! Pastikan folder aplikasi memiliki permission write dan konfigurasi di .env atau app.py sudah benar")
         return False
 
     try:
@@ -145,7 +1145,7 @@ def init_database():
 
         # Membuat tabel users jika belum ada
         if not users_table_exists:
-            print("📋 Membuat tabel 'users' jika belum ada...")
+            logger.info("📋 Membuat tabel 'users' jika belum ada...")
             create_table_query = """
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -159,30 +1159,30 @@ def init_database():
             """
             cursor.execute(create_table_query)
             connection.commit()
-            print("✅ Tabel 'users' siap!")
+            logger.info("✅ Tabel 'users' siap!")
         else:
-            print("📋 Tabel 'users' sudah ada, mengecek kolom...")
+            logger.info("📋 Tabel 'users' sudah ada, mengecek kolom...")
 
             # Tambahkan kolom role jika tabel sudah ada tapi kolom belum ada
             if not column_exists(connection, 'users', 'role'):
-                print("📝 Menambahkan kolom 'role' ke tabel 'users'...")
+                logger.info("📝 Menambahkan kolom 'role' ke tabel 'users'...")
                 cursor.execute("ALTER TABLE users ADD COLUMN role TEXT DEFAULT 'user'")
                 connection.commit()
-                print("✅ Kolom 'role' berhasil ditambahkan!")
+                logger.info("✅ Kolom 'role' berhasil ditambahkan!")
 
             # Tambahkan kolom nama jika tabel sudah ada tapi kolom belum ada
             if not column_exists(connection, 'users', 'nama'):
-                print("📝 Menambahkan kolom 'nama' ke tabel 'users'...")
+                logger.info("📝 Menambahkan kolom 'nama' ke tabel 'users'...")
                 cursor.execute("ALTER TABLE users ADD COLUMN nama VARCHAR(255) NULL")
                 connection.commit()
-                print("✅ Kolom 'nama' berhasil ditambahkan!")
+                logger.info("✅ Kolom 'nama' berhasil ditambahkan!")
 
             # Tambahkan kolom email jika tabel sudah ada tapi kolom belum ada
             if not column_exists(connection, 'users', 'email'):
-                print("📝 Menambahkan kolom 'email' ke tabel 'users'...")
+                logger.info("📝 Menambahkan kolom 'email' ke tabel 'users'...")
                 cursor.execute("ALTER TABLE users ADD COLUMN email VARCHAR(255) NULL")
                 connection.commit()
-                print("✅ Kolom 'email' berhasil ditambahkan!")
+                logger.info("✅ Kolom 'email' berhasil ditambahkan!")
 
         # Buat akun admin default jika belum ada
         try:
@@ -192,16 +1192,15 @@ def init_database():
             admin_exists = cursor.fetchone()
 
             if not admin_exists:
-                print("👤 Membuat akun admin default...")
+                logger.info("👤 Membuat akun admin default...")
                 # Simpan password sebagai plain text
                 cursor.execute(
                     "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
                     (admin_username, admin_password, 'admin')
                 )
                 connection.commit()
-                print(f"✅ Akun admin default berhasil dibuat!")
-                print(f"   Username: {admin_username}")
-                print(f"   Password: {admin_password}")
+                logger.info("✅ Akun admin default berhasil dibuat!")
+                logger.info("   Username: %s", admin_username)
             else:
                 # Update role jika admin sudah ada tapi belum set role
                 cursor.execute("UPDATE users SET role = 'admin' WHERE username = ? AND (role IS NULL OR role = 'user' OR role = 'operator')", (admin_username,))
@@ -213,12 +1212,19 @@ def init_database():
                     cursor.execute("UPDATE users SET password = ? WHERE username = ?", (admin_password, admin_username))
                 connection.commit()
                 if cursor.rowcount > 0:
-                    print("✅ Role admin berhasil diupdate untuk user yang sudah ada!")
+                    logger.info("✅ Role admin berhasil diupdate untuk user yang sudah ada!")
         except sqlite3.Error as e:
-            print(f"⚠️  Perhatian saat membuat akun admin: {e}")
+            logger.warning("⚠️  Perhatian saat membuat akun admin: %s", e)
+
+        # Skema peserta_profile: biodata_kegiatan berupa view di atas peserta_profile + participation
+        PESERTA_PROFILE_SCHEMA = peserta_profile_schema_aktif(connection)
+        if PESERTA_PROFILE_SCHEMA:
+            ensure_peserta_profile_view(connection)
+            connection.commit()
+            logger.info("✅ Skema peserta_profile aktif (biodata_kegiatan = view peserta_profile + participation)")
 
-        # Membuat tabel biodata_kegiatan jika belum ada
-        print("📋 Membuat tabel 'biodata_kegiatan' jika belum ada...")
+        # Membuat tabel biodata_kegiatan jika belum ada (no-op jika sudah ada sebagai tabel atau view)
+        logger.info("📋 Membuat tabel 'biodata_kegiatan' jika belum ada...")
         create_biodata_table_query = """
         CREATE TABLE IF NOT EXISTS biodata_kegiatan (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -255,15 +1261,18 @@ def init_database():
             tanda_tangan TEXT DEFAULT NULL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            kegiatan_id INTEGER DEFAULT NULL REFERENCES kegiatan_master(id) ON DELETE SET NULL,
+            tahun INTEGER GENERATED ALWAYS AS (CAST(strftime('%Y', created_at) AS INTEGER)) STORED,
+            bulan INTEGER GENERATED ALWAYS AS (CAST(strftime('%m', created_at) AS INTEGER)) STORED,
             FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
         )
         """
         cursor.execute(create_biodata_table_query)
         connection.commit()
-        print("✅ Tabel 'biodata_kegiatan' siap!")
+        logger.info("✅ Tabel 'biodata_kegiatan' siap!")
 
         # Membuat tabel kegiatan_master jika belum ada
-        print("📋 Membuat tabel 'kegiatan_master' jika belum ada...")
+        logger.info("📋 Membuat tabel 'kegiatan_master' jika belum ada...")
         create_kegiatan_master_table_query = """
         CREATE TABLE IF NOT EXISTS kegiatan_master (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -276,20 +1285,20 @@ def init_database():
         """
         cursor.execute(create_kegiatan_master_table_query)
         connection.commit()
-        print("✅ Tabel 'kegiatan_master' siap!")
+        logger.info("✅ Tabel 'kegiatan_master' siap!")
 
         # Tambahkan kolom is_hidden jika belum ada
         if not column_exists(connection, 'kegiatan_master', 'is_hidden'):
-            print("📝 Menambahkan kolom 'is_hidden' ke tabel 'kegiatan_master'...")
+            logger.info("📝 Menambahkan kolom 'is_hidden' ke tabel 'kegiatan_master'...")
             try:
                 cursor.execute("ALTER TABLE kegiatan_master ADD COLUMN is_hidden INTEGER DEFAULT 0")
                 connection.commit()
-                print("✅ Kolom 'is_hidden' berhasil ditambahkan!")
+                logger.info("✅ Kolom 'is_hidden' berhasil ditambahkan!")
             except sqlite3.Error as e:
-                print(f"⚠️  Perhatian saat menambahkan kolom is_hidden: {e}")
+                logger.warning("⚠️  Perhatian saat menambahkan kolom is_hidden: %s", e)
 
         # Membuat tabel operator_kegiatan untuk relasi many-to-many antara operator dan kegiatan
-        print("📋 Membuat tabel 'operator_kegiatan' jika belum ada...")
+        logger.info("📋 Membuat tabel 'operator_kegiatan' jika belum ada...")
         create_operator_kegiatan_table_query = """
         CREATE TABLE IF NOT EXISTS operator_kegiatan (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -303,43 +1312,142 @@ def init_database():
         """
         cursor.execute(create_operator_kegiatan_table_query)
         connection.commit()
-        print("✅ Tabel 'operator_kegiatan' siap!")
+        logger.info("✅ Tabel 'operator_kegiatan' siap!")
 
         # Tambahkan kolom user_id jika tabel sudah ada tapi kolom belum ada
         if not column_exists(connection, 'biodata_kegiatan', 'user_id'):
-            print("📝 Menambahkan kolom 'user_id' ke tabel 'biodata_kegiatan'...")
+            logger.info("📝 Menambahkan kolom 'user_id' ke tabel 'biodata_kegiatan'...")
             try:
                 cursor.execute("ALTER TABLE biodata_kegiatan ADD COLUMN user_id INTEGER NOT NULL DEFAULT 1")
                 connection.commit()
-                print("✅ Kolom 'user_id' berhasil ditambahkan!")
+                logger.info("✅ Kolom 'user_id' berhasil ditambahkan!")
+            except sqlite3.Error as e:
+                logger.warning("⚠️  Perhatian saat menambahkan kolom user_id: %s", e)
+
+        # Tambahkan kolom kegiatan_id (relasi integer ke kegiatan_master) jika belum ada
+        if not column_exists(connection, 'biodata_kegiatan', 'kegiatan_id'):
+            logger.info("📝 Menambahkan kolom 'kegiatan_id' ke tabel 'biodata_kegiatan'...")
+            try:
+                cursor.execute("ALTER TABLE biodata_kegiatan ADD COLUMN kegiatan_id INTEGER DEFAULT NULL REFERENCES kegiatan_master(id) ON DELETE SET NULL")
+                connection.commit()
+                logger.info("✅ Kolom 'kegiatan_id' berhasil ditambahkan!")
             except sqlite3.Error as e:
-                print(f"⚠️  Perhatian saat menambahkan kolom user_id: {e}")
+                logger.warning("⚠️  Perhatian saat menambahkan kolom kegiatan_id: %s", e)
 
-        # Create index untuk user_id
+        # Backfill kegiatan_id dari nama_kegiatan (hanya baris yang belum terhubung;
+        # index kegiatan_id dibuat ensure_db_indexes)
         try:
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_biodata_user_id ON biodata_kegiatan (user_id)")
+            cursor.execute("""
+                UPDATE biodata_kegiatan
+                SET kegiatan_id = (
+                    SELECT km.id FROM kegiatan_master km
+                    WHERE TRIM(km.nama_kegiatan) = TRIM(biodata_kegiatan.nama_kegiatan)
+                    ORDER BY km.id
+                    LIMIT 1
+                )
+                WHERE kegiatan_id IS NULL
+                  AND TRIM(COALESCE(nama_kegiatan, '')) != ''
+            """)
             connection.commit()
-        except sqlite3.Error:
-            pass
+            cursor.execute("SELECT COUNT(*) FROM biodata_kegiatan WHERE kegiatan_id IS NOT NULL")
+            logger.info("✅ Kolom 'kegiatan_id' siap (%s biodata terhubung ke kegiatan_master)", cursor.fetchone()[0])
+        except sqlite3.Error as e:
+            logger.warning("⚠️  Perhatian saat mengisi kolom kegiatan_id: %s", e)
+
+        # Kolom tahun/bulan dari created_at untuk filter rekap (tanpa strftime per baris saat query).
+        # SQLite tidak bisa menambah kolom STORED lewat ALTER TABLE, jadi database lama memakai
+        # kolom VIRTUAL; nilainya tetap tersimpan di index idx_biodata_tahun_bulan_kegiatan.
+        for kolom, format_waktu in (('tahun', '%Y'), ('bulan', '%m')):
+            if not column_exists(connection, 'biodata_kegiatan', kolom):
+                logger.info("📝 Menambahkan kolom '%s' ke tabel 'biodata_kegiatan'...", kolom)
+                try:
+                    cursor.execute(f"""
+                        ALTER TABLE biodata_kegiatan
+                        ADD COLUMN {kolom} INTEGER
+                        GENERATED ALWAYS AS (CAST(strftime('{format_waktu}', created_at) AS INTEGER)) VIRTUAL
+                    """)
+                    connection.commit()
+                    logger.info("✅ Kolom '%s' berhasil ditambahkan!", kolom)
+                except sqlite3.Error as e:
+                    logger.warning("⚠️  Perhatian saat menambahkan kolom %s: %s", kolom, e)
+
+        # Index untuk query yang sering dipakai
+        try:
+            ensure_db_indexes(connection)
+            logger.info("✅ %s index biodata/kegiatan siap!", len(PESERTA_PROFILE_INDEXES if PESERTA_PROFILE_SCHEMA else DB_INDEXES))
+        except sqlite3.Error as e:
+            logger.warning("⚠️  Perhatian saat membuat index: %s", e)
+
+        # Tabel ringkasan dashboard (dijaga trigger)
+        try:
+            ensure_kabupaten_counts(connection)
+            logger.info("✅ Ringkasan kabupaten_counts siap!")
+        except sqlite3.Error as e:
+            logger.warning("⚠️  Perhatian saat membuat ringkasan kabupaten_counts: %s", e)
+
+        # Versi cache untuk invalidasi antar worker
+        try:
+            ensure_cache_version(connection)
+            logger.info("✅ Tabel cache_version siap!")
+        except sqlite3.Error as e:
+            logger.warning("⚠️  Perhatian saat membuat tabel cache_version: %s", e)
+
+        # Antrian export background
+        try:
+            ensure_export_jobs(connection)
+            logger.info("✅ Tabel antrian export_jobs siap!")
+        except sqlite3.Error as e:
+            logger.warning("⚠️  Perhatian saat membuat tabel export_jobs: %s", e)
+
+        # updated_at biodata untuk versi data cache export
+        try:
+            ensure_biodata_updated_at(connection)
+            logger.info("✅ Trigger updated_at biodata siap!")
+        except sqlite3.Error as e:
+            logger.warning("⚠️  Perhatian saat membuat trigger updated_at biodata: %s", e)
+
+        # Profil NIK terakhir untuk autofill form pendaftaran (dijaga trigger)
+        try:
+            ensure_nik_latest_profile(connection)
+            logger.info("✅ Tabel nik_latest_profile siap!")
+        except sqlite3.Error as e:
+            logger.warning("⚠️  Perhatian saat membuat tabel nik_latest_profile: %s", e)
+
+        # Index full-text pencarian peserta (/api/search)
+        try:
+            ensure_biodata_fts(connection)
+            logger.info("✅ Index pencarian biodata_fts siap!")
+        except sqlite3.Error as e:
+            logger.warning("⚠️  Perhatian saat membuat index pencarian biodata_fts (SQLite tanpa FTS5?): %s", e)
 
-        print("🎉 Database berhasil diinisialisasi!")
+        logger.info("🎉 Database berhasil diinisialisasi!")
         return True
 
     except sqlite3.Error as e:
-        print(f"❌ Error initializing database: {e}")
+        logger.error("❌ Error initializing database: %s", e)
         return False
     finally:
         if connection:
             cursor.close()
             connection.close()
 
-# Inisialisasi database saat aplikasi dimulai
-print("🚀 Memulai inisialisasi database...")
-if not init_database():
-    print("⚠️  Peringatan: Inisialisasi database gagal atau database belum siap!")
-    print("   Silakan periksa file database dan coba refresh halaman.")
-else:
-    print("✅ Database siap digunakan!")
+# Inisialisasi database saat aplikasi dimulai; dilewati di proses render PDF paralel yang
+# mengimpor ulang app.py sebagai __mp_main__ saat aplikasi dijalankan dengan python app.py
+if __name__ != '__mp_main__':
+    logger.info("🚀 Memulai inisialisasi database...")
+    if not init_database():
+        logger.warning("⚠️  Peringatan: Inisialisasi database gagal atau database belum siap! Silakan periksa file database dan coba refresh halaman.")
+    else:
+        logger.info("✅ Database siap digunakan!")
+        _pragma_connection = get_db_connection()
+        if _pragma_connection:
+            try:
+                _pragmas = get_effective_db_pragmas(_pragma_connection)
+                logger.info("⚙️  SQLite PRAGMA: %s", ", ".join(f"{k}={v}" for k, v in _pragmas.items()))
+            except sqlite3.Error as e:
+                logger.warning("⚠️  Gagal membaca PRAGMA SQLite: %s", e)
+            finally:
+                _pragma_connection.close()
 
 def allowed_file(filename):
     """Cek apakah file yang diupload memiliki ekstensi yang diizinkan"""
@@ -391,9 +1499,10 @@ def is_valid_image(file):
             return False
 
     except Exception as e:
-        print(f"Error validating image: {e}")
+        logger.error("Error validating image: %s", e)
         return False
 
+@profile_span('buku_img')
 def save_uploaded_file(file, nik):
     """Menyimpan file yang diupload dengan validasi ketat dan mengembalikan path-nya (relatif dari static folder)"""
     if not file or not file.filename:
@@ -436,44 +1545,44 @@ def save_uploaded_file(file, nik):
         # Kembalikan path relatif dari static folder (uploads/filename.jpg)
         return os.path.join('uploads', filename).replace('\\', '/')
     except Exception as e:
-        print(f"Error saving uploaded file: {e}")
+        logger.error("Error saving uploaded file: %s", e)
         return None
 
+@profile_span('ttd_img')
 def save_tanda_tangan_file(tanda_tangan_base64, nik):
     """Menyimpan tanda tangan dari base64 ke file dan mengembalikan path-nya (relatif dari static folder)"""
     if not tanda_tangan_base64:
-        print("❌ save_tanda_tangan_file: tanda_tangan_base64 is None or empty")
+        logger.error("❌ save_tanda_tangan_file: tanda_tangan_base64 is None or empty")
         return None
 
     try:
-        print(f"🔍 save_tanda_tangan_file - NIK: {nik}")
-        print(f"🔍 save_tanda_tangan_file - tanda_tangan_base64 type: {type(tanda_tangan_base64)}")
-        print(f"🔍 save_tanda_tangan_file - tanda_tangan_base64 length: {len(str(tanda_tangan_base64))}")
-        print(f"🔍 save_tanda_tangan_file - tanda_tangan_base64 preview: {str(tanda_tangan_base64)[:100]}")
+        logger.debug("save_tanda_tangan_file - NIK: %s", nik)
+        logger.debug("save_tanda_tangan_file - tanda_tangan_base64 type: %s", type(tanda_tangan_base64))
+        logger.debug("save_tanda_tangan_file - tanda_tangan_base64 length: %s", len(str(tanda_tangan_base64)))
 
         # Decode base64
         img_data = None
         if isinstance(tanda_tangan_base64, str) and tanda_tangan_base64.startswith('data:image'):
             # Format: data:image/png;base64,...
-            print("🔍 save_tanda_tangan_file - Format: data:image")
+            logger.debug("save_tanda_tangan_file - Format: data:image")
             header, encoded = tanda_tangan_base64.split(',', 1)
             img_data = base64.b64decode(encoded)
-            print(f"🔍 save_tanda_tangan_file - Decoded size: {len(img_data)} bytes")
+            logger.debug("save_tanda_tangan_file - Decoded size: %s bytes", len(img_data))
         else:
             # Base64 langsung
-            print("🔍 save_tanda_tangan_file - Format: base64 langsung")
+            logger.debug("save_tanda_tangan_file - Format: base64 langsung")
             # Hapus whitespace jika ada
             clean_data = str(tanda_tangan_base64).strip().replace('\n', '').replace('\r', '').replace(' ', '')
             img_data = base64.b64decode(clean_data)
-            print(f"🔍 save_tanda_tangan_file - Decoded size: {len(img_data)} bytes")
+            logger.debug("save_tanda_tangan_file - Decoded size: %s bytes", len(img_data))
 
         if not img_data:
-            print("❌ save_tanda_tangan_file: Failed to decode base64")
+            logger.error("❌ save_tanda_tangan_file: Failed to decode base64")
             return None
 
         # Buka gambar
         img = Image.open(io.BytesIO(img_data))
-        print(f"🔍 save_tanda_tangan_file - Image opened: {img.size}, mode: {img.mode}")
+        logger.debug("save_tanda_tangan_file - Image opened: %s, mode: %s", img.size, img.mode)
 
         # Convert ke RGB jika perlu
         if img.mode in ('RGBA', 'LA', 'P'):
@@ -489,211 +1598,33 @@ def save_tanda_tangan_file(tanda_tangan_base64, nik):
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = secure_filename(f"{nik}_ttd_{timestamp}.jpg")
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        print(f"🔍 save_tanda_tangan_file - Saving to: {filepath}")
+        logger.debug("save_tanda_tangan_file - Saving to: %s", filepath)
 
         # Pastikan folder upload ada
         os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
         # Save sebagai JPEG dengan quality 90% untuk kualitas yang baik
         img.save(filepath, 'JPEG', quality=90, optimize=True)
-        print(f"✅ save_tanda_tangan_file - File saved successfully: {filepath}")
+        logger.debug("✅ save_tanda_tangan_file - File saved successfully: %s", filepath)
 
         # Kembalikan path relatif dari static folder (uploads/filename.jpg)
         result_path = os.path.join('uploads', filename).replace('\\', '/')
-        print(f"✅ save_tanda_tangan_file - Returning path: {result_path}")
+
+        # Siapkan versi siap cetak untuk export PDF sekarang, bukan saat export
+        siapkan_tanda_tangan_pdf(result_path)
+
+        logger.debug("✅ save_tanda_tangan_file - Returning path: %s", result_path)
         return result_path
     except Exception as e:
-        print(f"❌ Error saving tanda tangan file: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error saving tanda tangan file: %s", e)
         return None
 
-def process_tanda_tangan_for_pdf(tanda_tangan_data, temp_files_list=None):
-    """
-    Memproses tanda tangan untuk PDF export
-    Returns: (RLImage object, error_message)
-    """
-    if not tanda_tangan_data:
-        print("DEBUG: Tanda tangan data is None or empty")
-        return None, "Tanda tangan kosong"
-
-    try:
-        # Bersihkan whitespace jika string
-        if isinstance(tanda_tangan_data, str):
-            tanda_tangan_data = tanda_tangan_data.strip()
-            if not tanda_tangan_data:
-                print("DEBUG: Tanda tangan data is empty after strip")
-                return None, "Tanda tangan kosong setelah pembersihan"
-
-        img_data = None
-
-        # Debug: print tipe data
-        print(f"DEBUG process_tanda_tangan: Data type: {type(tanda_tangan_data)}")
-        if isinstance(tanda_tangan_data, str):
-            data_preview = tanda_tangan_data[:100] + "..." if len(tanda_tangan_data) > 100 else tanda_tangan_data
-            print(f"DEBUG process_tanda_tangan: Data preview: {data_preview}")
-            print(f"DEBUG process_tanda_tangan: Data length: {len(tanda_tangan_data)}")
-        else:
-            print(f"DEBUG process_tanda_tangan: Data length: {len(str(tanda_tangan_data)) if hasattr(tanda_tangan_data, '__len__') else 'N/A'}")
-
-        if isinstance(tanda_tangan_data, str):
-            if tanda_tangan_data.startswith('data:image'):
-                print("DEBUG process_tanda_tangan: Detected data:image format")
-                try:
-                    header, encoded = tanda_tangan_data.split(',', 1)
-                    print(f"DEBUG process_tanda_tangan: Header: {header[:50]}")
-                    print(f"DEBUG process_tanda_tangan: Encoded length: {len(encoded)}")
-                    img_data = base64.b64decode(encoded, validate=True)
-                    print(f"DEBUG process_tanda_tangan: Decoded base64, size: {len(img_data)} bytes")
-                except Exception as e:
-                    print(f"DEBUG process_tanda_tangan: Error decoding data:image: {e}")
-                    return None, f"Gagal decode data:image: {str(e)}"
-            elif 'uploads/' in tanda_tangan_data or tanda_tangan_data.startswith('static/'):
-                print(f"DEBUG process_tanda_tangan: Detected file path: {tanda_tangan_data}")
-                path = tanda_tangan_data
-                if path.startswith('uploads/'):
-                    path = os.path.join(BASE_DIR, 'static', path)
-                elif path.startswith('static/'):
-                    path = os.path.join(BASE_DIR, path)
-                else:
-                    # Jika hanya mengandung 'uploads/' di tengah string
-                    path = os.path.join(BASE_DIR, 'static', path)
-                print(f"DEBUG process_tanda_tangan: Full path: {path}")
-                print(f"DEBUG process_tanda_tangan: Path exists: {os.path.exists(path)}")
-                if os.path.exists(path):
-                    print(f"DEBUG process_tanda_tangan: File exists, reading...")
-                    with open(path, 'rb') as f:
-                        img_data = f.read()
-                    print(f"DEBUG process_tanda_tangan: Read file, size: {len(img_data)} bytes")
-                else:
-                    return None, f"File tidak ditemukan: {path}"
-            else:
-                print("DEBUG process_tanda_tangan: Trying direct base64 decode")
-                try:
-                    # Coba decode base64
-                    img_data = base64.b64decode(tanda_tangan_data, validate=True)
-                    print(f"DEBUG process_tanda_tangan: Direct base64 decode success, size: {len(img_data)} bytes")
-                except Exception as e:
-                    print(f"DEBUG process_tanda_tangan: Direct base64 decode failed: {e}")
-                    return None, f"Gagal decode base64: {str(e)}"
-        else:
-            print(f"DEBUG process_tanda_tangan: Unsupported data type: {type(tanda_tangan_data)}")
-            return None, f"Format data tidak dikenal: {type(tanda_tangan_data)}"
-
-        if not img_data:
-            print("DEBUG process_tanda_tangan: No image data extracted")
-            return None, "Tidak ada data gambar"
-
-        if len(img_data) < 100:
-            print(f"DEBUG process_tanda_tangan: Image data too small: {len(img_data)} bytes")
-            return None, f"Data gambar terlalu kecil: {len(img_data)} bytes"
-
-        print(f"DEBUG process_tanda_tangan: Opening image from {len(img_data)} bytes")
-        try:
-            img = Image.open(io.BytesIO(img_data))
-            print(f"DEBUG process_tanda_tangan: Image opened successfully, mode: {img.mode}, size: {img.size}")
-        except Exception as e:
-            print(f"DEBUG process_tanda_tangan: Error opening image: {e}")
-            return None, f"Gagal membuka gambar: {str(e)}"
-
-        # Convert ke RGBA jika belum untuk manipulasi alpha channel
-        if img.mode != 'RGBA':
-            print(f"DEBUG process_tanda_tangan: Converting from {img.mode} to RGBA")
-            img = img.convert('RGBA')
-
-        # Normalisasi: buat background putih dan goresan hitam
-        print("DEBUG process_tanda_tangan: Normalizing signature to black on white using auto inversion + threshold...")
-        img_gray = img.convert('L')
-        median = ImageStat.Stat(img_gray).median[0]
-        mean = ImageStat.Stat(img_gray).mean[0]
-        print(f"DEBUG process_tanda_tangan: median={median}, mean={mean}")
-
-        # Jika mayoritas gelap (background gelap), invert terlebih dahulu agar background jadi terang
-        if median < 128:
-            print("DEBUG process_tanda_tangan: Inverting grayscale because background seems dark")
-            img_gray = ImageOps.invert(img_gray)
-
-        # Tetapkan threshold adaptif: base dari median + offset, dibatasi range aman
-        stroke_threshold = int(min(230, max(120, median + 40)))
-        print(f"DEBUG process_tanda_tangan: stroke_threshold={stroke_threshold}")
-
-        binary = img_gray.point(lambda p: 0 if p < stroke_threshold else 255)
-        img = Image.merge('RGB', (binary, binary, binary))
-        print(f"DEBUG process_tanda_tangan: Final image mode: {img.mode}, size: {img.size}")
-
-        # Ukuran untuk dimasukkan ke tabel (dalam inch)
-        max_img_width_inch = 3.0 * inch
-        max_img_height_inch = 1.5 * inch
-
-        # DPI untuk kualitas HD (300 DPI untuk kualitas tinggi)
-        DPI = 300
-
-        # Konversi ukuran maksimal ke pixel
-        max_img_width_px = int(max_img_width_inch * DPI / 72.0)
-        max_img_height_px = int(max_img_height_inch * DPI / 72.0)
-
-        # Hitung ukuran baru dalam pixel dengan mempertahankan aspect ratio
-        img_ratio = img.width / img.height
-        original_width_px = img.width
-        original_height_px = img.height
-
-        if original_width_px > max_img_width_px:
-            new_width_px = max_img_width_px
-            new_height_px = int(new_width_px / img_ratio)
-            if new_height_px > max_img_height_px:
-                new_height_px = max_img_height_px
-                new_width_px = int(new_height_px * img_ratio)
-        elif original_height_px > max_img_height_px:
-            new_height_px = max_img_height_px
-            new_width_px = int(new_height_px * img_ratio)
-        else:
-            # Jika gambar terlalu kecil, perbesar minimal ke ukuran yang wajar
-            min_width_px = int(1.5 * inch * DPI / 72.0)
-            if original_width_px < min_width_px:
-                new_width_px = min_width_px
-                new_height_px = int(new_width_px / img_ratio)
-                if new_height_px > max_img_height_px:
-                    new_height_px = max_img_height_px
-                    new_width_px = int(new_height_px * img_ratio)
-            else:
-                new_width_px = original_width_px
-                new_height_px = original_height_px
-
-        # Konversi kembali ke inch untuk RLImage
-        new_width_inch = new_width_px * 72.0 / DPI
-        new_height_inch = new_height_px * 72.0 / DPI
-
-        print(f"DEBUG process_tanda_tangan: Original size: {original_width_px}x{original_height_px} px")
-        print(f"DEBUG process_tanda_tangan: Resizing to {new_width_px}x{new_height_px} px ({new_width_inch:.2f}x{new_height_inch:.2f} inches)")
+def jenis_tanda_tangan(value):
+    """Jenis nilai tanda tangan untuk log (isi base64/path tidak ikut dicatat)"""
+    if isinstance(value, str) and value.startswith('data:image'):
+        return f"data:image ({len(value)} karakter)"
+    return 'path' if value else 'kosong'
 
-        # Resize dengan LANCZOS untuk kualitas tinggi
-        img = img.resize((new_width_px, new_height_px), Image.Resampling.LANCZOS)
-
-        # Simpan ke temporary file dengan kualitas tinggi
-        print("DEBUG process_tanda_tangan: Saving to temporary file with high quality...")
-        tanda_tangan_temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-        img.save(tanda_tangan_temp_file.name, format='JPEG', quality=95, optimize=True)
-        tanda_tangan_temp_file.close()
-        print(f"DEBUG process_tanda_tangan: Saved to: {tanda_tangan_temp_file.name}")
-
-        # Simpan path untuk cleanup jika diperlukan
-        if temp_files_list is not None:
-            temp_files_list.append(tanda_tangan_temp_file.name)
-            print(f"DEBUG process_tanda_tangan: Added to cleanup list")
-
-        print("DEBUG process_tanda_tangan: Creating RLImage...")
-        tanda_tangan_img = RLImage(tanda_tangan_temp_file.name, width=new_width_inch, height=new_height_inch)
-        print(f"DEBUG process_tanda_tangan: RLImage created successfully, size: {new_width_inch:.2f}x{new_height_inch:.2f} inches")
-
-        return tanda_tangan_img, None
-
-    except Exception as e:
-        error_msg = f"Error processing tanda tangan: {str(e)}"
-        print(f"DEBUG process_tanda_tangan ERROR: {error_msg}")
-        import traceback
-        print("DEBUG process_tanda_tangan TRACEBACK:")
-        traceback.print_exc()
-        return None, error_msg
 
 def normalize_buku_tabungan_path(path):
     """Normalisasi path buku tabungan ke format 'uploads/filename.jpg'"""
@@ -838,7 +1769,7 @@ def validate_required_fields(form_data):
             missing_fields.append(field_name)
 
     if missing_fields:
-        print(f"❌ Validasi gagal - Field yang kosong: {', '.join(missing_fields)}")
+        logger.error("❌ Validasi gagal - Field yang kosong: %s", ', '.join(missing_fields))
         return False
 
     return True
@@ -950,92 +1881,390 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-@app.before_request
-def refresh_session():
-    """Refresh session sebelum setiap request untuk mencegah masalah saat back button"""
-    if session.get('logged_in'):
-        # Mark session sebagai modified untuk memastikan di-save
-        session.permanent = True
-        session.modified = True
-
-@app.after_request
-def set_cache_headers(response):
-    """Set header anti-cache untuk mencegah browser cache halaman yang memerlukan session"""
-    # Hanya set anti-cache untuk halaman HTML, bukan untuk file static, PDF, dll
-    if response.content_type and 'text/html' in response.content_type:
-        response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
-        # Vary header untuk memastikan browser tidak cache berdasarkan cookie
-        response.headers['Vary'] = 'Cookie'
-
-    # Refresh session setelah request untuk memastikan tetap valid
-    if session.get('logged_in'):
-        session.permanent = True
-        session.modified = True
-
-    return response
-
-@app.context_processor
-def inject_user_role():
-    """Inject user_role dan user_display_name ke semua template"""
-    return dict(
-        user_role=get_user_role(),
-        user_display_name=get_user_display_name(),
-        is_logged_in=is_logged_in(),
-        is_admin=is_admin()
+# =========================
+# Antrian export: enqueue, progres, eksekusi di worker
+# =========================
+def export_worker_aktif(cursor):
+    """Cek apakah ada export_worker.py yang heartbeat-nya masih baru"""
+    cursor.execute(
+        "SELECT COUNT(*) FROM export_workers WHERE last_seen >= datetime('now', ?)",
+        (f'-{EXPORT_WORKER_TIMEOUT} seconds',)
     )
+    return cursor.fetchone()[0] > 0
 
-@app.route('/login', methods=['GET', 'POST'])
-def login():
-    """Halaman login"""
-    # Jika user sudah login, redirect ke dashboard yang sesuai
-    if is_logged_in():
-        if is_admin():
-            return redirect(url_for('admin_dashboard'))
-        else:
-            return redirect(url_for('dashboard'))
-
-    if request.method == 'POST':
-        login_type = request.form.get('login_type')
-        username = request.form.get('username')
-        password = request.form.get('password')
+def enqueue_export_job(cursor):
+    """Masukkan request export saat ini ke antrian; return id job (commit dilakukan oleh pemanggil)"""
+    session_data = {key: session.get(key) for key in EXPORT_JOB_SESSION_KEYS}
+    cursor.execute("""
+        INSERT INTO export_jobs (user_id, path, query_string, session_data)
+        VALUES (?, ?, ?, ?)
+    """, (get_user_id(), request.path, request.query_string.decode('utf-8'), json.dumps(session_data)))
+    return cursor.lastrowid
 
-        # Validasi input
-        if not login_type or not username or not password:
-            flash('Semua field harus diisi!', 'error')
-            return render_template('login.html')
+def export_job(f):
+    """Decorator route export: jika diminta lewat header X-Export-Job dan worker aktif, masukkan ke antrian
 
-        # Validasi login_type
-        if login_type not in ['operator', 'admin']:
-            flash('Tipe login tidak valid!', 'error')
-            return render_template('login.html')
+    Tanpa header (link biasa) atau tanpa worker aktif, export tetap berjalan langsung seperti biasa.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if request.headers.get('X-Export-Job') != '1' or g.get('export_job'):
+            return f(*args, **kwargs)
 
-        # Koneksi ke database
         connection = get_db_connection()
-        if connection is None:
-            flash('Koneksi database gagal! Periksa file database dan konfigurasi.', 'error')
-            return render_template('login.html')
-
+        if not connection:
+            return jsonify({'async': False})
         cursor = None
         try:
             cursor = connection.cursor()
+            if not export_worker_aktif(cursor):
+                return jsonify({'async': False})
+            job_id = enqueue_export_job(cursor)
+            connection.commit()
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Gagal memasukkan export ke antrian, export langsung: %s", e)
+            return jsonify({'async': False})
+        finally:
+            if cursor:
+                cursor.close()
+            connection.close()
 
-            # Cek apakah tabel users ada, jika tidak, inisialisasi database
+        return jsonify({
+            'async': True,
+            'job_id': job_id,
+            'status_url': url_for('export_job_status', job_id=job_id)
+        }), 202
+    return decorated_function
+
+def export_output(suffix):
+    """File tujuan render export; job di worker selalu memakai spool karena body response dibaca worker"""
+    return new_export_file(suffix, sendfile=not g.get('export_job'))
+
+def export_row_limit(default_limit):
+    """Batas baris export: batas route untuk export langsung, EXPORT_JOB_MAX_ROWS jika dikerjakan worker"""
+    if has_app_context() and g.get('export_job'):
+        return max(default_limit, EXPORT_JOB_MAX_ROWS)
+    return default_limit
+
+def export_data_version(cursor, from_clause, params):
+    """Versi data baris yang akan di-export: (jumlah baris, jumlah id, updated_at terbaru)
+
+    Tambah/hapus baris mengubah jumlah baris atau id, edit baris menaikkan updated_at (trigger).
+    from_clause = bagian FROM ... WHERE ... dari query export (tanpa ORDER BY).
+    """
+    cursor.execute(f"SELECT COUNT(*), COALESCE(SUM(id), 0), MAX(updated_at) {from_clause}", params)
+    return tuple(cursor.fetchone())
+
+def export_tanda_tangan_values(cursor, from_clause, params):
+    """Isi kolom tanda_tangan baris yang akan di-export (dipotong, cukup untuk path file) untuk key cache PDF"""
+    cursor.execute(f"SELECT substr(tanda_tangan, 1, 500) {from_clause}", params)
+    return [row[0] for row in cursor.fetchall()]
+
+def export_cache_scope():
+    """Scope hak akses untuk key cache export: operator dibedakan per user, admin berbagi cache"""
+    if get_user_role() == 'operator':
+        return f"operator:{get_user_id()}"
+    return 'admin'
+
+def report_export_progress(rows_rendered, total_rows):
+    """Laporkan progres ke job yang sedang dikerjakan (no-op untuk export langsung)"""
+    if not has_app_context():
+        return
+    job = g.get('export_job')
+    if not job:
+        return
+    now = time.monotonic()
+    if rows_rendered < total_rows and now - job['last_progress'] < EXPORT_PROGRESS_INTERVAL:
+        return
+    job['last_progress'] = now
+
+    connection = get_db_connection()
+    if not connection:
+        return
+    try:
+        connection.execute(
+            "UPDATE export_jobs SET rows_rendered = ?, total_rows = ? WHERE id = ?",
+            (rows_rendered, total_rows, job['id'])
+        )
+        connection.commit()
+    except sqlite3.Error as e:
+        logger.warning("⚠️ Gagal update progres export job %s: %s", job['id'], e)
+    finally:
+        connection.close()
+
+def claim_export_job(connection, worker_id):
+    """Ambil satu job 'antri' tertua dan tandai 'proses' secara atomik; return dict job atau None"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT * FROM export_jobs WHERE status = 'antri' ORDER BY id LIMIT 1")
+        row = cursor.fetchone()
+        if row:
+            cursor.execute("""
+                UPDATE export_jobs
+                SET status = 'proses', worker_id = ?, started_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (worker_id, row['id']))
+        connection.commit()
+        return row_to_dict(row) if row else None
+    except sqlite3.Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def run_export_job(job):
+    """Jalankan route export milik job di request context worker; return (response, error)"""
+    session_data = json.loads(job['session_data'])
+    with app.test_request_context(job['path'], query_string=job['query_string']):
+        session.update(session_data)
+        g.export_job = {'id': job['id'], 'last_progress': 0.0}
+        response = app.full_dispatch_request()
+        if response.status_code == 200 and response.headers.get('Content-Disposition'):
+            return response, None
+        # Route export mengembalikan redirect + flash jika gagal (data kosong, terlalu besar, dsb)
+        pesan = [message for _category, message in session.get('_flashes', [])]
+        return None, '; '.join(pesan) or f"Export gagal (HTTP {response.status_code})"
+
+def process_export_job(connection, job):
+    """Kerjakan satu job yang sudah di-claim lalu simpan hasil/error ke export_jobs"""
+    try:
+        response, error = run_export_job(job)
+        if response is not None:
+            os.makedirs(EXPORT_JOB_FOLDER, exist_ok=True)
+            extension = '.pdf' if response.mimetype == 'application/pdf' else '.xlsx'
+            file_path = os.path.join(EXPORT_JOB_FOLDER, f"export_{job['id']}{extension}")
+            with open(file_path, 'wb') as f:
+                for chunk in response.iter_encoded():
+                    f.write(chunk)
+            response.close()
+            connection.execute("""
+                UPDATE export_jobs
+                SET status = 'selesai', file_path = ?, mimetype = ?, content_disposition = ?,
+                    rows_rendered = MAX(rows_rendered, total_rows), finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (file_path, response.mimetype, response.headers['Content-Disposition'], job['id']))
+        else:
+            connection.execute("""
+                UPDATE export_jobs SET status = 'gagal', error = ?, finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (error, job['id']))
+        connection.commit()
+    except Exception as e:
+        logger.exception("❌ Export job %s gagal: %s", job['id'], e)
+        connection.rollback()
+        connection.execute("""
+            UPDATE export_jobs SET status = 'gagal', error = ?, finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (f"Terjadi kesalahan saat export: {str(e)}", job['id']))
+        connection.commit()
+
+def purge_export_jobs(connection):
+    """Hapus job + file yang melewati masa simpan, dan gagalkan job 'proses' yang worker-nya mati"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            UPDATE export_jobs
+            SET status = 'gagal', error = 'Worker export berhenti sebelum job selesai', finished_at = CURRENT_TIMESTAMP
+            WHERE status = 'proses'
+              AND worker_id NOT IN (
+                  SELECT worker_id FROM export_workers WHERE last_seen >= datetime('now', ?)
+              )
+        """, (f'-{EXPORT_WORKER_TIMEOUT} seconds',))
+        cursor.execute("""
+            SELECT id, file_path FROM export_jobs
+            WHERE status IN ('selesai', 'gagal')
+              AND finished_at < datetime('now', ?)
+        """, (f'-{EXPORT_JOB_RETENTION_HOURS} hours',))
+        expired = cursor.fetchall()
+        for row in expired:
+            if row['file_path'] and os.path.exists(row['file_path']):
+                try:
+                    os.unlink(row['file_path'])
+                except OSError as e:
+                    logger.warning("⚠️ Gagal menghapus file export %s: %s", row['file_path'], e)
+        cursor.executemany("DELETE FROM export_jobs WHERE id = ?", [(row['id'],) for row in expired])
+        connection.commit()
+        return len(expired)
+    finally:
+        cursor.close()
+
+@app.route('/admin/export-job/<int:job_id>')
+@admin_required
+def export_job_status(job_id):
+    """API status job export: progres baris dan URL download jika sudah selesai"""
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Koneksi database gagal!'}), 500
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        cursor.execute("""
+            SELECT id, status, rows_rendered, total_rows, error
+            FROM export_jobs
+            WHERE id = ? AND user_id = ?
+        """, (job_id, get_user_id()))
+        job = cursor.fetchone()
+    except sqlite3.Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        connection.close()
+
+    if not job:
+        return jsonify({'error': 'Job export tidak ditemukan!'}), 404
+
+    percent = 0
+    if job['status'] == 'selesai':
+        percent = 100
+    elif job['total_rows']:
+        percent = int(job['rows_rendered'] * 100 / job['total_rows'])
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'rows_rendered': job['rows_rendered'],
+        'total_rows': job['total_rows'],
+        'percent': percent,
+        'error': job['error'],
+        'download_url': url_for('export_job_download', job_id=job_id) if job['status'] == 'selesai' else None
+    })
+
+@app.route('/admin/export-job/<int:job_id>/download')
+@admin_required
+def export_job_download(job_id):
+    """Download hasil job export yang sudah selesai"""
+    connection = get_db_connection()
+    if not connection:
+        flash('Koneksi database gagal!', 'error')
+        return redirect(url_for('admin_dashboard'))
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        cursor.execute("""
+            SELECT file_path, mimetype, content_disposition
+            FROM export_jobs
+            WHERE id = ? AND user_id = ? AND status = 'selesai'
+        """, (job_id, get_user_id()))
+        job = cursor.fetchone()
+    except sqlite3.Error as e:
+        flash(f'Terjadi kesalahan saat mengambil file export: {str(e)}', 'error')
+        return redirect(url_for('admin_dashboard'))
+    finally:
+        if cursor:
+            cursor.close()
+        connection.close()
+
+    if not job or not job['file_path'] or not os.path.exists(job['file_path']):
+        flash('File export tidak ditemukan atau sudah kedaluwarsa!', 'error')
+        return redirect(url_for('admin_dashboard'))
+
+    response = send_file(job['file_path'], mimetype=job['mimetype'])
+    response.headers['Content-Disposition'] = job['content_disposition']
+    return response
+
+@app.route('/metrics')
+def metrics():
+    """Metrics format Prometheus: hanya admin yang login atau scraper dengan METRICS_TOKEN"""
+    if not METRICS_ENABLED:
+        return Response('Metrics tidak aktif\n', status=404, mimetype='text/plain')
+    if not (is_logged_in() and is_admin()) and not metrics_token_valid(request.headers.get('Authorization')):
+        return Response('Akses ditolak\n', status=403, mimetype='text/plain')
+    try:
+        body = render_metrics()
+    except sqlite3.Error as e:
+        logger.error("❌ Gagal membaca metrics: %s", e)
+        return Response(f'Gagal membaca metrics: {e}\n', status=500, mimetype='text/plain')
+    response = Response(body, content_type=METRICS_CONTENT_TYPE)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.before_request
+def refresh_session():
+    """Refresh session sebelum setiap request untuk mencegah masalah saat back button"""
+    if session.get('logged_in'):
+        # Mark session sebagai modified untuk memastikan di-save
+        session.permanent = True
+        session.modified = True
+
+@app.after_request
+def set_cache_headers(response):
+    """Set header anti-cache untuk mencegah browser cache halaman yang memerlukan session"""
+    # Hanya set anti-cache untuk halaman HTML, bukan untuk file static, PDF, dll
+    if response.content_type and 'text/html' in response.content_type:
+        response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '0'
+        # Vary header untuk memastikan browser tidak cache berdasarkan cookie
+        response.headers['Vary'] = 'Cookie'
+
+    # Refresh session setelah request untuk memastikan tetap valid
+    if session.get('logged_in'):
+        session.permanent = True
+        session.modified = True
+
+    return response
+
+@app.context_processor
+def inject_user_role():
+    """Inject user_role dan user_display_name ke semua template"""
+    return dict(
+        user_role=get_user_role(),
+        user_display_name=get_user_display_name(),
+        is_logged_in=is_logged_in(),
+        is_admin=is_admin()
+    )
+
+@app.route('/login', methods=['GET', 'POST'])
+def login():
+    """Halaman login"""
+    # Jika user sudah login, redirect ke dashboard yang sesuai
+    if is_logged_in():
+        if is_admin():
+            return redirect(url_for('admin_dashboard'))
+        else:
+            return redirect(url_for('dashboard'))
+
+    if request.method == 'POST':
+        login_type = request.form.get('login_type')
+        username = request.form.get('username')
+        password = request.form.get('password')
+
+        # Validasi input
+        if not login_type or not username or not password:
+            flash('Semua field harus diisi!', 'error')
+            return render_template('login.html')
+
+        # Validasi login_type
+        if login_type not in ['operator', 'admin']:
+            flash('Tipe login tidak valid!', 'error')
+            return render_template('login.html')
+
+        # Koneksi ke database
+        connection = get_db_connection()
+        if connection is None:
+            flash('Koneksi database gagal! Periksa file database dan konfigurasi.', 'error')
+            return render_template('login.html')
+
+        cursor = None
+        try:
+            cursor = connection.cursor()
+
+            # Cek apakah tabel users ada, jika tidak, inisialisasi database
             try:
                 table_exists_result = table_exists(connection, 'users')
-                print(f"🔍 Debug login - Tabel users exists: {table_exists_result}")
+                logger.debug("login - Tabel users exists: %s", table_exists_result)
 
                 if not table_exists_result:
-                    print("⚠️  Tabel 'users' tidak ditemukan! Mencoba inisialisasi database...")
+                    logger.warning("⚠️  Tabel 'users' tidak ditemukan! Mencoba inisialisasi database...")
                     cursor.close()
                     if connection:
                         connection.close()
 
                     # Coba inisialisasi database
-                    print("🔄 Memanggil init_database()...")
+                    logger.info("🔄 Memanggil init_database()...")
                     init_result = init_database()
-                    print(f"🔍 Debug login - Init database result: {init_result}")
+                    logger.debug("login - Init database result: %s", init_result)
 
                     if init_result:
                         flash('Database berhasil diinisialisasi! Silakan coba login lagi dengan username: admin, password: admin123', 'success')
@@ -1044,10 +2273,10 @@ def login():
                     return render_template('login.html')
 
             except sqlite3.Error as e:
-                print(f"⚠️  Error saat mengecek tabel: {e}")
+                logger.warning("⚠️  Error saat mengecek tabel: %s", e)
                 # Jika error saat cek tabel, mungkin tabel tidak ada
                 if 'no such table' in str(e).lower() or 'doesn\'t exist' in str(e).lower():
-                    print("⚠️  Tabel tidak ada! Mencoba inisialisasi...")
+                    logger.warning("⚠️  Tabel tidak ada! Mencoba inisialisasi...")
                     cursor.close()
                     if connection:
                         connection.close()
@@ -1062,18 +2291,18 @@ def login():
                 cursor = connection.cursor()
 
             # Cari user berdasarkan username
-            print(f"🔍 Debug login - Mencari user dengan username: {username}")
+            logger.debug("login - Mencari user dengan username: %s", username)
             try:
                 cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
                 user = cursor.fetchone()
                 # Convert Row to dict for compatibility
                 if user:
                     user = row_to_dict(user)
-                print(f"🔍 Debug login - User ditemukan: {user is not None}")
+                logger.debug("login - User ditemukan: %s", user is not None)
             except sqlite3.Error as query_error:
                 # Jika error karena tabel tidak ada, coba inisialisasi
                 if 'no such table' in str(query_error).lower() or 'doesn\'t exist' in str(query_error).lower():
-                    print(f"⚠️  Error: Tabel users tidak ada")
+                    logger.warning("⚠️  Error: Tabel users tidak ada")
                     try:
                         cursor.close()
                     except:
@@ -1097,12 +2326,10 @@ def login():
                 stored_password = user['password']
                 password_valid = (stored_password == password)
 
-                print(f"🔍 Debug login - Username: {username}")
-                print(f"🔍 Debug login - Password valid: {password_valid}")
-                print(f"🔍 Debug login - Stored password: {stored_password[:3]}... (first 3 chars)")
-                print(f"🔍 Debug login - Input password: {password[:3]}... (first 3 chars)")
-                print(f"🔍 Debug login - Login type: {login_type}")
-                print(f"🔍 Debug login - User role from DB: {user.get('role')}")
+                logger.debug("login - Username: %s", username)
+                logger.debug("login - Password valid: %s", password_valid)
+                logger.debug("login - Login type: %s", login_type)
+                logger.debug("login - User role from DB: %s", user.get('role'))
 
                 if password_valid:
                     # Ambil role user dari database (normalisasi ke lowercase untuk konsistensi)
@@ -1110,7 +2337,7 @@ def login():
                     if user_role:
                         user_role = user_role.lower().strip()
 
-                    print(f"🔍 Debug login - User role (normalized): {user_role}")
+                    logger.debug("login - User role (normalized): %s", user_role)
 
                     # Validasi login_type sesuai dengan role user
                     role_mapping = {
@@ -1119,15 +2346,15 @@ def login():
                     }
 
                     expected_login_type = role_mapping.get(user_role)
-                    print(f"🔍 Debug login - Expected login type: {expected_login_type}")
+                    logger.debug("login - Expected login type: %s", expected_login_type)
 
                     if not expected_login_type:
-                        print(f"❌ Debug login - Role '{user_role}' tidak memiliki expected_login_type")
+                        logger.error("❌ Debug login - Role '%s' tidak memiliki expected_login_type", user_role)
                         flash(f'Role "{user_role}" tidak dapat login melalui halaman ini! Hanya Admin dan Operator yang dapat login.', 'error')
                         return render_template('login.html')
 
                     if login_type != expected_login_type:
-                        print(f"❌ Debug login - Login type mismatch: {login_type} != {expected_login_type}")
+                        logger.error("❌ Debug login - Login type mismatch: %s != %s", login_type, expected_login_type)
                         if user_role == 'admin':
                             flash('Admin hanya bisa login sebagai Admin!', 'error')
                         elif user_role == 'operator':
@@ -1155,27 +2382,23 @@ def login():
                 flash('Username tidak ditemukan!', 'error')
 
         except sqlite3.Error as e:
-            print(f"❌ Error during login (SQLite Error): {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Error during login (SQLite Error): %s", e)
 
             # Jika error karena tabel tidak ada, coba inisialisasi
             if 'no such table' in str(e).lower() or 'doesn\'t exist' in str(e).lower():
-                print("⚠️  Tabel tidak ada! Mencoba inisialisasi database...")
+                logger.warning("⚠️  Tabel tidak ada! Mencoba inisialisasi database...")
                 try:
                     if init_database():
                         flash('Database berhasil diinisialisasi! Silakan coba login lagi dengan username: admin, password: admin123', 'success')
                     else:
                         flash('Database belum diinisialisasi! Silakan kunjungi /init-db untuk inisialisasi manual.', 'error')
                 except Exception as init_error:
-                    print(f"❌ Error saat inisialisasi: {init_error}")
+                    logger.error("❌ Error saat inisialisasi: %s", init_error)
                     flash('Gagal menginisialisasi database! Silakan kunjungi /init-db untuk inisialisasi manual.', 'error')
             else:
                 flash(f'Terjadi kesalahan saat login: {str(e)}', 'error')
         except Exception as e:
-            print(f"❌ Error during login (General Error): {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Error during login (General Error): %s", e)
             flash(f'Terjadi kesalahan saat login: {str(e)}', 'error')
         finally:
             # Tutup cursor dan connection dengan aman
@@ -1249,11 +2472,9 @@ def dashboard():
                 ORDER BY nama_kegiatan ASC
             """)
             kegiatan_list = cursor.fetchall()
-            print(f"🔍 Debug dashboard - Jumlah kegiatan ditemukan: {len(kegiatan_list)}")
+            logger.debug("dashboard - Jumlah kegiatan ditemukan: %s", len(kegiatan_list))
         except sqlite3.Error as e:
-            print(f"❌ Error fetching kegiatan: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Error fetching kegiatan: %s", e)
         finally:
             if connection is not None:
                 cursor.close()
@@ -1329,7 +2550,7 @@ def change_password():
             return redirect(url_for('admin_dashboard' if is_admin_user else 'dashboard'))
 
         except sqlite3.Error as e:
-            print(f"Error during change_password: {e}")
+            logger.error("Error during change_password: %s", e)
             flash(f'Terjadi kesalahan saat mengubah password: {str(e)}', 'error')
         finally:
             if connection is not None:
@@ -1342,7 +2563,7 @@ def get_or_create_user_by_nik(nik, nama_lengkap=None, email=None):
     """Mendapatkan atau membuat user berdasarkan NIK (untuk peserta tanpa login)"""
     connection = get_db_connection()
     if not connection:
-        print("❌ Error: Tidak dapat membuat koneksi ke database")
+        logger.error("❌ Error: Tidak dapat membuat koneksi ke database")
         return None
 
     cursor = None
@@ -1357,7 +2578,7 @@ def get_or_create_user_by_nik(nik, nama_lengkap=None, email=None):
 
         if existing and existing.get('user_id'):
             # User sudah ada, return user_id
-            print(f"✅ User dengan NIK {nik} sudah ada, user_id: {existing['user_id']}")
+            logger.info("✅ User dengan NIK %s sudah ada, user_id: %s", nik, existing['user_id'])
             return existing['user_id']
 
         # Jika belum ada, buat user baru dengan username berdasarkan NIK
@@ -1369,7 +2590,7 @@ def get_or_create_user_by_nik(nik, nama_lengkap=None, email=None):
             user_existing = row_to_dict(user_existing)
 
         if user_existing:
-            print(f"✅ User dengan username {username} sudah ada, user_id: {user_existing['id']}")
+            logger.info("✅ User dengan username %s sudah ada, user_id: %s", username, user_existing['id'])
             return user_existing['id']
 
         # Cek apakah kolom nama dan email ada di tabel users
@@ -1390,19 +2611,17 @@ def get_or_create_user_by_nik(nik, nama_lengkap=None, email=None):
             query = "INSERT INTO users (username, password, role) VALUES (?, ?, 'user')"
             params = (username, password)
 
-        print(f"🔍 Debug get_or_create_user_by_nik - Creating user: username={username}, nama={nama_lengkap or username}, email={email or 'N/A'}")
+        logger.debug("get_or_create_user_by_nik - Creating user: username=%s, nama=%s, email=%s", username, nama_lengkap or username, email or 'N/A')
         cursor.execute(query, params)
         connection.commit()
 
         # Ambil user_id yang baru dibuat
         user_id = cursor.lastrowid
-        print(f"✅ User baru berhasil dibuat dengan user_id: {user_id}")
+        logger.info("✅ User baru berhasil dibuat dengan user_id: %s", user_id)
         return user_id
 
     except Exception as e:
-        print(f"❌ Error in get_or_create_user_by_nik: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error in get_or_create_user_by_nik: %s", e)
         # Rollback jika ada error
         try:
             if connection:
@@ -1435,7 +2654,7 @@ def check_nik_exists(nik, exclude_user_id=None):
         result = cursor.fetchone()
         return result[0] > 0 if result else False
     except Exception as e:
-        print(f"Error in check_nik_exists: {e}")
+        logger.error("Error in check_nik_exists: %s", e)
         return False
     finally:
         if cursor:
@@ -1468,7 +2687,7 @@ def insert_biodata_data(form_data, user_id, buku_tabungan_path=None):
         # Cek apakah kombinasi user_id + nama_kegiatan sudah ada
         # User bisa punya banyak data, tapi tidak boleh duplikat untuk kegiatan yang sama
         # Gunakan TRIM untuk memastikan perbandingan tanpa whitespace
-        print(f"🔍 Debug insert_biodata_data - Mengecek duplikat: user_id={user_id}, nama_kegiatan='{form_data['nama_kegiatan']}'")
+        logger.debug("insert_biodata_data - Mengecek duplikat: user_id=%s, nama_kegiatan='%s'", user_id, form_data['nama_kegiatan'])
         cursor.execute("""
             SELECT id, nik, nama_lengkap FROM biodata_kegiatan
             WHERE user_id = ? AND TRIM(nama_kegiatan) = TRIM(?)
@@ -1477,21 +2696,20 @@ def insert_biodata_data(form_data, user_id, buku_tabungan_path=None):
         existing = cursor.fetchone()
 
         if existing:
-            print(f"⚠️ Warning insert_biodata_data - Data duplikat ditemukan: id={existing[0]}, nik={existing[1]}, nama={existing[2]}")
-            print(f"⚠️ User mencoba insert dengan: nik={form_data['nik']}, nama_kegiatan='{form_data['nama_kegiatan']}', user_id={user_id}")
+            logger.warning("⚠️ Warning insert_biodata_data - Data duplikat ditemukan: id=%s, nik=%s, nama=%s", existing[0], existing[1], existing[2])
+            logger.warning("⚠️ User mencoba insert dengan: nik=%s, nama_kegiatan='%s', user_id=%s", form_data['nik'], form_data['nama_kegiatan'], user_id)
             # Cek apakah NIK di existing sama dengan NIK yang diinput
             existing_nik = existing[1]
             if existing_nik != form_data['nik']:
                 # NIK berbeda - user mengubah NIK, hapus data lama dan buat data baru
-                print(f"🔄 NIK berbeda terdeteksi! Existing NIK: {existing_nik}, Input NIK: {form_data['nik']}")
-                print(f"🔄 Menghapus data lama dan membuat data baru dengan NIK yang berbeda")
+                logger.info("🔄 NIK berbeda terdeteksi! Existing NIK: %s, Input NIK: %s", existing_nik, form_data['nik'])
+                logger.info("🔄 Menghapus data lama dan membuat data baru dengan NIK yang berbeda")
                 # Hapus data lama dengan NIK dan nama_kegiatan yang sama
-                cursor.execute("""
+                deleted_rows = biodata_write(cursor, """
                     DELETE FROM biodata_kegiatan
                     WHERE user_id = ? AND TRIM(nama_kegiatan) = TRIM(?) AND nik = ?
                 """, (user_id, form_data['nama_kegiatan'], existing_nik))
-                deleted_rows = cursor.rowcount
-                print(f"✅ Data lama dengan NIK {existing_nik} telah dihapus ({deleted_rows} row)")
+                logger.info("✅ Data lama dengan NIK %s telah dihapus (%s row)", existing_nik, deleted_rows)
                 # Lanjutkan ke insert data baru
             else:
                 # NIK sama - benar-benar duplikat
@@ -1510,54 +2728,50 @@ def insert_biodata_data(form_data, user_id, buku_tabungan_path=None):
             kabupaten_kota, kabko_lainnya, peran, nama_kegiatan,
             waktu_pelaksanaan, tempat_pelaksanaan, nama_bank,
             nama_bank_lainnya, no_rekening, nama_pemilik_rekening,
-            buku_tabungan_path, tanda_tangan
+            buku_tabungan_path, tanda_tangan, kegiatan_id
         ) VALUES (
             ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
-            ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+            ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
         )"""
 
         # Pastikan tanda tangan disimpan sebagai file, bukan base64
         tanda_tangan_value = form_data.get('tanda_tangan')
-        print(f"🔍 Inserting data for user_id: {user_id}, kegiatan: {form_data['nama_kegiatan']}")
-        print(f"🔍 NIK: {form_data['nik']}")
-        print(f"🔍 buku_tabungan_path: {buku_tabungan_path}")
-        print(f"🔍 tanda_tangan value: {tanda_tangan_value}")
-        print(f"🔍 tanda_tangan type: {type(tanda_tangan_value)}")
-        print(f"🔍 tanda_tangan length: {len(str(tanda_tangan_value)) if tanda_tangan_value else 0}")
+        logger.debug("Inserting data for user_id: %s, kegiatan: %s", user_id, form_data['nama_kegiatan'])
+        logger.debug("NIK: %s", form_data['nik'])
+        logger.debug("buku_tabungan_path: %s", buku_tabungan_path)
+        logger.debug("tanda_tangan: %s", jenis_tanda_tangan(tanda_tangan_value))
 
         # Cek apakah masih base64 atau sudah berupa path file
         if tanda_tangan_value and not ('uploads/' in str(tanda_tangan_value) or str(tanda_tangan_value).startswith('static/')):
             # Masih base64, simpan sebagai file
-            print(f"🔍 insert_biodata_data: Tanda tangan masih base64, menyimpan sebagai file...")
+            logger.debug("insert_biodata_data: Tanda tangan masih base64, menyimpan sebagai file...")
             tanda_tangan_path = save_tanda_tangan_file(tanda_tangan_value, form_data['nik'])
             if tanda_tangan_path:
                 tanda_tangan_value = tanda_tangan_path
-                print(f"🔍 insert_biodata_data: Tanda tangan disimpan sebagai file: {tanda_tangan_path}")
+                logger.debug("insert_biodata_data: Tanda tangan disimpan sebagai file: %s", tanda_tangan_path)
             else:
-                print(f"🔍 insert_biodata_data: Gagal menyimpan tanda tangan sebagai file, menggunakan base64")
+                logger.debug("insert_biodata_data: Gagal menyimpan tanda tangan sebagai file, menggunakan base64")
         elif tanda_tangan_value:
             # Sudah berupa path file, normalisasi saja
             tanda_tangan_value = normalize_buku_tabungan_path(tanda_tangan_value)
-            print(f"🔍 insert_biodata_data: Tanda tangan sudah berupa path: {tanda_tangan_value}")
+            logger.debug("insert_biodata_data: Tanda tangan sudah berupa path: %s", tanda_tangan_value)
 
-        cursor.execute(query, (form_data['nik'], user_id) + values + (buku_tabungan_path, tanda_tangan_value))
+        kegiatan_id = get_kegiatan_id_by_nama(cursor, form_data['nama_kegiatan'])
+        cursor.execute(query, (form_data['nik'], user_id) + values + (buku_tabungan_path, tanda_tangan_value, kegiatan_id))
+        invalidate_cache(cursor, 'biodata', niks=(form_data['nik'],))
         connection.commit()
-        print(f"✅ Data berhasil diinsert untuk user_id: {user_id}, kegiatan: {form_data['nama_kegiatan']}")
+        logger.info("✅ Data berhasil diinsert untuk user_id: %s, kegiatan: %s", user_id, form_data['nama_kegiatan'])
         return True, 'Data berhasil ditambahkan!'
 
     except sqlite3.Error as e:
         if connection:
             connection.rollback()
-        print(f"❌ Error inserting data: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error inserting data: %s", e)
         return False, f'Terjadi kesalahan saat menyimpan data: {str(e)}'
     except Exception as e:
         if connection:
             connection.rollback()
-        print(f"❌ Unexpected error in insert_biodata_data: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Unexpected error in insert_biodata_data: %s", e)
         return False, f'Terjadi kesalahan tidak terduga: {str(e)}'
     finally:
         if cursor:
@@ -1608,13 +2822,15 @@ def save_biodata_data(form_data, user_id, buku_tabungan_path=None):
             """, (user_id, nama_kegiatan))
 
         existing = cursor.fetchone()
+        # NIK baris lama (bisa berbeda dari form) ikut dibuang dari LRU autofill
+        nik_lama = existing[0] if existing else None
 
         values = get_biodata_values(form_data)
 
         # Jika ada old_nama_kegiatan dan nama kegiatan berbeda, hapus data lama dan buat data baru (replace)
         if old_nama_kegiatan_normalized and nama_kegiatan_normalized != old_nama_kegiatan_normalized:
             # User mengubah nama_kegiatan - hapus data lama, lalu buat data baru (replace)
-            print(f"✅ Nama kegiatan diubah: '{old_nama_kegiatan_normalized}' -> '{nama_kegiatan_normalized}' - Menghapus data lama dan membuat data baru (replace)")
+            logger.info("✅ Nama kegiatan diubah: '%s' -> '%s' - Menghapus data lama dan membuat data baru (replace)", old_nama_kegiatan_normalized, nama_kegiatan_normalized)
 
             # Cek apakah nama_kegiatan baru sudah dimiliki user
             cursor.execute("""
@@ -1628,12 +2844,11 @@ def save_biodata_data(form_data, user_id, buku_tabungan_path=None):
                 return False, f'Anda sudah memiliki data untuk kegiatan "{nama_kegiatan}".  '
 
             # Hapus data lama dengan old_nama_kegiatan
-            cursor.execute("""
+            deleted_rows = biodata_write(cursor, """
                 DELETE FROM biodata_kegiatan
                 WHERE user_id = ? AND TRIM(nama_kegiatan) = TRIM(?)
             """, (user_id, old_nama_kegiatan_normalized))
-            deleted_rows = cursor.rowcount
-            print(f"✅ Data lama untuk kegiatan '{old_nama_kegiatan_normalized}' telah dihapus ({deleted_rows} row)")
+            logger.info("✅ Data lama untuk kegiatan '%s' telah dihapus (%s row)", old_nama_kegiatan_normalized, deleted_rows)
 
             # Set existing = None agar masuk ke blok INSERT (bukan UPDATE)
             existing = None
@@ -1648,7 +2863,7 @@ def save_biodata_data(form_data, user_id, buku_tabungan_path=None):
                 old_nama_kegiatan_normalized = old_nama_kegiatan
             else:
                 # Nama kegiatan sama - UPDATE data yang ada
-                print(f"✅ Nama kegiatan sama: '{nama_kegiatan_normalized}' - Mengupdate data yang ada")
+                logger.info("✅ Nama kegiatan sama: '%s' - Mengupdate data yang ada", nama_kegiatan_normalized)
 
                 # Tidak perlu validasi NIK - 1 NIK bisa digunakan untuk beberapa kegiatan berbeda
                 # Validasi utama adalah kombinasi user_id + nama_kegiatan (sudah dicek di atas)
@@ -1678,6 +2893,7 @@ def save_biodata_data(form_data, user_id, buku_tabungan_path=None):
                     else:
                         form_data['tanda_tangan'] = normalize_buku_tabungan_path(existing_ttd_value) if existing_ttd_value else None
 
+            kegiatan_id = get_kegiatan_id_by_nama(cursor, nama_kegiatan)
             if buku_tabungan_path:
                 # Ada file baru, update termasuk buku_tabungan_path
                 query = """UPDATE biodata_kegiatan SET
@@ -1688,11 +2904,11 @@ def save_biodata_data(form_data, user_id, buku_tabungan_path=None):
                     kabupaten_kota = ?, kabko_lainnya = ?, peran = ?, nama_kegiatan = ?,
                     waktu_pelaksanaan = ?, tempat_pelaksanaan = ?, nama_bank = ?,
                     nama_bank_lainnya = ?, no_rekening = ?, nama_pemilik_rekening = ?,
-                    buku_tabungan_path = ?, tanda_tangan = ?
+                    buku_tabungan_path = ?, tanda_tangan = ?, kegiatan_id = ?
                     WHERE user_id = ? AND TRIM(nama_kegiatan) = TRIM(?)"""
                 tanda_tangan_update = form_data.get('tanda_tangan')
-                print(f"🔍 Debug save_biodata_data UPDATE (dengan buku_tabungan) - tanda_tangan: {tanda_tangan_update}")
-                cursor.execute(query, (form_data['nik'],) + values + (buku_tabungan_path, tanda_tangan_update, user_id, identifier_nama_kegiatan))
+                logger.debug("save_biodata_data UPDATE (dengan buku_tabungan) - tanda_tangan: %s", jenis_tanda_tangan(tanda_tangan_update))
+                rows_affected = biodata_write(cursor, query, (form_data['nik'],) + values + (buku_tabungan_path, tanda_tangan_update, kegiatan_id, user_id, identifier_nama_kegiatan))
             else:
                 # Tidak ada file baru, update tanpa mengubah buku_tabungan_path
                 query = """UPDATE biodata_kegiatan SET
@@ -1703,14 +2919,14 @@ def save_biodata_data(form_data, user_id, buku_tabungan_path=None):
                     kabupaten_kota = ?, kabko_lainnya = ?, peran = ?, nama_kegiatan = ?,
                     waktu_pelaksanaan = ?, tempat_pelaksanaan = ?, nama_bank = ?,
                     nama_bank_lainnya = ?, no_rekening = ?, nama_pemilik_rekening = ?,
-                    tanda_tangan = ?
+                    tanda_tangan = ?, kegiatan_id = ?
                     WHERE user_id = ? AND TRIM(nama_kegiatan) = TRIM(?)"""
                 tanda_tangan_update = form_data.get('tanda_tangan')
-                print(f"🔍 Debug save_biodata_data UPDATE (tanpa buku_tabungan) - tanda_tangan: {tanda_tangan_update}")
-                cursor.execute(query, (form_data['nik'],) + values + (tanda_tangan_update, user_id, identifier_nama_kegiatan))
+                logger.debug("save_biodata_data UPDATE (tanpa buku_tabungan) - tanda_tangan: %s", jenis_tanda_tangan(tanda_tangan_update))
+                rows_affected = biodata_write(cursor, query, (form_data['nik'],) + values + (tanda_tangan_update, kegiatan_id, user_id, identifier_nama_kegiatan))
 
             # Cek apakah update berhasil (ada row yang terupdate)
-            rows_affected = cursor.rowcount
+            invalidate_cache(cursor, 'biodata', niks=(nik_lama, form_data['nik']))
             connection.commit()
 
             if rows_affected == 0:
@@ -1743,25 +2959,26 @@ def save_biodata_data(form_data, user_id, buku_tabungan_path=None):
                 kabupaten_kota, kabko_lainnya, peran, nama_kegiatan,
                 waktu_pelaksanaan, tempat_pelaksanaan, nama_bank,
                 nama_bank_lainnya, no_rekening, nama_pemilik_rekening,
-                buku_tabungan_path, tanda_tangan
+                buku_tabungan_path, tanda_tangan, kegiatan_id
             ) VALUES (
                 ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
-                ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+                ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
             )"""
             tanda_tangan_value = form_data.get('tanda_tangan')
-            print(f"🔍 Debug save_biodata_data INSERT - tanda_tangan_value: {tanda_tangan_value}")
-            print(f"🔍 Debug save_biodata_data INSERT - tanda_tangan type: {type(tanda_tangan_value)}")
-            print(f"🔍 Debug save_biodata_data INSERT - buku_tabungan_path: {buku_tabungan_path}")
-            print(f"🔍 Debug save_biodata_data INSERT - NIK: {form_data['nik']}, user_id: {user_id}")
-            cursor.execute(query, (form_data['nik'], user_id) + values + (buku_tabungan_path, tanda_tangan_value))
+            logger.debug("save_biodata_data INSERT - tanda_tangan: %s", jenis_tanda_tangan(tanda_tangan_value))
+            logger.debug("save_biodata_data INSERT - buku_tabungan_path: %s", buku_tabungan_path)
+            logger.debug("save_biodata_data INSERT - NIK: %s, user_id: %s", form_data['nik'], user_id)
+            kegiatan_id = get_kegiatan_id_by_nama(cursor, nama_kegiatan)
+            cursor.execute(query, (form_data['nik'], user_id) + values + (buku_tabungan_path, tanda_tangan_value, kegiatan_id))
+            invalidate_cache(cursor, 'biodata', niks=(nik_lama, form_data['nik']))
             connection.commit()
-            print(f"✅ save_biodata_data INSERT - Data berhasil disimpan dengan tanda_tangan: {tanda_tangan_value}")
+            logger.debug("save_biodata_data INSERT - Data berhasil disimpan, tanda_tangan: %s", jenis_tanda_tangan(tanda_tangan_value))
             return True, 'Data berhasil ditambahkan!'
 
     except sqlite3.Error as e:
         if connection:
             connection.rollback()
-        print(f"❌ Error saving data: {e}")
+        logger.error("❌ Error saving data: %s", e)
         return False, f'Terjadi kesalahan saat menyimpan data: {str(e)}'
     finally:
         if cursor:
@@ -1821,25 +3038,25 @@ def admin_update_biodata(form_data, nik, nama_kegiatan, buku_tabungan_path=None)
 
         # Pastikan tanda tangan disimpan sebagai file, bukan base64
         tanda_tangan_to_save = form_data.get('tanda_tangan', '')
-        print(f"DEBUG admin_update_biodata: tanda_tangan to save - exists: {tanda_tangan_to_save is not None}, length: {len(tanda_tangan_to_save) if tanda_tangan_to_save else 0}")
+        logger.debug("admin_update_biodata: tanda_tangan to save - exists: %s, length: %s", tanda_tangan_to_save is not None, len(tanda_tangan_to_save) if tanda_tangan_to_save else 0)
         if tanda_tangan_to_save:
-            print(f"DEBUG admin_update_biodata: tanda_tangan preview: {tanda_tangan_to_save[:50]}...")
             # Cek apakah masih base64 atau sudah berupa path file
             if not ('uploads/' in str(tanda_tangan_to_save) or str(tanda_tangan_to_save).startswith('static/')):
                 # Masih base64, simpan sebagai file
-                print(f"DEBUG admin_update_biodata: Tanda tangan masih base64, menyimpan sebagai file...")
+                logger.debug("admin_update_biodata: Tanda tangan masih base64, menyimpan sebagai file...")
                 tanda_tangan_path = save_tanda_tangan_file(tanda_tangan_to_save, form_data['nik'])
                 if tanda_tangan_path:
                     tanda_tangan_to_save = tanda_tangan_path
-                    print(f"DEBUG admin_update_biodata: Tanda tangan disimpan sebagai file: {tanda_tangan_path}")
+                    logger.debug("admin_update_biodata: Tanda tangan disimpan sebagai file: %s", tanda_tangan_path)
                 else:
-                    print(f"DEBUG admin_update_biodata: Gagal menyimpan tanda tangan sebagai file, menggunakan base64")
+                    logger.debug("admin_update_biodata: Gagal menyimpan tanda tangan sebagai file, menggunakan base64")
             else:
                 # Sudah berupa path file, normalisasi saja
                 tanda_tangan_to_save = normalize_buku_tabungan_path(tanda_tangan_to_save)
-                print(f"DEBUG admin_update_biodata: Tanda tangan sudah berupa path: {tanda_tangan_to_save}")
+                logger.debug("admin_update_biodata: Tanda tangan sudah berupa path: %s", tanda_tangan_to_save)
 
         # Update query berdasarkan NIK dan nama_kegiatan (lama)
+        kegiatan_id = get_kegiatan_id_by_nama(cursor, new_nama_kegiatan)
         if buku_tabungan_path:
             # Ada file baru, update termasuk buku_tabungan_path
             query = """UPDATE biodata_kegiatan SET
@@ -1850,9 +3067,9 @@ def admin_update_biodata(form_data, nik, nama_kegiatan, buku_tabungan_path=None)
                 kabupaten_kota = ?, kabko_lainnya = ?, peran = ?, nama_kegiatan = ?,
                 waktu_pelaksanaan = ?, tempat_pelaksanaan = ?, nama_bank = ?,
                 nama_bank_lainnya = ?, no_rekening = ?, nama_pemilik_rekening = ?,
-                buku_tabungan_path = ?, tanda_tangan = ?
+                buku_tabungan_path = ?, tanda_tangan = ?, kegiatan_id = ?
                 WHERE nik = ? AND TRIM(nama_kegiatan) = TRIM(?)"""
-            cursor.execute(query, (form_data['nik'],) + values + (buku_tabungan_path, tanda_tangan_to_save, nik, nama_kegiatan))
+            cursor.execute(query, (form_data['nik'],) + values + (buku_tabungan_path, tanda_tangan_to_save, kegiatan_id, nik, nama_kegiatan))
         else:
             # Tidak ada file baru, update tanpa mengubah buku_tabungan_path
             query = """UPDATE biodata_kegiatan SET
@@ -1863,18 +3080,19 @@ def admin_update_biodata(form_data, nik, nama_kegiatan, buku_tabungan_path=None)
                 kabupaten_kota = ?, kabko_lainnya = ?, peran = ?, nama_kegiatan = ?,
                 waktu_pelaksanaan = ?, tempat_pelaksanaan = ?, nama_bank = ?,
                 nama_bank_lainnya = ?, no_rekening = ?, nama_pemilik_rekening = ?,
-                tanda_tangan = ?
+                tanda_tangan = ?, kegiatan_id = ?
                 WHERE nik = ? AND TRIM(nama_kegiatan) = TRIM(?)"""
-            cursor.execute(query, (form_data['nik'],) + values + (tanda_tangan_to_save, nik, nama_kegiatan))
+            cursor.execute(query, (form_data['nik'],) + values + (tanda_tangan_to_save, kegiatan_id, nik, nama_kegiatan))
 
+        invalidate_cache(cursor, 'biodata', niks=(nik, form_data['nik']))
         connection.commit()
-        print(f"DEBUG admin_update_biodata: Update successful for NIK: {nik}, kegiatan: {nama_kegiatan}")
+        logger.debug("admin_update_biodata: Update successful for NIK: %s, kegiatan: %s", nik, nama_kegiatan)
         return True, 'Data berhasil diperbarui!'
 
     except sqlite3.Error as e:
         if connection:
             connection.rollback()
-        print(f"❌ Error updating biodata: {e}")
+        logger.error("❌ Error updating biodata: %s", e)
         return False, f'Terjadi kesalahan saat menyimpan data: {str(e)}'
     finally:
         if cursor:
@@ -1885,6 +3103,35 @@ def admin_update_biodata(form_data, nik, nama_kegiatan, buku_tabungan_path=None)
         if connection and connection is not None:
             connection.close()
 
+def load_kegiatan_dropdown(cursor):
+    """Daftar kegiatan yang tampil di dropdown form peserta"""
+    # Gunakan query yang sama dengan halaman admin untuk konsistensi
+    cursor.execute("""
+        SELECT id, nama_kegiatan, waktu_pelaksanaan, tempat_pelaksanaan
+        FROM kegiatan_master
+        WHERE TRIM(nama_kegiatan) != ''
+            AND (is_hidden IS NULL OR is_hidden = 0)
+        ORDER BY nama_kegiatan ASC
+    """)
+    return [row_to_dict(row) for row in cursor.fetchall()]
+
+def load_kegiatan_lookup(cursor):
+    """Map TRIM(nama_kegiatan) -> data kegiatan yang tidak disembunyikan (untuk /api/get-kegiatan)"""
+    cursor.execute("""
+        SELECT nama_kegiatan, waktu_pelaksanaan, tempat_pelaksanaan
+        FROM kegiatan_master
+        WHERE is_hidden IS NULL OR is_hidden = 0
+        ORDER BY id ASC
+    """)
+    kegiatan_lookup = {}
+    for row in cursor.fetchall():
+        kegiatan_lookup.setdefault((row['nama_kegiatan'] or '').strip(' '), row_to_dict(row))
+    return kegiatan_lookup
+
+def get_kegiatan_dropdown(cursor):
+    """Dropdown kegiatan form peserta dari cache proses"""
+    return cached_query(cursor, 'kegiatan', 'dropdown', load_kegiatan_dropdown)
+
 @app.route('/tambah-data', methods=['GET', 'POST'])
 def tambah_data():
     """Halaman tambah data biodata kegiatan (bisa diakses tanpa login untuk peserta baru)"""
@@ -1892,7 +3139,7 @@ def tambah_data():
     # Jika user sudah login, gunakan user_id dari session
     # Jika belum login, akan dibuat user baru saat submit form
     user_id = get_user_id()
-    print(f"🔍 Debug tambah_data (GET) - user_id dari session: {user_id}")
+    logger.debug("tambah_data (GET) - user_id dari session: %s", user_id)
 
     # Untuk halaman tambah-data, form harus selalu kosong saat GET request
     # Karena ini halaman untuk menambah data baru, bukan edit
@@ -1907,36 +3154,23 @@ def tambah_data():
     if connection:
         try:
             cursor = connection.cursor()
-            # Ambil semua kegiatan dari kegiatan_master
-            # Gunakan query yang sama dengan halaman admin untuk konsistensi
-            cursor.execute("""
-                SELECT id, nama_kegiatan, waktu_pelaksanaan, tempat_pelaksanaan
-                FROM kegiatan_master
-                WHERE TRIM(nama_kegiatan) != ''
-                    AND (is_hidden IS NULL OR is_hidden = 0)
-                ORDER BY nama_kegiatan ASC
-            """)
-            rows = cursor.fetchall()
-            # Convert Row objects to dicts
-            kegiatan_list = [row_to_dict(row) for row in rows]
-            print(f"🔍 Debug tambah_data - Jumlah kegiatan ditemukan: {len(kegiatan_list)}")
+            # Ambil semua kegiatan dari kegiatan_master (lewat cache proses)
+            kegiatan_list = get_kegiatan_dropdown(cursor)
+            logger.debug("tambah_data - Jumlah kegiatan ditemukan: %s", len(kegiatan_list))
             if kegiatan_list:
-                print(f"🔍 Debug tambah_data - Kegiatan pertama: {kegiatan_list[0]}")
-                for idx, kg in enumerate(kegiatan_list[:3]):  # Print 3 pertama
-                    print(f"  [{idx+1}] {kg.get('nama_kegiatan', 'N/A')}")
+                logger.debug("tambah_data - Kegiatan pertama: %s", kegiatan_list[0])
+                logger.debug("tambah_data - 3 kegiatan pertama: %s", [kg.get('nama_kegiatan', 'N/A') for kg in kegiatan_list[:3]])
             else:
-                print("⚠️  Warning: Tidak ada kegiatan ditemukan di database!")
+                logger.warning("⚠️  Warning: Tidak ada kegiatan ditemukan di database!")
         except sqlite3.Error as e:
-            print(f"❌ Error fetching kegiatan: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Error fetching kegiatan: %s", e)
             flash(f'Terjadi kesalahan saat mengambil daftar kegiatan: {str(e)}', 'error')
         finally:
             if connection is not None:
                 cursor.close()
                 connection.close()
     else:
-        print("❌ Error: Tidak dapat membuat koneksi ke database")
+        logger.error("❌ Error: Tidak dapat membuat koneksi ke database")
         flash('Tidak dapat terhubung ke database!', 'error')
 
     # Handle POST request
@@ -1976,7 +3210,7 @@ def tambah_data():
                             flash('Kegiatan yang dipilih tidak tersedia!', 'error')
                             return render_template('user/tambah-data.html', biodata=biodata, kegiatan_list=kegiatan_list, current_year=current_year, username=get_username())
                     except sqlite3.Error as e:
-                        print(f"Error checking kegiatan hidden status: {e}")
+                        logger.error("Error checking kegiatan hidden status: %s", e)
                     finally:
                         if connection_check:
                             cursor_check.close()
@@ -2006,15 +3240,14 @@ def tambah_data():
             # Handle tanda tangan - simpan sebagai file
             tanda_tangan_path = None
             tanda_tangan_base64 = form_data.get('tanda_tangan')
-            print(f"🔍 Debug tambah_data - tanda_tangan_base64 dari form: {bool(tanda_tangan_base64)}")
-            print(f"🔍 Debug tambah_data - tanda_tangan_base64 length: {len(str(tanda_tangan_base64)) if tanda_tangan_base64 else 0}")
-            print(f"🔍 Debug tambah_data - tanda_tangan_base64 preview: {str(tanda_tangan_base64)[:100] if tanda_tangan_base64 else 'None'}")
+            logger.debug("tambah_data - tanda_tangan_base64 dari form: %s", bool(tanda_tangan_base64))
+            logger.debug("tambah_data - tanda_tangan_base64 length: %s", len(str(tanda_tangan_base64)) if tanda_tangan_base64 else 0)
 
             if tanda_tangan_base64:
                 # User membuat tanda tangan baru, simpan sebagai file
-                print(f"🔍 Debug tambah_data - Memanggil save_tanda_tangan_file...")
+                logger.debug("tambah_data - Memanggil save_tanda_tangan_file...")
                 tanda_tangan_path = save_tanda_tangan_file(tanda_tangan_base64, form_data['nik'])
-                print(f"🔍 Debug tambah_data - Hasil save_tanda_tangan_file: {tanda_tangan_path}")
+                logger.debug("tambah_data - Hasil save_tanda_tangan_file: %s", tanda_tangan_path)
                 if not tanda_tangan_path:
                     flash('Gagal menyimpan tanda tangan!', 'error')
                     return render_template('user/tambah-data.html', biodata=biodata, kegiatan_list=kegiatan_list, current_year=current_year, username=get_username())
@@ -2022,14 +3255,14 @@ def tambah_data():
                 # User tidak membuat tanda tangan baru, gunakan tanda tangan yang sudah ada
                 # Cek apakah sudah berupa path atau masih base64
                 existing_ttd = biodata.get('tanda_tangan')
-                print(f"🔍 Debug tambah_data - Menggunakan existing tanda_tangan: {str(existing_ttd)[:100] if existing_ttd else 'None'}")
+                logger.debug("tambah_data - Menggunakan existing tanda_tangan: %s", jenis_tanda_tangan(existing_ttd))
                 if existing_ttd and ('uploads/' in str(existing_ttd) or str(existing_ttd).startswith('static/')):
                     # Sudah berupa path file
                     tanda_tangan_path = normalize_buku_tabungan_path(existing_ttd)
-                    print(f"🔍 Debug tambah_data - Existing adalah path: {tanda_tangan_path}")
+                    logger.debug("tambah_data - Existing adalah path: %s", tanda_tangan_path)
                 elif existing_ttd:
                     # Masih base64, simpan sebagai file
-                    print(f"🔍 Debug tambah_data - Existing adalah base64, menyimpan sebagai file...")
+                    logger.debug("tambah_data - Existing adalah base64, menyimpan sebagai file...")
                     tanda_tangan_path = save_tanda_tangan_file(existing_ttd, form_data['nik'])
                     if not tanda_tangan_path:
                         flash('Gagal menyimpan tanda tangan yang sudah ada!', 'error')
@@ -2041,8 +3274,8 @@ def tambah_data():
 
             # Update form_data dengan tanda_tangan_path (bukan base64)
             form_data['tanda_tangan'] = tanda_tangan_path
-            print(f"🔍 Debug tambah_data - tanda_tangan_path final: {tanda_tangan_path}")
-            print(f"🔍 Debug tambah_data - form_data['tanda_tangan'] final: {form_data.get('tanda_tangan')}")
+            logger.debug("tambah_data - tanda_tangan_path final: %s", tanda_tangan_path)
+            logger.debug("tambah_data - form_data['tanda_tangan'] final: %s", form_data.get('tanda_tangan'))
 
             # Cek apakah NIK yang diinput berbeda dari NIK yang ada di biodata_kegiatan untuk user_id saat ini
             # Jika berbeda, kita perlu menggunakan user_id berdasarkan NIK yang diinput, bukan dari session
@@ -2059,10 +3292,10 @@ def tambah_data():
                         nik_cursor.execute("SELECT nik FROM biodata_kegiatan WHERE user_id = ? ORDER BY created_at DESC LIMIT 1", (session_user_id,))
                         session_user_data = nik_cursor.fetchone()
                         if session_user_data:
-                            session_nik = session_user_data.get('nik')
+                            session_nik = session_user_data['nik']
                         nik_cursor.close()
                     except Exception as e:
-                        print(f"⚠️ Error saat cek NIK session: {e}")
+                        logger.warning("⚠️ Error saat cek NIK session: %s", e)
                     finally:
                         if nik_check_conn:
                             nik_check_conn.close()
@@ -2072,13 +3305,13 @@ def tambah_data():
             # reset user_id agar dibuat/dicari berdasarkan NIK baru
             input_nik = form_data['nik']
             if session_nik and session_nik != input_nik:
-                print(f"🔄 NIK berbeda terdeteksi! Existing NIK: {session_nik}, Input NIK: {input_nik}")
-                print(f"🔄 Akan menggunakan user berdasarkan NIK baru, bukan session")
+                logger.info("🔄 NIK berbeda terdeteksi! Existing NIK: %s, Input NIK: %s", session_nik, input_nik)
+                logger.info("🔄 Akan menggunakan user berdasarkan NIK baru, bukan session")
                 user_id = None  # Reset user_id agar dibuat/dicari berdasarkan NIK baru
             elif session_user_id and not session_nik:
                 # Tidak ada data di biodata_kegiatan untuk user_id ini (mungkin sudah dihapus)
                 # Reset user_id agar dibuat/dicari berdasarkan NIK baru
-                print(f"🔄 Tidak ada data di biodata_kegiatan untuk user_id {session_user_id}, akan menggunakan user berdasarkan NIK baru")
+                logger.info("🔄 Tidak ada data di biodata_kegiatan untuk user_id %s, akan menggunakan user berdasarkan NIK baru", session_user_id)
                 user_id = None
 
             # Cek dulu apakah NIK ini sudah pernah digunakan untuk kegiatan yang sama (duplikat)
@@ -2095,26 +3328,26 @@ def tambah_data():
                     if nik_kegiatan_exists:
                         temp_cursor.close()
                         temp_connection.close()
-                        print(f"⚠️ NIK {form_data['nik']} sudah pernah digunakan untuk kegiatan '{form_data['nama_kegiatan']}'")
+                        logger.warning("⚠️ NIK %s sudah pernah digunakan untuk kegiatan '%s'", form_data['nik'], form_data['nama_kegiatan'])
                         flash(f'NIK {form_data["nik"]} sudah pernah digunakan untuk kegiatan "{form_data["nama_kegiatan"]}". Silakan gunakan kegiatan lain atau hubungi admin jika ini kesalahan.', 'error')
                         return render_template('user/tambah-data.html', biodata=biodata, kegiatan_list=kegiatan_list, current_year=current_year, username=get_username())
                     temp_cursor.close()
                 except Exception as e:
-                    print(f"⚠️ Error saat cek NIK untuk kegiatan: {e}")
+                    logger.warning("⚠️ Error saat cek NIK untuk kegiatan: %s", e)
                 finally:
                     if temp_connection is not None:
                         temp_connection.close()
 
             # Jika user_id tidak ada (tidak login atau NIK berbeda), buat atau dapatkan user berdasarkan NIK
             if not user_id:
-                print(f"🔍 Debug tambah_data - Akan membuat/dapatkan user berdasarkan NIK: {form_data['nik']}")
+                logger.debug("tambah_data - Akan membuat/dapatkan user berdasarkan NIK: %s", form_data['nik'])
 
                 user_id = get_or_create_user_by_nik(
                     form_data['nik'],
                     form_data.get('nama_lengkap'),
                     form_data.get('alamat_email')
                 )
-                print(f"🔍 Debug tambah_data - Hasil get_or_create_user_by_nik: user_id={user_id}")
+                logger.debug("tambah_data - Hasil get_or_create_user_by_nik: user_id=%s", user_id)
                 if not user_id:
                     flash('Gagal membuat user! Silakan coba lagi.', 'error')
                     return render_template('user/tambah-data.html', biodata=biodata, kegiatan_list=kegiatan_list, current_year=current_year, username=session.get('username'))
@@ -2125,19 +3358,17 @@ def tambah_data():
                     try:
                         cursor = connection.cursor()
                         cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-                        new_user = cursor.fetchone()
+                        new_user = row_to_dict(cursor.fetchone())
                         if new_user:
                             # Set session untuk user baru
                             user_role = new_user.get('role', 'user')
                             if user_role:
                                 user_role = user_role.lower().strip()
                             set_session_data(new_user, user_role)
-                            print(f"✅ Session dibuat untuk user dengan ID: {user_id}")
+                            logger.info("✅ Session dibuat untuk user dengan ID: %s", user_id)
                         cursor.close()
                     except Exception as e:
-                        print(f"⚠️ Error saat membuat session untuk user: {e}")
-                        import traceback
-                        traceback.print_exc()
+                        logger.exception("⚠️ Error saat membuat session untuk user: %s", e)
                     finally:
                         if connection is not None:
                             connection.close()
@@ -2148,14 +3379,14 @@ def tambah_data():
 
             if is_update_mode:
                 # Mode UPDATE: gunakan save_biodata_data dengan old_nama_kegiatan
-                print(f"✅ Mode UPDATE: Mengupdate data untuk kegiatan '{form_data.get('original_nama_kegiatan')}'")
+                logger.info("✅ Mode UPDATE: Mengupdate data untuk kegiatan '%s'", form_data.get('original_nama_kegiatan'))
                 # Set old_nama_kegiatan untuk identifikasi data yang akan diupdate
                 form_data['old_nama_kegiatan'] = form_data.get('original_nama_kegiatan')
                 success, message = save_biodata_data(form_data, user_id, buku_tabungan_path)
             else:
                 # Mode INSERT: simpan data baru
-                print(f"✅ Mode INSERT: Menyimpan data baru untuk kegiatan '{form_data.get('nama_kegiatan')}'")
-                print(f"🔍 Debug tambah_data (INSERT) - user_id yang akan digunakan: {user_id}, NIK: {form_data.get('nik')}")
+                logger.info("✅ Mode INSERT: Menyimpan data baru untuk kegiatan '%s'", form_data.get('nama_kegiatan'))
+                logger.debug("tambah_data (INSERT) - user_id yang akan digunakan: %s, NIK: %s", user_id, form_data.get('nik'))
                 success, message = insert_biodata_data(form_data, user_id, buku_tabungan_path)
 
             if success:
@@ -2168,9 +3399,7 @@ def tambah_data():
                 return render_template('user/tambah-data.html', biodata=biodata, kegiatan_list=kegiatan_list, current_year=current_year, username=get_username())
 
         except Exception as e:
-            print(f"Unexpected error in tambah_data: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Unexpected error in tambah_data: %s", e)
             flash(f'Terjadi kesalahan tidak terduga: {str(e)}', 'error')
             return render_template('user/tambah-data.html', biodata=biodata, kegiatan_list=kegiatan_list, current_year=current_year, username=get_username())
 
@@ -2214,7 +3443,7 @@ def daftar_kegiatan():
                     bk.nik,
                     bk.nama_lengkap
                 FROM biodata_kegiatan bk
-                LEFT JOIN kegiatan_master km ON TRIM(km.nama_kegiatan) = TRIM(bk.nama_kegiatan)
+                LEFT JOIN kegiatan_master km ON km.id = bk.kegiatan_id
                 WHERE bk.user_id = ?
                     AND TRIM(bk.nama_kegiatan) != ''
                     AND bk.nama_kegiatan IS NOT NULL
@@ -2222,7 +3451,7 @@ def daftar_kegiatan():
             """, (user_id,))
             kegiatan_user_list = cursor.fetchall()
         except sqlite3.Error as e:
-            print(f"Error fetching kegiatan user: {e}")
+            logger.error("Error fetching kegiatan user: %s", e)
         finally:
             if connection is not None:
                 cursor.close()
@@ -2232,6 +3461,25 @@ def daftar_kegiatan():
                          username=get_username(),
                          kegiatan_user_list=kegiatan_user_list)
 
+def get_kabupaten_counts(cursor, user_role, user_id):
+    """Jumlah peserta per kabupaten dari tabel ringkasan kabupaten_counts (operator: hanya kegiatan yang dipegang)"""
+    if user_role == 'operator' and user_id:
+        cursor.execute("""
+            SELECT kc.kabupaten_kota, SUM(kc.jumlah_peserta) as jumlah_peserta
+            FROM kabupaten_counts kc
+            INNER JOIN operator_kegiatan ok ON ok.kegiatan_id = kc.kegiatan_id
+            WHERE ok.user_id = ? AND TRIM(kc.kabupaten_kota) != ''
+            GROUP BY kc.kabupaten_kota
+        """, (user_id,))
+    else:
+        cursor.execute("""
+            SELECT kabupaten_kota, SUM(jumlah_peserta) as jumlah_peserta
+            FROM kabupaten_counts
+            WHERE TRIM(kabupaten_kota) != ''
+            GROUP BY kabupaten_kota
+        """)
+    return {row['kabupaten_kota']: row['jumlah_peserta'] for row in cursor.fetchall()}
+
 @app.route('/admin', methods=['GET', 'POST'])
 @app.route('/admin/dashboard', methods=['GET'])
 @admin_required
@@ -2258,10 +3506,9 @@ def admin_dashboard():
                 # Operator: hanya data kegiatan yang dipegang
                 # Total biodata (biodata dari kegiatan operator)
                 cursor.execute("""
-                    SELECT COUNT(*) as count
-                    FROM biodata_kegiatan bk
-                    INNER JOIN kegiatan_master k ON TRIM(k.nama_kegiatan) = TRIM(bk.nama_kegiatan)
-                    INNER JOIN operator_kegiatan ok ON k.id = ok.kegiatan_id
+                    SELECT COALESCE(SUM(kc.jumlah_peserta), 0) as count
+                    FROM kabupaten_counts kc
+                    INNER JOIN operator_kegiatan ok ON ok.kegiatan_id = kc.kegiatan_id
                     WHERE ok.user_id = ?
                 """, (user_id,))
                 result = cursor.fetchone()
@@ -2284,17 +3531,16 @@ def admin_dashboard():
 
                 # Total kabupaten dari biodata kegiatan operator
                 cursor.execute("""
-                    SELECT COUNT(DISTINCT bk.kabupaten_kota) as count
-                    FROM biodata_kegiatan bk
-                    INNER JOIN kegiatan_master k ON TRIM(k.nama_kegiatan) = TRIM(bk.nama_kegiatan)
-                    INNER JOIN operator_kegiatan ok ON k.id = ok.kegiatan_id
-                    WHERE ok.user_id = ? AND TRIM(bk.kabupaten_kota) != '' AND bk.kabupaten_kota IS NOT NULL
+                    SELECT COUNT(DISTINCT kc.kabupaten_kota) as count
+                    FROM kabupaten_counts kc
+                    INNER JOIN operator_kegiatan ok ON ok.kegiatan_id = kc.kegiatan_id
+                    WHERE ok.user_id = ? AND TRIM(kc.kabupaten_kota) != ''
                 """, (user_id,))
                 result = cursor.fetchone()
                 stats['total_kabupaten'] = result['count'] if result else 0
             else:
-                # Admin: semua data
-                cursor.execute("SELECT COUNT(*) as count FROM biodata_kegiatan")
+                # Admin: semua data (dari tabel ringkasan kabupaten_counts)
+                cursor.execute("SELECT COALESCE(SUM(jumlah_peserta), 0) as count FROM kabupaten_counts")
                 result = cursor.fetchone()
                 stats['total_biodata'] = result['count'] if result else 0
 
@@ -2308,14 +3554,14 @@ def admin_dashboard():
 
                 cursor.execute("""
                     SELECT COUNT(DISTINCT kabupaten_kota) as count
-                    FROM biodata_kegiatan
-                    WHERE TRIM(kabupaten_kota) != '' AND kabupaten_kota IS NOT NULL
+                    FROM kabupaten_counts
+                    WHERE TRIM(kabupaten_kota) != ''
                 """)
                 result = cursor.fetchone()
                 stats['total_kabupaten'] = result['count'] if result else 0
 
         except sqlite3.Error as e:
-            print(f"Error fetching stats: {e}")
+            logger.error("Error fetching stats: %s", e)
         finally:
             if connection is not None:
                 cursor.close()
@@ -2334,23 +3580,7 @@ def admin_dashboard():
             all_kabupaten_upper = {k.upper().strip() for k in all_kabupaten_list}
 
             cursor2 = connection2.cursor()
-            if user_role == 'operator' and user_id:
-                cursor2.execute("""
-                    SELECT bk.kabupaten_kota, COUNT(*) as jumlah_peserta
-                    FROM biodata_kegiatan bk
-                    INNER JOIN kegiatan_master k ON TRIM(k.nama_kegiatan) = TRIM(bk.nama_kegiatan)
-                    INNER JOIN operator_kegiatan ok ON k.id = ok.kegiatan_id
-                    WHERE ok.user_id = ? AND TRIM(bk.kabupaten_kota) != '' AND bk.kabupaten_kota IS NOT NULL
-                    GROUP BY bk.kabupaten_kota
-                """, (user_id,))
-            else:
-                cursor2.execute("""
-                    SELECT kabupaten_kota, COUNT(*) as jumlah_peserta
-                    FROM biodata_kegiatan
-                    WHERE TRIM(kabupaten_kota) != '' AND kabupaten_kota IS NOT NULL
-                    GROUP BY kabupaten_kota
-                """)
-            kabupaten_counts = {row['kabupaten_kota']: row['jumlah_peserta'] for row in cursor2.fetchall()}
+            kabupaten_counts = get_kabupaten_counts(cursor2, user_role, user_id)
 
             lainnya_count = 0
             for kab, count in kabupaten_counts.items():
@@ -2366,7 +3596,7 @@ def admin_dashboard():
             # Pastikan "LAINNYA" selalu paling terakhir
             kabupaten_summary.sort(key=lambda x: ((x.get('nama') or '').strip().upper() == 'LAINNYA', x.get('nama') or ''))
         except sqlite3.Error as e:
-            print(f"Error fetching kabupaten summary: {e}")
+            logger.error("Error fetching kabupaten summary: %s", e)
         finally:
             if connection2:
                 cursor2.close()
@@ -2386,14 +3616,10 @@ def admin_dashboard():
 
 @app.route('/admin/export-rekap-kabupaten-pdf/<path:kabupaten>')
 @admin_required
+@export_job
 def export_rekap_kabupaten_pdf(kabupaten):
     """Export rekap per kabupaten ke PDF - mengikuti style rekap tahunan"""
-    from io import BytesIO
     from urllib.parse import unquote
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-    from reportlab.lib import colors
 
     # Decode URL encoding
     kabupaten = unquote(kabupaten)
@@ -2407,41 +3633,50 @@ def export_rekap_kabupaten_pdf(kabupaten):
         flash('Koneksi database gagal!', 'error')
         return redirect(url_for('admin_rekap_filter'))
 
+    # Generate filename
+    filename = f"Rekap_Kabupaten_{kabupaten.replace(' ', '_')}.pdf"
+    content_disposition = f'attachment; filename="{filename}"'
+
     try:
         cursor = connection.cursor()
-        # Ambil semua biodata untuk kabupaten ini
         # Jika operator, batasi hanya pada kegiatan yang ia pegang
+        where_clause = "WHERE TRIM(bk.kabupaten_kota) = TRIM(?)"
+        params = [kabupaten]
         if user_role == 'operator' and user_id:
-            cursor.execute("""
-                SELECT
-                    bk.*,
-                    COALESCE(km.nama_kegiatan, bk.nama_kegiatan, '') AS nama_kegiatan,
-                    COALESCE(km.tempat_pelaksanaan, bk.tempat_pelaksanaan, '') AS tempat_pelaksanaan,
-                    COALESCE(km.waktu_pelaksanaan, bk.waktu_pelaksanaan, '') AS waktu_pelaksanaan
-                FROM biodata_kegiatan bk
-                LEFT JOIN kegiatan_master km ON TRIM(km.nama_kegiatan) = TRIM(bk.nama_kegiatan)
-                WHERE TRIM(bk.kabupaten_kota) = TRIM(?)
+            where_clause += """
                   AND EXISTS (
                       SELECT 1
-                      FROM kegiatan_master k
-                      INNER JOIN operator_kegiatan ok ON k.id = ok.kegiatan_id
+                      FROM operator_kegiatan ok
                       WHERE ok.user_id = ?
-                        AND TRIM(k.nama_kegiatan) = TRIM(COALESCE(km.nama_kegiatan, bk.nama_kegiatan, ''))
-                  )
-                ORDER BY bk.nama_lengkap ASC
-            """, (kabupaten, user_id))
-        else:
-            cursor.execute("""
-                SELECT
-                    bk.*,
-                    COALESCE(km.nama_kegiatan, bk.nama_kegiatan, '') AS nama_kegiatan,
-                    COALESCE(km.tempat_pelaksanaan, bk.tempat_pelaksanaan, '') AS tempat_pelaksanaan,
-                    COALESCE(km.waktu_pelaksanaan, bk.waktu_pelaksanaan, '') AS waktu_pelaksanaan
-                FROM biodata_kegiatan bk
-                LEFT JOIN kegiatan_master km ON TRIM(km.nama_kegiatan) = TRIM(bk.nama_kegiatan)
-                WHERE TRIM(bk.kabupaten_kota) = TRIM(?)
-                ORDER BY bk.nama_lengkap ASC
-            """, (kabupaten,))
+                        AND ok.kegiatan_id = bk.kegiatan_id
+                  )"""
+            params.append(user_id)
+
+        # PDF yang sama (data belum berubah) dikirim dari cache tanpa render ulang
+        versi_data = export_data_version(cursor, f"FROM biodata_kegiatan bk {where_clause}", params)
+        versi_laporan = report_cache_version(
+            export_tanda_tangan_values(cursor, f"FROM biodata_kegiatan bk {where_clause}", params)
+        )
+        cache_key = export_cache_key(
+            'export_rekap_kabupaten_pdf', versi_laporan, kabupaten, export_cache_scope(), versi_data
+        )
+        if versi_data[0]:
+            cached = cached_export_response(cache_key, '.pdf', 'application/pdf', content_disposition)
+            if cached:
+                return cached
+
+        # Ambil semua biodata untuk kabupaten ini
+        cursor.execute(f"""
+            SELECT
+                bk.*,
+                COALESCE(km.nama_kegiatan, bk.nama_kegiatan, '') AS nama_kegiatan,
+                COALESCE(km.tempat_pelaksanaan, bk.tempat_pelaksanaan, '') AS tempat_pelaksanaan,
+                COALESCE(km.waktu_pelaksanaan, bk.waktu_pelaksanaan, '') AS waktu_pelaksanaan
+            FROM biodata_kegiatan bk
+            LEFT JOIN kegiatan_master km ON km.id = bk.kegiatan_id
+            {where_clause}
+            ORDER BY bk.nama_lengkap ASC
+        """, params)
         rows = cursor.fetchall()
         all_biodata = [row_to_dict(row) for row in rows]
 
@@ -2462,450 +3697,19 @@ def export_rekap_kabupaten_pdf(kabupaten):
             cursor.close()
             connection.close()
 
-    # Load logo untuk header
-    logo_path = os.path.join(BASE_DIR, 'static', 'Logo_BGTK.png')
-    logo_img = None
-    logo_width = 0
-    logo_height = 0
-    if os.path.exists(logo_path):
-        try:
-            logo_pil = Image.open(logo_path)
-            max_logo_height = 0.6 * inch
-            logo_ratio = logo_pil.width / logo_pil.height
-            logo_width = max_logo_height * logo_ratio
-            logo_height = max_logo_height
-
-            logo_buffer = io.BytesIO()
-            logo_pil.save(logo_buffer, format='PNG')
-            logo_buffer.seek(0)
-            logo_img = RLImage(logo_buffer, width=logo_width, height=logo_height)
-        except Exception as e:
-            print(f"Error loading logo: {e}")
-            logo_img = None
-
-    # Load logo Pendidikan Bermutu dengan background transparan
-    pendidikan_bermutu_path = os.path.join(BASE_DIR, 'static', 'Pendidikan Bermutu untuk Semua.png')
-    pendidikan_bermutu_processed_path = None
-    pendidikan_bermutu_width = 0
-    pendidikan_bermutu_height = 0
-    pendidikan_bermutu_temp_file = None
-    if os.path.exists(pendidikan_bermutu_path):
-        try:
-            pendidikan_bermutu_pil = Image.open(pendidikan_bermutu_path)
-            if pendidikan_bermutu_pil.mode != 'RGBA':
-                pendidikan_bermutu_pil = pendidikan_bermutu_pil.convert('RGBA')
-
-            pixels = pendidikan_bermutu_pil.load()
-            width, height = pendidikan_bermutu_pil.size
-            black_threshold = 30
-
-            for x in range(width):
-                for y in range(height):
-                    r, g, b, a = pixels[x, y]
-                    if r < black_threshold and g < black_threshold and b < black_threshold:
-                        pixels[x, y] = (r, g, b, 0)
-
-            max_logo_height = 0.5 * inch
-            pendidikan_bermutu_ratio = pendidikan_bermutu_pil.width / pendidikan_bermutu_pil.height
-            pendidikan_bermutu_width = max_logo_height * pendidikan_bermutu_ratio
-            pendidikan_bermutu_height = max_logo_height
-
-            pendidikan_bermutu_temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-            pendidikan_bermutu_pil.save(pendidikan_bermutu_temp_file.name, format='PNG', optimize=False)
-            pendidikan_bermutu_processed_path = pendidikan_bermutu_temp_file.name
-        except Exception as e:
-            print(f"Error loading logo Pendidikan Bermutu: {e}")
-
-    # Load logo Ramah dengan background transparan
-    ramah_path = os.path.join(BASE_DIR, 'static', 'Ramah.png')
-    ramah_processed_path = None
-    ramah_width = 0
-    ramah_height = 0
-    ramah_temp_file = None
-    if os.path.exists(ramah_path):
-        try:
-            ramah_pil = Image.open(ramah_path)
-            if ramah_pil.mode != 'RGBA':
-                ramah_pil = ramah_pil.convert('RGBA')
-
-            pixels = ramah_pil.load()
-            width, height = ramah_pil.size
-            black_threshold = 30
-
-            for x in range(width):
-                for y in range(height):
-                    r, g, b, a = pixels[x, y]
-                    if r < black_threshold and g < black_threshold and b < black_threshold:
-                        pixels[x, y] = (r, g, b, 0)
-
-            max_logo_height = 0.5 * inch
-            ramah_ratio = ramah_pil.width / ramah_pil.height
-            ramah_width = max_logo_height * ramah_ratio
-            ramah_height = max_logo_height
-
-            ramah_temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-            ramah_pil.save(ramah_temp_file.name, format='PNG', optimize=False)
-            ramah_processed_path = ramah_temp_file.name
-        except Exception as e:
-            print(f"Error loading logo Ramah: {e}")
-
-    # Fungsi untuk header dengan logo dan footer
-    def add_header_footer(canvas, doc):
-        canvas.saveState()
-
-        max_logo_h = logo_height if logo_height > 0 else 0
-
-        # Header - Logo BGTK di kiri
-        if logo_img and logo_height > 0:
-            try:
-                logo_x = 25
-                logo_y = F4_SIZE[1] - 25 - max_logo_h
-                canvas.drawImage(logo_path, logo_x, logo_y, width=logo_width, height=logo_height, preserveAspectRatio=True)
-            except Exception as e:
-                print(f"Error drawing logo: {e}")
-
-        # Garis header
-        canvas.setStrokeColor(colors.HexColor('#067ac1'))
-        canvas.setLineWidth(1.5)
-        max_header_height = logo_height if logo_height > 0 else 0
-        header_line_y = F4_SIZE[1] - 25 - max_header_height - 5
-        canvas.line(25, header_line_y, F4_SIZE[0] - 25, header_line_y)
-
-        # Footer - Logo Pendidikan Bermutu dan Ramah di kanan bawah
-        max_footer_logo_height = max(pendidikan_bermutu_height if pendidikan_bermutu_height > 0 else 0,
-                                    ramah_height if ramah_height > 0 else 0)
-        footer_logo_y = 45
-
-        if max_footer_logo_height > 0:
-            total_footer_logo_width = (pendidikan_bermutu_width if pendidikan_bermutu_height > 0 else 0) + \
-                                     (ramah_width if ramah_height > 0 else 0) + 10
-            footer_logo_start_x = F4_SIZE[0] - 25 - total_footer_logo_width
-
-            if pendidikan_bermutu_processed_path and os.path.exists(pendidikan_bermutu_processed_path) and pendidikan_bermutu_height > 0:
-                try:
-                    pendidikan_bermutu_footer_x = footer_logo_start_x
-                    pendidikan_bermutu_footer_y = footer_logo_y
-                    canvas.drawImage(pendidikan_bermutu_processed_path, pendidikan_bermutu_footer_x, pendidikan_bermutu_footer_y,
-                                   width=pendidikan_bermutu_width, height=pendidikan_bermutu_height, preserveAspectRatio=True, mask='auto')
-                except Exception as e:
-                    print(f"Error drawing logo Pendidikan Bermutu di footer: {e}")
-
-            if ramah_processed_path and os.path.exists(ramah_processed_path) and ramah_height > 0:
-                try:
-                    ramah_footer_x = footer_logo_start_x + (pendidikan_bermutu_width if pendidikan_bermutu_height > 0 else 0) + 10
-                    ramah_footer_y = footer_logo_y
-                    canvas.drawImage(ramah_processed_path, ramah_footer_x, ramah_footer_y,
-                                   width=ramah_width, height=ramah_height, preserveAspectRatio=True, mask='auto')
-                except Exception as e:
-                    print(f"Error drawing logo Ramah di footer: {e}")
-
-        # Garis footer
-        canvas.setStrokeColor(colors.HexColor('#067ac1'))
-        canvas.setLineWidth(1)
-        footer_line_y = footer_logo_y - 10
-        canvas.line(25, footer_line_y, F4_SIZE[0] - 25, footer_line_y)
-
-        # Footer - Tanggal dan waktu export WITA
-        canvas.setFont('Helvetica', 8)
-        canvas.setFillColor(colors.black)
-        wita_time = datetime.utcnow() + timedelta(hours=8)
-        footer_text = f"Dicetak pada: {wita_time.strftime('%d/%m/%Y %H:%M')} WITA"
-        footer_width = canvas.stringWidth(footer_text, 'Helvetica', 8)
-        footer_x = 25
-        footer_y = footer_line_y - 15
-        canvas.drawString(footer_x, footer_y, footer_text)
-
-        canvas.restoreState()
-
-    # Gunakan kertas F4 dan beri ruang header
-    buffer = io.BytesIO()
-    max_header_logo_height = logo_height if logo_height > 0 else 0
-    top_margin_with_logo = 25 + max_header_logo_height + 15
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=F4_SIZE,
-        rightMargin=25,
-        leftMargin=25,
-        topMargin=top_margin_with_logo,
-        bottomMargin=40
-    )
-
-    elements = []
-    styles = getSampleStyleSheet()
-
-    # Title style
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=20,
-        textColor=colors.black,
-        spaceAfter=12,
-        spaceBefore=0,
-        alignment=1,  # Center
-        fontName='Helvetica-Bold',
-        leading=24
-    )
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=9,
-        leading=11,
-        textColor=colors.black,
-        alignment=0  # Left
-    )
-    value_style = ParagraphStyle(
-        'ValueStyle',
-        parent=styles['Normal'],
-        fontSize=9,
-        leading=11,
-        textColor=colors.black,
-        alignment=0,  # Left
-        leftIndent=0,
-        rightIndent=0
-    )
-
-    # Field mapping untuk label yang lebih readable dan profesional
-    field_labels = {
-        'nik': 'NIK',
-        'nama_lengkap': 'Nama Lengkap',
-        'nip_nippk': 'NIP/NIPPK',
-        'tempat_lahir': 'Tempat Lahir',
-        'tanggal_lahir': 'Tanggal Lahir',
-        'jenis_kelamin': 'Jenis Kelamin',
-        'agama': 'Agama',
-        'pendidikan_terakhir': 'Pendidikan Terakhir',
-        'jurusan': 'Jurusan',
-        'status_asn': 'Status Kepegawaian',
-        'pangkat_golongan': 'Pangkat / Golongan',
-        'jabatan': 'Jabatan',
-        'instansi': 'Nama Instansi',
-        'alamat_instansi': 'Alamat Instansi',
-        'alamat_domisili': 'Alamat Domisili',
-        'kabupaten_kota': 'Kabupaten/Kota',
-        'kabko_lainnya': 'Kabupaten/Kota Lainnya',
-        'peran': 'Peran dalam Kegiatan',
-        'no_hp': 'Nomor HP',
-        'alamat_email': 'Alamat Email',
-        'npwp': 'NPWP',
-        'nama_bank': 'Nama Bank',
-        'nama_bank_lainnya': 'Nama Bank Lainnya',
-        'no_rekening': 'Nomor Rekening',
-        'nama_pemilik_rekening': 'Nama Pemilik Rekening'
-    }
-
-    # Urutan field yang diinginkan
-    field_order = [
-        'nik', 'nama_lengkap', 'nip_nippk', 'tempat_lahir', 'tanggal_lahir',
-        'jenis_kelamin', 'agama', 'pendidikan_terakhir', 'jurusan',
-        'status_asn', 'pangkat_golongan', 'jabatan', 'instansi',
-        'alamat_instansi', 'alamat_domisili', 'kabupaten_kota', 'kabko_lainnya',
-        'peran',
-        'no_hp', 'alamat_email', 'npwp',
-        'nama_bank', 'nama_bank_lainnya', 'no_rekening', 'nama_pemilik_rekening'
-    ]
-
-    # Exclude fields yang tidak perlu ditampilkan
-    exclude_fields = ['id', 'user_id', 'buku_tabungan_path', 'tanda_tangan', 'created_at', 'updated_at', 'nama_kegiatan', 'waktu_pelaksanaan', 'tempat_pelaksanaan']
-
-    # List untuk menyimpan temporary files tanda tangan untuk cleanup
-    tanda_tangan_temp_files = []
-
-
-    # Loop untuk setiap user - buat 1 halaman per user
-    for user_idx, biodata in enumerate(all_biodata):
-        # Tambahkan page break kecuali untuk user pertama
-        if user_idx > 0:
-            elements.append(PageBreak())
-
-        # Title
-        title = Paragraph("BIODATA KEGIATAN", title_style)
-        elements.append(title)
-        elements.append(Spacer(1, 0.15*inch))
-
-        # Ambil data kegiatan untuk header tabel
-        biodata_nama_kegiatan = biodata.get('nama_kegiatan', '-')
-        waktu_pelaksanaan = biodata.get('waktu_pelaksanaan', '-')
-        tempat_pelaksanaan = biodata.get('tempat_pelaksanaan', '-')
-
-        # Buat header informasi kegiatan di atas tabel dengan titik dua yang sejajar
-        if biodata_nama_kegiatan or waktu_pelaksanaan or tempat_pelaksanaan:
-            info_style = ParagraphStyle(
-                'InfoStyle',
-                parent=styles['Normal'],
-                fontSize=10,
-                leading=14,
-                textColor=colors.black,
-                alignment=0,  # Left align
-                fontName='Helvetica-Bold'
-            )
-
-            info_table_data = []
-            if biodata_nama_kegiatan and str(biodata_nama_kegiatan).strip() and str(biodata_nama_kegiatan).strip() != '-':
-                info_table_data.append([
-                    Paragraph("<b>Nama Kegiatan</b>", info_style),
-                    Paragraph(":", info_style),
-                    Paragraph(str(biodata_nama_kegiatan), info_style)
-                ])
-            if waktu_pelaksanaan and str(waktu_pelaksanaan).strip() and str(waktu_pelaksanaan).strip() != '-':
-                info_table_data.append([
-                    Paragraph("<b>Waktu Pelaksanaan</b>", info_style),
-                    Paragraph(":", info_style),
-                    Paragraph(str(waktu_pelaksanaan), info_style)
-                ])
-            if tempat_pelaksanaan and str(tempat_pelaksanaan).strip() and str(tempat_pelaksanaan).strip() != '-':
-                info_table_data.append([
-                    Paragraph("<b>Tempat Pelaksanaan</b>", info_style),
-                    Paragraph(":", info_style),
-                    Paragraph(str(tempat_pelaksanaan), info_style)
-                ])
-
-            if info_table_data:
-                available_width = (8.27 * inch) - (25 * 2)
-                info_table = Table(info_table_data, colWidths=[2.2*inch, 0.15*inch, available_width - 2.2*inch - 0.15*inch])
-                info_table.setStyle(TableStyle([
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                    ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-                    ('ALIGN', (2, 0), (2, -1), 'LEFT'),
-                    ('LEFTPADDING', (0, 0), (0, -1), 0),
-                    ('LEFTPADDING', (1, 0), (1, -1), 0),
-                    ('LEFTPADDING', (2, 0), (2, -1), 0),
-                    ('RIGHTPADDING', (0, 0), (0, -1), 4),
-                    ('RIGHTPADDING', (1, 0), (1, -1), 0),
-                    ('RIGHTPADDING', (2, 0), (2, -1), 6),
-                    ('TOPPADDING', (0, 0), (-1, -1), 2),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-                ]))
-                elements.append(info_table)
-                elements.append(Spacer(1, 0.1*inch))
-
-        # Semua data dalam 1 tabel
-        all_data = []
-
-        # Collect all data in order
-        for key in field_order:
-            if key in biodata and key not in exclude_fields:
-                label = field_labels.get(key, key.replace('_', ' ').title())
-                value = biodata[key]
-                display_value = str(value) if value and str(value).strip() else '-'
-                all_data.append([label, display_value])
-
-        # Add any remaining fields not in field_order
-        for key, value in biodata.items():
-            if key not in exclude_fields and key not in field_order:
-                label = field_labels.get(key, key.replace('_', ' ').title())
-                display_value = str(value) if value and str(value).strip() else '-'
-                all_data.append([label, display_value])
-
-        # Process tanda tangan menggunakan helper function
-        tanda_tangan_raw = biodata.get('tanda_tangan')
-        tanda_tangan_img, error_msg = process_tanda_tangan_for_pdf(tanda_tangan_raw, tanda_tangan_temp_files)
-
-        # Buat 1 tabel untuk semua data
-        if all_data:
-            table_data = []
-            for row in all_data:
-                field_label = Paragraph(f"<b>{row[0]}</b>", value_style)
-                value_text = str(row[1]) if row[1] else '-'
-                value_text = value_text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                if len(value_text) > 50:
-                    words = value_text.split()
-                    lines = []
-                    current_line = []
-                    current_length = 0
-                    for word in words:
-                        if current_length + len(word) + 1 > 50:
-                            if current_line:
-                                lines.append(' '.join(current_line))
-                            current_line = [word]
-                            current_length = len(word)
-                        else:
-                            current_line.append(word)
-                            current_length += len(word) + 1
-                    if current_line:
-                        lines.append(' '.join(current_line))
-                    value_text = '<br/>'.join(lines)
-                value_para = Paragraph(value_text, value_style)
-                table_data.append([field_label, value_para])
-
-            # Tambahkan tanda tangan ke tabel jika ada
-            if tanda_tangan_img:
-                field_label = Paragraph("<b>Tanda Tangan</b>", value_style)
-                table_data.append([field_label, tanda_tangan_img])
-            elif biodata.get('tanda_tangan'):
-                field_label = Paragraph("<b>Tanda Tangan</b>", value_style)
-                error_msg_para = Paragraph("<i>Tanda tangan tidak tersedia</i>", value_style)
-                table_data.append([field_label, error_msg_para])
-
-            available_width = (8.27 * inch) - (25 * 2)
-            table = Table(table_data, colWidths=[2.2*inch, available_width - 2.2*inch])
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, -1), colors.white),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('LEFTPADDING', (0, 0), (0, -1), 4),
-                ('LEFTPADDING', (1, 0), (1, -1), 6),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-                ('TOPPADDING', (0, 0), (-1, -1), 5),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#d1d5db')),
-                ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor('#067ac1')),
-            ]))
-            elements.append(table)
-            elements.append(Spacer(1, 0.08*inch))
-
-    # Build PDF
-    try:
-        doc.build(elements, onFirstPage=add_header_footer, onLaterPages=add_header_footer)
-        buffer.seek(0)
-
-        # Refresh session sebelum return response untuk mencegah logout
-        session.permanent = True
-        session.modified = True
-    finally:
-        # Cleanup temporary files
-        try:
-            if pendidikan_bermutu_temp_file and os.path.exists(pendidikan_bermutu_processed_path):
-                os.unlink(pendidikan_bermutu_processed_path)
-        except Exception as e:
-            print(f"Error cleaning up Pendidikan Bermutu temp file: {e}")
-
-        try:
-            if ramah_temp_file and os.path.exists(ramah_processed_path):
-                os.unlink(ramah_processed_path)
-        except Exception as e:
-            print(f"Error cleaning up Ramah temp file: {e}")
-
-        # Cleanup temporary files tanda tangan
-        for temp_file_path in tanda_tangan_temp_files:
-            try:
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
-            except Exception as e:
-                print(f"Error cleaning up tanda tangan temp file {temp_file_path}: {e}")
+    pdf_file = render_biodata_pdf(all_biodata, progress=report_export_progress, output=new_export_cache_file('.pdf'))
 
-    # Generate filename
-    filename = f"Rekap_Kabupaten_{kabupaten.replace(' ', '_')}.pdf"
+    # Refresh session sebelum return response untuk mencegah logout
+    session.permanent = True
+    session.modified = True
 
-    return Response(
-        buffer.getvalue(),
-        mimetype='application/pdf',
-        headers={
-            'Content-Disposition': f'attachment; filename="{filename}"'
-        }
-    )
+    return store_export_cache(pdf_file, cache_key, '.pdf', 'application/pdf', content_disposition)
 
 @app.route('/admin/export-rekap-kabupaten-excel/<path:kabupaten>')
 @admin_required
+@export_job
 def export_rekap_kabupaten_excel(kabupaten):
     """Export rekap per kabupaten ke Excel - mengikuti style rekap tahunan"""
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
-    from io import BytesIO
     from urllib.parse import unquote
 
     # Decode URL encoding
@@ -2925,47 +3729,59 @@ def export_rekap_kabupaten_excel(kabupaten):
         # Ambil semua biodata untuk kabupaten ini
         # Jika operator, batasi hanya pada kegiatan yang ia pegang
         if user_role == 'operator' and user_id:
-            cursor.execute("""
+            query = """
                 SELECT
                     bk.*,
                     COALESCE(km.nama_kegiatan, bk.nama_kegiatan, '') AS nama_kegiatan,
                     COALESCE(km.tempat_pelaksanaan, bk.tempat_pelaksanaan, '') AS tempat_pelaksanaan,
                     COALESCE(km.waktu_pelaksanaan, bk.waktu_pelaksanaan, '') AS waktu_pelaksanaan
                 FROM biodata_kegiatan bk
-                LEFT JOIN kegiatan_master km ON TRIM(km.nama_kegiatan) = TRIM(bk.nama_kegiatan)
+                LEFT JOIN kegiatan_master km ON km.id = bk.kegiatan_id
                 WHERE TRIM(bk.kabupaten_kota) = TRIM(?)
                   AND EXISTS (
                       SELECT 1
-                      FROM kegiatan_master k
-                      INNER JOIN operator_kegiatan ok ON k.id = ok.kegiatan_id
+                      FROM operator_kegiatan ok
                       WHERE ok.user_id = ?
-                        AND TRIM(k.nama_kegiatan) = TRIM(COALESCE(km.nama_kegiatan, bk.nama_kegiatan, ''))
+                        AND ok.kegiatan_id = bk.kegiatan_id
                   )
                 ORDER BY bk.nama_lengkap ASC
-            """, (kabupaten, user_id))
+            """
+            params = (kabupaten, user_id)
         else:
-            cursor.execute("""
+            query = """
                 SELECT
                     bk.*,
                     COALESCE(km.nama_kegiatan, bk.nama_kegiatan, '') AS nama_kegiatan,
                     COALESCE(km.tempat_pelaksanaan, bk.tempat_pelaksanaan, '') AS tempat_pelaksanaan,
                     COALESCE(km.waktu_pelaksanaan, bk.waktu_pelaksanaan, '') AS waktu_pelaksanaan
                 FROM biodata_kegiatan bk
-                LEFT JOIN kegiatan_master km ON TRIM(km.nama_kegiatan) = TRIM(bk.nama_kegiatan)
+                LEFT JOIN kegiatan_master km ON km.id = bk.kegiatan_id
                 WHERE TRIM(bk.kabupaten_kota) = TRIM(?)
                 ORDER BY bk.nama_lengkap ASC
-            """, (kabupaten,))
-        rows = cursor.fetchall()
-        all_biodata = [row_to_dict(row) for row in rows]
+            """
+            params = (kabupaten,)
 
-        if not all_biodata:
+        # Pass 1: jumlah baris + statistik lebar kolom, tanpa menyimpan baris di memori
+        cursor.execute(query, params)
+        stats = ExcelColumnStats(biodata_excel_fields())
+        with profile_span('excel_width'):
+            for row in cursor:
+                stats.add(row_to_dict(row))
+
+        if not stats.total_rows:
             flash(f'Tidak ada data untuk kabupaten {kabupaten}!', 'error')
             return redirect(url_for('admin_rekap_filter'))
 
-        # Normalisasi path buku tabungan
-        for biodata in all_biodata:
-            if biodata.get('buku_tabungan_path'):
-                biodata['buku_tabungan_path'] = normalize_buku_tabungan_path(biodata['buku_tabungan_path'])
+        # Pass 2: tulis baris langsung dari cursor ke workbook streaming
+        cursor.execute(query, params)
+        excel_file = write_biodata_workbook(
+            (row_to_dict(row) for row in cursor),
+            stats,
+            export_output('.xlsx'),
+            sheet_title=f"Rekap {kabupaten}",
+            title=f"REKAP DATA PESERTA - {kabupaten.upper()}",
+            progress=report_export_progress
+        )
 
     except sqlite3.Error as e:
         flash(f'Terjadi kesalahan saat mengambil data: {str(e)}', 'error')
@@ -2975,210 +3791,6 @@ def export_rekap_kabupaten_excel(kabupaten):
             cursor.close()
             connection.close()
 
-    # Field mapping untuk label yang lebih readable dan profesional
-    field_labels = {
-        'nik': 'NIK',
-        'nama_lengkap': 'Nama Lengkap',
-        'nip_nippk': 'NIP/NIPPK',
-        'tempat_lahir': 'Tempat Lahir',
-        'tanggal_lahir': 'Tanggal Lahir',
-        'jenis_kelamin': 'Jenis Kelamin',
-        'agama': 'Agama',
-        'pendidikan_terakhir': 'Pendidikan Terakhir',
-        'jurusan': 'Jurusan',
-        'status_asn': 'Status Kepegawaian',
-        'pangkat_golongan': 'Pangkat / Golongan',
-        'jabatan': 'Jabatan',
-        'instansi': 'Nama Instansi',
-        'alamat_instansi': 'Alamat Instansi',
-        'alamat_domisili': 'Alamat Domisili',
-        'kabupaten_kota': 'Kabupaten/Kota',
-        'kabko_lainnya': 'Kabupaten/Kota Lainnya',
-        'peran': 'Peran dalam Kegiatan',
-        'no_hp': 'Nomor HP',
-        'alamat_email': 'Alamat Email',
-        'npwp': 'NPWP',
-        'nama_bank': 'Nama Bank',
-        'nama_bank_lainnya': 'Nama Bank Lainnya',
-        'no_rekening': 'Nomor Rekening',
-        'nama_pemilik_rekening': 'Nama Pemilik Rekening'
-    }
-
-    # Urutan field yang diinginkan
-    field_order = [
-        'nik', 'nama_lengkap', 'nip_nippk', 'tempat_lahir', 'tanggal_lahir',
-        'jenis_kelamin', 'agama', 'pendidikan_terakhir', 'jurusan',
-        'status_asn', 'pangkat_golongan', 'jabatan', 'instansi',
-        'alamat_instansi', 'alamat_domisili', 'kabupaten_kota', 'kabko_lainnya',
-        'peran',
-        'no_hp', 'alamat_email', 'npwp',
-        'nama_bank', 'nama_bank_lainnya', 'no_rekening', 'nama_pemilik_rekening'
-    ]
-
-    # Exclude fields yang tidak perlu ditampilkan
-    exclude_fields = ['id', 'user_id', 'buku_tabungan_path', 'tanda_tangan', 'created_at', 'updated_at', 'waktu_pelaksanaan', 'tempat_pelaksanaan']
-
-    # Buat workbook Excel
-    wb = Workbook()
-    ws = wb.active
-    ws.title = f"Rekap {kabupaten}"
-
-    # Styles
-    header_fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-    header_font = Font(bold=True, color="000000", size=11)
-    title_font = Font(bold=True, size=12, color="000000")
-    border_style = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    center_align = Alignment(horizontal='center', vertical='center')
-    left_align = Alignment(horizontal='left', vertical='top', wrap_text=True)
-
-    # Buat list semua field yang akan ditampilkan (dalam urutan yang diinginkan)
-    all_fields = []
-    # Tambahkan nama_kegiatan di awal
-    all_fields.append({'key': 'nama_kegiatan', 'label': 'Nama Kegiatan'})
-    for key in field_order:
-        if key not in exclude_fields:
-            label = field_labels.get(key, key.replace('_', ' ').title())
-            all_fields.append({'key': key, 'label': label})
-
-    # Tambahkan field tanda tangan
-    all_fields.append({'key': 'tanda_tangan', 'label': 'Tanda Tangan'})
-
-    # Header kegiatan
-    num_cols = len(all_fields)
-    last_col_letter = get_column_letter(num_cols)
-
-    # Title
-    title_text = f"REKAP DATA PESERTA - {kabupaten.upper()}"
-
-    ws.merge_cells(f'A1:{last_col_letter}1')
-    ws['A1'] = title_text
-    ws['A1'].font = title_font
-    ws['A1'].alignment = center_align
-
-    # Tambahkan informasi tanggal export
-    export_date = datetime.now().strftime("%d %B %Y, %H:%M:%S")
-    ws.merge_cells(f'A2:{last_col_letter}2')
-    ws['A2'] = f"Tanggal Export: {export_date}"
-    ws['A2'].font = Font(size=10, italic=True)
-    ws['A2'].alignment = left_align
-    ws.row_dimensions[2].height = 18
-
-    # Buat header kolom (semua field sebagai kolom)
-    for col_idx, field_info in enumerate(all_fields, 1):
-        cell = ws.cell(row=3, column=col_idx, value=field_info['label'])
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = center_align
-        cell.border = border_style
-    ws.row_dimensions[3].height = 22
-
-    # Set lebar kolom pertama (Nama Kegiatan) lebih lebar
-    ws.column_dimensions['A'].width = 35
-    # Set lebar semua kolom lainnya
-    for col_idx in range(2, len(all_fields) + 1):
-        col_letter = get_column_letter(col_idx)
-        ws.column_dimensions[col_letter].width = 25
-
-    # Data untuk setiap user (setiap user = 1 baris)
-    current_row = 4
-    for user_idx, biodata in enumerate(all_biodata):
-        for col_idx, field_info in enumerate(all_fields, 1):
-            field_key = field_info['key']
-
-            # Ambil nilai field
-            if field_key == 'tanda_tangan':
-                display_value = "[Tersedia]" if biodata.get('tanda_tangan') else "-"
-            else:
-                value = biodata.get(field_key, '')
-                display_value = str(value) if value and str(value).strip() else '-'
-
-            # Tulis ke cell
-            cell = ws.cell(row=current_row, column=col_idx, value=display_value)
-            cell.border = border_style
-
-            # Alternating row colors untuk readability
-            if user_idx % 2 == 0:
-                cell.fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-            else:
-                cell.fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-
-            # Alignment dengan wrap text untuk semua kolom
-            if field_key in ['nik', 'nip_nippk', 'no_hp', 'npwp', 'no_rekening']:
-                cell.alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
-            elif field_key in ['tanggal_lahir']:
-                cell.alignment = Alignment(horizontal='center', vertical='top', wrap_text=True)
-            else:
-                cell.alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
-
-        # Auto adjust row height
-        max_height = 18
-        for col_idx, field_info in enumerate(all_fields, 1):
-            cell = ws.cell(row=current_row, column=col_idx)
-            if cell.value:
-                col_letter = get_column_letter(col_idx)
-                col_width = ws.column_dimensions[col_letter].width or 25
-                text_length = len(str(cell.value))
-                estimated_lines = max(1, (text_length / max(col_width * 0.8, 1)))
-                estimated_height = estimated_lines * 15
-                max_height = max(max_height, min(estimated_height, 60))
-
-        ws.row_dimensions[current_row].height = max_height
-        current_row += 1
-
-    # Auto-adjust column widths berdasarkan konten aktual
-    for col_idx, field_info in enumerate(all_fields, 1):
-        col_letter = get_column_letter(col_idx)
-
-        if col_letter == 'A':
-            continue  # Skip kolom A (Nama Kegiatan) - sudah di-set
-
-        max_length = 0
-        header_cell = ws.cell(row=3, column=col_idx)
-        if header_cell.value:
-            max_length = len(str(header_cell.value))
-
-        for row in range(4, current_row):
-            cell = ws.cell(row=row, column=col_idx)
-            if cell.value:
-                text = str(cell.value)
-                text_length = len(text)
-                if text_length > 50:
-                    lines = text.split('\n') if '\n' in text else [text]
-                    max_line_length = max(len(line) for line in lines)
-                    max_length = max(max_length, min(max_line_length, 40))
-                else:
-                    max_length = max(max_length, text_length)
-
-        optimal_width = max(12, min(max_length + 2, 40))
-        if 'Alamat' in field_info['label']:
-            optimal_width = max(optimal_width, min(max_length + 2, 45))
-        ws.column_dimensions[col_letter].width = optimal_width
-
-    # Freeze panes untuk memudahkan scrolling (freeze header)
-    ws.freeze_panes = 'A4'
-
-    # Enable auto filter untuk header
-    ws.auto_filter.ref = f'A3:{last_col_letter}{current_row - 1}'
-
-    # Set print settings
-    ws.page_setup.orientation = ws.ORIENTATION_LANDSCAPE
-    ws.page_setup.paperSize = ws.PAPERSIZE_A4
-    ws.page_setup.fitToWidth = 1
-    ws.page_setup.fitToHeight = 0
-
-    # Set row heights untuk header
-    ws.row_dimensions[1].height = 25
-
-    # Save to BytesIO
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-
     # Refresh session
     session.permanent = True
     session.modified = True
@@ -3186,20 +3798,90 @@ def export_rekap_kabupaten_excel(kabupaten):
     # Generate filename
     filename = f"Rekap_Kabupaten_{kabupaten.replace(' ', '_')}.xlsx"
 
-    return Response(
-        buffer.getvalue(),
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={
-            'Content-Disposition': f'attachment; filename="{filename}"'
-        }
-    )
+    return export_file_response(excel_file, EXCEL_MIMETYPE, f'attachment; filename="{filename}"')
+
+def load_rekap_filter_dropdown(cursor):
+    """Isi dropdown tahun, kabupaten/kota dan nama kegiatan di halaman rekap filter"""
+    # Dropdown Tahun (berdasarkan created_at biodata_kegiatan)
+    cursor.execute("""
+        SELECT DISTINCT tahun
+        FROM biodata_kegiatan
+        WHERE tahun IS NOT NULL
+        ORDER BY tahun DESC
+    """)
+    tahun_list = [row[0] for row in cursor.fetchall() if row and row[0]]
+
+    # Dropdown Kabupaten/Kota (dari tabel ringkasan kabupaten_counts, tanpa membaca biodata)
+    cursor.execute("""
+        SELECT DISTINCT kabupaten_kota
+        FROM kabupaten_counts
+        WHERE TRIM(kabupaten_kota) != ''
+        ORDER BY kabupaten_kota ASC
+    """)
+    kabupaten_list = [row[0] for row in cursor.fetchall() if row and row[0]]
+
+    # Dropdown Nama Kegiatan: kegiatan_master yang punya peserta (kabupaten_counts), ditambah
+    # nama kegiatan biodata yang tidak terhubung ke kegiatan_master (kegiatan_id NULL, lewat index)
+    cursor.execute("""
+        SELECT km.nama_kegiatan
+        FROM kegiatan_master km
+        WHERE TRIM(km.nama_kegiatan) != ''
+          AND EXISTS (SELECT 1 FROM kabupaten_counts kc WHERE kc.kegiatan_id = km.id)
+        UNION
+        SELECT nama_kegiatan
+        FROM biodata_kegiatan
+        WHERE kegiatan_id IS NULL AND TRIM(nama_kegiatan) != ''
+        ORDER BY 1 ASC
+    """)
+    kegiatan_list = [row[0] for row in cursor.fetchall() if row and row[0]]
+
+    return tahun_list, kabupaten_list, kegiatan_list
+
+def rekap_filter_where(selected_year, selected_kabupaten, selected_kegiatan):
+    """WHERE (alias bk) + params untuk filter rekap; operator dibatasi pada kegiatan yang dipegang"""
+    user_role = get_user_role()
+    user_id = get_user_id()
+    where_conditions = ["1=1"]
+    params = []
+
+    # Filter tahun
+    if selected_year:
+        try:
+            year_int = int(selected_year)
+            where_conditions.append("bk.tahun = ?")
+            params.append(year_int)
+        except ValueError:
+            pass
+
+    # Filter kabupaten/kota
+    if selected_kabupaten:
+        where_conditions.append("TRIM(bk.kabupaten_kota) = TRIM(?)")
+        params.append(selected_kabupaten)
+
+    # Filter nama kegiatan
+    if selected_kegiatan:
+        where_conditions.append("TRIM(bk.nama_kegiatan) = TRIM(?)")
+        params.append(selected_kegiatan)
+
+    # Jika operator, batasi hanya kegiatan yang dia pegang
+    if user_role == 'operator' and user_id:
+        where_conditions.append("""
+            EXISTS (
+                SELECT 1
+                FROM operator_kegiatan ok
+                WHERE ok.user_id = ?
+                  AND ok.kegiatan_id = bk.kegiatan_id
+            )
+        """)
+        params.append(user_id)
+
+    return " AND ".join(where_conditions), params
 
 @app.route('/admin/rekap-filter', methods=['GET'])
 @admin_required
 def admin_rekap_filter():
     """Halaman rekap biodata dengan filter tahun/kabupaten/kegiatan (DataTables)."""
     user_role = get_user_role()
-    user_id = get_user_id()
 
     selected_year = request.args.get('tahun', '').strip()
     selected_kabupaten = request.args.get('kabupaten_kota', '').strip()
@@ -3210,7 +3892,7 @@ def admin_rekap_filter():
         flash('Koneksi database gagal!', 'error')
         return render_template(
             'admin/admin-rekap-filter.html',
-            biodata_list=[],
+            jumlah_data=0,
             tahun_list=[],
             kabupaten_list=[],
             kegiatan_list=[],
@@ -3221,7 +3903,7 @@ def admin_rekap_filter():
             user_role=user_role
         )
 
-    biodata_list = []
+    jumlah_data = 0
     tahun_list = []
     kabupaten_list = []
     kegiatan_list = []
@@ -3229,91 +3911,20 @@ def admin_rekap_filter():
     try:
         cursor = connection.cursor()
 
-        # Dropdown Tahun (berdasarkan created_at biodata_kegiatan)
-        tahun_query = """
-            SELECT DISTINCT CAST(strftime('%Y', created_at) AS INTEGER) AS tahun
-            FROM biodata_kegiatan
-            WHERE created_at IS NOT NULL
-            ORDER BY tahun DESC
-        """
-        cursor.execute(tahun_query)
-        tahun_list = [row[0] for row in cursor.fetchall() if row and row[0]]
-
-        # Dropdown Kabupaten/Kota
-        kab_query = """
-            SELECT DISTINCT kabupaten_kota
-            FROM biodata_kegiatan
-            WHERE TRIM(kabupaten_kota) != '' AND kabupaten_kota IS NOT NULL
-            ORDER BY kabupaten_kota ASC
-        """
-        cursor.execute(kab_query)
-        kabupaten_list = [row[0] for row in cursor.fetchall() if row and row[0]]
-
-        # Dropdown Nama Kegiatan
-        keg_query = """
-            SELECT DISTINCT nama_kegiatan
-            FROM biodata_kegiatan
-            WHERE TRIM(nama_kegiatan) != '' AND nama_kegiatan IS NOT NULL
-            ORDER BY nama_kegiatan ASC
-        """
-        cursor.execute(keg_query)
-        kegiatan_list = [row[0] for row in cursor.fetchall() if row and row[0]]
-
-        where_conditions = ["1=1"]
-        params = []
-
-        # Filter tahun
-        if selected_year:
-            try:
-                year_int = int(selected_year)
-                where_conditions.append("CAST(strftime('%Y', bk.created_at) AS INTEGER) = ?")
-                params.append(year_int)
-            except ValueError:
-                pass
-
-        # Filter kabupaten/kota
-        if selected_kabupaten:
-            where_conditions.append("TRIM(bk.kabupaten_kota) = TRIM(?)")
-            params.append(selected_kabupaten)
-
-        # Filter nama kegiatan
-        if selected_kegiatan:
-            where_conditions.append("TRIM(bk.nama_kegiatan) = TRIM(?)")
-            params.append(selected_kegiatan)
-
-        # Jika operator, batasi hanya kegiatan yang dia pegang
-        if user_role == 'operator' and user_id:
-            where_conditions.append("""
-                EXISTS (
-                    SELECT 1
-                    FROM kegiatan_master k
-                    INNER JOIN operator_kegiatan ok ON k.id = ok.kegiatan_id
-                    WHERE ok.user_id = ?
-                      AND TRIM(k.nama_kegiatan) = TRIM(bk.nama_kegiatan)
-                )
-            """)
-            params.append(user_id)
-
-        where_clause = " AND ".join(where_conditions)
-
-        biodata_query = f"""
-            SELECT bk.*
-            FROM biodata_kegiatan bk
-            WHERE {where_clause}
-            ORDER BY bk.created_at DESC, bk.id DESC
-        """
-        cursor.execute(biodata_query, tuple(params))
-        rows = cursor.fetchall()
-        biodata_list = [row_to_dict(r) for r in rows]
+        # Dropdown Tahun, Kabupaten/Kota dan Nama Kegiatan (lewat cache proses)
+        tahun_list, kabupaten_list, kegiatan_list = cached_query(
+            cursor, 'biodata', 'rekap_filter_dropdown', load_rekap_filter_dropdown
+        )
 
-        # Normalisasi path buku tabungan agar bisa ditampilkan/diakses konsisten
-        for b in biodata_list:
-            if b.get('buku_tabungan_path'):
-                b['buku_tabungan_path'] = normalize_buku_tabungan_path(b['buku_tabungan_path'])
+        # Baris tabel diambil per halaman lewat api_rekap_filter_data (DataTables server-side),
+        # halaman ini cukup menghitung jumlah data untuk tombol export
+        where_clause, params = rekap_filter_where(selected_year, selected_kabupaten, selected_kegiatan)
+        cursor.execute(f"SELECT COUNT(*) FROM biodata_kegiatan bk WHERE {where_clause}", params)
+        jumlah_data = cursor.fetchone()[0]
 
     except sqlite3.Error as e:
         flash(f'Terjadi kesalahan saat mengambil data: {str(e)}', 'error')
-        biodata_list = []
+        jumlah_data = 0
     finally:
         try:
             cursor.close()
@@ -3323,7 +3934,7 @@ def admin_rekap_filter():
 
     return render_template(
         'admin/admin-rekap-filter.html',
-        biodata_list=biodata_list,
+        jumlah_data=jumlah_data,
         tahun_list=tahun_list,
         kabupaten_list=kabupaten_list,
         kegiatan_list=kegiatan_list,
@@ -3334,19 +3945,236 @@ def admin_rekap_filter():
         user_role=user_role
     )
 
+# =========================
+# DataTables server-side (parameter, pencarian, halaman keyset)
+# =========================
+DATATABLES_MAX_PAGE_LENGTH = 100
+
+def parse_datatables_args(order_columns, default_column, default_dir='desc'):
+    """Parameter DataTables server-side dari request.args
+
+    order_columns = {index kolom tabel: kolom SQL (alias bk)}; kolom lain diurutkan dengan default_column.
+    after_value/after_id = keyset dari next_after respons sebelumnya (dikirim template).
+    """
+    order_index = request.args.get('order[0][column]', type=int)
+    return {
+        'draw': request.args.get('draw', 0, type=int),
+        'start': max(request.args.get('start', 0, type=int), 0),
+        'length': min(max(request.args.get('length', 25, type=int), 1), DATATABLES_MAX_PAGE_LENGTH),
+        'search': request.args.get('search[value]', '').strip(),
+        'order_column': order_columns.get(order_index, default_column),
+        'descending': request.args.get('order[0][dir]', default_dir) != 'asc',
+        'after_id': request.args.get('after_id', type=int),
+        'after_value': request.args.get('after_value')
+    }
+
+def datatables_search_clause(columns, search_value):
+    """Kondisi pencarian DataTables (alias bk) di kolom yang ditampilkan lewat index biodata_fts; return (sql, params)
+
+    Setiap kata dicari sebagai awalan kata di kolom tersebut (bukan potongan teks di tengah kata
+    seperti LIKE '%...%' yang harus membaca setiap baris). Semua kolom harus ada di BIODATA_FTS_COLUMNS.
+    Input tanpa kata (hanya tanda baca) tidak memfilter.
+    """
+    match_query = fts_match_query(search_value, columns)
+    if match_query is None:
+        return "", []
+    return " AND bk.id IN (SELECT rowid FROM biodata_fts WHERE biodata_fts MATCH ?)", [match_query]
+
+def fetch_datatables_page(cursor, select_columns, where_clause, params, dt):
+    """Ambil satu halaman DataTables dari biodata_kegiatan bk; return (rows, next_after)
+
+    Urutan selalu ditambah bk.id agar keyset (nilai kolom, id) unik. Halaman berikutnya dengan
+    urutan yang sama memakai keyset, halaman pertama/lompat halaman memakai OFFSET.
+    """
+    order_column = dt['order_column']
+    arah = 'DESC' if dt['descending'] else 'ASC'
+    pembanding = '<' if dt['descending'] else '>'
+    offset = dt['start']
+    if order_column == 'id':
+        order_by = f"bk.id {arah}"
+        if dt['after_id'] is not None:
+            where_clause += f" AND bk.id {pembanding} ?"
+            params = params + [dt['after_id']]
+            offset = 0
+    else:
+        order_by = f"bk.{order_column} {arah}, bk.id {arah}"
+        if dt['after_id'] is not None and dt['after_value'] is not None:
+            where_clause += f" AND (bk.{order_column}, bk.id) {pembanding} (?, ?)"
+            params = params + [dt['after_value'], dt['after_id']]
+            offset = 0
+
+    cursor.execute(f"""
+        SELECT bk.id, bk.{order_column} AS urut, {', '.join('bk.' + column for column in select_columns)}
+        FROM biodata_kegiatan bk
+        WHERE {where_clause}
+        ORDER BY {order_by}
+        LIMIT ? OFFSET ?
+    """, params + [dt['length'], offset])
+    rows = cursor.fetchall()
+    next_after = [rows[-1]['urut'], rows[-1]['id']] if len(rows) == dt['length'] else None
+    return rows, next_after
+
+# Kolom DataTables rekap filter yang bisa diurutkan (index kolom di tabel -> kolom SQL)
+REKAP_FILTER_ORDER_COLUMNS = {1: 'id', 2: 'nik', 3: 'nama_lengkap', 4: 'nama_kegiatan', 5: 'peran'}
+
+@app.route('/api/rekap-filter-data', methods=['GET'])
+@admin_required
+def api_rekap_filter_data():
+    """API DataTables server-side untuk tabel rekap filter (start, length, search, order)
+
+    Hanya kolom yang ditampilkan yang diambil, per halaman (lihat fetch_datatables_page).
+    """
+    dt = parse_datatables_args(REKAP_FILTER_ORDER_COLUMNS, 'id')
+    result = {'draw': dt['draw'], 'recordsTotal': 0, 'recordsFiltered': 0, 'data': [], 'next_after': None}
+    connection = get_db_connection()
+    if not connection:
+        result['error'] = 'Koneksi database gagal!'
+        return jsonify(result)
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        where_clause, params = rekap_filter_where(
+            request.args.get('tahun', '').strip(),
+            request.args.get('kabupaten_kota', '').strip(),
+            request.args.get('nama_kegiatan', '').strip()
+        )
+        cursor.execute(f"SELECT COUNT(*) FROM biodata_kegiatan bk WHERE {where_clause}", params)
+        result['recordsTotal'] = result['recordsFiltered'] = cursor.fetchone()[0]
+
+        if dt['search']:
+            search_clause, search_params = datatables_search_clause(
+                ('nik', 'nama_lengkap', 'nama_kegiatan', 'peran'), dt['search']
+            )
+            where_clause += search_clause
+            params = params + search_params
+            cursor.execute(f"SELECT COUNT(*) FROM biodata_kegiatan bk WHERE {where_clause}", params)
+            result['recordsFiltered'] = cursor.fetchone()[0]
+
+        rows, result['next_after'] = fetch_datatables_page(
+            cursor, ('nik', 'nama_lengkap', 'nama_kegiatan', 'peran'), where_clause, params, dt
+        )
+    except sqlite3.Error as e:
+        result['error'] = f'Terjadi kesalahan saat mengambil data: {str(e)}'
+        return jsonify(result)
+    finally:
+        if cursor:
+            cursor.close()
+        connection.close()
+
+    for row in rows:
+        result['data'].append({
+            'id': row['id'],
+            'nik': row['nik'],
+            'nama_lengkap': row['nama_lengkap'],
+            'nama_kegiatan': row['nama_kegiatan'],
+            'peran': row['peran'],
+            # Route edit butuh nama kegiatan (path tidak boleh kosong)
+            'edit_url': url_for(
+                'admin_edit_biodata', nik=row['nik'], nama_kegiatan=row['nama_kegiatan'], **{'from': 'rekap-filter'}
+            ) if row['nik'] and row['nama_kegiatan'] else None
+        })
+    return jsonify(result)
+
+@app.route('/api/search', methods=['GET'])
+@admin_required
+def api_search():
+    """API pencarian peserta di semua kegiatan (FTS5): q, page, per_page, filter tahun/kabupaten_kota/nama_kegiatan
+
+    Setiap kata di q dicari sebagai awalan di nama, NIK, NIP/NIPPK, instansi, jabatan dan
+    kabupaten/kota; hasil diurutkan berdasarkan relevansi (bm25). Operator hanya melihat
+    peserta kegiatan yang dia pegang.
+    """
+    search_value = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 25, type=int), 1), DATATABLES_MAX_PAGE_LENGTH)
+    result = {'q': search_value, 'page': page, 'per_page': per_page, 'total': 0, 'results': []}
+
+    match_query = fts_match_query(search_value)
+    if match_query is None:
+        return jsonify(result)
+
+    connection = get_db_connection()
+    if not connection:
+        result['error'] = 'Koneksi database gagal!'
+        return jsonify(result), 500
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        where_clause, params = rekap_filter_where(
+            request.args.get('tahun', '').strip(),
+            request.args.get('kabupaten_kota', '').strip(),
+            request.args.get('nama_kegiatan', '').strip()
+        )
+        bm25 = f"bm25(biodata_fts, {', '.join(str(bobot) for bobot in BIODATA_FTS_WEIGHTS)})"
+        offset = (page - 1) * per_page
+        # Tanpa filter (admin): hitung & urutkan cukup dari index FTS5, baris biodata hanya
+        # dibaca untuk satu halaman. Dengan filter/operator: FTS5 tetap tabel pertama (MATCH
+        # lewat index), lalu baris biodata diambil per rowid untuk dicek kondisinya.
+        if not params:
+            cursor.execute("SELECT COUNT(*) FROM biodata_fts WHERE biodata_fts MATCH ?", (match_query,))
+            from_clause = f"""
+                (SELECT rowid, {bm25} AS skor FROM biodata_fts WHERE biodata_fts MATCH ?
+                 ORDER BY skor, rowid DESC LIMIT ? OFFSET ?) f
+                INNER JOIN biodata_kegiatan bk ON bk.id = f.rowid
+            """
+            query_params = [match_query, per_page, offset]
+            offset = 0
+        else:
+            cursor.execute(f"""
+                SELECT COUNT(*)
+                FROM biodata_fts
+                INNER JOIN biodata_kegiatan bk ON bk.id = biodata_fts.rowid
+                WHERE biodata_fts MATCH ? AND {where_clause}
+            """, [match_query] + params)
+            from_clause = f"""
+                (SELECT rowid, {bm25} AS skor FROM biodata_fts WHERE biodata_fts MATCH ?) f
+                INNER JOIN biodata_kegiatan bk ON bk.id = f.rowid
+            """
+            query_params = [match_query] + params
+        result['total'] = cursor.fetchone()[0]
+
+        rows = []
+        if result['total'] > (page - 1) * per_page:
+            cursor.execute(f"""
+                SELECT bk.id, bk.nik, bk.nama_lengkap, bk.nip_nippk, bk.instansi, bk.jabatan,
+                       bk.kabupaten_kota, bk.nama_kegiatan, bk.peran, bk.tahun
+                FROM {from_clause}
+                WHERE {where_clause}
+                ORDER BY f.skor, bk.id DESC
+                LIMIT ? OFFSET ?
+            """, query_params + [per_page, offset])
+            rows = cursor.fetchall()
+    except sqlite3.Error as e:
+        result['error'] = f'Terjadi kesalahan saat mencari data: {str(e)}'
+        return jsonify(result), 500
+    finally:
+        if cursor:
+            cursor.close()
+        connection.close()
+
+    for row in rows:
+        result['results'].append({
+            'id': row['id'],
+            'nik': row['nik'],
+            'nama_lengkap': row['nama_lengkap'],
+            'nip_nippk': row['nip_nippk'],
+            'instansi': row['instansi'],
+            'jabatan': row['jabatan'],
+            'kabupaten_kota': row['kabupaten_kota'],
+            'nama_kegiatan': row['nama_kegiatan'],
+            'peran': row['peran'],
+            'tahun': row['tahun'],
+            'edit_url': url_for(
+                'admin_edit_biodata', nik=row['nik'], nama_kegiatan=row['nama_kegiatan'], **{'from': 'rekap-filter'}
+            ) if row['nik'] and row['nama_kegiatan'] else None
+        })
+    return jsonify(result)
+
 @app.route('/admin/export-rekap-filter-pdf')
 @admin_required
+@export_job
 def export_rekap_filter_pdf():
     """Export Rekap ke PDF (format biodata lengkap seperti rekap tahunan) sesuai filter."""
-    from io import BytesIO
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.styles import getSampleStyleSheet
-    from reportlab.lib import colors
-    from reportlab.lib.units import inch
-
-    user_role = get_user_role()
-    user_id = get_user_id()
 
     selected_year = request.args.get('tahun', '').strip()
     selected_kabupaten = request.args.get('kabupaten_kota', '').strip()
@@ -3359,38 +4187,7 @@ def export_rekap_filter_pdf():
 
     try:
         cursor = connection.cursor()
-        where_conditions = ["1=1"]
-        params = []
-
-        if selected_year:
-            try:
-                year_int = int(selected_year)
-                where_conditions.append("CAST(strftime('%Y', bk.created_at) AS INTEGER) = ?")
-                params.append(year_int)
-            except ValueError:
-                pass
-
-        if selected_kabupaten:
-            where_conditions.append("TRIM(bk.kabupaten_kota) = TRIM(?)")
-            params.append(selected_kabupaten)
-
-        if selected_kegiatan:
-            where_conditions.append("TRIM(bk.nama_kegiatan) = TRIM(?)")
-            params.append(selected_kegiatan)
-
-        if user_role == 'operator' and user_id:
-            where_conditions.append("""
-                EXISTS (
-                    SELECT 1
-                    FROM kegiatan_master k
-                    INNER JOIN operator_kegiatan ok ON k.id = ok.kegiatan_id
-                    WHERE ok.user_id = ?
-                      AND TRIM(k.nama_kegiatan) = TRIM(bk.nama_kegiatan)
-                )
-            """)
-            params.append(user_id)
-
-        where_clause = " AND ".join(where_conditions)
+        where_clause, params = rekap_filter_where(selected_year, selected_kabupaten, selected_kegiatan)
         cursor.execute(f"""
             SELECT bk.*
             FROM biodata_kegiatan bk
@@ -3409,402 +4206,16 @@ def export_rekap_filter_pdf():
             flash('Tidak ada data untuk diekspor!', 'error')
             return redirect(url_for('admin_rekap_filter', tahun=selected_year, kabupaten_kota=selected_kabupaten, nama_kegiatan=selected_kegiatan))
 
-        MAX_EXPORT_ROWS = 2000
+        MAX_EXPORT_ROWS = export_row_limit(2000)
         if len(all_biodata) > MAX_EXPORT_ROWS:
             flash(f'Data terlalu besar ({len(all_biodata)} rows). Maksimal {MAX_EXPORT_ROWS} peserta untuk export PDF. Silakan gunakan filter yang lebih spesifik.', 'error')
             return redirect(url_for('admin_rekap_filter', tahun=selected_year, kabupaten_kota=selected_kabupaten, nama_kegiatan=selected_kegiatan))
 
-        # ==== Mulai: blok gaya PDF sama dengan Rekap Tahunan ====
-        # Load logo untuk header
-        logo_path = os.path.join(BASE_DIR, 'static', 'Logo_BGTK.png')
-        logo_img = None
-        logo_width = 0
-        logo_height = 0
-        if os.path.exists(logo_path):
-            try:
-                logo_pil = Image.open(logo_path)
-                max_logo_height = 0.6 * inch
-                logo_ratio = logo_pil.width / logo_pil.height
-                logo_width = max_logo_height * logo_ratio
-                logo_height = max_logo_height
-
-                logo_buffer = io.BytesIO()
-                logo_pil.save(logo_buffer, format='PNG')
-                logo_buffer.seek(0)
-                logo_img = RLImage(logo_buffer, width=logo_width, height=logo_height)
-            except Exception as e:
-                print(f"Error loading logo: {e}")
-                logo_img = None
-
-        # Load logo Pendidikan Bermutu
-        pendidikan_bermutu_path = os.path.join(BASE_DIR, 'static', 'Pendidikan Bermutu untuk Semua.png')
-        pendidikan_bermutu_processed_path = None
-        pendidikan_bermutu_width = 0
-        pendidikan_bermutu_height = 0
-        pendidikan_bermutu_temp_file = None
-        if os.path.exists(pendidikan_bermutu_path):
-            try:
-                pendidikan_bermutu_pil = Image.open(pendidikan_bermutu_path)
-                if pendidikan_bermutu_pil.mode != 'RGBA':
-                    pendidikan_bermutu_pil = pendidikan_bermutu_pil.convert('RGBA')
-
-                pixels = pendidikan_bermutu_pil.load()
-                width, height = pendidikan_bermutu_pil.size
-                black_threshold = 30
-                for x in range(width):
-                    for y in range(height):
-                        r, g, b, a = pixels[x, y]
-                        if r < black_threshold and g < black_threshold and b < black_threshold:
-                            pixels[x, y] = (r, g, b, 0)
-
-                max_logo_height = 0.5 * inch
-                pendidikan_bermutu_ratio = pendidikan_bermutu_pil.width / pendidikan_bermutu_pil.height
-                pendidikan_bermutu_width = max_logo_height * pendidikan_bermutu_ratio
-                pendidikan_bermutu_height = max_logo_height
-
-                pendidikan_bermutu_temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-                pendidikan_bermutu_pil.save(pendidikan_bermutu_temp_file.name, format='PNG', optimize=False)
-                pendidikan_bermutu_processed_path = pendidikan_bermutu_temp_file.name
-            except Exception as e:
-                print(f"Error loading logo Pendidikan Bermutu: {e}")
-
-        # Load logo Ramah
-        ramah_path = os.path.join(BASE_DIR, 'static', 'Ramah.png')
-        ramah_processed_path = None
-        ramah_width = 0
-        ramah_height = 0
-        ramah_temp_file = None
-        if os.path.exists(ramah_path):
-            try:
-                ramah_pil = Image.open(ramah_path)
-                if ramah_pil.mode != 'RGBA':
-                    ramah_pil = ramah_pil.convert('RGBA')
-
-                pixels = ramah_pil.load()
-                width, height = ramah_pil.size
-                black_threshold = 30
-                for x in range(width):
-                    for y in range(height):
-                        r, g, b, a = pixels[x, y]
-                        if r < black_threshold and g < black_threshold and b < black_threshold:
-                            pixels[x, y] = (r, g, b, 0)
-
-                max_logo_height = 0.5 * inch
-                ramah_ratio = ramah_pil.width / ramah_pil.height
-                ramah_width = max_logo_height * ramah_ratio
-                ramah_height = max_logo_height
-
-                ramah_temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-                ramah_pil.save(ramah_temp_file.name, format='PNG', optimize=False)
-                ramah_processed_path = ramah_temp_file.name
-            except Exception as e:
-                print(f"Error loading logo Ramah: {e}")
-
-        def add_header_footer(canvas, doc):
-            canvas.saveState()
-
-            max_logo_h = logo_height if logo_height > 0 else 0
-
-            if logo_img and logo_height > 0:
-                try:
-                    logo_x = 25
-                    logo_y = F4_SIZE[1] - 25 - max_logo_h
-                    canvas.drawImage(logo_path, logo_x, logo_y, width=logo_width, height=logo_height, preserveAspectRatio=True)
-                except Exception as e:
-                    print(f"Error drawing logo: {e}")
-
-            canvas.setStrokeColor(colors.HexColor('#067ac1'))
-            canvas.setLineWidth(1.5)
-            max_header_height = logo_height if logo_height > 0 else 0
-            header_line_y = F4_SIZE[1] - 25 - max_header_height - 5
-            canvas.line(25, header_line_y, F4_SIZE[0] - 25, header_line_y)
-
-            max_footer_logo_height = max(
-                pendidikan_bermutu_height if pendidikan_bermutu_height > 0 else 0,
-                ramah_height if ramah_height > 0 else 0
-            )
-            footer_logo_y = 45
-
-            if max_footer_logo_height > 0:
-                total_footer_logo_width = (
-                    (pendidikan_bermutu_width if pendidikan_bermutu_height > 0 else 0) +
-                    (ramah_width if ramah_height > 0 else 0) + 10
-                )
-                footer_logo_start_x = F4_SIZE[0] - 25 - total_footer_logo_width
-
-                if pendidikan_bermutu_processed_path and os.path.exists(pendidikan_bermutu_processed_path) and pendidikan_bermutu_height > 0:
-                    try:
-                        pendidikan_bermutu_footer_x = footer_logo_start_x
-                        pendidikan_bermutu_footer_y = footer_logo_y
-                        canvas.drawImage(
-                            pendidikan_bermutu_processed_path,
-                            pendidikan_bermutu_footer_x,
-                            pendidikan_bermutu_footer_y,
-                            width=pendidikan_bermutu_width,
-                            height=pendidikan_bermutu_height,
-                            preserveAspectRatio=True,
-                            mask='auto'
-                        )
-                    except Exception as e:
-                        print(f"Error drawing logo Pendidikan Bermutu di footer: {e}")
-
-                if ramah_processed_path and os.path.exists(ramah_processed_path) and ramah_height > 0:
-                    try:
-                        ramah_footer_x = footer_logo_start_x + (pendidikan_bermutu_width if pendidikan_bermutu_height > 0 else 0) + 10
-                        ramah_footer_y = footer_logo_y
-                        canvas.drawImage(
-                            ramah_processed_path,
-                            ramah_footer_x,
-                            ramah_footer_y,
-                            width=ramah_width,
-                            height=ramah_height,
-                            preserveAspectRatio=True,
-                            mask='auto'
-                        )
-                    except Exception as e:
-                        print(f"Error drawing logo Ramah di footer: {e}")
-
-            canvas.setStrokeColor(colors.HexColor('#067ac1'))
-            canvas.setLineWidth(1)
-            footer_line_y = footer_logo_y - 10
-            canvas.line(25, footer_line_y, F4_SIZE[0] - 25, footer_line_y)
-
-            canvas.setFont('Helvetica', 8)
-            canvas.setFillColor(colors.black)
-            wita_time = datetime.utcnow() + timedelta(hours=8)
-            footer_text = f"Dicetak pada: {wita_time.strftime('%d/%m/%Y %H:%M')} WITA"
-            footer_x = 25
-            footer_y = footer_line_y - 15
-            canvas.drawString(footer_x, footer_y, footer_text)
-
-            canvas.restoreState()
-
-        buffer = io.BytesIO()
-        max_header_logo_height = logo_height if logo_height > 0 else 0
-        top_margin_with_logo = 25 + max_header_logo_height + 15
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=F4_SIZE,
-            rightMargin=25,
-            leftMargin=25,
-            topMargin=top_margin_with_logo,
-            bottomMargin=40
-        )
-
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=20,
-            textColor=colors.black,
-            spaceAfter=12,
-            spaceBefore=0,
-            alignment=1,
-            fontName='Helvetica-Bold',
-            leading=24
-        )
-        value_style = ParagraphStyle(
-            'ValueStyle',
-            parent=styles['Normal'],
-            fontSize=9,
-            leading=11,
-            textColor=colors.black,
-            alignment=0,
-            leftIndent=0,
-            rightIndent=0
-        )
-
-        field_labels = {
-            'nik': 'NIK',
-            'nama_lengkap': 'Nama Lengkap',
-            'nip_nippk': 'NIP/NIPPK',
-            'tempat_lahir': 'Tempat Lahir',
-            'tanggal_lahir': 'Tanggal Lahir',
-            'jenis_kelamin': 'Jenis Kelamin',
-            'agama': 'Agama',
-            'pendidikan_terakhir': 'Pendidikan Terakhir',
-            'jurusan': 'Jurusan',
-            'status_asn': 'Status Kepegawaian',
-            'pangkat_golongan': 'Pangkat / Golongan',
-            'jabatan': 'Jabatan',
-            'instansi': 'Nama Instansi',
-            'alamat_instansi': 'Alamat Instansi',
-            'alamat_domisili': 'Alamat Domisili',
-            'kabupaten_kota': 'Kabupaten/Kota',
-            'kabko_lainnya': 'Kabupaten/Kota Lainnya',
-            'peran': 'Peran dalam Kegiatan',
-            'no_hp': 'Nomor HP',
-            'alamat_email': 'Alamat Email',
-            'npwp': 'NPWP',
-            'nama_bank': 'Nama Bank',
-            'nama_bank_lainnya': 'Nama Bank Lainnya',
-            'no_rekening': 'Nomor Rekening',
-            'nama_pemilik_rekening': 'Nama Pemilik Rekening'
-        }
-        field_order = [
-            'nik', 'nama_lengkap', 'nip_nippk', 'tempat_lahir', 'tanggal_lahir',
-            'jenis_kelamin', 'agama', 'pendidikan_terakhir', 'jurusan',
-            'status_asn', 'pangkat_golongan', 'jabatan', 'instansi',
-            'alamat_instansi', 'alamat_domisili', 'kabupaten_kota', 'kabko_lainnya',
-            'peran',
-            'no_hp', 'alamat_email', 'npwp',
-            'nama_bank', 'nama_bank_lainnya', 'no_rekening', 'nama_pemilik_rekening'
-        ]
-        exclude_fields = ['id', 'user_id', 'buku_tabungan_path', 'tanda_tangan', 'created_at', 'updated_at', 'nama_kegiatan', 'waktu_pelaksanaan', 'tempat_pelaksanaan']
-
-        elements = []
-        tanda_tangan_temp_files = []
-
-        for user_idx, biodata in enumerate(all_biodata):
-            if user_idx > 0:
-                elements.append(PageBreak())
-
-            title = Paragraph("BIODATA KEGIATAN", title_style)
-            elements.append(title)
-            elements.append(Spacer(1, 0.15 * inch))
-
-            biodata_nama_kegiatan = biodata.get('nama_kegiatan', '-')
-            waktu_pelaksanaan = biodata.get('waktu_pelaksanaan', '-')
-            tempat_pelaksanaan = biodata.get('tempat_pelaksanaan', '-')
-
-            info_table_data = []
-            if biodata_nama_kegiatan and str(biodata_nama_kegiatan).strip() and str(biodata_nama_kegiatan).strip() != '-':
-                info_table_data.append([
-                    Paragraph("<b>Nama Kegiatan</b>", value_style),
-                    Paragraph(":", value_style),
-                    Paragraph(str(biodata_nama_kegiatan), value_style)
-                ])
-            if waktu_pelaksanaan and str(waktu_pelaksanaan).strip() and str(waktu_pelaksanaan).strip() != '-':
-                info_table_data.append([
-                    Paragraph("<b>Waktu Pelaksanaan</b>", value_style),
-                    Paragraph(":", value_style),
-                    Paragraph(str(waktu_pelaksanaan), value_style)
-                ])
-            if tempat_pelaksanaan and str(tempat_pelaksanaan).strip() and str(tempat_pelaksanaan).strip() != '-':
-                info_table_data.append([
-                    Paragraph("<b>Tempat Pelaksanaan</b>", value_style),
-                    Paragraph(":", value_style),
-                    Paragraph(str(tempat_pelaksanaan), value_style)
-                ])
-
-            if info_table_data:
-                available_width = (8.27 * inch) - (25 * 2)
-                info_table = Table(info_table_data, colWidths=[2.2 * inch, 0.15 * inch, available_width - 2.2 * inch - 0.15 * inch])
-                info_table.setStyle(TableStyle([
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                    ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-                    ('ALIGN', (2, 0), (2, -1), 'LEFT'),
-                    ('LEFTPADDING', (0, 0), (0, -1), 0),
-                    ('LEFTPADDING', (1, 0), (1, -1), 0),
-                    ('LEFTPADDING', (2, 0), (2, -1), 0),
-                    ('RIGHTPADDING', (0, 0), (0, -1), 4),
-                    ('RIGHTPADDING', (1, 0), (1, -1), 0),
-                    ('RIGHTPADDING', (2, 0), (2, -1), 6),
-                    ('TOPPADDING', (0, 0), (-1, -1), 2),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-                ]))
-                elements.append(info_table)
-                elements.append(Spacer(1, 0.1 * inch))
-
-            all_data = []
-            for key in field_order:
-                if key in biodata and key not in exclude_fields:
-                    label = field_labels.get(key, key.replace('_', ' ').title())
-                    value = biodata[key]
-                    display_value = str(value) if value and str(value).strip() else '-'
-                    all_data.append([label, display_value])
-
-            for key, value in biodata.items():
-                if key not in exclude_fields and key not in field_order:
-                    label = field_labels.get(key, key.replace('_', ' ').title())
-                    display_value = str(value) if value and str(value).strip() else '-'
-                    all_data.append([label, display_value])
-
-            tanda_tangan_raw = biodata.get('tanda_tangan')
-            tanda_tangan_img, error_msg = process_tanda_tangan_for_pdf(tanda_tangan_raw, tanda_tangan_temp_files)
-
-            if all_data:
-                table_data = []
-                for row in all_data:
-                    field_label = Paragraph(f"<b>{row[0]}</b>", value_style)
-                    value_text = str(row[1]) if row[1] else '-'
-                    value_text = value_text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                    if len(value_text) > 50:
-                        words = value_text.split()
-                        lines = []
-                        current_line = []
-                        current_length = 0
-                        for word in words:
-                            if current_length + len(word) + 1 > 50:
-                                if current_line:
-                                    lines.append(' '.join(current_line))
-                                current_line = [word]
-                                current_length = len(word)
-                            else:
-                                current_line.append(word)
-                                current_length += len(word) + 1
-                        if current_line:
-                            lines.append(' '.join(current_line))
-                        value_text = '<br/>'.join(lines)
-                    value_para = Paragraph(value_text, value_style)
-                    table_data.append([field_label, value_para])
-
-                if tanda_tangan_img:
-                    field_label = Paragraph("<b>Tanda Tangan</b>", value_style)
-                    table_data.append([field_label, tanda_tangan_img])
-                elif biodata.get('tanda_tangan'):
-                    field_label = Paragraph("<b>Tanda Tangan</b>", value_style)
-                    error_msg_para = Paragraph("<i>Tanda tangan tidak tersedia</i>", value_style)
-                    table_data.append([field_label, error_msg_para])
-
-                available_width = (8.27 * inch) - (25 * 2)
-                table = Table(table_data, colWidths=[2.2 * inch, available_width - 2.2 * inch])
-                table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, -1), colors.white),
-                    ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-                    ('FONTSIZE', (0, 0), (-1, -1), 9),
-                    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                    ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ('LEFTPADDING', (0, 0), (0, -1), 4),
-                    ('LEFTPADDING', (1, 0), (1, -1), 6),
-                    ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-                    ('TOPPADDING', (0, 0), (-1, -1), 5),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-                    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#d1d5db')),
-                    ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor('#067ac1')),
-                ]))
-                elements.append(table)
-                elements.append(Spacer(1, 0.08 * inch))
-
-        try:
-            doc.build(elements, onFirstPage=add_header_footer, onLaterPages=add_header_footer)
-            buffer.seek(0)
-        finally:
-            try:
-                if pendidikan_bermutu_temp_file and os.path.exists(pendidikan_bermutu_processed_path):
-                    os.unlink(pendidikan_bermutu_processed_path)
-            except Exception as e:
-                print(f"Error cleaning up Pendidikan Bermutu temp file: {e}")
-            try:
-                if ramah_temp_file and os.path.exists(ramah_processed_path):
-                    os.unlink(ramah_processed_path)
-            except Exception as e:
-                print(f"Error cleaning up Ramah temp file: {e}")
-            for temp_file_path in tanda_tangan_temp_files:
-                try:
-                    if os.path.exists(temp_file_path):
-                        os.unlink(temp_file_path)
-                except Exception as e:
-                    print(f"Error cleaning up tanda tangan temp file {temp_file_path}: {e}")
+        # Info kegiatan memakai style isi tabel (9pt), bukan info tebal seperti export lain
+        pdf_file = render_biodata_pdf(all_biodata, report_spec(info_bold=False), progress=report_export_progress, output=export_output('.pdf'))
 
         filename = "Rekap_Filter.pdf"
-        return Response(
-            buffer.getvalue(),
-            mimetype='application/pdf',
-            headers={'Content-Disposition': f'attachment; filename=\"{filename}\"'}
-        )
+        return export_file_response(pdf_file, 'application/pdf', f'attachment; filename=\"{filename}\"')
     except sqlite3.Error as e:
         flash(f'Terjadi kesalahan saat export: {str(e)}', 'error')
         return redirect(url_for('admin_rekap_filter'))
@@ -3817,15 +4228,9 @@ def export_rekap_filter_pdf():
 
 @app.route('/admin/export-rekap-filter-excel')
 @admin_required
+@export_job
 def export_rekap_filter_excel():
     """Export Rekap ke Excel (format biodata lengkap seperti rekap tahunan) sesuai filter."""
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
-    from io import BytesIO
-
-    user_role = get_user_role()
-    user_id = get_user_id()
 
     selected_year = request.args.get('tahun', '').strip()
     selected_kabupaten = request.args.get('kabupaten_kota', '').strip()
@@ -3838,125 +4243,30 @@ def export_rekap_filter_excel():
 
     try:
         cursor = connection.cursor()
-        where_conditions = ["1=1"]
-        params = []
-
-        if selected_year:
-            try:
-                year_int = int(selected_year)
-                where_conditions.append("CAST(strftime('%Y', bk.created_at) AS INTEGER) = ?")
-                params.append(year_int)
-            except ValueError:
-                pass
-
-        if selected_kabupaten:
-            where_conditions.append("TRIM(bk.kabupaten_kota) = TRIM(?)")
-            params.append(selected_kabupaten)
-
-        if selected_kegiatan:
-            where_conditions.append("TRIM(bk.nama_kegiatan) = TRIM(?)")
-            params.append(selected_kegiatan)
-
-        if user_role == 'operator' and user_id:
-            where_conditions.append("""
-                EXISTS (
-                    SELECT 1
-                    FROM kegiatan_master k
-                    INNER JOIN operator_kegiatan ok ON k.id = ok.kegiatan_id
-                    WHERE ok.user_id = ?
-                      AND TRIM(k.nama_kegiatan) = TRIM(bk.nama_kegiatan)
-                )
-            """)
-            params.append(user_id)
-
-        where_clause = " AND ".join(where_conditions)
-        cursor.execute(f"""
+        where_clause, params = rekap_filter_where(selected_year, selected_kabupaten, selected_kegiatan)
+        query = f"""
             SELECT bk.*
             FROM biodata_kegiatan bk
             WHERE {where_clause}
             ORDER BY bk.nama_kegiatan ASC, bk.kabupaten_kota ASC, bk.nama_lengkap ASC, bk.id DESC
-        """, tuple(params))
-        rows = cursor.fetchall()
-        all_biodata = [row_to_dict(r) for r in rows]
+        """
 
-        if not all_biodata:
+        # Pass 1: jumlah baris + statistik lebar kolom, tanpa menyimpan baris di memori
+        cursor.execute(query, tuple(params))
+        stats = ExcelColumnStats(biodata_excel_fields())
+        with profile_span('excel_width'):
+            for row in cursor:
+                stats.add(row_to_dict(row))
+
+        if not stats.total_rows:
             flash('Tidak ada data untuk diekspor!', 'error')
             return redirect(url_for('admin_rekap_filter', tahun=selected_year, kabupaten_kota=selected_kabupaten, nama_kegiatan=selected_kegiatan))
 
-        MAX_EXPORT_ROWS = 50000
-        if len(all_biodata) > MAX_EXPORT_ROWS:
-            flash(f'Data terlalu besar ({len(all_biodata)} rows). Maksimal {MAX_EXPORT_ROWS} rows untuk export Excel. Silakan gunakan filter yang lebih spesifik.', 'error')
+        MAX_EXPORT_ROWS = export_row_limit(50000)
+        if stats.total_rows > MAX_EXPORT_ROWS:
+            flash(f'Data terlalu besar ({stats.total_rows} rows). Maksimal {MAX_EXPORT_ROWS} rows untuk export Excel. Silakan gunakan filter yang lebih spesifik.', 'error')
             return redirect(url_for('admin_rekap_filter', tahun=selected_year, kabupaten_kota=selected_kabupaten, nama_kegiatan=selected_kegiatan))
 
-        # Field mapping (samakan dengan rekap tahunan excel)
-        field_labels = {
-            'nik': 'NIK',
-            'nama_lengkap': 'Nama Lengkap',
-            'nip_nippk': 'NIP/NIPPK',
-            'tempat_lahir': 'Tempat Lahir',
-            'tanggal_lahir': 'Tanggal Lahir',
-            'jenis_kelamin': 'Jenis Kelamin',
-            'agama': 'Agama',
-            'pendidikan_terakhir': 'Pendidikan Terakhir',
-            'jurusan': 'Jurusan',
-            'status_asn': 'Status Kepegawaian',
-            'pangkat_golongan': 'Pangkat / Golongan',
-            'jabatan': 'Jabatan',
-            'instansi': 'Nama Instansi',
-            'alamat_instansi': 'Alamat Instansi',
-            'alamat_domisili': 'Alamat Domisili',
-            'kabupaten_kota': 'Kabupaten/Kota',
-            'kabko_lainnya': 'Kabupaten/Kota Lainnya',
-            'peran': 'Peran dalam Kegiatan',
-            'no_hp': 'Nomor HP',
-            'alamat_email': 'Alamat Email',
-            'npwp': 'NPWP',
-            'nama_bank': 'Nama Bank',
-            'nama_bank_lainnya': 'Nama Bank Lainnya',
-            'no_rekening': 'Nomor Rekening',
-            'nama_pemilik_rekening': 'Nama Pemilik Rekening'
-        }
-        field_order = [
-            'nik', 'nama_lengkap', 'nip_nippk', 'tempat_lahir', 'tanggal_lahir',
-            'jenis_kelamin', 'agama', 'pendidikan_terakhir', 'jurusan',
-            'status_asn', 'pangkat_golongan', 'jabatan', 'instansi',
-            'alamat_instansi', 'alamat_domisili', 'kabupaten_kota', 'kabko_lainnya',
-            'peran',
-            'no_hp', 'alamat_email', 'npwp',
-            'nama_bank', 'nama_bank_lainnya', 'no_rekening', 'nama_pemilik_rekening'
-        ]
-        exclude_fields = ['id', 'user_id', 'buku_tabungan_path', 'tanda_tangan', 'created_at', 'updated_at', 'waktu_pelaksanaan', 'tempat_pelaksanaan']
-
-        # === Format Excel disamakan dengan export Rekap Tahunan ===
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Data Biodata"
-
-        # Styles (samakan dengan rekap tahunan excel)
-        header_fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-        header_font = Font(bold=True, color="000000", size=11)
-        title_font = Font(bold=True, size=12, color="000000")
-        border_style = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        center_align = Alignment(horizontal='center', vertical='center')
-        left_align = Alignment(horizontal='left', vertical='top', wrap_text=True)
-
-        # Field list (nama_kegiatan + biodata fields + tanda tangan)
-        all_fields = []
-        all_fields.append({'key': 'nama_kegiatan', 'label': 'Nama Kegiatan'})
-        for key in field_order:
-            if key not in exclude_fields:
-                label = field_labels.get(key, key.replace('_', ' ').title())
-                all_fields.append({'key': key, 'label': label})
-        all_fields.append({'key': 'tanda_tangan', 'label': 'Tanda Tangan'})
-
-        num_cols = len(all_fields)
-        last_col_letter = get_column_letter(num_cols)
-
         # Title (row 1) + info export (row 2) seperti rekap tahunan
         title_text = "Rekap"
         filter_parts = []
@@ -3969,128 +4279,19 @@ def export_rekap_filter_excel():
         if filter_parts:
             title_text += " - " + " | ".join(filter_parts)
 
-        ws.merge_cells(f'A1:{last_col_letter}1')
-        ws['A1'] = title_text
-        ws['A1'].font = title_font
-        ws['A1'].alignment = center_align
-
-        export_date = datetime.now().strftime("%d %B %Y, %H:%M:%S")
-        ws.merge_cells(f'A2:{last_col_letter}2')
-        ws['A2'] = f"Tanggal Export: {export_date}"
-        ws['A2'].font = Font(size=10, italic=True)
-        ws['A2'].alignment = left_align
-        ws.row_dimensions[2].height = 18
-
-        # Header kolom (row 3)
-        for col_idx, field_info in enumerate(all_fields, 1):
-            cell = ws.cell(row=3, column=col_idx, value=field_info['label'])
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center_align
-            cell.border = border_style
-        ws.row_dimensions[3].height = 22
-
-        # Lebar kolom default (samakan)
-        ws.column_dimensions['A'].width = 35  # Nama Kegiatan
-        for col_idx in range(2, len(all_fields) + 1):
-            ws.column_dimensions[get_column_letter(col_idx)].width = 25
-
-        # Data rows (mulai row 4)
-        current_row = 4
-        for user_idx, biodata in enumerate(all_biodata):
-            for col_idx, field_info in enumerate(all_fields, 1):
-                field_key = field_info['key']
-
-                if field_key == 'tanda_tangan':
-                    display_value = "[Tersedia]" if biodata.get('tanda_tangan') else "-"
-                else:
-                    value = biodata.get(field_key, '')
-                    display_value = str(value) if value and str(value).strip() else '-'
-
-                cell = ws.cell(row=current_row, column=col_idx, value=display_value)
-                cell.border = border_style
-
-                # Alternating row colors
-                if user_idx % 2 == 0:
-                    cell.fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-                else:
-                    cell.fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-
-                # Alignment
-                if field_key in ['nik', 'nip_nippk', 'no_hp', 'npwp', 'no_rekening']:
-                    cell.alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
-                elif field_key in ['tanggal_lahir']:
-                    cell.alignment = Alignment(horizontal='center', vertical='top', wrap_text=True)
-                else:
-                    cell.alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
-
-            # Auto adjust row height
-            max_height = 18
-            for col_idx, _field_info in enumerate(all_fields, 1):
-                cell = ws.cell(row=current_row, column=col_idx)
-                if cell.value:
-                    col_letter = get_column_letter(col_idx)
-                    col_width = ws.column_dimensions[col_letter].width or 25
-                    text_length = len(str(cell.value))
-                    estimated_lines = max(1, (text_length / max(col_width * 0.8, 1)))
-                    estimated_height = estimated_lines * 15
-                    max_height = max(max_height, min(estimated_height, 60))
-            ws.row_dimensions[current_row].height = max_height
-            current_row += 1
-
-        # Auto-adjust column widths berdasarkan konten (samakan)
-        for col_idx, field_info in enumerate(all_fields, 1):
-            col_letter = get_column_letter(col_idx)
-            if col_letter == 'A':
-                continue
-
-            max_length = 0
-            header_cell = ws.cell(row=3, column=col_idx)
-            if header_cell.value:
-                max_length = len(str(header_cell.value))
-
-            for row in range(4, current_row):
-                cell = ws.cell(row=row, column=col_idx)
-                if cell.value:
-                    text = str(cell.value)
-                    text_length = len(text)
-                    if text_length > 50:
-                        lines = text.split('\n') if '\n' in text else [text]
-                        max_line_length = max(len(line) for line in lines)
-                        max_length = max(max_length, min(max_line_length, 40))
-                    else:
-                        max_length = max(max_length, text_length)
-
-            optimal_width = max(12, min(max_length + 2, 40))
-            if 'Alamat' in field_info['label']:
-                optimal_width = max(optimal_width, min(max_length + 2, 45))
-            ws.column_dimensions[col_letter].width = optimal_width
-
-        # Freeze panes untuk header
-        ws.freeze_panes = 'A4'
-
-        # Auto filter untuk header
-        ws.auto_filter.ref = f'A3:{last_col_letter}{current_row - 1}'
-
-        # Print settings
-        ws.page_setup.orientation = ws.ORIENTATION_LANDSCAPE
-        ws.page_setup.paperSize = ws.PAPERSIZE_A4
-        ws.page_setup.fitToWidth = 1
-        ws.page_setup.fitToHeight = 0
-
-        # Header row height
-        ws.row_dimensions[1].height = 25
-
-        buffer = BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
+        # Pass 2: tulis baris langsung dari cursor ke workbook streaming
+        cursor.execute(query, tuple(params))
+        excel_file = write_biodata_workbook(
+            (row_to_dict(row) for row in cursor),
+            stats,
+            export_output('.xlsx'),
+            sheet_title="Data Biodata",
+            title=title_text,
+            progress=report_export_progress
+        )
 
         filename = "Rekap_Filter.xlsx"
-        return Response(
-            buffer.getvalue(),
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            headers={'Content-Disposition': f'attachment; filename=\"{filename}\"'}
-        )
+        return export_file_response(excel_file, EXCEL_MIMETYPE, f'attachment; filename=\"{filename}\"')
     except sqlite3.Error as e:
         flash(f'Terjadi kesalahan saat export: {str(e)}', 'error')
         return redirect(url_for('admin_rekap_filter'))
@@ -4101,6 +4302,104 @@ def export_rekap_filter_excel():
             pass
         connection.close()
 
+def parse_rekap_tanggal(tanggal_str):
+    """Convert string tanggal SQLite ('YYYY-MM-DD HH:MM:SS' atau 'YYYY-MM-DD') ke datetime"""
+    if not isinstance(tanggal_str, str):
+        return tanggal_str
+    try:
+        if ' ' in tanggal_str:
+            return datetime.strptime(tanggal_str, '%Y-%m-%d %H:%M:%S')
+        return datetime.strptime(tanggal_str, '%Y-%m-%d')
+    except (ValueError, TypeError):
+        return None
+
+def build_rekap_tahunan_kegiatan(cursor, where_clause, params):
+    """Rekap kegiatan + detail kabupaten dalam satu query GROUP BY (nama_kegiatan, kabupaten_kota)"""
+    cursor.execute(f"""
+        SELECT
+            bk.nama_kegiatan,
+            bk.kabupaten_kota,
+            COUNT(DISTINCT bk.id) as jumlah_peserta,
+            MIN(bk.created_at) as tanggal_awal,
+            MAX(bk.created_at) as tanggal_akhir
+        FROM biodata_kegiatan bk
+        WHERE {where_clause}
+            AND TRIM(bk.nama_kegiatan) != ''
+        GROUP BY bk.nama_kegiatan, bk.kabupaten_kota
+        ORDER BY bk.nama_kegiatan ASC, bk.kabupaten_kota ASC
+    """, tuple(params))
+
+    # Lipat baris per (kegiatan, kabupaten) menjadi struktur bertingkat dalam satu pass
+    kegiatan_map = {}
+    for row in cursor.fetchall():
+        nama_kegiatan = row['nama_kegiatan']
+        kabupaten = row['kabupaten_kota']
+        kegiatan = kegiatan_map.get(nama_kegiatan)
+        if kegiatan is None:
+            kegiatan = kegiatan_map[nama_kegiatan] = {
+                'nama_kegiatan': nama_kegiatan,
+                'jumlah_peserta': 0,
+                'jumlah_kabupaten': 0,
+                'tanggal_awal': None,
+                'tanggal_akhir': None,
+                'kabupaten_detail': []
+            }
+
+        kegiatan['jumlah_peserta'] += row['jumlah_peserta']
+        if kabupaten is not None:
+            kegiatan['jumlah_kabupaten'] += 1
+        if row['tanggal_awal'] is not None and (kegiatan['tanggal_awal'] is None or row['tanggal_awal'] < kegiatan['tanggal_awal']):
+            kegiatan['tanggal_awal'] = row['tanggal_awal']
+        if row['tanggal_akhir'] is not None and (kegiatan['tanggal_akhir'] is None or row['tanggal_akhir'] > kegiatan['tanggal_akhir']):
+            kegiatan['tanggal_akhir'] = row['tanggal_akhir']
+
+        # Detail kabupaten hanya untuk kabupaten yang terisi (sama seperti TRIM(...) != '')
+        if kabupaten is not None and kabupaten.strip(' ') != '':
+            kegiatan['kabupaten_detail'].append({
+                'kabupaten_kota': kabupaten,
+                'jumlah_peserta': row['jumlah_peserta'],
+                'tanggal_awal': parse_rekap_tanggal(row['tanggal_awal']),
+                'tanggal_akhir': parse_rekap_tanggal(row['tanggal_akhir'])
+            })
+
+    kegiatan_data = sorted(
+        kegiatan_map.values(),
+        key=lambda k: (-k['jumlah_peserta'], k['nama_kegiatan'])
+    )
+    for kegiatan in kegiatan_data:
+        kegiatan['tanggal_awal'] = parse_rekap_tanggal(kegiatan['tanggal_awal'])
+        kegiatan['tanggal_akhir'] = parse_rekap_tanggal(kegiatan['tanggal_akhir'])
+    return kegiatan_data
+
+def rekap_tahunan_biodata_query(where_clause, urut_jumlah_peserta=False):
+    """Query biodata rekap tahunan terurut (kegiatan, kabupaten, nama)"""
+    if urut_jumlah_peserta:
+        # Urutan kegiatan sama dengan halaman rekap: jumlah peserta terbanyak dulu
+        kegiatan_order = "COUNT(*) OVER (PARTITION BY bk.nama_kegiatan) DESC, bk.nama_kegiatan ASC"
+    else:
+        kegiatan_order = "bk.nama_kegiatan ASC"
+
+    return f"""
+        SELECT bk.*
+        FROM biodata_kegiatan bk
+        WHERE {where_clause}
+            AND TRIM(bk.nama_kegiatan) != ''
+        ORDER BY {kegiatan_order}, bk.kabupaten_kota ASC, bk.nama_lengkap ASC
+    """
+
+def fetch_rekap_tahunan_biodata(cursor, where_clause, params, urut_jumlah_peserta=False):
+    """Ambil semua biodata rekap tahunan dalam satu query terurut (kegiatan, kabupaten, nama)"""
+    cursor.execute(rekap_tahunan_biodata_query(where_clause, urut_jumlah_peserta), tuple(params))
+
+    biodata_list = []
+    for row in cursor:
+        biodata = row_to_dict(row)
+        # Normalisasi path buku tabungan
+        if biodata.get('buku_tabungan_path'):
+            biodata['buku_tabungan_path'] = normalize_buku_tabungan_path(biodata['buku_tabungan_path'])
+        biodata_list.append(biodata)
+    return biodata_list
+
 @app.route('/admin/rekap-tahunan')
 @admin_required
 def admin_rekap_tahunan():
@@ -4184,21 +4483,19 @@ def admin_rekap_tahunan():
         if user_role == 'operator' and user_id:
             # Hanya tahun dari kegiatan yang dipegang operator
             cursor.execute("""
-                SELECT DISTINCT CAST(strftime('%Y', bk.created_at) AS INTEGER) as tahun
+                SELECT DISTINCT bk.tahun as tahun
                 FROM biodata_kegiatan bk
-                INNER JOIN kegiatan_master k
-                    ON TRIM(k.nama_kegiatan) = TRIM(bk.nama_kegiatan)
                 INNER JOIN operator_kegiatan ok
-                    ON k.id = ok.kegiatan_id
-                WHERE bk.created_at IS NOT NULL
+                    ON ok.kegiatan_id = bk.kegiatan_id
+                WHERE bk.tahun IS NOT NULL
                   AND ok.user_id = ?
                 ORDER BY tahun DESC
             """, (user_id,))
         else:
             cursor.execute("""
-                SELECT DISTINCT strftime('%Y', created_at) as tahun
+                SELECT DISTINCT tahun
                 FROM biodata_kegiatan
-                WHERE created_at IS NOT NULL
+                WHERE tahun IS NOT NULL
                 ORDER BY tahun DESC
             """)
         rows = cursor.fetchall()
@@ -4223,14 +4520,13 @@ def admin_rekap_tahunan():
         if selected_year not in tahun_list and tahun_list:
             selected_year = int(tahun_list[0]) if isinstance(tahun_list[0], str) else tahun_list[0]
 
-        # Buat kondisi WHERE untuk filter bulan (SQLite: gunakan strftime untuk ekstrak tahun/bulan)
+        # Buat kondisi WHERE untuk filter tahun/bulan (kolom generated tahun & bulan)
         selected_year_str = str(selected_year)
-        where_conditions = ["CAST(strftime('%Y', bk.created_at) AS INTEGER) = ?"]
+        where_conditions = ["bk.tahun = ?"]
         params = [selected_year_str]
 
         if bulan_awal and bulan_akhir:
-            # SQLite: bandingkan bulan sebagai integer dari strftime('%m')
-            where_conditions.append("CAST(strftime('%m', bk.created_at) AS INTEGER) BETWEEN ? AND ?")
+            where_conditions.append("bk.bulan BETWEEN ? AND ?")
             params.extend([bulan_awal, bulan_akhir])
 
         # Jika operator, batasi hanya pada kegiatan yang ia pegang
@@ -4238,10 +4534,9 @@ def admin_rekap_tahunan():
             where_conditions.append("""
                 EXISTS (
                     SELECT 1
-                    FROM kegiatan_master k
-                    INNER JOIN operator_kegiatan ok ON k.id = ok.kegiatan_id
+                    FROM operator_kegiatan ok
                     WHERE ok.user_id = ?
-                      AND TRIM(k.nama_kegiatan) = TRIM(bk.nama_kegiatan)
+                      AND ok.kegiatan_id = bk.kegiatan_id
                 )
             """)
             params.append(user_id)
@@ -4271,130 +4566,15 @@ def admin_rekap_tahunan():
             if tahun_stats['total_kegiatan'] > 0:
                 tahun_stats['rata_peserta'] = round(tahun_stats['total_peserta'] / tahun_stats['total_kegiatan'], 2)
 
-        # Ambil daftar kegiatan per tahun dengan detail (dengan filter bulan jika ada)
-        kegiatan_query = f"""
-            SELECT
-                bk.nama_kegiatan,
-                COUNT(DISTINCT bk.id) as jumlah_peserta,
-                COUNT(DISTINCT bk.kabupaten_kota) as jumlah_kabupaten,
-                MIN(bk.created_at) as tanggal_awal,
-                MAX(bk.created_at) as tanggal_akhir
-            FROM biodata_kegiatan bk
-            WHERE {where_clause}
-                AND TRIM(bk.nama_kegiatan) != ''
-            GROUP BY bk.nama_kegiatan
-            ORDER BY jumlah_peserta DESC, bk.nama_kegiatan ASC
-        """
-
-        cursor.execute(kegiatan_query, tuple(params))
-
-        rows = cursor.fetchall()
-        # Convert Row to dict dan ambil detail kabupaten per kegiatan
-        kegiatan_data = []
-        for row in rows:
-            row_dict = row_to_dict(row)
-            nama_kegiatan = row_dict.get('nama_kegiatan')
-
-            # Ambil detail per kabupaten untuk kegiatan ini
-            kabupaten_detail_query = f"""
-                SELECT
-                    bk.kabupaten_kota,
-                    COUNT(DISTINCT bk.id) as jumlah_peserta,
-                    MIN(bk.created_at) as tanggal_awal,
-                    MAX(bk.created_at) as tanggal_akhir
-                FROM biodata_kegiatan bk
-                WHERE {where_clause}
-                    AND TRIM(bk.nama_kegiatan) = TRIM(?)
-                    AND TRIM(bk.kabupaten_kota) != ''
-                    AND bk.kabupaten_kota IS NOT NULL
-                GROUP BY bk.kabupaten_kota
-                ORDER BY bk.kabupaten_kota ASC
-            """
-            kabupaten_params = list(params) + [nama_kegiatan]
-            cursor.execute(kabupaten_detail_query, tuple(kabupaten_params))
-            kabupaten_rows = cursor.fetchall()
-
-            # Convert kabupaten rows to dict dan format
-            kabupaten_list = []
-            for kab_row in kabupaten_rows:
-                kab_dict = row_to_dict(kab_row)
-                # Convert tanggal string ke datetime object
-                if kab_dict.get('tanggal_awal'):
-                    try:
-                        tanggal_str = kab_dict['tanggal_awal']
-                        if isinstance(tanggal_str, str):
-                            if ' ' in tanggal_str:
-                                kab_dict['tanggal_awal'] = datetime.strptime(tanggal_str, '%Y-%m-%d %H:%M:%S')
-                            else:
-                                kab_dict['tanggal_awal'] = datetime.strptime(tanggal_str, '%Y-%m-%d')
-                    except (ValueError, TypeError):
-                        kab_dict['tanggal_awal'] = None
-                if kab_dict.get('tanggal_akhir'):
-                    try:
-                        tanggal_str = kab_dict['tanggal_akhir']
-                        if isinstance(tanggal_str, str):
-                            if ' ' in tanggal_str:
-                                kab_dict['tanggal_akhir'] = datetime.strptime(tanggal_str, '%Y-%m-%d %H:%M:%S')
-                            else:
-                                kab_dict['tanggal_akhir'] = datetime.strptime(tanggal_str, '%Y-%m-%d')
-                    except (ValueError, TypeError):
-                        kab_dict['tanggal_akhir'] = None
-                kabupaten_list.append(kab_dict)
-
-            row_dict['kabupaten_detail'] = kabupaten_list
-            # Convert tanggal kegiatan juga
-            if row_dict.get('tanggal_awal'):
-                try:
-                    tanggal_str = row_dict['tanggal_awal']
-                    if isinstance(tanggal_str, str):
-                        if ' ' in tanggal_str:
-                            row_dict['tanggal_awal'] = datetime.strptime(tanggal_str, '%Y-%m-%d %H:%M:%S')
-                        else:
-                            row_dict['tanggal_awal'] = datetime.strptime(tanggal_str, '%Y-%m-%d')
-                except (ValueError, TypeError):
-                    row_dict['tanggal_awal'] = None
-            if row_dict.get('tanggal_akhir'):
-                try:
-                    tanggal_str = row_dict['tanggal_akhir']
-                    if isinstance(tanggal_str, str):
-                        if ' ' in tanggal_str:
-                            row_dict['tanggal_akhir'] = datetime.strptime(tanggal_str, '%Y-%m-%d %H:%M:%S')
-                        else:
-                            row_dict['tanggal_akhir'] = datetime.strptime(tanggal_str, '%Y-%m-%d')
-                except (ValueError, TypeError):
-                    row_dict['tanggal_akhir'] = None
-            # Convert tanggal string ke datetime object untuk template
-            if row_dict.get('tanggal_awal'):
-                try:
-                    # SQLite datetime format: 'YYYY-MM-DD HH:MM:SS' atau 'YYYY-MM-DD'
-                    tanggal_str = row_dict['tanggal_awal']
-                    if isinstance(tanggal_str, str):
-                        if ' ' in tanggal_str:
-                            row_dict['tanggal_awal'] = datetime.strptime(tanggal_str, '%Y-%m-%d %H:%M:%S')
-                        else:
-                            row_dict['tanggal_awal'] = datetime.strptime(tanggal_str, '%Y-%m-%d')
-                except (ValueError, TypeError):
-                    row_dict['tanggal_awal'] = None
-            if row_dict.get('tanggal_akhir'):
-                try:
-                    tanggal_str = row_dict['tanggal_akhir']
-                    if isinstance(tanggal_str, str):
-                        if ' ' in tanggal_str:
-                            row_dict['tanggal_akhir'] = datetime.strptime(tanggal_str, '%Y-%m-%d %H:%M:%S')
-                        else:
-                            row_dict['tanggal_akhir'] = datetime.strptime(tanggal_str, '%Y-%m-%d')
-                except (ValueError, TypeError):
-                    row_dict['tanggal_akhir'] = None
-            kegiatan_data.append(row_dict)
+        # Ambil daftar kegiatan + detail kabupaten dalam satu query (dengan filter bulan jika ada)
+        kegiatan_data = build_rekap_tahunan_kegiatan(cursor, where_clause, params)
 
     except sqlite3.Error as e:
         flash(f'Terjadi kesalahan saat mengambil data: {str(e)}', 'error')
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Terjadi kesalahan saat mengambil data")
     except Exception as e:
         flash(f'Terjadi kesalahan tidak terduga: {str(e)}', 'error')
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Terjadi kesalahan tidak terduga")
     finally:
         if connection:
             try:
@@ -4426,14 +4606,9 @@ def admin_rekap_tahunan():
 
 @app.route('/admin/export-rekap-tahunan-pdf')
 @admin_required
+@export_job
 def export_rekap_tahunan_pdf():
     """Export rekap tahunan ke PDF - semua kegiatan dengan semua biodata"""
-    from io import BytesIO
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-    from reportlab.lib import colors
-
     user_role = get_user_role()
     user_id = get_user_id()
 
@@ -4492,18 +4667,18 @@ def export_rekap_tahunan_pdf():
         flash('Koneksi database gagal!', 'error')
         return redirect(url_for('admin_rekap_tahunan'))
 
-    # Ambil daftar kegiatan per tahun
-    kegiatan_list = []
+    # Ambil semua biodata per tahun
+    all_biodata = []
     try:
         cursor = connection.cursor()
 
         # Buat kondisi WHERE untuk filter bulan (SQLite)
         selected_year_str = str(selected_year)
-        where_conditions = ["CAST(strftime('%Y', bk.created_at) AS INTEGER) = ?"]
+        where_conditions = ["bk.tahun = ?"]
         params = [selected_year_str]
 
         if bulan_awal and bulan_akhir:
-            where_conditions.append("CAST(strftime('%m', bk.created_at) AS INTEGER) BETWEEN ? AND ?")
+            where_conditions.append("bk.bulan BETWEEN ? AND ?")
             params.extend([bulan_awal, bulan_akhir])
 
         # Jika operator, batasi hanya pada kegiatan yang ia pegang
@@ -4511,112 +4686,22 @@ def export_rekap_tahunan_pdf():
             where_conditions.append("""
                 EXISTS (
                     SELECT 1
-                    FROM kegiatan_master k
-                    INNER JOIN operator_kegiatan ok ON k.id = ok.kegiatan_id
+                    FROM operator_kegiatan ok
                     WHERE ok.user_id = ?
-                      AND TRIM(k.nama_kegiatan) = TRIM(bk.nama_kegiatan)
+                      AND ok.kegiatan_id = bk.kegiatan_id
                 )
             """)
             params.append(user_id)
 
         where_clause = " AND ".join(where_conditions)
 
-        # Ambil daftar kegiatan per tahun dengan detail
-        kegiatan_query = f"""
-            SELECT
-                bk.nama_kegiatan,
-                COUNT(DISTINCT bk.id) as jumlah_peserta,
-                COUNT(DISTINCT bk.kabupaten_kota) as jumlah_kabupaten,
-                MIN(bk.created_at) as tanggal_awal,
-                MAX(bk.created_at) as tanggal_akhir
-            FROM biodata_kegiatan bk
-            WHERE {where_clause}
-                AND TRIM(bk.nama_kegiatan) != ''
-            GROUP BY bk.nama_kegiatan
-            ORDER BY jumlah_peserta DESC, bk.nama_kegiatan ASC
-        """
+        # Ambil semua biodata dalam satu query terurut (kegiatan dengan peserta terbanyak dulu)
+        all_biodata = fetch_rekap_tahunan_biodata(cursor, where_clause, params, urut_jumlah_peserta=True)
 
-        cursor.execute(kegiatan_query, tuple(params))
-        rows = cursor.fetchall()
-        kegiatan_list = [row_to_dict(row) for row in rows]
-
-        if not kegiatan_list:
+        if not all_biodata:
             flash('Tidak ada kegiatan untuk tahun yang dipilih!', 'error')
             return redirect(url_for('admin_rekap_tahunan'))
 
-        # Ambil detail per kabupaten untuk setiap kegiatan dan semua biodata
-        kegiatan_data = []
-        all_biodata = []
-
-        for kegiatan in kegiatan_list:
-            nama_kegiatan = kegiatan.get('nama_kegiatan')
-
-            # Ambil detail per kabupaten untuk kegiatan ini
-            kabupaten_detail_query = f"""
-                SELECT
-                    bk.kabupaten_kota,
-                    COUNT(DISTINCT bk.id) as jumlah_peserta,
-                    MIN(bk.created_at) as tanggal_awal,
-                    MAX(bk.created_at) as tanggal_akhir
-                FROM biodata_kegiatan bk
-                WHERE {where_clause}
-                    AND TRIM(bk.nama_kegiatan) = TRIM(?)
-                    AND TRIM(bk.kabupaten_kota) != ''
-                    AND bk.kabupaten_kota IS NOT NULL
-                GROUP BY bk.kabupaten_kota
-                ORDER BY bk.kabupaten_kota ASC
-            """
-            kabupaten_params = list(params) + [nama_kegiatan]
-            cursor.execute(kabupaten_detail_query, tuple(kabupaten_params))
-            kabupaten_rows = cursor.fetchall()
-
-            # Convert kabupaten rows to dict
-            kabupaten_list = []
-            for kab_row in kabupaten_rows:
-                kab_dict = row_to_dict(kab_row)
-                kabupaten_list.append(kab_dict)
-
-            kegiatan['kabupaten_detail'] = kabupaten_list
-            kegiatan_data.append(kegiatan)
-
-            # Ambil semua biodata untuk kegiatan ini
-            biodata_query = f"""
-                SELECT * FROM biodata_kegiatan
-                WHERE TRIM(nama_kegiatan) = TRIM(?)
-                    AND CAST(strftime('%Y', created_at) AS INTEGER) = ?
-            """
-            biodata_params = [nama_kegiatan, selected_year_str]
-
-            if bulan_awal and bulan_akhir:
-                biodata_query += " AND CAST(strftime('%m', created_at) AS INTEGER) BETWEEN ? AND ?"
-                biodata_params.extend([bulan_awal, bulan_akhir])
-
-            biodata_query += " ORDER BY kabupaten_kota ASC, nama_lengkap ASC"
-
-            cursor.execute(biodata_query, tuple(biodata_params))
-            biodata_rows = cursor.fetchall()
-            biodata_list = [row_to_dict(row) for row in biodata_rows]
-
-            # Normalisasi path buku tabungan
-            for biodata in biodata_list:
-                if biodata.get('buku_tabungan_path'):
-                    biodata['buku_tabungan_path'] = normalize_buku_tabungan_path(biodata['buku_tabungan_path'])
-
-            all_biodata.extend(biodata_list)
-
-        # Group biodata by kegiatan dan kabupaten untuk PDF export
-        biodata_by_kegiatan = {}
-        for biodata in all_biodata:
-            nama_kegiatan = biodata.get('nama_kegiatan', 'Unknown')
-            kabupaten = biodata.get('kabupaten_kota', 'Unknown')
-
-            if nama_kegiatan not in biodata_by_kegiatan:
-                biodata_by_kegiatan[nama_kegiatan] = {}
-            if kabupaten not in biodata_by_kegiatan[nama_kegiatan]:
-                biodata_by_kegiatan[nama_kegiatan][kabupaten] = []
-
-            biodata_by_kegiatan[nama_kegiatan][kabupaten].append(biodata)
-
     except sqlite3.Error as e:
         flash(f'Terjadi kesalahan saat mengambil data: {str(e)}', 'error')
         return redirect(url_for('admin_rekap_tahunan'))
@@ -4630,448 +4715,20 @@ def export_rekap_tahunan_pdf():
         return redirect(url_for('admin_rekap_tahunan'))
 
     # Limit maksimal untuk export (5000 rows)
-    MAX_EXPORT_ROWS = 5000
+    MAX_EXPORT_ROWS = export_row_limit(5000)
     if len(all_biodata) > MAX_EXPORT_ROWS:
         flash(f'Data terlalu besar ({len(all_biodata)} rows). Maksimal {MAX_EXPORT_ROWS} rows untuk export. Silakan gunakan filter yang lebih spesifik.', 'error')
         return redirect(url_for('admin_rekap_tahunan'))
 
     # Warning jika data > 1000 rows
     if len(all_biodata) > 1000:
-        print(f"WARNING: Export PDF dengan {len(all_biodata)} rows - mungkin memakan waktu lama")
-
-    # Load logo untuk header
-    logo_path = os.path.join(BASE_DIR, 'static', 'Logo_BGTK.png')
-    logo_img = None
-    logo_width = 0
-    logo_height = 0
-    if os.path.exists(logo_path):
-        try:
-            logo_pil = Image.open(logo_path)
-            # Resize logo untuk header (max height 0.6 inch)
-            max_logo_height = 0.6 * inch
-            logo_ratio = logo_pil.width / logo_pil.height
-            logo_width = max_logo_height * logo_ratio
-            logo_height = max_logo_height
-
-            # Convert PIL Image to reportlab Image
-            logo_buffer = io.BytesIO()
-            logo_pil.save(logo_buffer, format='PNG')
-            logo_buffer.seek(0)
-            logo_img = RLImage(logo_buffer, width=logo_width, height=logo_height)
-        except Exception as e:
-            print(f"Error loading logo: {e}")
-            logo_img = None
-
-    # Load logo Pendidikan Bermutu dengan background transparan
-    pendidikan_bermutu_path = os.path.join(BASE_DIR, 'static', 'Pendidikan Bermutu untuk Semua.png')
-    pendidikan_bermutu_processed_path = None
-    pendidikan_bermutu_width = 0
-    pendidikan_bermutu_height = 0
-    pendidikan_bermutu_temp_file = None
-    if os.path.exists(pendidikan_bermutu_path):
-        try:
-            pendidikan_bermutu_pil = Image.open(pendidikan_bermutu_path)
-            if pendidikan_bermutu_pil.mode != 'RGBA':
-                pendidikan_bermutu_pil = pendidikan_bermutu_pil.convert('RGBA')
-
-            # Hapus background hitam (buat transparan)
-            pixels = pendidikan_bermutu_pil.load()
-            width, height = pendidikan_bermutu_pil.size
-            black_threshold = 30
-
-            for x in range(width):
-                for y in range(height):
-                    r, g, b, a = pixels[x, y]
-                    if r < black_threshold and g < black_threshold and b < black_threshold:
-                        pixels[x, y] = (r, g, b, 0)
-
-            max_logo_height = 0.5 * inch
-            pendidikan_bermutu_ratio = pendidikan_bermutu_pil.width / pendidikan_bermutu_pil.height
-            pendidikan_bermutu_width = max_logo_height * pendidikan_bermutu_ratio
-            pendidikan_bermutu_height = max_logo_height
-
-            pendidikan_bermutu_temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-            pendidikan_bermutu_pil.save(pendidikan_bermutu_temp_file.name, format='PNG', optimize=False)
-            pendidikan_bermutu_processed_path = pendidikan_bermutu_temp_file.name
-        except Exception as e:
-            print(f"Error loading logo Pendidikan Bermutu: {e}")
-
-    # Load logo Ramah dengan background transparan
-    ramah_path = os.path.join(BASE_DIR, 'static', 'Ramah.png')
-    ramah_processed_path = None
-    ramah_width = 0
-    ramah_height = 0
-    ramah_temp_file = None
-    if os.path.exists(ramah_path):
-        try:
-            ramah_pil = Image.open(ramah_path)
-            if ramah_pil.mode != 'RGBA':
-                ramah_pil = ramah_pil.convert('RGBA')
-
-            # Hapus background hitam (buat transparan)
-            pixels = ramah_pil.load()
-            width, height = ramah_pil.size
-            black_threshold = 30
-
-            for x in range(width):
-                for y in range(height):
-                    r, g, b, a = pixels[x, y]
-                    if r < black_threshold and g < black_threshold and b < black_threshold:
-                        pixels[x, y] = (r, g, b, 0)
-
-            max_logo_height = 0.5 * inch
-            ramah_ratio = ramah_pil.width / ramah_pil.height
-            ramah_width = max_logo_height * ramah_ratio
-            ramah_height = max_logo_height
-
-            ramah_temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-            ramah_pil.save(ramah_temp_file.name, format='PNG', optimize=False)
-            ramah_processed_path = ramah_temp_file.name
-        except Exception as e:
-            print(f"Error loading logo Ramah: {e}")
-
-    # Fungsi untuk header dengan logo dan footer
-    def add_header_footer(canvas, doc):
-        canvas.saveState()
+        logger.warning("Export PDF dengan %s rows - mungkin memakan waktu lama", len(all_biodata))
 
-        # Hitung tinggi logo terbesar untuk alignment vertikal (hanya logo BGTK di header)
-        max_logo_h = logo_height if logo_height > 0 else 0
+    pdf_file = render_biodata_pdf(all_biodata, progress=report_export_progress, output=export_output('.pdf'))
 
-        # Header - Logo BGTK di kiri
-        if logo_img and logo_height > 0:
-            try:
-                logo_x = 25
-                logo_y = F4_SIZE[1] - 25 - max_logo_h
-                canvas.drawImage(logo_path, logo_x, logo_y, width=logo_width, height=logo_height, preserveAspectRatio=True)
-            except Exception as e:
-                print(f"Error drawing logo: {e}")
-
-        # Garis header
-        canvas.setStrokeColor(colors.HexColor('#067ac1'))
-        canvas.setLineWidth(1.5)
-        max_header_height = logo_height if logo_height > 0 else 0
-        header_line_y = F4_SIZE[1] - 25 - max_header_height - 5
-        canvas.line(25, header_line_y, F4_SIZE[0] - 25, header_line_y)
-
-        # Footer - Logo Pendidikan Bermutu dan Ramah di kanan bawah
-        max_footer_logo_height = max(pendidikan_bermutu_height if pendidikan_bermutu_height > 0 else 0,
-                                    ramah_height if ramah_height > 0 else 0)
-        footer_logo_y = 45  # Posisi Y untuk logo footer
-
-        if max_footer_logo_height > 0:
-            # Hitung total lebar kedua logo + spacing
-            total_footer_logo_width = (pendidikan_bermutu_width if pendidikan_bermutu_height > 0 else 0) + \
-                                     (ramah_width if ramah_height > 0 else 0) + 10  # 10 pt spacing antara logo
-            # Posisi X untuk logo di kanan (rata kanan dengan margin 25)
-            footer_logo_start_x = F4_SIZE[0] - 25 - total_footer_logo_width
-
-            # Logo Pendidikan Bermutu di kiri (dalam footer)
-            if pendidikan_bermutu_processed_path and os.path.exists(pendidikan_bermutu_processed_path) and pendidikan_bermutu_height > 0:
-                try:
-                    pendidikan_bermutu_footer_x = footer_logo_start_x
-                    pendidikan_bermutu_footer_y = footer_logo_y
-                    canvas.drawImage(pendidikan_bermutu_processed_path, pendidikan_bermutu_footer_x, pendidikan_bermutu_footer_y,
-                                   width=pendidikan_bermutu_width, height=pendidikan_bermutu_height, preserveAspectRatio=True, mask='auto')
-                except Exception as e:
-                    print(f"Error drawing logo Pendidikan Bermutu di footer: {e}")
-
-            # Logo Ramah di kanan (dalam footer)
-            if ramah_processed_path and os.path.exists(ramah_processed_path) and ramah_height > 0:
-                try:
-                    ramah_footer_x = footer_logo_start_x + (pendidikan_bermutu_width if pendidikan_bermutu_height > 0 else 0) + 10
-                    ramah_footer_y = footer_logo_y
-                    canvas.drawImage(ramah_processed_path, ramah_footer_x, ramah_footer_y,
-                                   width=ramah_width, height=ramah_height, preserveAspectRatio=True, mask='auto')
-                except Exception as e:
-                    print(f"Error drawing logo Ramah di footer: {e}")
-
-        # Garis footer (di bawah logo)
-        canvas.setStrokeColor(colors.HexColor('#067ac1'))
-        canvas.setLineWidth(1)
-        footer_line_y = footer_logo_y - 10  # Garis di bawah logo dengan spacing 10
-        canvas.line(25, footer_line_y, F4_SIZE[0] - 25, footer_line_y)
-
-        # Footer - Tanggal dan waktu export WITA (di bawah garis)
-        canvas.setFont('Helvetica', 8)
-        canvas.setFillColor(colors.black)
-        wita_time = datetime.utcnow() + timedelta(hours=8)
-        footer_text = f"Dicetak pada: {wita_time.strftime('%d/%m/%Y %H:%M')} WITA"
-        footer_width = canvas.stringWidth(footer_text, 'Helvetica', 8)
-        footer_x = 25  # Rata kiri dengan margin 25 pt
-        footer_y = footer_line_y - 15  # Tanggal di bawah garis
-        canvas.drawString(footer_x, footer_y, footer_text)
-
-        canvas.restoreState()
-
-    # Gunakan kertas F4 (8.27 x 13 inch) dan beri ruang header
-    buffer = io.BytesIO()
-    max_header_logo_height = logo_height if logo_height > 0 else 0  # Hanya logo BGTK di header
-    top_margin_with_logo = 25 + max_header_logo_height + 15
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=F4_SIZE,
-        rightMargin=25,
-        leftMargin=25,
-        topMargin=top_margin_with_logo,
-        bottomMargin=40
-    )
-
-    elements = []
-    styles = getSampleStyleSheet()
-
-    # Title style
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=20,
-        textColor=colors.black,
-        spaceAfter=12,
-        spaceBefore=0,
-        alignment=1,  # Center
-        fontName='Helvetica-Bold',
-        leading=24
-    )
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=9,
-        leading=11,
-        textColor=colors.black,
-        alignment=0  # Left
-    )
-    value_style = ParagraphStyle(
-        'ValueStyle',
-        parent=styles['Normal'],
-        fontSize=9,
-        leading=11,
-        textColor=colors.black,
-        alignment=0,  # Left
-        leftIndent=0,
-        rightIndent=0
-    )
-
-    # Field mapping untuk label yang lebih readable dan profesional
-    field_labels = {
-        'nik': 'NIK',
-        'nama_lengkap': 'Nama Lengkap',
-        'nip_nippk': 'NIP/NIPPK',
-        'tempat_lahir': 'Tempat Lahir',
-        'tanggal_lahir': 'Tanggal Lahir',
-        'jenis_kelamin': 'Jenis Kelamin',
-        'agama': 'Agama',
-        'pendidikan_terakhir': 'Pendidikan Terakhir',
-        'jurusan': 'Jurusan',
-        'status_asn': 'Status Kepegawaian',
-        'pangkat_golongan': 'Pangkat / Golongan',
-        'jabatan': 'Jabatan',
-        'instansi': 'Nama Instansi',
-        'alamat_instansi': 'Alamat Instansi',
-        'alamat_domisili': 'Alamat Domisili',
-        'kabupaten_kota': 'Kabupaten/Kota',
-        'kabko_lainnya': 'Kabupaten/Kota Lainnya',
-        'peran': 'Peran dalam Kegiatan',
-        'no_hp': 'Nomor HP',
-        'alamat_email': 'Alamat Email',
-        'npwp': 'NPWP',
-        'nama_bank': 'Nama Bank',
-        'nama_bank_lainnya': 'Nama Bank Lainnya',
-        'no_rekening': 'Nomor Rekening',
-        'nama_pemilik_rekening': 'Nama Pemilik Rekening'
-    }
-
-    # Urutan field yang diinginkan
-    field_order = [
-        'nik', 'nama_lengkap', 'nip_nippk', 'tempat_lahir', 'tanggal_lahir',
-        'jenis_kelamin', 'agama', 'pendidikan_terakhir', 'jurusan',
-        'status_asn', 'pangkat_golongan', 'jabatan', 'instansi',
-        'alamat_instansi', 'alamat_domisili', 'kabupaten_kota', 'kabko_lainnya',
-        'peran',
-        'no_hp', 'alamat_email', 'npwp',
-        'nama_bank', 'nama_bank_lainnya', 'no_rekening', 'nama_pemilik_rekening'
-    ]
-
-    # Exclude fields yang tidak perlu ditampilkan
-    exclude_fields = ['id', 'user_id', 'buku_tabungan_path', 'tanda_tangan', 'created_at', 'updated_at', 'nama_kegiatan', 'waktu_pelaksanaan', 'tempat_pelaksanaan']
-
-    # List untuk menyimpan temporary files tanda tangan untuk cleanup
-    tanda_tangan_temp_files = []
-
-    # Loop untuk setiap user - buat 1 halaman per user
-    for user_idx, biodata in enumerate(all_biodata):
-        # Tambahkan page break kecuali untuk user pertama
-        if user_idx > 0:
-            elements.append(PageBreak())
-
-        # Title
-        title = Paragraph("BIODATA KEGIATAN", title_style)
-        elements.append(title)
-        elements.append(Spacer(1, 0.15*inch))
-
-        # Ambil data kegiatan untuk header tabel
-        biodata_nama_kegiatan = biodata.get('nama_kegiatan', '-')
-        waktu_pelaksanaan = biodata.get('waktu_pelaksanaan', '-')
-        tempat_pelaksanaan = biodata.get('tempat_pelaksanaan', '-')
-
-        # Buat header informasi kegiatan di atas tabel dengan titik dua yang sejajar
-        if biodata_nama_kegiatan or waktu_pelaksanaan or tempat_pelaksanaan:
-            info_style = ParagraphStyle(
-                'InfoStyle',
-                parent=styles['Normal'],
-                fontSize=10,
-                leading=14,
-                textColor=colors.black,
-                alignment=0,  # Left align
-                fontName='Helvetica-Bold'
-            )
-
-            # Buat tabel kecil untuk info kegiatan agar titik dua sejajar
-            info_table_data = []
-            if biodata_nama_kegiatan and str(biodata_nama_kegiatan).strip() and str(biodata_nama_kegiatan).strip() != '-':
-                info_table_data.append([
-                    Paragraph("<b>Nama Kegiatan</b>", info_style),
-                    Paragraph(":", info_style),
-                    Paragraph(str(biodata_nama_kegiatan), info_style)
-                ])
-            if waktu_pelaksanaan and str(waktu_pelaksanaan).strip() and str(waktu_pelaksanaan).strip() != '-':
-                info_table_data.append([
-                    Paragraph("<b>Waktu Pelaksanaan</b>", info_style),
-                    Paragraph(":", info_style),
-                    Paragraph(str(waktu_pelaksanaan), info_style)
-                ])
-            if tempat_pelaksanaan and str(tempat_pelaksanaan).strip() and str(tempat_pelaksanaan).strip() != '-':
-                info_table_data.append([
-                    Paragraph("<b>Tempat Pelaksanaan</b>", info_style),
-                    Paragraph(":", info_style),
-                    Paragraph(str(tempat_pelaksanaan), info_style)
-                ])
-
-            if info_table_data:
-                available_width = (8.27 * inch) - (25 * 2)
-                info_table = Table(info_table_data, colWidths=[2.2*inch, 0.15*inch, available_width - 2.2*inch - 0.15*inch])
-                info_table.setStyle(TableStyle([
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                    ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-                    ('ALIGN', (2, 0), (2, -1), 'LEFT'),
-                    ('LEFTPADDING', (0, 0), (0, -1), 0),
-                    ('LEFTPADDING', (1, 0), (1, -1), 0),
-                    ('LEFTPADDING', (2, 0), (2, -1), 0),
-                    ('RIGHTPADDING', (0, 0), (0, -1), 4),
-                    ('RIGHTPADDING', (1, 0), (1, -1), 0),
-                    ('RIGHTPADDING', (2, 0), (2, -1), 6),
-                    ('TOPPADDING', (0, 0), (-1, -1), 2),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-                ]))
-                elements.append(info_table)
-                elements.append(Spacer(1, 0.1*inch))
-
-        # Semua data dalam 1 tabel
-        all_data = []
-
-        # Collect all data in order
-        for key in field_order:
-            if key in biodata and key not in exclude_fields:
-                label = field_labels.get(key, key.replace('_', ' ').title())
-                value = biodata[key]
-                display_value = str(value) if value and str(value).strip() else '-'
-                all_data.append([label, display_value])
-
-        # Add any remaining fields not in field_order
-        for key, value in biodata.items():
-            if key not in exclude_fields and key not in field_order:
-                label = field_labels.get(key, key.replace('_', ' ').title())
-                display_value = str(value) if value and str(value).strip() else '-'
-                all_data.append([label, display_value])
-
-        # Process tanda tangan menggunakan helper function
-        tanda_tangan_raw = biodata.get('tanda_tangan')
-        tanda_tangan_img, error_msg = process_tanda_tangan_for_pdf(tanda_tangan_raw, tanda_tangan_temp_files)
-
-        # Buat 1 tabel untuk semua data
-        if all_data:
-            table_data = []
-            for row in all_data:
-                field_label = Paragraph(f"<b>{row[0]}</b>", value_style)
-                value_text = str(row[1]) if row[1] else '-'
-                value_text = value_text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                if len(value_text) > 50:
-                    words = value_text.split()
-                    lines = []
-                    current_line = []
-                    current_length = 0
-                    for word in words:
-                        if current_length + len(word) + 1 > 50:
-                            if current_line:
-                                lines.append(' '.join(current_line))
-                            current_line = [word]
-                            current_length = len(word)
-                        else:
-                            current_line.append(word)
-                            current_length += len(word) + 1
-                    if current_line:
-                        lines.append(' '.join(current_line))
-                    value_text = '<br/>'.join(lines)
-                value_para = Paragraph(value_text, value_style)
-                table_data.append([field_label, value_para])
-
-            # Tambahkan tanda tangan ke tabel jika ada
-            if tanda_tangan_img:
-                field_label = Paragraph("<b>Tanda Tangan</b>", value_style)
-                table_data.append([field_label, tanda_tangan_img])
-            elif biodata.get('tanda_tangan'):
-                field_label = Paragraph("<b>Tanda Tangan</b>", value_style)
-                error_msg_para = Paragraph("<i>Tanda tangan tidak tersedia</i>", value_style)
-                table_data.append([field_label, error_msg_para])
-
-            available_width = (8.27 * inch) - (25 * 2)
-            table = Table(table_data, colWidths=[2.2*inch, available_width - 2.2*inch])
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, -1), colors.white),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('LEFTPADDING', (0, 0), (0, -1), 4),
-                ('LEFTPADDING', (1, 0), (1, -1), 6),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-                ('TOPPADDING', (0, 0), (-1, -1), 5),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#d1d5db')),
-                ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor('#067ac1')),
-            ]))
-            elements.append(table)
-            elements.append(Spacer(1, 0.08*inch))
-
-    # Build PDF
-    try:
-        doc.build(elements, onFirstPage=add_header_footer, onLaterPages=add_header_footer)
-        buffer.seek(0)
-
-        # Refresh session sebelum return response untuk mencegah logout
-        session.permanent = True
-        session.modified = True
-    finally:
-        # Cleanup temporary files
-        try:
-            if pendidikan_bermutu_temp_file and os.path.exists(pendidikan_bermutu_processed_path):
-                os.unlink(pendidikan_bermutu_processed_path)
-        except Exception as e:
-            print(f"Error cleaning up Pendidikan Bermutu temp file: {e}")
-
-        try:
-            if ramah_temp_file and os.path.exists(ramah_processed_path):
-                os.unlink(ramah_processed_path)
-        except Exception as e:
-            print(f"Error cleaning up Ramah temp file: {e}")
-
-        # Cleanup temporary files tanda tangan
-        for temp_file_path in tanda_tangan_temp_files:
-            try:
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
-            except Exception as e:
-                print(f"Error cleaning up tanda tangan temp file {temp_file_path}: {e}")
+    # Refresh session sebelum return response untuk mencegah logout
+    session.permanent = True
+    session.modified = True
 
     # Generate filename
     filename = f"Rekap_Tahun_{selected_year}"
@@ -5082,22 +4739,13 @@ def export_rekap_tahunan_pdf():
             filename += f"_{bulan_names[bulan_awal]}_{bulan_names[bulan_akhir]}"
     filename += ".pdf"
 
-    return Response(
-        buffer.getvalue(),
-        mimetype='application/pdf',
-        headers={
-            'Content-Disposition': f'attachment; filename="{filename}"'
-        }
-    )
+    return export_file_response(pdf_file, 'application/pdf', f'attachment; filename="{filename}"')
 
 @app.route('/admin/export-rekap-tahunan-excel')
 @admin_required
+@export_job
 def export_rekap_tahunan_excel():
     """Export rekap tahunan ke Excel"""
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
-    from io import BytesIO
 
     user_role = get_user_role()
     user_id = get_user_id()
@@ -5157,18 +4805,24 @@ def export_rekap_tahunan_excel():
         flash('Koneksi database gagal!', 'error')
         return redirect(url_for('admin_rekap_tahunan'))
 
-    # Ambil daftar kegiatan per tahun
-    kegiatan_list = []
+    # Title
+    title_text = f"Rekap Kegiatan Tahun {selected_year}"
+    if bulan_awal and bulan_akhir:
+        if bulan_awal == bulan_akhir:
+            title_text += f" - {bulan_names[bulan_awal]}"
+        else:
+            title_text += f" - {bulan_names[bulan_awal]} s/d {bulan_names[bulan_akhir]}"
+
     try:
         cursor = connection.cursor()
 
         # Buat kondisi WHERE untuk filter bulan (SQLite)
         selected_year_str = str(selected_year)
-        where_conditions = ["CAST(strftime('%Y', bk.created_at) AS INTEGER) = ?"]
+        where_conditions = ["bk.tahun = ?"]
         params = [selected_year_str]
 
         if bulan_awal and bulan_akhir:
-            where_conditions.append("CAST(strftime('%m', bk.created_at) AS INTEGER) BETWEEN ? AND ?")
+            where_conditions.append("bk.bulan BETWEEN ? AND ?")
             params.extend([bulan_awal, bulan_akhir])
 
         # Jika operator, batasi hanya pada kegiatan yang ia pegang
@@ -5176,321 +4830,46 @@ def export_rekap_tahunan_excel():
             where_conditions.append("""
                 EXISTS (
                     SELECT 1
-                    FROM kegiatan_master k
-                    INNER JOIN operator_kegiatan ok ON k.id = ok.kegiatan_id
+                    FROM operator_kegiatan ok
                     WHERE ok.user_id = ?
-                      AND TRIM(k.nama_kegiatan) = TRIM(bk.nama_kegiatan)
+                      AND ok.kegiatan_id = bk.kegiatan_id
                 )
-            """)
-            params.append(user_id)
-
-        where_clause = " AND ".join(where_conditions)
-
-        # Ambil daftar kegiatan per tahun dengan detail
-        kegiatan_query = f"""
-            SELECT
-                bk.nama_kegiatan,
-                COUNT(DISTINCT bk.id) as jumlah_peserta,
-                COUNT(DISTINCT bk.kabupaten_kota) as jumlah_kabupaten,
-                MIN(bk.created_at) as tanggal_awal,
-                MAX(bk.created_at) as tanggal_akhir
-            FROM biodata_kegiatan bk
-            WHERE {where_clause}
-                AND TRIM(bk.nama_kegiatan) != ''
-            GROUP BY bk.nama_kegiatan
-            ORDER BY jumlah_peserta DESC, bk.nama_kegiatan ASC
-        """
-
-        cursor.execute(kegiatan_query, tuple(params))
-        rows = cursor.fetchall()
-        kegiatan_list = [row_to_dict(row) for row in rows]
-
-        # Ambil detail per kabupaten untuk setiap kegiatan dan semua biodata
-        kegiatan_data = []
-        all_biodata = []
-
-        for kegiatan in kegiatan_list:
-            nama_kegiatan = kegiatan.get('nama_kegiatan')
-
-            # Ambil detail per kabupaten untuk kegiatan ini
-            kabupaten_detail_query = f"""
-                SELECT
-                    bk.kabupaten_kota,
-                    COUNT(DISTINCT bk.id) as jumlah_peserta,
-                    MIN(bk.created_at) as tanggal_awal,
-                    MAX(bk.created_at) as tanggal_akhir
-                FROM biodata_kegiatan bk
-                WHERE {where_clause}
-                    AND TRIM(bk.nama_kegiatan) = TRIM(?)
-                    AND TRIM(bk.kabupaten_kota) != ''
-                    AND bk.kabupaten_kota IS NOT NULL
-                GROUP BY bk.kabupaten_kota
-                ORDER BY bk.kabupaten_kota ASC
-            """
-            kabupaten_params = list(params) + [nama_kegiatan]
-            cursor.execute(kabupaten_detail_query, tuple(kabupaten_params))
-            kabupaten_rows = cursor.fetchall()
-
-            # Convert kabupaten rows to dict
-            kabupaten_list = []
-            for kab_row in kabupaten_rows:
-                kab_dict = row_to_dict(kab_row)
-                kabupaten_list.append(kab_dict)
-
-            kegiatan['kabupaten_detail'] = kabupaten_list
-
-            # Ambil semua biodata untuk kegiatan ini
-            biodata_query = f"""
-                SELECT * FROM biodata_kegiatan
-                WHERE TRIM(nama_kegiatan) = TRIM(?)
-                    AND CAST(strftime('%Y', created_at) AS INTEGER) = ?
-            """
-            biodata_params = [nama_kegiatan, selected_year_str]
-
-            if bulan_awal and bulan_akhir:
-                biodata_query += " AND CAST(strftime('%m', created_at) AS INTEGER) BETWEEN ? AND ?"
-                biodata_params.extend([bulan_awal, bulan_akhir])
-
-            biodata_query += " ORDER BY kabupaten_kota ASC, nama_lengkap ASC"
-
-            cursor.execute(biodata_query, tuple(biodata_params))
-            biodata_rows = cursor.fetchall()
-            biodata_list = [row_to_dict(row) for row in biodata_rows]
-
-            # Normalisasi path buku tabungan
-            for biodata in biodata_list:
-                if biodata.get('buku_tabungan_path'):
-                    biodata['buku_tabungan_path'] = normalize_buku_tabungan_path(biodata['buku_tabungan_path'])
-
-            all_biodata.extend(biodata_list)
-
-        # Sort by nama_kegiatan, then by kabupaten_kota, then by nama_lengkap
-        all_biodata.sort(key=lambda x: (
-            x.get('nama_kegiatan', ''),
-            x.get('kabupaten_kota', ''),
-            x.get('nama_lengkap', '')
-        ))
-
-    except sqlite3.Error as e:
-        flash(f'Terjadi kesalahan saat mengambil data: {str(e)}', 'error')
-        return redirect(url_for('admin_rekap_tahunan'))
-    finally:
-        if connection:
-            cursor.close()
-            connection.close()
-
-    if not all_biodata:
-        flash('Tidak ada data untuk diekspor!', 'error')
-        return redirect(url_for('admin_rekap_tahunan'))
-
-    # Field mapping untuk label yang lebih readable dan profesional
-    field_labels = {
-        'nik': 'NIK',
-        'nama_lengkap': 'Nama Lengkap',
-        'nip_nippk': 'NIP/NIPPK',
-        'tempat_lahir': 'Tempat Lahir',
-        'tanggal_lahir': 'Tanggal Lahir',
-        'jenis_kelamin': 'Jenis Kelamin',
-        'agama': 'Agama',
-        'pendidikan_terakhir': 'Pendidikan Terakhir',
-        'jurusan': 'Jurusan',
-        'status_asn': 'Status Kepegawaian',
-        'pangkat_golongan': 'Pangkat / Golongan',
-        'jabatan': 'Jabatan',
-        'instansi': 'Nama Instansi',
-        'alamat_instansi': 'Alamat Instansi',
-        'alamat_domisili': 'Alamat Domisili',
-        'kabupaten_kota': 'Kabupaten/Kota',
-        'kabko_lainnya': 'Kabupaten/Kota Lainnya',
-        'peran': 'Peran dalam Kegiatan',
-        'no_hp': 'Nomor HP',
-        'alamat_email': 'Alamat Email',
-        'npwp': 'NPWP',
-        'nama_bank': 'Nama Bank',
-        'nama_bank_lainnya': 'Nama Bank Lainnya',
-        'no_rekening': 'Nomor Rekening',
-        'nama_pemilik_rekening': 'Nama Pemilik Rekening'
-    }
-
-    # Urutan field yang diinginkan
-    field_order = [
-        'nik', 'nama_lengkap', 'nip_nippk', 'tempat_lahir', 'tanggal_lahir',
-        'jenis_kelamin', 'agama', 'pendidikan_terakhir', 'jurusan',
-        'status_asn', 'pangkat_golongan', 'jabatan', 'instansi',
-        'alamat_instansi', 'alamat_domisili', 'kabupaten_kota', 'kabko_lainnya',
-        'peran',
-        'no_hp', 'alamat_email', 'npwp',
-        'nama_bank', 'nama_bank_lainnya', 'no_rekening', 'nama_pemilik_rekening'
-    ]
-
-    # Exclude fields yang tidak perlu ditampilkan
-    exclude_fields = ['id', 'user_id', 'buku_tabungan_path', 'tanda_tangan', 'created_at', 'updated_at', 'waktu_pelaksanaan', 'tempat_pelaksanaan']
-
-    # Buat workbook Excel
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Data Biodata"
-
-    # Styles
-    header_fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-    header_font = Font(bold=True, color="000000", size=11)
-    title_font = Font(bold=True, size=12, color="000000")
-    border_style = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    center_align = Alignment(horizontal='center', vertical='center')
-    left_align = Alignment(horizontal='left', vertical='top', wrap_text=True)
-
-    # Buat list semua field yang akan ditampilkan (dalam urutan yang diinginkan)
-    all_fields = []
-    # Tambahkan nama_kegiatan di awal
-    all_fields.append({'key': 'nama_kegiatan', 'label': 'Nama Kegiatan'})
-    for key in field_order:
-        if key not in exclude_fields:
-            label = field_labels.get(key, key.replace('_', ' ').title())
-            all_fields.append({'key': key, 'label': label})
-
-    # Tambahkan field tanda tangan
-    all_fields.append({'key': 'tanda_tangan', 'label': 'Tanda Tangan'})
-
-    # Header kegiatan
-    num_cols = len(all_fields)
-    last_col_letter = get_column_letter(num_cols)
-
-    # Title
-    title_text = f"Rekap Kegiatan Tahun {selected_year}"
-    if bulan_awal and bulan_akhir:
-        if bulan_awal == bulan_akhir:
-            title_text += f" - {bulan_names[bulan_awal]}"
-        else:
-            title_text += f" - {bulan_names[bulan_awal]} s/d {bulan_names[bulan_akhir]}"
-
-    ws.merge_cells(f'A1:{last_col_letter}1')
-    ws['A1'] = title_text
-    ws['A1'].font = title_font
-    ws['A1'].alignment = center_align
-
-    # Tambahkan informasi tanggal export
-    export_date = datetime.now().strftime("%d %B %Y, %H:%M:%S")
-    ws.merge_cells(f'A2:{last_col_letter}2')
-    ws['A2'] = f"Tanggal Export: {export_date}"
-    ws['A2'].font = Font(size=10, italic=True)
-    ws['A2'].alignment = left_align
-    ws.row_dimensions[2].height = 18
-
-    # Buat header kolom (semua field sebagai kolom)
-    for col_idx, field_info in enumerate(all_fields, 1):
-        cell = ws.cell(row=3, column=col_idx, value=field_info['label'])
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = center_align
-        cell.border = border_style
-    ws.row_dimensions[3].height = 22
-
-    # Set lebar kolom pertama (Nama Kegiatan) lebih lebar
-    ws.column_dimensions['A'].width = 35
-    # Set lebar semua kolom lainnya
-    for col_idx in range(2, len(all_fields) + 1):
-        col_letter = get_column_letter(col_idx)
-        ws.column_dimensions[col_letter].width = 25
-
-    # Data untuk setiap user (setiap user = 1 baris)
-    current_row = 4
-    for user_idx, biodata in enumerate(all_biodata):
-        for col_idx, field_info in enumerate(all_fields, 1):
-            field_key = field_info['key']
-
-            # Ambil nilai field
-            if field_key == 'tanda_tangan':
-                display_value = "[Tersedia]" if biodata.get('tanda_tangan') else "-"
-            else:
-                value = biodata.get(field_key, '')
-                display_value = str(value) if value and str(value).strip() else '-'
-
-            # Tulis ke cell
-            cell = ws.cell(row=current_row, column=col_idx, value=display_value)
-            cell.border = border_style
-
-            # Alternating row colors untuk readability
-            if user_idx % 2 == 0:
-                cell.fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-            else:
-                cell.fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-
-            # Alignment dengan wrap text untuk semua kolom
-            if field_key in ['nik', 'nip_nippk', 'no_hp', 'npwp', 'no_rekening']:
-                cell.alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
-            elif field_key in ['tanggal_lahir']:
-                cell.alignment = Alignment(horizontal='center', vertical='top', wrap_text=True)
-            else:
-                cell.alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
-
-        # Auto adjust row height
-        max_height = 18
-        for col_idx, field_info in enumerate(all_fields, 1):
-            cell = ws.cell(row=current_row, column=col_idx)
-            if cell.value:
-                col_letter = get_column_letter(col_idx)
-                col_width = ws.column_dimensions[col_letter].width or 25
-                text_length = len(str(cell.value))
-                estimated_lines = max(1, (text_length / max(col_width * 0.8, 1)))
-                estimated_height = estimated_lines * 15
-                max_height = max(max_height, min(estimated_height, 60))
-
-        ws.row_dimensions[current_row].height = max_height
-        current_row += 1
-
-    # Auto-adjust column widths berdasarkan konten aktual
-    for col_idx, field_info in enumerate(all_fields, 1):
-        col_letter = get_column_letter(col_idx)
-
-        if col_letter == 'A':
-            continue  # Skip kolom A (Nama Kegiatan) - sudah di-set
-
-        max_length = 0
-        header_cell = ws.cell(row=3, column=col_idx)
-        if header_cell.value:
-            max_length = len(str(header_cell.value))
-
-        for row in range(4, current_row):
-            cell = ws.cell(row=row, column=col_idx)
-            if cell.value:
-                text = str(cell.value)
-                text_length = len(text)
-                if text_length > 50:
-                    lines = text.split('\n') if '\n' in text else [text]
-                    max_line_length = max(len(line) for line in lines)
-                    max_length = max(max_length, min(max_line_length, 40))
-                else:
-                    max_length = max(max_length, text_length)
-
-        optimal_width = max(12, min(max_length + 2, 40))
-        if 'Alamat' in field_info['label']:
-            optimal_width = max(optimal_width, min(max_length + 2, 45))
-        ws.column_dimensions[col_letter].width = optimal_width
+            """)
+            params.append(user_id)
 
-    # Freeze panes untuk memudahkan scrolling (freeze header)
-    ws.freeze_panes = 'A4'
+        where_clause = " AND ".join(where_conditions)
+        # Semua biodata dalam satu query, urut kegiatan, kabupaten, nama
+        query = rekap_tahunan_biodata_query(where_clause)
 
-    # Enable auto filter untuk header
-    ws.auto_filter.ref = f'A3:{last_col_letter}{current_row - 1}'
+        # Pass 1: jumlah baris + statistik lebar kolom, tanpa menyimpan baris di memori
+        cursor.execute(query, tuple(params))
+        stats = ExcelColumnStats(biodata_excel_fields())
+        with profile_span('excel_width'):
+            for row in cursor:
+                stats.add(row_to_dict(row))
 
-    # Set print settings
-    ws.page_setup.orientation = ws.ORIENTATION_LANDSCAPE
-    ws.page_setup.paperSize = ws.PAPERSIZE_A4
-    ws.page_setup.fitToWidth = 1
-    ws.page_setup.fitToHeight = 0
+        if not stats.total_rows:
+            flash('Tidak ada data untuk diekspor!', 'error')
+            return redirect(url_for('admin_rekap_tahunan'))
 
-    # Set row heights untuk header
-    ws.row_dimensions[1].height = 25
+        # Pass 2: tulis baris langsung dari cursor ke workbook streaming
+        cursor.execute(query, tuple(params))
+        excel_file = write_biodata_workbook(
+            (row_to_dict(row) for row in cursor),
+            stats,
+            export_output('.xlsx'),
+            sheet_title="Data Biodata",
+            title=title_text,
+            progress=report_export_progress
+        )
 
-    # Save to BytesIO
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
+    except sqlite3.Error as e:
+        flash(f'Terjadi kesalahan saat mengambil data: {str(e)}', 'error')
+        return redirect(url_for('admin_rekap_tahunan'))
+    finally:
+        if connection:
+            cursor.close()
+            connection.close()
 
     # Refresh session
     session.permanent = True
@@ -5505,78 +4884,160 @@ def export_rekap_tahunan_excel():
             filename += f"_{bulan_names[bulan_awal]}_{bulan_names[bulan_akhir]}"
     filename += ".xlsx"
 
-    return Response(
-        buffer.getvalue(),
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={
-            'Content-Disposition': f'attachment; filename="{filename}"'
-        }
-    )
+    return export_file_response(excel_file, EXCEL_MIMETYPE, f'attachment; filename="{filename}"')
+
+# Label grup peserta yang kabupaten/kota-nya kosong di halaman detail kegiatan
+KABUPATEN_TIDAK_DIKETAHUI = 'Tidak Diketahui'
+# Kolom DataTables detail kegiatan yang bisa diurutkan (index kolom di tabel -> kolom SQL)
+DETAIL_KEGIATAN_ORDER_COLUMNS = {2: 'nik', 3: 'nama_lengkap', 4: 'peran', 5: 'instansi'}
+
+def operator_boleh_akses_kegiatan(cursor, nama_kegiatan):
+    """Admin selalu boleh; operator hanya untuk kegiatan yang dia pegang"""
+    if get_user_role() != 'operator':
+        return True
+    cursor.execute("""
+        SELECT k.id
+        FROM kegiatan_master k
+        INNER JOIN operator_kegiatan ok ON k.id = ok.kegiatan_id
+        WHERE ok.user_id = ?
+            AND TRIM(k.nama_kegiatan) = TRIM(?)
+    """, (get_user_id(), nama_kegiatan))
+    return cursor.fetchone() is not None
+
+def get_detail_kegiatan_kabupaten_counts(cursor, nama_kegiatan):
+    """Jumlah peserta per kabupaten/kota untuk satu kegiatan (urut nama kabupaten, kosong digabung)"""
+    cursor.execute("""
+        SELECT kabupaten_kota, COUNT(*) AS jumlah_peserta
+        FROM biodata_kegiatan
+        WHERE TRIM(nama_kegiatan) = TRIM(?)
+        GROUP BY kabupaten_kota
+        ORDER BY kabupaten_kota ASC
+    """, (nama_kegiatan,))
+    counts = {}
+    for row in cursor.fetchall():
+        kabupaten = row['kabupaten_kota'] or KABUPATEN_TIDAK_DIKETAHUI
+        counts[kabupaten] = counts.get(kabupaten, 0) + row['jumlah_peserta']
+    return [{'kabupaten_kota': kabupaten, 'jumlah_peserta': jumlah} for kabupaten, jumlah in counts.items()]
 
 @app.route('/admin/kegiatan/<path:nama_kegiatan>')
 @admin_required
 def admin_detail_kegiatan(nama_kegiatan):
-    """Halaman detail peserta per kegiatan berdasarkan kabupaten/kota"""
+    """Halaman detail peserta per kegiatan berdasarkan kabupaten/kota
+
+    Halaman hanya memuat jumlah peserta per kabupaten; baris peserta diambil per halaman
+    lewat api_detail_kegiatan (DataTables server-side).
+    """
     from urllib.parse import unquote
 
     # Decode URL encoding
     nama_kegiatan = unquote(nama_kegiatan)
-    kabupaten_data = {}
-    user_id = get_user_id()
-    user_role = get_user_role()
+    kabupaten_counts = []
 
     connection = get_db_connection()
     if connection is None:
         flash('Koneksi database gagal!', 'error')
         return redirect(url_for('admin_kegiatan'))
 
+    cursor = None
     try:
         cursor = connection.cursor()
 
         # Jika operator, cek apakah kegiatan ini termasuk yang dia ikuti
-        if user_role == 'operator':
-            cursor.execute("""
-                SELECT k.id
-                FROM kegiatan_master k
-                INNER JOIN operator_kegiatan ok ON k.id = ok.kegiatan_id
-                WHERE ok.user_id = ?
-                    AND TRIM(k.nama_kegiatan) = TRIM(?)
-            """, (user_id, nama_kegiatan))
-            if not cursor.fetchone():
-                flash('Anda tidak memiliki akses ke kegiatan ini!', 'error')
-                return redirect(url_for('admin_kegiatan'))
-
-        # Ambil semua biodata untuk kegiatan yang dipilih
-        cursor.execute("""
-            SELECT nik, nama_lengkap, nip_nippk, instansi, peran, kabupaten_kota, nama_kegiatan
-            FROM biodata_kegiatan
-            WHERE TRIM(nama_kegiatan) = TRIM(?)
-            ORDER BY kabupaten_kota ASC, nama_lengkap ASC
-        """, (nama_kegiatan,))
-        rows = cursor.fetchall()
-        all_biodata = [row_to_dict(row) for row in rows]
+        if not operator_boleh_akses_kegiatan(cursor, nama_kegiatan):
+            flash('Anda tidak memiliki akses ke kegiatan ini!', 'error')
+            return redirect(url_for('admin_kegiatan'))
 
-        # Group by kabupaten_kota
-        for biodata in all_biodata:
-            kabupaten = biodata['kabupaten_kota'] or 'Tidak Diketahui'
-            if kabupaten not in kabupaten_data:
-                kabupaten_data[kabupaten] = []
-            kabupaten_data[kabupaten].append(biodata)
+        kabupaten_counts = get_detail_kegiatan_kabupaten_counts(cursor, nama_kegiatan)
 
     except sqlite3.Error as e:
         flash(f'Terjadi kesalahan saat mengambil data: {str(e)}', 'error')
     finally:
-        if connection:
+        if cursor:
             cursor.close()
-            connection.close()
+        connection.close()
 
     return render_template(
         'admin/admin-detail-kegiatan.html',
-        kabupaten_data=kabupaten_data,
+        kabupaten_counts=kabupaten_counts,
+        jumlah_peserta=sum(item['jumlah_peserta'] for item in kabupaten_counts),
         selected_kegiatan=nama_kegiatan,
         username=get_username()
     )
 
+@app.route('/api/detail-kegiatan/<path:nama_kegiatan>', methods=['GET'])
+@admin_required
+def api_detail_kegiatan(nama_kegiatan):
+    """API DataTables server-side untuk tabel peserta di halaman detail kegiatan
+
+    Parameter tambahan: kabupaten_kota (filter grup kabupaten, 'Tidak Diketahui' = kosong).
+    """
+    from urllib.parse import unquote
+
+    nama_kegiatan = unquote(nama_kegiatan)
+    dt = parse_datatables_args(DETAIL_KEGIATAN_ORDER_COLUMNS, 'nik', default_dir='asc')
+    kabupaten = request.args.get('kabupaten_kota', '')
+    result = {'draw': dt['draw'], 'recordsTotal': 0, 'recordsFiltered': 0, 'data': [], 'next_after': None}
+
+    connection = get_db_connection()
+    if connection is None:
+        result['error'] = 'Koneksi database gagal!'
+        return jsonify(result)
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        if not operator_boleh_akses_kegiatan(cursor, nama_kegiatan):
+            result['error'] = 'Anda tidak memiliki akses ke kegiatan ini!'
+            return jsonify(result), 403
+
+        where_clause = "TRIM(bk.nama_kegiatan) = TRIM(?)"
+        params = [nama_kegiatan]
+        if kabupaten == KABUPATEN_TIDAK_DIKETAHUI:
+            where_clause += " AND (bk.kabupaten_kota IS NULL OR bk.kabupaten_kota IN ('', ?))"
+            params.append(kabupaten)
+        elif kabupaten:
+            where_clause += " AND bk.kabupaten_kota = ?"
+            params.append(kabupaten)
+
+        cursor.execute(f"SELECT COUNT(*) FROM biodata_kegiatan bk WHERE {where_clause}", params)
+        result['recordsTotal'] = result['recordsFiltered'] = cursor.fetchone()[0]
+
+        if dt['search']:
+            search_clause, search_params = datatables_search_clause(
+                ('nik', 'nama_lengkap', 'peran', 'instansi'), dt['search']
+            )
+            where_clause += search_clause
+            params = params + search_params
+            cursor.execute(f"SELECT COUNT(*) FROM biodata_kegiatan bk WHERE {where_clause}", params)
+            result['recordsFiltered'] = cursor.fetchone()[0]
+
+        rows, result['next_after'] = fetch_datatables_page(
+            cursor, ('nik', 'nama_lengkap', 'peran', 'instansi', 'kabupaten_kota', 'nama_kegiatan'),
+            where_clause, params, dt
+        )
+    except sqlite3.Error as e:
+        result['error'] = f'Terjadi kesalahan saat mengambil data: {str(e)}'
+        return jsonify(result)
+    finally:
+        if cursor:
+            cursor.close()
+        connection.close()
+
+    for row in rows:
+        # Route PDF/edit butuh NIK dan nama kegiatan (path tidak boleh kosong)
+        ada_kunci = bool(row['nik'] and row['nama_kegiatan'])
+        result['data'].append({
+            'id': row['id'],
+            'nik': row['nik'],
+            'nama_lengkap': row['nama_lengkap'],
+            'peran': row['peran'],
+            'instansi': row['instansi'],
+            'kabupaten_kota': row['kabupaten_kota'] or KABUPATEN_TIDAK_DIKETAHUI,
+            'nama_kegiatan': row['nama_kegiatan'],
+            'pdf_url': url_for('export_biodata_pdf', nik=row['nik'], nama_kegiatan=row['nama_kegiatan']) if ada_kunci else None,
+            'edit_url': url_for('admin_edit_biodata', nik=row['nik'], nama_kegiatan=row['nama_kegiatan']) if ada_kunci else None
+        })
+    return jsonify(result)
+
 @app.route('/api/kabupaten-summary', methods=['GET'])
 @admin_required
 def api_kabupaten_summary():
@@ -5597,23 +5058,7 @@ def api_kabupaten_summary():
         user_role = get_user_role()
         user_id = get_user_id()
 
-        if user_role == 'operator' and user_id:
-            cursor.execute("""
-                SELECT bk.kabupaten_kota, COUNT(*) as jumlah_peserta
-                FROM biodata_kegiatan bk
-                INNER JOIN kegiatan_master k ON TRIM(k.nama_kegiatan) = TRIM(bk.nama_kegiatan)
-                INNER JOIN operator_kegiatan ok ON k.id = ok.kegiatan_id
-                WHERE ok.user_id = ? AND TRIM(bk.kabupaten_kota) != '' AND bk.kabupaten_kota IS NOT NULL
-                GROUP BY bk.kabupaten_kota
-            """, (user_id,))
-        else:
-            cursor.execute("""
-                SELECT kabupaten_kota, COUNT(*) as jumlah_peserta
-                FROM biodata_kegiatan
-                WHERE TRIM(kabupaten_kota) != '' AND kabupaten_kota IS NOT NULL
-                GROUP BY kabupaten_kota
-            """)
-        counts = {row['kabupaten_kota']: row['jumlah_peserta'] for row in cursor.fetchall()}
+        counts = get_kabupaten_counts(cursor, user_role, user_id)
         lainnya_count = sum(c for k, c in counts.items() if (k or '').strip().upper() not in all_kabupaten_upper)
         kabupaten_summary = [{'nama': k, 'jumlah_peserta': counts.get(k, 0)} for k in all_kabupaten_list]
         kabupaten_summary.append({'nama': 'LAINNYA', 'jumlah_peserta': lainnya_count})
@@ -5643,17 +5088,10 @@ def get_kegiatan_by_nama(nama_kegiatan):
 
         try:
             cursor = connection.cursor()
-            cursor.execute("""
-                SELECT nama_kegiatan, waktu_pelaksanaan, tempat_pelaksanaan
-                FROM kegiatan_master
-                WHERE TRIM(nama_kegiatan) = TRIM(?)
-                    AND (is_hidden IS NULL OR is_hidden = 0)
-                LIMIT 1
-            """, (nama_kegiatan,))
-            kegiatan_row = cursor.fetchone()
+            kegiatan_lookup = cached_query(cursor, 'kegiatan', 'lookup', load_kegiatan_lookup)
+            kegiatan = kegiatan_lookup.get(nama_kegiatan.strip(' '))
 
-            if kegiatan_row:
-                kegiatan = row_to_dict(kegiatan_row)
+            if kegiatan:
                 return jsonify({
                     'success': True,
                     'data': {
@@ -5716,7 +5154,7 @@ def check_nik():
             return jsonify({'available': True, 'message': 'NIK valid - dapat digunakan untuk kegiatan baru'}), 200
 
         except sqlite3.Error as e:
-            print(f"Error checking NIK: {e}")
+            logger.error("Error checking NIK: %s", e)
             return jsonify({'available': False, 'message': 'Terjadi kesalahan saat mengecek NIK'}), 500
         finally:
             if connection is not None:
@@ -5724,7 +5162,7 @@ def check_nik():
                 connection.close()
 
     except Exception as e:
-        print(f"Unexpected error in check_nik: {e}")
+        logger.error("Unexpected error in check_nik: %s", e)
         return jsonify({'available': False, 'message': 'Terjadi kesalahan tidak terduga'}), 500
 
 @app.route('/api/get-latest-by-nik', methods=['POST'])
@@ -5732,33 +5170,27 @@ def check_nik():
 def get_latest_by_nik():
     """API endpoint untuk mengambil data biodata terakhir berdasarkan NIK (tidak perlu login)"""
     try:
-        # Log request info untuk debugging
-        print(f"🔍 Debug get_latest_by_nik - Content-Type: {request.content_type}")
-        print(f"🔍 Debug get_latest_by_nik - Request method: {request.method}")
-        print(f"🔍 Debug get_latest_by_nik - Is JSON: {request.is_json}")
-        print(f"🔍 Debug get_latest_by_nik - Raw data: {request.data}")
+        logger.debug("get_latest_by_nik - Content-Type: %s, panjang body: %s", request.content_type, request.content_length)
 
         # Coba ambil JSON data dengan force=True untuk bypass Content-Type check
         data = None
         try:
             data = request.get_json(force=True)
         except Exception as e:
-            print(f"❌ Error parsing JSON with force=True: {e}")
+            logger.error("❌ Error parsing JSON with force=True: %s", e)
             # Coba tanpa force
             try:
                 data = request.get_json()
             except Exception as e2:
-                print(f"❌ Error parsing JSON: {e2}")
+                logger.error("❌ Error parsing JSON: %s", e2)
                 return jsonify({'success': False, 'message': f'Error parsing JSON: {str(e2)}'}), 400
 
-        print(f"🔍 Debug get_latest_by_nik - Data received: {data}, Type: {type(data)}")
-
         if not data:
-            print(f"⚠️ Data kosong atau None")
+            logger.warning("⚠️ Data kosong atau None")
             # Coba ambil dari form data sebagai fallback
             nik_from_form = request.form.get('nik')
             if nik_from_form:
-                print(f"🔍 Found NIK in form data: {nik_from_form}")
+                logger.debug("Found NIK in form data: %s", nik_from_form)
                 data = {'nik': nik_from_form}
             else:
                 return jsonify({'success': False, 'message': 'Data tidak valid - pastikan mengirim JSON dengan field "nik"'}), 400
@@ -5774,8 +5206,6 @@ def get_latest_by_nik():
         else:
             nik = str(nik_value).strip()
 
-        print(f"🔍 Debug get_latest_by_nik - NIK extracted: '{nik}', length: {len(nik) if nik else 0}, type: {type(nik)}")
-
         if not nik:
             return jsonify({'success': False, 'message': 'NIK tidak boleh kosong'}), 400
 
@@ -5788,125 +5218,29 @@ def get_latest_by_nik():
         if not connection:
             return jsonify({'success': False, 'message': 'Koneksi database gagal!'}), 500
 
+        cursor = None
         try:
             cursor = connection.cursor()
 
-            # Ambil data terakhir berdasarkan NIK (urutan berdasarkan created_at DESC)
-            cursor.execute("""
-                SELECT * FROM biodata_kegiatan
-                WHERE nik = ?
-                ORDER BY created_at DESC
-                LIMIT 1
-            """, (nik,))
-
-            biodata_row = cursor.fetchone()
-
-            if biodata_row:
-                biodata = row_to_dict(biodata_row)
-                # Log untuk debugging - lihat apa yang dikembalikan dari database
-                print(f"Debug get_latest_by_nik - biodata dari DB: keys={list(biodata.keys())}")
-                print(f"Debug get_latest_by_nik - tanggal_lahir dari DB: {biodata.get('tanggal_lahir')}, type={type(biodata.get('tanggal_lahir'))}")
-
-                # Konversi biodata dict ke format yang bisa di-serialize ke JSON
-                # Convert datetime objects ke string, tapi tetap simpan value asli untuk field penting
-                biodata_dict = {}
-                for key, value in biodata.items():
-                    if value is None:
-                        biodata_dict[key] = None
-                    elif isinstance(value, datetime):
-                        # Format tanggal lahir sebagai date, created_at sebagai datetime
-                        if 'tanggal_lahir' in key.lower():
-                            biodata_dict[key] = value.strftime('%Y-%m-%d')
-                        elif 'created_at' in key.lower() or 'updated_at' in key.lower():
-                            biodata_dict[key] = value.strftime('%Y-%m-%d %H:%M:%S')
-                        else:
-                            biodata_dict[key] = value.strftime('%Y-%m-%d') if 'date' in key.lower() else value.strftime('%Y-%m-%d %H:%M:%S')
-                    elif isinstance(value, (bytes, bytearray)):
-                        biodata_dict[key] = value.decode('utf-8', errors='ignore')
-                    elif isinstance(value, (int, float)):
-                        biodata_dict[key] = value
-                    elif isinstance(value, bool):
-                        biodata_dict[key] = value
-                    else:
-                        # Tangani date object (dari MySQL DATE type bisa jadi date bukan datetime)
-                        # Juga tangani string yang sudah dalam format date
-                        if 'tanggal_lahir' in key.lower():
-                            # Pastikan tanggal_lahir selalu dalam format YYYY-MM-DD
-                            if hasattr(value, 'strftime'):
-                                # Date/datetime object
-                                biodata_dict[key] = value.strftime('%Y-%m-%d')
-                            elif isinstance(value, str):
-                                # String - coba parse dan format ulang jika perlu
-                                if len(value) >= 10:
-                                    # Ambil 10 karakter pertama (YYYY-MM-DD)
-                                    biodata_dict[key] = value[:10]
-                                else:
-                                    biodata_dict[key] = value
-                            else:
-                                biodata_dict[key] = str(value)
-                        else:
-                            # String dan tipe lainnya tetap sebagai string
-                            biodata_dict[key] = value
-
-                # Normalisasi path buku tabungan dan buat URL lengkap
-                if biodata_dict.get('buku_tabungan_path'):
-                    normalized_path = normalize_buku_tabungan_path(biodata_dict['buku_tabungan_path'])
-                    # Buat URL untuk akses gambar (relative path dari static)
-                    if normalized_path.startswith('static/'):
-                        biodata_dict['buku_tabungan_path'] = normalized_path
-                    elif normalized_path.startswith('uploads/'):
-                        biodata_dict['buku_tabungan_path'] = 'static/' + normalized_path
-                    else:
-                        biodata_dict['buku_tabungan_path'] = 'static/uploads/' + normalized_path
-
-                # Normalisasi path tanda tangan jika ada dan buat URL lengkap
-                if biodata_dict.get('tanda_tangan'):
-                    tanda_tangan_val = str(biodata_dict['tanda_tangan'])
-                    # Jika sudah base64, biarkan (untuk kompatibilitas)
-                    if tanda_tangan_val.startswith('data:image'):
-                        biodata_dict['tanda_tangan'] = tanda_tangan_val
-                    else:
-                        # Normalisasi path dan buat URL
-                        if 'uploads/' in tanda_tangan_val or tanda_tangan_val.startswith('static/'):
-                            normalized_ttd = normalize_buku_tabungan_path(tanda_tangan_val)
-                        else:
-                            normalized_ttd = tanda_tangan_val
-
-                        if normalized_ttd.startswith('static/'):
-                            biodata_dict['tanda_tangan'] = normalized_ttd
-                        elif normalized_ttd.startswith('uploads/'):
-                            biodata_dict['tanda_tangan'] = 'static/' + normalized_ttd
-                        else:
-                            biodata_dict['tanda_tangan'] = 'static/uploads/' + normalized_ttd
-
-                # Log untuk debugging tanggal_lahir
-                print(f"Debug get_latest_by_nik - tanggal_lahir dalam biodata_dict: {biodata_dict.get('tanggal_lahir')}")
-                print(f"Debug get_latest_by_nik - Keys dalam biodata_dict: {list(biodata_dict.keys())}")
-
-                return jsonify({
-                    'success': True,
-                    'data': biodata_dict
-                })
-            else:
+            # Satu lookup PRIMARY KEY ke nik_latest_profile (JSON autofill sudah jadi), lewat LRU proses
+            profile_json = get_nik_latest_profile(cursor, nik)
+            if profile_json is None:
                 return jsonify({
                     'success': False,
                     'message': 'Tidak ada data ditemukan untuk NIK tersebut'
                 })
+            return Response('{"success":true,"data":' + profile_json + '}', mimetype='application/json')
 
         except sqlite3.Error as e:
-            import traceback
-            print(f"❌ Error fetching biodata by NIK: {e}")
-            traceback.print_exc()
+            logger.exception("❌ Error fetching biodata by NIK: %s", e)
             return jsonify({'success': False, 'message': f'Terjadi kesalahan saat mengambil data: {str(e)}'}), 500
         finally:
-            if connection and connection is not None:
+            if cursor:
                 cursor.close()
-                connection.close()
+            connection.close()
 
     except Exception as e:
-        import traceback
-        print(f"❌ Unexpected error in get_latest_by_nik: {e}")
-        traceback.print_exc()
+        logger.exception("❌ Unexpected error in get_latest_by_nik: %s", e)
         return jsonify({'success': False, 'message': f'Terjadi kesalahan tidak terduga: {str(e)}'}), 500
 
 @app.route('/check-kegiatan', methods=['POST'])
@@ -5957,7 +5291,7 @@ def check_kegiatan():
         else:
             return jsonify({'has_data': False, 'message': 'Kegiatan tersedia'})
     except Exception as e:
-        print(f"Error checking kegiatan: {e}")
+        logger.error("Error checking kegiatan: %s", e)
         return jsonify({'has_data': False, 'message': f'Terjadi kesalahan: {str(e)}'})
     finally:
         if cursor:
@@ -5989,29 +5323,27 @@ def admin_kegiatan():
             cursor.execute("""
                 SELECT
                     k.nama_kegiatan,
-                    COALESCE(COUNT(b.id), 0) as jumlah_peserta,
+                    (SELECT COUNT(*) FROM biodata_kegiatan b WHERE b.kegiatan_id = k.id) as jumlah_peserta,
                     k.id as kegiatan_id,
                     COALESCE(k.is_hidden, 0) as is_hidden
                 FROM kegiatan_master k
                 INNER JOIN operator_kegiatan ok ON k.id = ok.kegiatan_id
-                LEFT JOIN biodata_kegiatan b ON TRIM(k.nama_kegiatan) = TRIM(b.nama_kegiatan)
                 WHERE ok.user_id = ?
                     AND TRIM(k.nama_kegiatan) != ''
-                GROUP BY k.id, k.nama_kegiatan, k.is_hidden
                 ORDER BY k.id DESC
             """, (user_id,))
         else:
             # Jika admin, tampilkan semua kegiatan
+            # (jumlah peserta lewat subquery per kegiatan: index kegiatan_id terpakai juga
+            # saat biodata_kegiatan berupa view skema peserta_profile)
             cursor.execute("""
                 SELECT
                     k.nama_kegiatan,
-                    COALESCE(COUNT(b.id), 0) as jumlah_peserta,
+                    (SELECT COUNT(*) FROM biodata_kegiatan b WHERE b.kegiatan_id = k.id) as jumlah_peserta,
                     k.id as kegiatan_id,
                     COALESCE(k.is_hidden, 0) as is_hidden
                 FROM kegiatan_master k
-                LEFT JOIN biodata_kegiatan b ON TRIM(k.nama_kegiatan) = TRIM(b.nama_kegiatan)
                 WHERE TRIM(k.nama_kegiatan) != ''
-                GROUP BY k.id, k.nama_kegiatan, k.is_hidden
                 ORDER BY k.id DESC
             """)
         kegiatan_list = cursor.fetchall()
@@ -6059,6 +5391,7 @@ def toggle_hide_kegiatan(kegiatan_id):
             SET is_hidden = ?, updated_at = CURRENT_TIMESTAMP
             WHERE id = ?
         """, (new_hidden, kegiatan_id))
+        invalidate_cache(cursor, 'kegiatan')
         connection.commit()
         
         status_text = "disembunyikan" if new_hidden == 1 else "ditampilkan"
@@ -6248,6 +5581,9 @@ def admin_tambah_kegiatan():
                             INSERT INTO kegiatan_master (nama_kegiatan, waktu_pelaksanaan, tempat_pelaksanaan)
                             VALUES (?, ?, ?)
                         """, (nama_kegiatan, waktu_pelaksanaan, tempat_pelaksanaan))
+                        # Hubungkan biodata lama dengan nama kegiatan yang sama (jika ada)
+                        link_biodata_to_kegiatan(cursor, cursor.lastrowid, nama_kegiatan)
+                        invalidate_cache(cursor, 'kegiatan')
                         connection.commit()
                         flash('Kegiatan berhasil ditambahkan!', 'success')
                         return redirect(url_for('admin_kegiatan'))
@@ -6374,16 +5710,18 @@ def _edit_kegiatan(kegiatan_id, is_operator=False):
 
                         # Jika nama_kegiatan berubah, update semua biodata yang terkait
                         if old_nama_kegiatan != new_nama_kegiatan:
-                            # Update semua biodata_kegiatan yang memiliki nama_kegiatan lama
-                            cursor.execute("""
+                            # Update semua biodata_kegiatan yang terhubung ke kegiatan ini
+                            jumlah_terupdate = biodata_write(cursor, """
                                 UPDATE biodata_kegiatan
                                 SET nama_kegiatan = ?,
                                     waktu_pelaksanaan = ?,
                                     tempat_pelaksanaan = ?
-                                WHERE TRIM(nama_kegiatan) = TRIM(?)
-                            """, (new_nama_kegiatan, waktu_pelaksanaan, tempat_pelaksanaan, old_nama_kegiatan))
-                            jumlah_terupdate = cursor.rowcount
+                                WHERE kegiatan_id = ?
+                            """, (new_nama_kegiatan, waktu_pelaksanaan, tempat_pelaksanaan, kegiatan_id))
+                            # Biodata lama yang belum terhubung tapi sudah memakai nama baru ikut dihubungkan
+                            link_biodata_to_kegiatan(cursor, kegiatan_id, new_nama_kegiatan)
 
+                            invalidate_cache(cursor, 'kegiatan', 'biodata')
                             connection.commit()
                             if jumlah_terupdate > 0:
                                 flash(f'Kegiatan berhasil diperbarui! {jumlah_terupdate} data biodata terkait juga telah diperbarui.', 'success')
@@ -6391,14 +5729,14 @@ def _edit_kegiatan(kegiatan_id, is_operator=False):
                                 flash('Kegiatan berhasil diperbarui!', 'success')
                         else:
                             # Jika hanya waktu atau tempat yang berubah, update juga biodata
-                            cursor.execute("""
+                            jumlah_terupdate = biodata_write(cursor, """
                                 UPDATE biodata_kegiatan
                                 SET waktu_pelaksanaan = ?,
                                     tempat_pelaksanaan = ?
-                                WHERE TRIM(nama_kegiatan) = TRIM(?)
-                            """, (waktu_pelaksanaan, tempat_pelaksanaan, new_nama_kegiatan))
-                            jumlah_terupdate = cursor.rowcount
+                                WHERE kegiatan_id = ?
+                            """, (waktu_pelaksanaan, tempat_pelaksanaan, kegiatan_id))
 
+                            invalidate_cache(cursor, 'kegiatan', 'biodata')
                             connection.commit()
                             if jumlah_terupdate > 0:
                                 flash(f'Kegiatan berhasil diperbarui! {jumlah_terupdate} data biodata terkait juga telah diperbarui.', 'success')
@@ -6416,22 +5754,18 @@ def _edit_kegiatan(kegiatan_id, is_operator=False):
                     if connection:
                         connection.rollback()
                     flash(f'Terjadi kesalahan saat memperbarui data: {str(e)}', 'error')
-                    import traceback
-                    traceback.print_exc()
+                    logger.exception("❌ Terjadi kesalahan saat memperbarui data")
                 except Exception as e:
                     if connection:
                         connection.rollback()
                     flash(f'Terjadi kesalahan tidak terduga: {str(e)}', 'error')
-                    import traceback
-                    traceback.print_exc()
+                    logger.exception("❌ Terjadi kesalahan tidak terduga")
     except sqlite3.Error as e:
         flash(f'Terjadi kesalahan: {str(e)}', 'error')
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Terjadi kesalahan")
     except Exception as e:
         flash(f'Terjadi kesalahan tidak terduga: {str(e)}', 'error')
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Terjadi kesalahan tidak terduga")
     finally:
         if connection:
             try:
@@ -6505,7 +5839,7 @@ def admin_edit_biodata(nik, nama_kegiatan):
                 kegiatan_list.append({'nama_kegiatan': current_nama})
                 kegiatan_list.sort(key=lambda x: (x.get('nama_kegiatan') or ''))
         except sqlite3.Error as e:
-            print(f"Error fetching kegiatan: {e}")
+            logger.error("Error fetching kegiatan: %s", e)
         finally:
             if connection is not None:
                 cursor.close()
@@ -6528,46 +5862,46 @@ def admin_edit_biodata(nik, nama_kegiatan):
             tanda_tangan_base64 = form_data.get('tanda_tangan')
             if tanda_tangan_base64:
                 # Admin membuat tanda tangan baru, simpan sebagai file
-                print(f"DEBUG admin_edit_biodata: Processing new tanda_tangan (length: {len(tanda_tangan_base64)})")
+                logger.debug("admin_edit_biodata: Processing new tanda_tangan (length: %s)", len(tanda_tangan_base64))
                 # Cek apakah sudah berupa path file atau masih base64
                 if 'uploads/' in str(tanda_tangan_base64) or str(tanda_tangan_base64).startswith('static/'):
                     # Sudah berupa path file, normalisasi saja
                     form_data['tanda_tangan'] = normalize_buku_tabungan_path(tanda_tangan_base64)
-                    print(f"DEBUG admin_edit_biodata: Tanda tangan sudah berupa path: {form_data['tanda_tangan']}")
+                    logger.debug("admin_edit_biodata: Tanda tangan sudah berupa path: %s", form_data['tanda_tangan'])
                 else:
                     # Masih base64, simpan sebagai file
-                    print(f"DEBUG admin_edit_biodata: Tanda tangan adalah base64, menyimpan sebagai file...")
+                    logger.debug("admin_edit_biodata: Tanda tangan adalah base64, menyimpan sebagai file...")
                     tanda_tangan_path = save_tanda_tangan_file(tanda_tangan_base64, form_data['nik'])
                     if tanda_tangan_path:
                         form_data['tanda_tangan'] = tanda_tangan_path
-                        print(f"DEBUG admin_edit_biodata: Tanda tangan disimpan sebagai file: {tanda_tangan_path}")
+                        logger.debug("admin_edit_biodata: Tanda tangan disimpan sebagai file: %s", tanda_tangan_path)
                     else:
                         flash('Gagal menyimpan tanda tangan!', 'error')
                         return render_template('admin/admin-edit-biodata.html', biodata=biodata, kegiatan_list=kegiatan_list, username=get_username(), nik=nik, nama_kegiatan=nama_kegiatan, current_year=current_year)
             elif biodata and biodata.get('tanda_tangan'):
                 # Admin tidak mengubah tanda tangan, gunakan tanda tangan yang sudah ada
                 existing_ttd = biodata.get('tanda_tangan')
-                print(f"DEBUG admin_edit_biodata: Using existing tanda_tangan (length: {len(existing_ttd) if existing_ttd else 0})")
+                logger.debug("admin_edit_biodata: Using existing tanda_tangan (length: %s)", len(existing_ttd) if existing_ttd else 0)
                 # Cek apakah sudah berupa path file atau masih base64
                 if existing_ttd and ('uploads/' in str(existing_ttd) or str(existing_ttd).startswith('static/')):
                     # Sudah berupa path file, normalisasi saja
                     form_data['tanda_tangan'] = normalize_buku_tabungan_path(existing_ttd)
-                    print(f"DEBUG admin_edit_biodata: Existing tanda tangan adalah path: {form_data['tanda_tangan']}")
+                    logger.debug("admin_edit_biodata: Existing tanda tangan adalah path: %s", form_data['tanda_tangan'])
                 elif existing_ttd:
                     # Masih base64, simpan sebagai file
-                    print(f"DEBUG admin_edit_biodata: Existing tanda tangan adalah base64, menyimpan sebagai file...")
+                    logger.debug("admin_edit_biodata: Existing tanda tangan adalah base64, menyimpan sebagai file...")
                     tanda_tangan_path = save_tanda_tangan_file(existing_ttd, form_data['nik'])
                     if tanda_tangan_path:
                         form_data['tanda_tangan'] = tanda_tangan_path
-                        print(f"DEBUG admin_edit_biodata: Existing tanda tangan disimpan sebagai file: {tanda_tangan_path}")
+                        logger.debug("admin_edit_biodata: Existing tanda tangan disimpan sebagai file: %s", tanda_tangan_path)
                     else:
                         # Jika gagal, tetap gunakan base64 yang ada
                         form_data['tanda_tangan'] = existing_ttd
-                        print(f"DEBUG admin_edit_biodata: Gagal menyimpan existing tanda tangan, menggunakan base64")
+                        logger.debug("admin_edit_biodata: Gagal menyimpan existing tanda tangan, menggunakan base64")
                 else:
                     form_data['tanda_tangan'] = existing_ttd
             else:
-                print(f"DEBUG admin_edit_biodata: WARNING - No tanda_tangan provided and no existing tanda_tangan!")
+                logger.warning("admin_edit_biodata: No tanda_tangan provided and no existing tanda_tangan!")
 
             # Validasi
             if not form_data['nik']:
@@ -6603,9 +5937,7 @@ def admin_edit_biodata(nik, nama_kegiatan):
                 return render_template('admin/admin-edit-biodata.html', biodata=biodata, kegiatan_list=kegiatan_list, username=get_username(), nik=nik, nama_kegiatan=nama_kegiatan, current_year=current_year)
 
         except Exception as e:
-            print(f"Unexpected error in admin_edit_biodata: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Unexpected error in admin_edit_biodata: %s", e)
             flash(f'Terjadi kesalahan tidak terduga: {str(e)}', 'error')
             return render_template('admin/admin-edit-biodata.html', biodata=biodata, kegiatan_list=kegiatan_list, username=get_username(), nik=nik, nama_kegiatan=nama_kegiatan, current_year=current_year)
 
@@ -6662,21 +5994,21 @@ def _hapus_kegiatan(kegiatan_id, is_operator=False):
 
             # Update semua biodata_kegiatan yang memiliki nama_kegiatan yang sama
             # Set nama_kegiatan, waktu_pelaksanaan, dan tempat_pelaksanaan menjadi string kosong (data user lainnya tetap utuh)
-            cursor.execute("""
+            jumlah_terpengaruh = biodata_write(cursor, """
                 UPDATE biodata_kegiatan
                 SET nama_kegiatan = '',
                     waktu_pelaksanaan = '',
-                    tempat_pelaksanaan = ''
-                WHERE TRIM(nama_kegiatan) = TRIM(?)
-            """, (nama_kegiatan,))
-
-            jumlah_terpengaruh = cursor.rowcount
+                    tempat_pelaksanaan = '',
+                    kegiatan_id = NULL
+                WHERE kegiatan_id = ?
+            """, (kegiatan_id,))
 
             # Hapus relasi operator_kegiatan yang terkait
             cursor.execute("DELETE FROM operator_kegiatan WHERE kegiatan_id = ?", (kegiatan_id,))
 
             # Hapus kegiatan dari kegiatan_master
             cursor.execute("DELETE FROM kegiatan_master WHERE id = ?", (kegiatan_id,))
+            invalidate_cache(cursor, 'kegiatan', 'biodata')
             connection.commit()
 
             if jumlah_terpengaruh > 0:
@@ -6754,6 +6086,7 @@ def admin_hapus_biodata(nik, nama_kegiatan):
                 WHERE nik = ? AND (nama_kegiatan IS NULL OR TRIM(COALESCE(nama_kegiatan, '')) = '')
             """, (nik,))
 
+        invalidate_cache(cursor, 'biodata', niks=(nik,))
         connection.commit()
         kegiatan_display = nama_kegiatan.strip() if nama_kegiatan and nama_kegiatan.strip() else '(Kegiatan Kosong)'
         flash(f'Data biodata untuk "{nama_lengkap}" (NIK: {nik}) pada kegiatan "{kegiatan_display}" berhasil dihapus!', 'success')
@@ -6761,7 +6094,7 @@ def admin_hapus_biodata(nik, nama_kegiatan):
     except sqlite3.Error as e:
         if connection:
             connection.rollback()
-        print(f"Error deleting biodata: {e}")
+        logger.error("Error deleting biodata: %s", e)
         flash(f'Terjadi kesalahan saat menghapus data: {str(e)}', 'error')
     finally:
         if connection:
@@ -6909,7 +6242,7 @@ def admin_tambah_operator():
             """)
             operators_list = cursor.fetchall()
         except sqlite3.Error as e:
-            print(f"Error fetching operators list: {e}")
+            logger.error("Error fetching operators list: %s", e)
         finally:
             if connection is not None:
                 cursor.close()
@@ -7233,6 +6566,7 @@ def admin_hapus_operator(operator_id):
 
 @app.route('/admin/export-all-pdf/<path:nama_kegiatan>')
 @admin_required
+@export_job
 def export_all_pdf_kegiatan(nama_kegiatan):
     """Export semua biodata per kegiatan ke PDF - 1 user 1 halaman"""
     from urllib.parse import unquote
@@ -7270,21 +6604,34 @@ def export_all_pdf_kegiatan(nama_kegiatan):
             flash('Terjadi kesalahan saat memverifikasi akses!', 'error')
             return redirect(url_for('admin_kegiatan'))
 
+    content_disposition = f'attachment; filename=biodata_{nama_kegiatan.replace(" ", "_")}.pdf'
     all_biodata = []
     try:
         cursor = connection.cursor()
         params = [nama_kegiatan]
         kabupaten_filter = request.args.get('kabupaten_kota', '').strip()
 
-        base_query = """
-            SELECT * FROM biodata_kegiatan
+        from_clause = """
+            FROM biodata_kegiatan
             WHERE TRIM(nama_kegiatan) = TRIM(?)
         """
         if kabupaten_filter:
-            base_query += " AND TRIM(kabupaten_kota) = TRIM(?)"
+            from_clause += " AND TRIM(kabupaten_kota) = TRIM(?)"
             params.append(kabupaten_filter)
 
-        base_query += " ORDER BY kabupaten_kota ASC, nama_lengkap ASC"
+        # PDF yang sama (data belum berubah) dikirim dari cache tanpa render ulang
+        versi_data = export_data_version(cursor, from_clause, params)
+        versi_laporan = report_cache_version(export_tanda_tangan_values(cursor, from_clause, params))
+        cache_key = export_cache_key(
+            'export_all_pdf_kegiatan', versi_laporan, nama_kegiatan, kabupaten_filter,
+            export_cache_scope(), versi_data
+        )
+        if versi_data[0]:
+            cached = cached_export_response(cache_key, '.pdf', 'application/pdf', content_disposition)
+            if cached:
+                return cached
+
+        base_query = "SELECT * " + from_clause + " ORDER BY kabupaten_kota ASC, nama_lengkap ASC"
 
         # Pastikan semua kolom termasuk tanda_tangan diambil
         cursor.execute(base_query, params)
@@ -7296,35 +6643,26 @@ def export_all_pdf_kegiatan(nama_kegiatan):
             return redirect(url_for('admin_detail_kegiatan', nama_kegiatan=nama_kegiatan))
 
         # Limit maksimal untuk export (5000 rows)
-        MAX_EXPORT_ROWS = 5000
+        MAX_EXPORT_ROWS = export_row_limit(5000)
         if len(all_biodata) > MAX_EXPORT_ROWS:
             flash(f'Data terlalu besar ({len(all_biodata)} rows). Maksimal {MAX_EXPORT_ROWS} rows untuk export. Silakan gunakan filter yang lebih spesifik.', 'error')
             return redirect(url_for('admin_detail_kegiatan', nama_kegiatan=nama_kegiatan))
 
         # Warning jika data > 1000 rows
         if len(all_biodata) > 1000:
-            print(f"WARNING: Export PDF dengan {len(all_biodata)} rows - mungkin memakan waktu lama")
+            logger.warning("Export PDF dengan %s rows - mungkin memakan waktu lama", len(all_biodata))
 
         # Debug: Check tanda_tangan in database results
-        print(f"DEBUG export_all_pdf: ===== DATABASE QUERY RESULTS =====")
-        print(f"DEBUG export_all_pdf: Total biodata retrieved: {len(all_biodata)}")
-        print(f"DEBUG export_all_pdf: Nama kegiatan: {nama_kegiatan}")
-        for idx, biodata in enumerate(all_biodata):
-            print(f"DEBUG export_all_pdf: --- Biodata {idx} ---")
-            print(f"DEBUG export_all_pdf: NIK: {biodata.get('nik')}, Nama: {biodata.get('nama_lengkap')}")
-            print(f"DEBUG export_all_pdf: Fields in biodata: {list(biodata.keys())}")
-            print(f"DEBUG export_all_pdf: tanda_tangan field exists: {'tanda_tangan' in biodata}")
-            print(f"DEBUG export_all_pdf: tanda_tangan is not None: {biodata.get('tanda_tangan') is not None}")
-            if biodata.get('tanda_tangan'):
-                tanda_tangan_val = biodata.get('tanda_tangan')
-                print(f"DEBUG export_all_pdf: tanda_tangan type: {type(tanda_tangan_val)}")
-                if isinstance(tanda_tangan_val, str):
-                    print(f"DEBUG export_all_pdf: tanda_tangan length: {len(tanda_tangan_val)}")
-                    if len(tanda_tangan_val) > 0:
-                        print(f"DEBUG export_all_pdf: tanda_tangan starts with data:image: {tanda_tangan_val.startswith('data:image')}")
-                        print(f"DEBUG export_all_pdf: tanda_tangan preview (first 100 chars): {tanda_tangan_val[:100]}")
-            else:
-                print(f"DEBUG export_all_pdf: WARNING: tanda_tangan is None or empty for this biodata!")
+        logger.debug("export_all_pdf: ===== DATABASE QUERY RESULTS =====")
+        logger.debug("export_all_pdf: Total biodata retrieved: %s", len(all_biodata))
+        logger.debug("export_all_pdf: Nama kegiatan: %s", nama_kegiatan)
+        # Loop per peserta hanya dijalankan jika level DEBUG aktif
+        if logger.isEnabledFor(logging.DEBUG):
+            for idx, biodata in enumerate(all_biodata):
+                logger.debug(
+                    "export_all_pdf: biodata %s - NIK: %s, Nama: %s, tanda_tangan: %s",
+                    idx, biodata.get('nik'), biodata.get('nama_lengkap'), jenis_tanda_tangan(biodata.get('tanda_tangan'))
+                )
 
         # Normalisasi path buku tabungan untuk setiap biodata
         for biodata in all_biodata:
@@ -7338,510 +6676,21 @@ def export_all_pdf_kegiatan(nama_kegiatan):
             cursor.close()
             connection.close()
 
-    # Load logo untuk header
-    logo_path = os.path.join(BASE_DIR, 'static', 'Logo_BGTK.png')
-    logo_img = None
-    logo_width = 0
-    logo_height = 0
-    if os.path.exists(logo_path):
-        try:
-            logo_pil = Image.open(logo_path)
-            # Resize logo untuk header (max height 0.6 inch)
-            max_logo_height = 0.6 * inch
-            logo_ratio = logo_pil.width / logo_pil.height
-            logo_width = max_logo_height * logo_ratio
-            logo_height = max_logo_height
-
-            # Convert PIL Image to reportlab Image
-            logo_buffer = io.BytesIO()
-            logo_pil.save(logo_buffer, format='PNG')
-            logo_buffer.seek(0)
-            logo_img = RLImage(logo_buffer, width=logo_width, height=logo_height)
-        except Exception as e:
-            print(f"Error loading logo: {e}")
-            logo_img = None
-
-    # Load logo Pendidikan Bermutu dengan background transparan
-    pendidikan_bermutu_path = os.path.join(BASE_DIR, 'static', 'Pendidikan Bermutu untuk Semua.png')
-    pendidikan_bermutu_processed_path = None
-    pendidikan_bermutu_width = 0
-    pendidikan_bermutu_height = 0
-    pendidikan_bermutu_temp_file = None
-    if os.path.exists(pendidikan_bermutu_path):
-        try:
-            pendidikan_bermutu_pil = Image.open(pendidikan_bermutu_path)
-            # Convert ke RGBA jika belum
-            if pendidikan_bermutu_pil.mode != 'RGBA':
-                pendidikan_bermutu_pil = pendidikan_bermutu_pil.convert('RGBA')
-
-            # Hapus background hitam (buat transparan)
-            pixels = pendidikan_bermutu_pil.load()
-            width, height = pendidikan_bermutu_pil.size
-            black_threshold = 30  # Threshold untuk mendeteksi warna hitam
-
-            for x in range(width):
-                for y in range(height):
-                    r, g, b, a = pixels[x, y]
-                    # Jika pixel sangat gelap (background hitam), buat transparan
-                    if r < black_threshold and g < black_threshold and b < black_threshold:
-                        pixels[x, y] = (r, g, b, 0)
-
-            # Hitung ukuran untuk header (max height 0.5 inch - diperkecil)
-            # Tapi jangan resize dengan PIL, biarkan reportlab yang handle resize untuk kualitas lebih baik
-            max_logo_height = 0.5 * inch
-            pendidikan_bermutu_ratio = pendidikan_bermutu_pil.width / pendidikan_bermutu_pil.height
-            pendidikan_bermutu_width = max_logo_height * pendidikan_bermutu_ratio
-            pendidikan_bermutu_height = max_logo_height
-
-            # Simpan gambar asli (tanpa resize) ke temporary file dengan kualitas tinggi
-            # Biarkan reportlab yang handle resize dengan preserveAspectRatio untuk kualitas lebih tajam
-            pendidikan_bermutu_temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-            pendidikan_bermutu_pil.save(pendidikan_bermutu_temp_file.name, format='PNG', optimize=False)
-            pendidikan_bermutu_processed_path = pendidikan_bermutu_temp_file.name
-        except Exception as e:
-            print(f"Error loading logo Pendidikan Bermutu: {e}")
-
-    # Load logo Ramah dengan background transparan
-    ramah_path = os.path.join(BASE_DIR, 'static', 'Ramah.png')
-    ramah_processed_path = None
-    ramah_width = 0
-    ramah_height = 0
-    ramah_temp_file = None
-    if os.path.exists(ramah_path):
-        try:
-            ramah_pil = Image.open(ramah_path)
-            # Convert ke RGBA jika belum
-            if ramah_pil.mode != 'RGBA':
-                ramah_pil = ramah_pil.convert('RGBA')
-
-            # Hapus background hitam (buat transparan)
-            pixels = ramah_pil.load()
-            width, height = ramah_pil.size
-            black_threshold = 30  # Threshold untuk mendeteksi warna hitam
-
-            for x in range(width):
-                for y in range(height):
-                    r, g, b, a = pixels[x, y]
-                    # Jika pixel sangat gelap (background hitam), buat transparan
-                    if r < black_threshold and g < black_threshold and b < black_threshold:
-                        pixels[x, y] = (r, g, b, 0)
-
-            # Hitung ukuran untuk header (max height 0.5 inch - diperkecil)
-            # Tapi jangan resize dengan PIL, biarkan reportlab yang handle resize untuk kualitas lebih baik
-            max_logo_height = 0.5 * inch
-            ramah_ratio = ramah_pil.width / ramah_pil.height
-            ramah_width = max_logo_height * ramah_ratio
-            ramah_height = max_logo_height
-
-            # Simpan gambar asli (tanpa resize) ke temporary file dengan kualitas tinggi
-            # Biarkan reportlab yang handle resize dengan preserveAspectRatio untuk kualitas lebih tajam
-            ramah_temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-            ramah_pil.save(ramah_temp_file.name, format='PNG', optimize=False)
-            ramah_processed_path = ramah_temp_file.name
-        except Exception as e:
-            print(f"Error loading logo Ramah: {e}")
-
-    # Fungsi untuk header dengan logo dan footer
-    def add_header_footer(canvas, doc):
-        canvas.saveState()
-
-        # Hitung tinggi logo terbesar untuk alignment vertikal (hanya logo BGTK di header)
-        max_logo_h = logo_height if logo_height > 0 else 0
-
-        # Header - Logo BGTK di kiri
-        if logo_img and logo_height > 0:
-            try:
-                logo_x = 25
-                logo_y = F4_SIZE[1] - 25 - max_logo_h
-                canvas.drawImage(logo_path, logo_x, logo_y, width=logo_width, height=logo_height, preserveAspectRatio=True)
-            except Exception as e:
-                print(f"Error drawing logo: {e}")
-
-        # Garis header
-        canvas.setStrokeColor(colors.HexColor('#067ac1'))
-        canvas.setLineWidth(1.5)
-        max_header_height = logo_height if logo_height > 0 else 0
-        header_line_y = F4_SIZE[1] - 25 - max_header_height - 5
-        canvas.line(25, header_line_y, F4_SIZE[0] - 25, header_line_y)
-
-        # Footer - Logo Pendidikan Bermutu dan Ramah di kanan bawah
-        max_footer_logo_height = max(pendidikan_bermutu_height if pendidikan_bermutu_height > 0 else 0,
-                                    ramah_height if ramah_height > 0 else 0)
-        footer_logo_y = 45  # Posisi Y untuk logo footer
-
-        if max_footer_logo_height > 0:
-            # Hitung total lebar kedua logo + spacing
-            total_footer_logo_width = (pendidikan_bermutu_width if pendidikan_bermutu_height > 0 else 0) + \
-                                     (ramah_width if ramah_height > 0 else 0) + 10  # 10 pt spacing antara logo
-            # Posisi X untuk logo di kanan (rata kanan dengan margin 25)
-            footer_logo_start_x = F4_SIZE[0] - 25 - total_footer_logo_width
-
-            # Logo Pendidikan Bermutu di kiri (dalam footer)
-            if pendidikan_bermutu_processed_path and os.path.exists(pendidikan_bermutu_processed_path) and pendidikan_bermutu_height > 0:
-                try:
-                    pendidikan_bermutu_footer_x = footer_logo_start_x
-                    pendidikan_bermutu_footer_y = footer_logo_y
-                    canvas.drawImage(pendidikan_bermutu_processed_path, pendidikan_bermutu_footer_x, pendidikan_bermutu_footer_y,
-                                   width=pendidikan_bermutu_width, height=pendidikan_bermutu_height, preserveAspectRatio=True, mask='auto')
-                except Exception as e:
-                    print(f"Error drawing logo Pendidikan Bermutu di footer: {e}")
-
-            # Logo Ramah di kanan (dalam footer)
-            if ramah_processed_path and os.path.exists(ramah_processed_path) and ramah_height > 0:
-                try:
-                    ramah_footer_x = footer_logo_start_x + (pendidikan_bermutu_width if pendidikan_bermutu_height > 0 else 0) + 10
-                    ramah_footer_y = footer_logo_y
-                    canvas.drawImage(ramah_processed_path, ramah_footer_x, ramah_footer_y,
-                                   width=ramah_width, height=ramah_height, preserveAspectRatio=True, mask='auto')
-                except Exception as e:
-                    print(f"Error drawing logo Ramah di footer: {e}")
-
-        # Garis footer (di bawah logo)
-        canvas.setStrokeColor(colors.HexColor('#067ac1'))
-        canvas.setLineWidth(1)
-        footer_line_y = footer_logo_y - 10  # Garis di bawah logo dengan spacing 10
-        canvas.line(25, footer_line_y, F4_SIZE[0] - 25, footer_line_y)
-
-        # Footer - Tanggal dan waktu export WITA (di bawah garis)
-        canvas.setFont('Helvetica', 8)
-        canvas.setFillColor(colors.black)
-        # WITA = UTC+8
-        wita_time = datetime.utcnow() + timedelta(hours=8)
-        footer_text = f"Dicetak pada: {wita_time.strftime('%d/%m/%Y %H:%M')} WITA"
-        footer_width = canvas.stringWidth(footer_text, 'Helvetica', 8)
-        footer_x = 25  # Rata kiri dengan margin 25 pt
-        footer_y = footer_line_y - 15  # Tanggal di bawah garis
-        canvas.drawString(footer_x, footer_y, footer_text)
-
-        canvas.restoreState()
-
-    # Gunakan kertas F4 (8.27 x 13 inch) dan beri ruang header
-    buffer = io.BytesIO()
-    # Gunakan tinggi logo terbesar untuk margin (hanya logo BGTK di header)
-    max_header_logo_height = logo_height if logo_height > 0 else 0
-    top_margin_with_logo = 25 + max_header_logo_height + 15
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=F4_SIZE,
-        rightMargin=25,
-        leftMargin=25,
-        topMargin=top_margin_with_logo,
-        bottomMargin=40
-    )
-
-    # Container untuk elemen PDF
-    elements = []
-
-    # Styles - lebih compact untuk muat di 1 halaman
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=20,
-        textColor=colors.black,
-        spaceAfter=12,
-        spaceBefore=0,
-        alignment=1,  # Center
-        fontName='Helvetica-Bold',
-        leading=24
-    )
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=9,
-        leading=11,
-        textColor=colors.black,
-        alignment=0  # Left
-    )
-    value_style = ParagraphStyle(
-        'ValueStyle',
-        parent=styles['Normal'],
-        fontSize=9,
-        leading=11,
-        textColor=colors.black,
-        alignment=0,  # Left
-        leftIndent=0,
-        rightIndent=0
-    )
-
-    # Field mapping untuk label yang lebih readable dan profesional
-    field_labels = {
-        'nik': 'NIK',
-        'nama_lengkap': 'Nama Lengkap',
-        'nip_nippk': 'NIP/NIPPK',
-        'tempat_lahir': 'Tempat Lahir',
-        'tanggal_lahir': 'Tanggal Lahir',
-        'jenis_kelamin': 'Jenis Kelamin',
-        'agama': 'Agama',
-        'pendidikan_terakhir': 'Pendidikan Terakhir',
-        'jurusan': 'Jurusan',
-        'status_asn': 'Status Kepegawaian',
-        'pangkat_golongan': 'Pangkat / Golongan',
-        'jabatan': 'Jabatan',
-        'instansi': 'Nama Instansi',
-        'alamat_instansi': 'Alamat Instansi',
-        'alamat_domisili': 'Alamat Domisili',
-        'kabupaten_kota': 'Kabupaten/Kota',
-        'kabko_lainnya': 'Kabupaten/Kota Lainnya',
-        'peran': 'Peran dalam Kegiatan',
-        'no_hp': 'Nomor HP',
-        'alamat_email': 'Alamat Email',
-        'npwp': 'NPWP',
-        'nama_bank': 'Nama Bank',
-        'nama_bank_lainnya': 'Nama Bank Lainnya',
-        'no_rekening': 'Nomor Rekening',
-        'nama_pemilik_rekening': 'Nama Pemilik Rekening'
-    }
-
-    # Urutan field yang diinginkan
-    field_order = [
-        'nik', 'nama_lengkap', 'nip_nippk', 'tempat_lahir', 'tanggal_lahir',
-        'jenis_kelamin', 'agama', 'pendidikan_terakhir', 'jurusan',
-        'status_asn', 'pangkat_golongan', 'jabatan', 'instansi',
-        'alamat_instansi', 'alamat_domisili', 'kabupaten_kota', 'kabko_lainnya',
-        'peran',
-        'no_hp', 'alamat_email', 'npwp',
-        'nama_bank', 'nama_bank_lainnya', 'no_rekening', 'nama_pemilik_rekening'
-    ]
-
-    # Exclude fields yang tidak perlu ditampilkan
-    exclude_fields = ['id', 'user_id', 'buku_tabungan_path', 'tanda_tangan', 'created_at', 'updated_at', 'nama_kegiatan', 'waktu_pelaksanaan', 'tempat_pelaksanaan']
-
-    # List untuk menyimpan temporary files tanda tangan untuk cleanup
-    tanda_tangan_temp_files = []
-
-    # Loop untuk setiap user - buat 1 halaman per user
-    for user_idx, biodata in enumerate(all_biodata):
-        # Tambahkan page break kecuali untuk user pertama
-        if user_idx > 0:
-            elements.append(PageBreak())
-
-        # Title
-        title = Paragraph("BIODATA KEGIATAN", title_style)
-        elements.append(title)
-        elements.append(Spacer(1, 0.15*inch))
-
-        # Ambil data kegiatan untuk header tabel
-        biodata_nama_kegiatan = biodata.get('nama_kegiatan', '-')
-        waktu_pelaksanaan = biodata.get('waktu_pelaksanaan', '-')
-        tempat_pelaksanaan = biodata.get('tempat_pelaksanaan', '-')
-
-        # Buat header informasi kegiatan di atas tabel dengan titik dua yang sejajar
-        if biodata_nama_kegiatan or waktu_pelaksanaan or tempat_pelaksanaan:
-            info_style = ParagraphStyle(
-                'InfoStyle',
-                parent=styles['Normal'],
-                fontSize=10,
-                leading=14,
-                textColor=colors.black,
-                alignment=0,  # Left align
-                fontName='Helvetica-Bold'
-            )
-
-            # Buat tabel kecil untuk info kegiatan agar titik dua sejajar
-            # Pisahkan label dan titik dua menjadi kolom terpisah
-            info_table_data = []
-            if biodata_nama_kegiatan and str(biodata_nama_kegiatan).strip() and str(biodata_nama_kegiatan).strip() != '-':
-                info_table_data.append([
-                    Paragraph("<b>Nama Kegiatan</b>", info_style),
-                    Paragraph(":", info_style),
-                    Paragraph(str(biodata_nama_kegiatan), info_style)
-                ])
-            if waktu_pelaksanaan and str(waktu_pelaksanaan).strip() and str(waktu_pelaksanaan).strip() != '-':
-                info_table_data.append([
-                    Paragraph("<b>Waktu Pelaksanaan</b>", info_style),
-                    Paragraph(":", info_style),
-                    Paragraph(str(waktu_pelaksanaan), info_style)
-                ])
-            if tempat_pelaksanaan and str(tempat_pelaksanaan).strip() and str(tempat_pelaksanaan).strip() != '-':
-                info_table_data.append([
-                    Paragraph("<b>Tempat Pelaksanaan</b>", info_style),
-                    Paragraph(":", info_style),
-                    Paragraph(str(tempat_pelaksanaan), info_style)
-                ])
-
-            if info_table_data:
-                # Hitung lebar yang sama dengan tabel utama agar sejajar dengan border biru
-                available_width = (8.27 * inch) - (25 * 2)
-                # Gunakan 3 kolom: label, titik dua, value
-                # Lebar kolom disesuaikan agar titik dua sejajar dan lebar total sama dengan tabel utama
-                info_table = Table(info_table_data, colWidths=[2.2*inch, 0.15*inch, available_width - 2.2*inch - 0.15*inch])
-                info_table.setStyle(TableStyle([
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ('ALIGN', (0, 0), (0, -1), 'LEFT'),   # Left align untuk kolom label agar sejajar dengan border kiri
-                    ('ALIGN', (1, 0), (1, -1), 'LEFT'),   # Left align untuk titik dua
-                    ('ALIGN', (2, 0), (2, -1), 'LEFT'),   # Left align untuk kolom value
-                    ('LEFTPADDING', (0, 0), (0, -1), 0),  # Tidak ada padding kiri untuk kolom label agar sejajar dengan border kiri tabel
-                    ('LEFTPADDING', (1, 0), (1, -1), 0),  # Tidak ada padding untuk titik dua
-                    ('LEFTPADDING', (2, 0), (2, -1), 0),  # Tidak ada padding untuk kolom value
-                    ('RIGHTPADDING', (0, 0), (0, -1), 4),  # Padding kanan untuk kolom label
-                    ('RIGHTPADDING', (1, 0), (1, -1), 0),  # Tidak ada padding untuk titik dua
-                    ('RIGHTPADDING', (2, 0), (2, -1), 6),  # Padding kanan sama dengan tabel utama
-                    ('TOPPADDING', (0, 0), (-1, -1), 2),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-                    # Border dihilangkan sesuai permintaan
-                ]))
-                elements.append(info_table)
-                elements.append(Spacer(1, 0.1*inch))
-
-        # Semua data dalam 1 tabel
-        all_data = []
-
-        # Collect all data in order
-        for key in field_order:
-            if key in biodata and key not in exclude_fields:
-                label = field_labels.get(key, key.replace('_', ' ').title())
-                value = biodata[key]
-                display_value = str(value) if value and str(value).strip() else '-'
-                all_data.append([label, display_value])
-
-        # Add any remaining fields not in field_order
-        for key, value in biodata.items():
-            if key not in exclude_fields and key not in field_order:
-                label = field_labels.get(key, key.replace('_', ' ').title())
-                display_value = str(value) if value and str(value).strip() else '-'
-                all_data.append([label, display_value])
-
-        # Process tanda tangan menggunakan helper function
-        nik_user = biodata.get('nik', 'N/A')
-        nama_user = biodata.get('nama_lengkap', 'N/A')
-        print(f"DEBUG export_all_pdf: ===== Processing tanda tangan for user {user_idx} =====")
-        print(f"DEBUG export_all_pdf: NIK: {nik_user}, Nama: {nama_user}")
-
-        tanda_tangan_raw = biodata.get('tanda_tangan')
-        print(f"DEBUG export_all_pdf: Tanda tangan exists in biodata: {tanda_tangan_raw is not None}")
-        if tanda_tangan_raw:
-            print(f"DEBUG export_all_pdf: Tanda tangan type: {type(tanda_tangan_raw)}")
-            if isinstance(tanda_tangan_raw, str):
-                print(f"DEBUG export_all_pdf: Tanda tangan length: {len(tanda_tangan_raw)}")
-                print(f"DEBUG export_all_pdf: Tanda tangan preview: {tanda_tangan_raw[:50]}...")
-
-        tanda_tangan_img, error_msg = process_tanda_tangan_for_pdf(tanda_tangan_raw, tanda_tangan_temp_files)
-        if error_msg:
-            print(f"DEBUG export_all_pdf ERROR: {error_msg}")
-        else:
-            print(f"DEBUG export_all_pdf: Tanda tangan processed successfully")
-        print(f"DEBUG export_all_pdf: Tanda tangan image object: {tanda_tangan_img is not None}")
-
-        # Buat 1 tabel untuk semua data - compact untuk muat di 1 halaman
-        if all_data:
-            # Prepare table data with Paragraph for text wrapping
-            table_data = []
-            # Header dihapus - langsung ke data rows
-            # Data rows dengan Paragraph untuk text wrapping
-            for row in all_data:
-                field_label = Paragraph(f"<b>{row[0]}</b>", value_style)
-                value_text = str(row[1]) if row[1] else '-'
-                value_text = value_text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                if len(value_text) > 50:
-                    words = value_text.split()
-                    lines = []
-                    current_line = []
-                    current_length = 0
-                    for word in words:
-                        if current_length + len(word) + 1 > 50:
-                            if current_line:
-                                lines.append(' '.join(current_line))
-                            current_line = [word]
-                            current_length = len(word)
-                        else:
-                            current_line.append(word)
-                            current_length += len(word) + 1
-                    if current_line:
-                        lines.append(' '.join(current_line))
-                    value_text = '<br/>'.join(lines)
-                value_para = Paragraph(value_text, value_style)
-                table_data.append([field_label, value_para])
-
-            # Tambahkan tanda tangan ke tabel jika ada
-            print(f"DEBUG export_all_pdf: Adding tanda tangan to table...")
-            print(f"DEBUG export_all_pdf: tanda_tangan_img is not None: {tanda_tangan_img is not None}")
-            print(f"DEBUG export_all_pdf: biodata has tanda_tangan: {biodata.get('tanda_tangan') is not None}")
-
-            if tanda_tangan_img:
-                print(f"DEBUG export_all_pdf: Adding tanda tangan image to table")
-                field_label = Paragraph("<b>Tanda Tangan</b>", value_style)
-                table_data.append([field_label, tanda_tangan_img])
-                print(f"DEBUG export_all_pdf: Tanda tangan added to table successfully")
-            elif biodata.get('tanda_tangan'):
-                # Jika ada data tanda tangan tapi gagal diproses, tampilkan pesan
-                print(f"DEBUG export_all_pdf: Adding error message to table (tanda tangan exists but failed to process)")
-                field_label = Paragraph("<b>Tanda Tangan</b>", value_style)
-                error_msg = Paragraph("<i>Tanda tangan tidak tersedia</i>", value_style)
-                table_data.append([field_label, error_msg])
-            else:
-                print(f"DEBUG export_all_pdf: No tanda tangan data, skipping table row")
-
-            # Calculate table width (F4 width minus margins)
-            available_width = (8.27 * inch) - (25 * 2)
-            table = Table(table_data, colWidths=[2.2*inch, available_width - 2.2*inch])
-            table.setStyle(TableStyle([
-                # Tidak ada header, langsung ke data rows
-                ('BACKGROUND', (0, 0), (-1, -1), colors.white),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                # Padding lebih kecil agar teks rata lebih kiri
-                ('LEFTPADDING', (0, 0), (0, -1), 4),
-                ('LEFTPADDING', (1, 0), (1, -1), 6),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-                ('TOPPADDING', (0, 0), (-1, -1), 5),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#d1d5db')),
-                ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor('#067ac1')),
-            ]))
-            elements.append(table)
-            elements.append(Spacer(1, 0.08*inch))
-
-    # Build PDF
-    try:
-        doc.build(elements, onFirstPage=add_header_footer, onLaterPages=add_header_footer)
-        buffer.seek(0)
-
-        # Refresh session sebelum return response untuk mencegah logout
-        session.permanent = True
-        session.modified = True
-
-        # Return PDF
-        return Response(
-            buffer.getvalue(),
-            mimetype='application/pdf',
-            headers={
-                'Content-Disposition': f'attachment; filename=biodata_{nama_kegiatan.replace(" ", "_")}.pdf'
-            }
-        )
-    finally:
-        # Cleanup temporary files
-        try:
-            if pendidikan_bermutu_temp_file and os.path.exists(pendidikan_bermutu_processed_path):
-                os.unlink(pendidikan_bermutu_processed_path)
-        except Exception as e:
-            print(f"Error cleaning up Pendidikan Bermutu temp file: {e}")
+    pdf_file = render_biodata_pdf(all_biodata, progress=report_export_progress, output=new_export_cache_file('.pdf'))
 
-        try:
-            if ramah_temp_file and os.path.exists(ramah_processed_path):
-                os.unlink(ramah_processed_path)
-        except Exception as e:
-            print(f"Error cleaning up Ramah temp file: {e}")
+    # Refresh session sebelum return response untuk mencegah logout
+    session.permanent = True
+    session.modified = True
 
-        # Cleanup temporary files tanda tangan
-        for temp_file_path in tanda_tangan_temp_files:
-            try:
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
-            except Exception as e:
-                print(f"Error cleaning up tanda tangan temp file {temp_file_path}: {e}")
+    # Return PDF
+    return store_export_cache(pdf_file, cache_key, '.pdf', 'application/pdf', content_disposition)
 
 @app.route('/admin/export-all-excel/<path:nama_kegiatan>')
 @admin_required
+@export_job
 def export_all_excel_kegiatan(nama_kegiatan):
     """Export semua biodata per kegiatan ke Excel - dengan semua field detail lengkap"""
     from urllib.parse import unquote
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
 
     if not is_admin():
         flash('Anda tidak memiliki akses!', 'error')
@@ -7876,7 +6725,6 @@ def export_all_excel_kegiatan(nama_kegiatan):
             flash('Terjadi kesalahan saat memverifikasi akses!', 'error')
             return redirect(url_for('admin_kegiatan'))
 
-    all_biodata = []
     try:
         cursor = connection.cursor()
         params = [nama_kegiatan]
@@ -7892,28 +6740,46 @@ def export_all_excel_kegiatan(nama_kegiatan):
 
         base_query += " ORDER BY kabupaten_kota ASC, nama_lengkap ASC"
 
+        # Pass 1: jumlah baris + statistik lebar kolom, tanpa menyimpan baris di memori
         cursor.execute(base_query, params)
-        rows = cursor.fetchall()
-        all_biodata = [row_to_dict(row) for row in rows]
+        stats = ExcelColumnStats(biodata_excel_fields(dengan_nama_kegiatan=False))
+        with profile_span('excel_width'):
+            for row in cursor:
+                stats.add(row_to_dict(row))
 
-        if not all_biodata:
+        if not stats.total_rows:
             flash('Tidak ada data untuk kegiatan ini!', 'error')
             return redirect(url_for('admin_detail_kegiatan', nama_kegiatan=nama_kegiatan))
 
         # Limit maksimal untuk export (5000 rows)
-        MAX_EXPORT_ROWS = 5000
-        if len(all_biodata) > MAX_EXPORT_ROWS:
-            flash(f'Data terlalu besar ({len(all_biodata)} rows). Maksimal {MAX_EXPORT_ROWS} rows untuk export. Silakan gunakan filter yang lebih spesifik.', 'error')
+        MAX_EXPORT_ROWS = export_row_limit(5000)
+        if stats.total_rows > MAX_EXPORT_ROWS:
+            flash(f'Data terlalu besar ({stats.total_rows} rows). Maksimal {MAX_EXPORT_ROWS} rows untuk export. Silakan gunakan filter yang lebih spesifik.', 'error')
             return redirect(url_for('admin_detail_kegiatan', nama_kegiatan=nama_kegiatan))
 
         # Warning jika data > 1000 rows
-        if len(all_biodata) > 1000:
-            print(f"WARNING: Export Excel dengan {len(all_biodata)} rows - mungkin memakan waktu lama")
+        if stats.total_rows > 1000:
+            logger.warning("Export Excel dengan %s rows - mungkin memakan waktu lama", stats.total_rows)
+
+        # Ambil waktu dan tempat pelaksanaan dari data pertama (semua biodata dalam satu kegiatan memiliki waktu dan tempat yang sama)
+        first_biodata = stats.first_row
+        nama_kegiatan = first_biodata.get('nama_kegiatan', '-')
+        info_kegiatan = [
+            ("NAMA KEGIATAN", nama_kegiatan),
+            ("WAKTU PELAKSANAAN", first_biodata.get('waktu_pelaksanaan', '-')),
+            ("TEMPAT PELAKSANAAN", first_biodata.get('tempat_pelaksanaan', '-'))
+        ]
 
-        # Normalisasi path buku tabungan untuk setiap biodata
-        for biodata in all_biodata:
-            if biodata.get('buku_tabungan_path'):
-                biodata['buku_tabungan_path'] = normalize_buku_tabungan_path(biodata['buku_tabungan_path'])
+        # Pass 2: tulis baris langsung dari cursor ke workbook streaming
+        cursor.execute(base_query, params)
+        excel_file = write_biodata_workbook(
+            (row_to_dict(row) for row in cursor),
+            stats,
+            export_output('.xlsx'),
+            sheet_title="Data Biodata",
+            info_kegiatan=info_kegiatan,
+            progress=report_export_progress
+        )
     except sqlite3.Error as e:
         flash(f'Terjadi kesalahan saat mengambil data: {str(e)}', 'error')
         return redirect(url_for('admin_detail_kegiatan', nama_kegiatan=nama_kegiatan))
@@ -7922,279 +6788,12 @@ def export_all_excel_kegiatan(nama_kegiatan):
             cursor.close()
             connection.close()
 
-    # Field mapping untuk label yang lebih readable dan profesional
-    field_labels = {
-        'nik': 'NIK',
-        'nama_lengkap': 'Nama Lengkap',
-        'nip_nippk': 'NIP/NIPPK',
-        'tempat_lahir': 'Tempat Lahir',
-        'tanggal_lahir': 'Tanggal Lahir',
-        'jenis_kelamin': 'Jenis Kelamin',
-        'agama': 'Agama',
-        'pendidikan_terakhir': 'Pendidikan Terakhir',
-        'jurusan': 'Jurusan',
-        'status_asn': 'Status Kepegawaian',
-        'pangkat_golongan': 'Pangkat / Golongan',
-        'jabatan': 'Jabatan',
-        'instansi': 'Nama Instansi',
-        'alamat_instansi': 'Alamat Instansi',
-        'alamat_domisili': 'Alamat Domisili',
-        'kabupaten_kota': 'Kabupaten/Kota',
-        'kabko_lainnya': 'Kabupaten/Kota Lainnya',
-        'peran': 'Peran dalam Kegiatan',
-        'no_hp': 'Nomor HP',
-        'alamat_email': 'Alamat Email',
-        'npwp': 'NPWP',
-        'nama_bank': 'Nama Bank',
-        'nama_bank_lainnya': 'Nama Bank Lainnya',
-        'no_rekening': 'Nomor Rekening',
-        'nama_pemilik_rekening': 'Nama Pemilik Rekening'
-    }
-
-    # Urutan field yang diinginkan
-    field_order = [
-        'nik', 'nama_lengkap', 'nip_nippk', 'tempat_lahir', 'tanggal_lahir',
-        'jenis_kelamin', 'agama', 'pendidikan_terakhir', 'jurusan',
-        'status_asn', 'pangkat_golongan', 'jabatan', 'instansi',
-        'alamat_instansi', 'alamat_domisili', 'kabupaten_kota', 'kabko_lainnya',
-        'peran',
-        'no_hp', 'alamat_email', 'npwp',
-        'nama_bank', 'nama_bank_lainnya', 'no_rekening', 'nama_pemilik_rekening'
-    ]
-
-    # Exclude fields yang tidak perlu ditampilkan
-    exclude_fields = ['id', 'user_id', 'buku_tabungan_path', 'tanda_tangan', 'created_at', 'updated_at', 'nama_kegiatan', 'waktu_pelaksanaan', 'tempat_pelaksanaan']
-
-    # Buat workbook Excel
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Data Biodata"
-
-    # Styles
-    header_fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-    header_font = Font(bold=True, color="000000", size=11)
-    title_font = Font(bold=True, size=12, color="000000")
-    border_style = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    center_align = Alignment(horizontal='center', vertical='center')
-    left_align = Alignment(horizontal='left', vertical='top', wrap_text=True)
-
-    # Buat list semua field yang akan ditampilkan (dalam urutan yang diinginkan)
-    all_fields = []
-    for key in field_order:
-        if key not in exclude_fields:
-            label = field_labels.get(key, key.replace('_', ' ').title())
-            all_fields.append({'key': key, 'label': label})
-
-    # Tambahkan field tanda tangan
-    all_fields.append({'key': 'tanda_tangan', 'label': 'Tanda Tangan'})
-
-    # Ambil waktu dan tempat pelaksanaan dari data pertama (semua biodata dalam satu kegiatan memiliki waktu dan tempat yang sama)
-    nama_kegiatan = all_biodata[0].get('nama_kegiatan', '-') if all_biodata else '-'
-    waktu_pelaksanaan = all_biodata[0].get('waktu_pelaksanaan', '-') if all_biodata else '-'
-    tempat_pelaksanaan = all_biodata[0].get('tempat_pelaksanaan', '-') if all_biodata else '-'
-
-    # Header kegiatan
-    num_cols = len(all_fields)
-    last_col_letter = get_column_letter(num_cols)
-
-    # Gunakan 2 kolom: kolom A untuk label (diperlebar), kolom B sampai akhir untuk titik dua + value (di-merge)
-    # Ini memungkinkan label tidak terpotong dan value tidak terpotong
-    ws['A1'] = "NAMA KEGIATAN"
-    ws['B1'] = f": {nama_kegiatan}"
-    ws['A2'] = "WAKTU PELAKSANAAN"
-    ws['B2'] = f": {waktu_pelaksanaan}"
-    ws['A3'] = "TEMPAT PELAKSANAAN"
-    ws['B3'] = f": {tempat_pelaksanaan}"
-
-    # Merge kolom B sampai akhir untuk titik dua + value
-    ws.merge_cells(f'B1:{last_col_letter}1')
-    ws.merge_cells(f'B2:{last_col_letter}2')
-    ws.merge_cells(f'B3:{last_col_letter}3')
-
-    # Set font, alignment, dan fill untuk setiap cell header
-    # Buat font untuk header dengan warna hitam dan ukuran lebih kecil
-    header_title_font = Font(bold=True, size=11, color="000000")
-    for row in [1, 2, 3]:
-        # Cell label (kolom A) - rata kiri
-        label_cell = ws[f'A{row}']
-        label_cell.font = header_title_font
-        label_cell.alignment = Alignment(horizontal='left', vertical='center')
-        label_cell.fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-
-        # Cell titik dua + value (kolom B yang di-merge) - rata kiri
-        value_cell = ws[f'B{row}']
-        value_cell.font = header_title_font
-        value_cell.alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
-        value_cell.fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-
-    # Tambahkan informasi tanggal export (definisikan dulu sebelum digunakan)
-    from datetime import datetime
-    export_date = datetime.now().strftime("%d %B %Y, %H:%M:%S")
-
-    # Set lebar kolom A untuk label - diperlebar agar tidak terpotong
-    # Hitung lebar optimal berdasarkan konten di row 1-3 (header kegiatan)
-    max_label_length = max(
-        len("NAMA KEGIATAN"),
-        len("WAKTU PELAKSANAAN"),
-        len("TEMPAT PELAKSANAAN"),
-        len(f"Tanggal Export: {export_date}")
-    )
-    # Set width berdasarkan konten dengan padding, minimal 25, maksimal 35
-    col_a_width = max(20, min(max_label_length + 3, 23))
-    ws.column_dimensions['A'].width = col_a_width
-    # Tinggi baris header dibuat lebih tinggi agar teks panjang tidak terpotong
-    ws.row_dimensions[1].height = 32
-    ws.row_dimensions[2].height = 32
-    ws.row_dimensions[3].height = 32
-    ws['A4'] = f"Tanggal Export: {export_date}"
-    ws.merge_cells(f'A4:{last_col_letter}4')
-    ws['A4'].font = Font(size=10, italic=True)
-    ws['A4'].alignment = left_align
-    ws.row_dimensions[4].height = 18
-
-    # Buat header kolom (semua field sebagai kolom)
-    for col_idx, field_info in enumerate(all_fields, 1):
-        cell = ws.cell(row=5, column=col_idx, value=field_info['label'])
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = center_align
-        cell.border = border_style
-    ws.row_dimensions[5].height = 22
-
-    # Set lebar semua kolom menjadi 25 agar konsisten
-    for col_idx in range(1, len(all_fields) + 1):
-        col_letter = get_column_letter(col_idx)
-        # Skip kolom A - sudah di-set sebelumnya dengan width yang lebih lebar
-        if col_letter != 'A':
-            ws.column_dimensions[col_letter].width = 25
-
-    # Data untuk setiap user (setiap user = 1 baris)
-    current_row = 6
-    for user_idx, biodata in enumerate(all_biodata):
-        for col_idx, field_info in enumerate(all_fields, 1):
-            field_key = field_info['key']
-
-            # Ambil nilai field
-            if field_key == 'tanda_tangan':
-                display_value = "[Tersedia]" if biodata.get('tanda_tangan') else "-"
-            else:
-                value = biodata.get(field_key, '')
-                display_value = str(value) if value and str(value).strip() else '-'
-
-            # Tulis ke cell
-            cell = ws.cell(row=current_row, column=col_idx, value=display_value)
-            cell.border = border_style
-
-            # Alternating row colors untuk readability
-            if user_idx % 2 == 0:
-                cell.fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-            else:
-                cell.fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-
-            # Alignment dengan wrap text untuk semua kolom agar teks tidak terpotong
-            if field_key in ['nik', 'nip_nippk', 'no_hp', 'npwp', 'no_rekening']:
-                cell.alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
-            elif field_key in ['tanggal_lahir']:
-                cell.alignment = Alignment(horizontal='center', vertical='top', wrap_text=True)
-            else:
-                # Semua kolom lain juga menggunakan wrap_text
-                cell.alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
-
-        # Auto adjust row height berdasarkan konten
-        max_height = 18  # Minimum height
-        for col_idx, field_info in enumerate(all_fields, 1):
-            cell = ws.cell(row=current_row, column=col_idx)
-            if cell.value:
-                # Estimasi tinggi berdasarkan panjang teks dan lebar kolom
-                col_letter = get_column_letter(col_idx)
-                col_width = ws.column_dimensions[col_letter].width or 25
-                text_length = len(str(cell.value))
-                # Estimasi: setiap ~col_width karakter = 1 baris, setiap baris = 15 points
-                estimated_lines = max(1, (text_length / max(col_width * 0.8, 1)))
-                estimated_height = estimated_lines * 15
-                max_height = max(max_height, min(estimated_height, 60))  # Max 60 points
-
-        ws.row_dimensions[current_row].height = max_height
-        current_row += 1
-
-    # Auto-adjust column widths berdasarkan konten aktual (header dan data)
-    for col_idx, field_info in enumerate(all_fields, 1):
-        col_letter = get_column_letter(col_idx)
-
-        # Skip kolom A - sudah di-set sebelumnya dan tidak perlu di-adjust
-        if col_letter == 'A':
-            continue
-
-        max_length = 0
-
-        # Cek panjang header
-        header_cell = ws.cell(row=5, column=col_idx)
-        if header_cell.value:
-            max_length = len(str(header_cell.value))
-
-        # Cek panjang konten data di kolom ini
-        for row in range(6, current_row):
-            cell = ws.cell(row=row, column=col_idx)
-            if cell.value:
-                # Untuk teks panjang, ambil panjang maksimal per baris (dengan wrap text)
-                text = str(cell.value)
-                # Estimasi: jika teks panjang, mungkin akan wrap, jadi ambil panjang maksimal
-                # Tapi untuk perhitungan lebar, gunakan panjang total dibagi estimasi wrap
-                text_length = len(text)
-                # Jika teks sangat panjang, estimasi lebar berdasarkan wrap
-                if text_length > 50:
-                    # Estimasi: setiap 15 karakter = 1 baris, ambil panjang maksimal per baris
-                    lines = text.split('\n') if '\n' in text else [text]
-                    max_line_length = max(len(line) for line in lines)
-                    max_length = max(max_length, min(max_line_length, 40))  # Maksimal 40 karakter per baris
-                else:
-                    max_length = max(max_length, text_length)
-
-        # Set lebar kolom: panjang maksimal + 2 (padding), minimal 12, maksimal 40
-        optimal_width = max(12, min(max_length + 2, 40))
-        # Untuk kolom alamat, boleh lebih lebar
-        if 'Alamat' in field_info['label']:
-            optimal_width = max(optimal_width, min(max_length + 2, 45))
-        ws.column_dimensions[col_letter].width = optimal_width
-
-    # Pastikan kolom A tetap memiliki width yang cukup (jika ter-overwrite, set ulang)
-    if ws.column_dimensions['A'].width < 20:
-        ws.column_dimensions['A'].width = col_a_width
-
-    # Freeze panes untuk memudahkan scrolling (freeze header)
-    ws.freeze_panes = 'A6'
-
-    # Enable auto filter untuk header
-    ws.auto_filter.ref = f'A5:{last_col_letter}{current_row - 1}'
-
-    # Set print settings untuk lebih rapi saat print
-    ws.page_setup.orientation = ws.ORIENTATION_LANDSCAPE
-    ws.page_setup.paperSize = ws.PAPERSIZE_A4
-    ws.page_setup.fitToWidth = 1
-    ws.page_setup.fitToHeight = 0
-
-    # Save to BytesIO
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-
     # Refresh session sebelum return response untuk mencegah logout
     session.permanent = True
     session.modified = True
 
     # Return Excel file
-    return Response(
-        buffer.getvalue(),
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={
-            'Content-Disposition': f'attachment; filename=biodata_{nama_kegiatan.replace(" ", "_")}.xlsx'
-        }
-    )
+    return export_file_response(excel_file, EXCEL_MIMETYPE, f'attachment; filename=biodata_{nama_kegiatan.replace(" ", "_")}.xlsx')
 
 @app.route('/admin/export-pdf/<nik>/<path:nama_kegiatan>')
 @admin_required
@@ -8245,502 +6844,18 @@ def export_biodata_pdf(nik, nama_kegiatan):
             cursor.close()
             connection.close()
 
-    # Load logo untuk header
-    logo_path = os.path.join(BASE_DIR, 'static', 'Logo_BGTK.png')
-    logo_img = None
-    logo_width = 0
-    logo_height = 0
-    if os.path.exists(logo_path):
-        try:
-            logo_pil = Image.open(logo_path)
-            # Resize logo untuk header (max height 0.6 inch)
-            max_logo_height = 0.6 * inch
-            logo_ratio = logo_pil.width / logo_pil.height
-            logo_width = max_logo_height * logo_ratio
-            logo_height = max_logo_height
-
-            # Convert PIL Image to reportlab Image
-            logo_buffer = io.BytesIO()
-            logo_pil.save(logo_buffer, format='PNG')
-            logo_buffer.seek(0)
-            logo_img = RLImage(logo_buffer, width=logo_width, height=logo_height)
-        except Exception as e:
-            print(f"Error loading logo: {e}")
-            logo_img = None
-
-    # Load logo Pendidikan Bermutu dengan background transparan
-    pendidikan_bermutu_path = os.path.join(BASE_DIR, 'static', 'Pendidikan Bermutu untuk Semua.png')
-    pendidikan_bermutu_processed_path = None
-    pendidikan_bermutu_width = 0
-    pendidikan_bermutu_height = 0
-    pendidikan_bermutu_temp_file = None
-    if os.path.exists(pendidikan_bermutu_path):
-        try:
-            pendidikan_bermutu_pil = Image.open(pendidikan_bermutu_path)
-            # Convert ke RGBA jika belum
-            if pendidikan_bermutu_pil.mode != 'RGBA':
-                pendidikan_bermutu_pil = pendidikan_bermutu_pil.convert('RGBA')
-
-            # Hapus background hitam (buat transparan)
-            pixels = pendidikan_bermutu_pil.load()
-            width, height = pendidikan_bermutu_pil.size
-            black_threshold = 30  # Threshold untuk mendeteksi warna hitam
-
-            for x in range(width):
-                for y in range(height):
-                    r, g, b, a = pixels[x, y]
-                    # Jika pixel sangat gelap (background hitam), buat transparan
-                    if r < black_threshold and g < black_threshold and b < black_threshold:
-                        pixels[x, y] = (r, g, b, 0)
-
-            # Hitung ukuran untuk header (max height 0.5 inch - diperkecil)
-            # Tapi jangan resize dengan PIL, biarkan reportlab yang handle resize untuk kualitas lebih baik
-            max_logo_height = 0.5 * inch
-            pendidikan_bermutu_ratio = pendidikan_bermutu_pil.width / pendidikan_bermutu_pil.height
-            pendidikan_bermutu_width = max_logo_height * pendidikan_bermutu_ratio
-            pendidikan_bermutu_height = max_logo_height
-
-            # Simpan gambar asli (tanpa resize) ke temporary file dengan kualitas tinggi
-            # Biarkan reportlab yang handle resize dengan preserveAspectRatio untuk kualitas lebih tajam
-            pendidikan_bermutu_temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-            pendidikan_bermutu_pil.save(pendidikan_bermutu_temp_file.name, format='PNG', optimize=False)
-            pendidikan_bermutu_processed_path = pendidikan_bermutu_temp_file.name
-        except Exception as e:
-            print(f"Error loading logo Pendidikan Bermutu: {e}")
-
-    # Load logo Ramah dengan background transparan
-    ramah_path = os.path.join(BASE_DIR, 'static', 'Ramah.png')
-    ramah_processed_path = None
-    ramah_width = 0
-    ramah_height = 0
-    ramah_temp_file = None
-    if os.path.exists(ramah_path):
-        try:
-            ramah_pil = Image.open(ramah_path)
-            # Convert ke RGBA jika belum
-            if ramah_pil.mode != 'RGBA':
-                ramah_pil = ramah_pil.convert('RGBA')
-
-            # Hapus background hitam (buat transparan)
-            pixels = ramah_pil.load()
-            width, height = ramah_pil.size
-            black_threshold = 30  # Threshold untuk mendeteksi warna hitam
-
-            for x in range(width):
-                for y in range(height):
-                    r, g, b, a = pixels[x, y]
-                    # Jika pixel sangat gelap (background hitam), buat transparan
-                    if r < black_threshold and g < black_threshold and b < black_threshold:
-                        pixels[x, y] = (r, g, b, 0)
-
-            # Hitung ukuran untuk header (max height 0.5 inch - diperkecil)
-            # Tapi jangan resize dengan PIL, biarkan reportlab yang handle resize untuk kualitas lebih baik
-            max_logo_height = 0.5 * inch
-            ramah_ratio = ramah_pil.width / ramah_pil.height
-            ramah_width = max_logo_height * ramah_ratio
-            ramah_height = max_logo_height
-
-            # Simpan gambar asli (tanpa resize) ke temporary file dengan kualitas tinggi
-            # Biarkan reportlab yang handle resize dengan preserveAspectRatio untuk kualitas lebih tajam
-            ramah_temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-            ramah_pil.save(ramah_temp_file.name, format='PNG', optimize=False)
-            ramah_processed_path = ramah_temp_file.name
-        except Exception as e:
-            print(f"Error loading logo Ramah: {e}")
-
-    # Fungsi untuk header dengan logo dan footer
-    def add_header_footer(canvas, doc):
-        canvas.saveState()
-
-        # Hitung tinggi logo terbesar untuk alignment vertikal (hanya logo BGTK di header)
-        max_logo_h = logo_height if logo_height > 0 else 0
-
-        # Header - Logo BGTK di kiri
-        if logo_img and logo_height > 0:
-            try:
-                logo_x = 25
-                logo_y = F4_SIZE[1] - 25 - max_logo_h
-                canvas.drawImage(logo_path, logo_x, logo_y, width=logo_width, height=logo_height, preserveAspectRatio=True)
-            except Exception as e:
-                print(f"Error drawing logo: {e}")
-
-        # Garis header
-        canvas.setStrokeColor(colors.HexColor('#067ac1'))
-        canvas.setLineWidth(1.5)
-        max_header_height = logo_height if logo_height > 0 else 0
-        header_line_y = F4_SIZE[1] - 25 - max_header_height - 5
-        canvas.line(25, header_line_y, F4_SIZE[0] - 25, header_line_y)
-
-        # Footer - Logo Pendidikan Bermutu dan Ramah di kanan bawah
-        max_footer_logo_height = max(pendidikan_bermutu_height if pendidikan_bermutu_height > 0 else 0,
-                                    ramah_height if ramah_height > 0 else 0)
-        footer_logo_y = 45  # Posisi Y untuk logo footer
-
-        if max_footer_logo_height > 0:
-            # Hitung total lebar kedua logo + spacing
-            total_footer_logo_width = (pendidikan_bermutu_width if pendidikan_bermutu_height > 0 else 0) + \
-                                     (ramah_width if ramah_height > 0 else 0) + 10  # 10 pt spacing antara logo
-            # Posisi X untuk logo di kanan (rata kanan dengan margin 25)
-            footer_logo_start_x = F4_SIZE[0] - 25 - total_footer_logo_width
-
-            # Logo Pendidikan Bermutu di kiri (dalam footer)
-            if pendidikan_bermutu_processed_path and os.path.exists(pendidikan_bermutu_processed_path) and pendidikan_bermutu_height > 0:
-                try:
-                    pendidikan_bermutu_footer_x = footer_logo_start_x
-                    pendidikan_bermutu_footer_y = footer_logo_y
-                    canvas.drawImage(pendidikan_bermutu_processed_path, pendidikan_bermutu_footer_x, pendidikan_bermutu_footer_y,
-                                   width=pendidikan_bermutu_width, height=pendidikan_bermutu_height, preserveAspectRatio=True, mask='auto')
-                except Exception as e:
-                    print(f"Error drawing logo Pendidikan Bermutu di footer: {e}")
-
-            # Logo Ramah di kanan (dalam footer)
-            if ramah_processed_path and os.path.exists(ramah_processed_path) and ramah_height > 0:
-                try:
-                    ramah_footer_x = footer_logo_start_x + (pendidikan_bermutu_width if pendidikan_bermutu_height > 0 else 0) + 10
-                    ramah_footer_y = footer_logo_y
-                    canvas.drawImage(ramah_processed_path, ramah_footer_x, ramah_footer_y,
-                                   width=ramah_width, height=ramah_height, preserveAspectRatio=True, mask='auto')
-                except Exception as e:
-                    print(f"Error drawing logo Ramah di footer: {e}")
-
-        # Garis footer (di bawah logo)
-        canvas.setStrokeColor(colors.HexColor('#067ac1'))
-        canvas.setLineWidth(1)
-        footer_line_y = footer_logo_y - 10  # Garis di bawah logo dengan spacing 10
-        canvas.line(25, footer_line_y, F4_SIZE[0] - 25, footer_line_y)
-
-        # Footer - Tanggal dan waktu export WITA (di bawah garis)
-        canvas.setFont('Helvetica', 8)
-        canvas.setFillColor(colors.black)
-        # WITA = UTC+8
-        wita_time = datetime.utcnow() + timedelta(hours=8)
-        footer_text = f"Dicetak pada: {wita_time.strftime('%d/%m/%Y %H:%M')} WITA"
-        footer_width = canvas.stringWidth(footer_text, 'Helvetica', 8)
-        footer_x = 25  # Rata kiri dengan margin 25 pt
-        footer_y = footer_line_y - 15  # Tanggal di bawah garis
-        canvas.drawString(footer_x, footer_y, footer_text)
-
-        canvas.restoreState()
-
-    # Gunakan kertas F4 (8.27 x 13 inch) dan beri ruang header
-    buffer = io.BytesIO()
-    # Gunakan tinggi logo terbesar untuk margin (hanya logo BGTK di header)
-    max_header_logo_height = logo_height if logo_height > 0 else 0
-    top_margin_with_logo = 25 + max_header_logo_height + 15
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=F4_SIZE,
-        rightMargin=25,
-        leftMargin=25,
-        topMargin=top_margin_with_logo,
-        bottomMargin=40
-    )
-
-    # Container untuk elemen PDF
-    elements = []
-
-    # Styles - lebih compact untuk muat di 1 halaman
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=20,
-        textColor=colors.black,
-        spaceAfter=12,
-        spaceBefore=0,
-        alignment=1,  # Center
-        fontName='Helvetica-Bold',
-        leading=24
-    )
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=9,
-        leading=11,
-        textColor=colors.black,
-        alignment=0  # Left
-    )
-    value_style = ParagraphStyle(
-        'ValueStyle',
-        parent=styles['Normal'],
-        fontSize=9,
-        leading=11,
-        textColor=colors.black,
-        alignment=0,  # Left
-        leftIndent=0,
-        rightIndent=0
-    )
-
-    # Title
-    title = Paragraph("BIODATA KEGIATAN", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 0.15*inch))
-
-    # Ambil data kegiatan untuk header tabel
-    nama_kegiatan = biodata.get('nama_kegiatan', '-')
-    waktu_pelaksanaan = biodata.get('waktu_pelaksanaan', '-')
-    tempat_pelaksanaan = biodata.get('tempat_pelaksanaan', '-')
-
-    # Buat header informasi kegiatan di atas tabel dengan titik dua yang sejajar
-    if nama_kegiatan or waktu_pelaksanaan or tempat_pelaksanaan:
-        info_style = ParagraphStyle(
-            'InfoStyle',
-            parent=styles['Normal'],
-            fontSize=10,
-            leading=14,
-            textColor=colors.black,
-            alignment=0,  # Left align
-            fontName='Helvetica-Bold'
-        )
-
-        # Buat tabel kecil untuk info kegiatan agar titik dua sejajar
-        # Pisahkan label dan titik dua menjadi kolom terpisah
-        info_table_data = []
-        if nama_kegiatan and str(nama_kegiatan).strip() and str(nama_kegiatan).strip() != '-':
-            info_table_data.append([
-                Paragraph("<b>Nama Kegiatan</b>", info_style),
-                Paragraph(":", info_style),
-                Paragraph(str(nama_kegiatan), info_style)
-            ])
-        if waktu_pelaksanaan and str(waktu_pelaksanaan).strip() and str(waktu_pelaksanaan).strip() != '-':
-            info_table_data.append([
-                Paragraph("<b>Waktu Pelaksanaan</b>", info_style),
-                Paragraph(":", info_style),
-                Paragraph(str(waktu_pelaksanaan), info_style)
-            ])
-        if tempat_pelaksanaan and str(tempat_pelaksanaan).strip() and str(tempat_pelaksanaan).strip() != '-':
-            info_table_data.append([
-                Paragraph("<b>Tempat Pelaksanaan</b>", info_style),
-                Paragraph(":", info_style),
-                Paragraph(str(tempat_pelaksanaan), info_style)
-            ])
-
-        if info_table_data:
-            # Hitung lebar yang sama dengan tabel utama agar sejajar dengan border biru
-            available_width = (8.27 * inch) - (25 * 2)
-            # Gunakan 3 kolom: label, titik dua, value
-            # Lebar kolom disesuaikan agar titik dua sejajar dan lebar total sama dengan tabel utama
-            info_table = Table(info_table_data, colWidths=[2.2*inch, 0.15*inch, available_width - 2.2*inch - 0.15*inch])
-            info_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('ALIGN', (0, 0), (0, -1), 'LEFT'),   # Left align untuk kolom label agar sejajar dengan border kiri
-                ('ALIGN', (1, 0), (1, -1), 'LEFT'),   # Left align untuk titik dua
-                ('ALIGN', (2, 0), (2, -1), 'LEFT'),   # Left align untuk kolom value
-                ('LEFTPADDING', (0, 0), (0, -1), 0),  # Tidak ada padding kiri untuk kolom label agar sejajar dengan border kiri tabel
-                ('LEFTPADDING', (1, 0), (1, -1), 0),  # Tidak ada padding untuk titik dua
-                ('LEFTPADDING', (2, 0), (2, -1), 0),  # Tidak ada padding untuk kolom value
-                ('RIGHTPADDING', (0, 0), (0, -1), 4),  # Padding kanan untuk kolom label
-                ('RIGHTPADDING', (1, 0), (1, -1), 0),  # Tidak ada padding untuk titik dua
-                ('RIGHTPADDING', (2, 0), (2, -1), 6),  # Padding kanan sama dengan tabel utama
-                ('TOPPADDING', (0, 0), (-1, -1), 2),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-                # Border dihilangkan sesuai permintaan
-            ]))
-            elements.append(info_table)
-            elements.append(Spacer(1, 0.1*inch))
-
-    # Semua data dalam 1 tabel
-    all_data = []
-
-    # Field mapping untuk label yang lebih readable - urut sesuai prioritas
-    field_labels = {
-        'nik': 'NIK',
-        'nama_lengkap': 'Nama Lengkap',
-        'nip_nippk': 'NIP/NIPPK',
-        'tempat_lahir': 'Tempat Lahir',
-        'tanggal_lahir': 'Tanggal Lahir',
-        'jenis_kelamin': 'Jenis Kelamin',
-        'agama': 'Agama',
-        'pendidikan_terakhir': 'Pendidikan Terakhir',
-        'jurusan': 'Jurusan',
-        'status_asn': 'Status ASN',
-        'pangkat_golongan': 'Pangkat/Golongan',
-        'jabatan': 'Jabatan',
-        'instansi': 'Instansi',
-        'alamat_instansi': 'Alamat Instansi',
-        'alamat_domisili': 'Alamat Domisili',
-        'kabupaten_kota': 'Kabupaten/Kota',
-        'kabko_lainnya': 'Kabupaten/Kota Lainnya',
-        'peran': 'Peran',
-        'no_hp': 'No. HP',
-        'alamat_email': 'Email',
-        'npwp': 'NPWP',
-        'nama_bank': 'Nama Bank',
-        'nama_bank_lainnya': 'Nama Bank Lainnya',
-        'no_rekening': 'No. Rekening',
-        'nama_pemilik_rekening': 'Nama Pemilik Rekening'
-    }
-
-    # Urutan field yang diinginkan (tanpa nama_kegiatan, waktu_pelaksanaan, tempat_pelaksanaan)
-    field_order = [
-        'nik', 'nama_lengkap', 'nip_nippk', 'tempat_lahir', 'tanggal_lahir',
-        'jenis_kelamin', 'agama', 'pendidikan_terakhir', 'jurusan',
-        'status_asn', 'pangkat_golongan', 'jabatan', 'instansi',
-        'alamat_instansi', 'alamat_domisili', 'kabupaten_kota', 'kabko_lainnya',
-        'peran',
-        'no_hp', 'alamat_email', 'npwp',
-        'nama_bank', 'nama_bank_lainnya', 'no_rekening', 'nama_pemilik_rekening'
-    ]
-
-    # Exclude fields yang tidak perlu ditampilkan (termasuk nama_kegiatan, waktu_pelaksanaan, tempat_pelaksanaan)
-    exclude_fields = ['id', 'user_id', 'buku_tabungan_path', 'tanda_tangan', 'created_at', 'updated_at', 'nama_kegiatan', 'waktu_pelaksanaan', 'tempat_pelaksanaan']
-
-    # Collect all data in order
-    for key in field_order:
-        if key in biodata and key not in exclude_fields:
-            label = field_labels.get(key, key.replace('_', ' ').title())
-            value = biodata[key]
-            display_value = str(value) if value and str(value).strip() else '-'
-            all_data.append([label, display_value])
-
-    # Add any remaining fields not in field_order
-    for key, value in biodata.items():
-        if key not in exclude_fields and key not in field_order:
-            label = field_labels.get(key, key.replace('_', ' ').title())
-            display_value = str(value) if value and str(value).strip() else '-'
-            all_data.append([label, display_value])
-
-    # Process tanda tangan menggunakan helper function
-    print(f"DEBUG export_biodata_pdf: ===== Processing tanda tangan for NIK: {nik} =====")
-    nama_user = biodata.get('nama_lengkap', 'N/A')
-    print(f"DEBUG export_biodata_pdf: Nama: {nama_user}")
-
-    tanda_tangan_temp_files = []
-    tanda_tangan_raw = biodata.get('tanda_tangan')
-    print(f"DEBUG export_biodata_pdf: Tanda tangan exists in biodata: {tanda_tangan_raw is not None}")
-    if tanda_tangan_raw:
-        print(f"DEBUG export_biodata_pdf: Tanda tangan type: {type(tanda_tangan_raw)}")
-        if isinstance(tanda_tangan_raw, str):
-            print(f"DEBUG export_biodata_pdf: Tanda tangan length: {len(tanda_tangan_raw)}")
-            print(f"DEBUG export_biodata_pdf: Tanda tangan preview: {tanda_tangan_raw[:50]}...")
-
-    tanda_tangan_img, error_msg = process_tanda_tangan_for_pdf(tanda_tangan_raw, tanda_tangan_temp_files)
-    if error_msg:
-        print(f"DEBUG export_biodata_pdf ERROR: {error_msg}")
-    else:
-        print(f"DEBUG export_biodata_pdf: Tanda tangan processed successfully")
-    print(f"DEBUG export_biodata_pdf: Tanda tangan image object: {tanda_tangan_img is not None}")
-
-    buku_tabungan_img = None
-
-    # Buat 1 tabel untuk semua data - compact untuk muat di 1 halaman
-    if all_data:
-        # Prepare table data with Paragraph for text wrapping
-        table_data = []
-        # Header dihapus - langsung ke data rows
-        # Data rows dengan Paragraph untuk text wrapping
-        for row in all_data:
-            field_label = Paragraph(f"<b>{row[0]}</b>", value_style)
-            # Wrap long text values
-            value_text = str(row[1]) if row[1] else '-'
-            # Escape HTML characters
-            value_text = value_text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-            # Break long words - lebih pendek untuk compact
-            if len(value_text) > 50:
-                words = value_text.split()
-                lines = []
-                current_line = []
-                current_length = 0
-                for word in words:
-                    if current_length + len(word) + 1 > 50:
-                        if current_line:
-                            lines.append(' '.join(current_line))
-                        current_line = [word]
-                        current_length = len(word)
-                    else:
-                        current_line.append(word)
-                        current_length += len(word) + 1
-                if current_line:
-                    lines.append(' '.join(current_line))
-                value_text = '<br/>'.join(lines)
-            value_para = Paragraph(value_text, value_style)
-            table_data.append([field_label, value_para])
-
-        # Tambahkan tanda tangan ke tabel jika ada
-        print(f"DEBUG export_biodata_pdf: Adding tanda tangan to table...")
-        print(f"DEBUG export_biodata_pdf: tanda_tangan_img is not None: {tanda_tangan_img is not None}")
-        print(f"DEBUG export_biodata_pdf: biodata has tanda_tangan: {biodata.get('tanda_tangan') is not None}")
-
-        if tanda_tangan_img:
-            print(f"DEBUG export_biodata_pdf: Adding tanda tangan image to table")
-            field_label = Paragraph("<b>Tanda Tangan</b>", value_style)
-            table_data.append([field_label, tanda_tangan_img])
-            print(f"DEBUG export_biodata_pdf: Tanda tangan added to table successfully")
-        elif biodata.get('tanda_tangan'):
-            # Jika ada data tanda tangan tapi gagal diproses, tampilkan pesan
-            print(f"DEBUG export_biodata_pdf: Adding error message to table (tanda tangan exists but failed to process)")
-            field_label = Paragraph("<b>Tanda Tangan</b>", value_style)
-            error_msg = Paragraph("<i>Tanda tangan tidak tersedia</i>", value_style)
-            table_data.append([field_label, error_msg])
-        else:
-            print(f"DEBUG export_biodata_pdf: No tanda tangan data, skipping table row")
-
-        # Calculate table width (F4 width minus margins)
-        available_width = (8.27 * inch) - (25 * 2)
-        table = Table(table_data, colWidths=[2.2*inch, available_width - 2.2*inch])
-        table.setStyle(TableStyle([
-            # Tidak ada header, langsung ke data rows
-            ('BACKGROUND', (0, 0), (-1, -1), colors.white),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-            ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            # Padding lebih kecil agar teks rata lebih kiri
-            ('LEFTPADDING', (0, 0), (0, -1), 4),
-            ('LEFTPADDING', (1, 0), (1, -1), 6),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 5),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#d1d5db')),
-            ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor('#067ac1')),
-        ]))
-        elements.append(table)
-        elements.append(Spacer(1, 0.08*inch))
-
-    # Build PDF
-    try:
-        doc.build(elements, onFirstPage=add_header_footer, onLaterPages=add_header_footer)
-        buffer.seek(0)
-        pdf_data = buffer.getvalue()
-        buffer.close()
-
-        # Generate filename
-        filename = f"Biodata_{biodata.get('nama_lengkap', 'Unknown').replace(' ', '_')}_{nik}.pdf"
-
-        # Refresh session sebelum return response untuk mencegah logout
-        session.permanent = True
-        session.modified = True
+    # Export satu peserta memakai label field versi ringkas
+    pdf_file = render_biodata_pdf([biodata], report_spec(field_labels=FIELD_LABELS_RINGKAS), output=export_output('.pdf'))
 
-        # Return PDF as response
-        return Response(
-            pdf_data,
-            mimetype='application/pdf',
-            headers={
-                'Content-Disposition': f'attachment; filename="{filename}"'
-            }
-        )
-    finally:
-        # Cleanup temporary files tanda tangan
-        for temp_file_path in tanda_tangan_temp_files:
-            try:
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
-            except Exception as e:
-                print(f"Error cleaning up tanda tangan temp file {temp_file_path}: {e}")
+    # Generate filename
+    filename = f"Biodata_{biodata.get('nama_lengkap', 'Unknown').replace(' ', '_')}_{nik}.pdf"
 
-        # Cleanup temporary files logo
-        try:
-            if 'pendidikan_bermutu_processed_path' in locals() and os.path.exists(pendidikan_bermutu_processed_path):
-                os.unlink(pendidikan_bermutu_processed_path)
-        except Exception as e:
-            print(f"Error cleaning up Pendidikan Bermutu temp file: {e}")
+    # Refresh session sebelum return response untuk mencegah logout
+    session.permanent = True
+    session.modified = True
 
-        try:
-            if 'ramah_processed_path' in locals() and os.path.exists(ramah_processed_path):
-                os.unlink(ramah_processed_path)
-        except Exception as e:
-            print(f"Error cleaning up Ramah temp file: {e}")
+    # Return PDF as response
+    return export_file_response(pdf_file, 'application/pdf', f'attachment; filename="{filename}"')
 
 @app.route('/user/hapus-biodata/<path:nik>/<path:nama_kegiatan>', methods=['POST'])
 @login_required
@@ -8792,13 +6907,14 @@ def user_hapus_biodata(nik, nama_kegiatan):
             WHERE nik = ? AND TRIM(nama_kegiatan) = TRIM(?) AND user_id = ?
         """, (nik, nama_kegiatan, user_id))
 
+        invalidate_cache(cursor, 'biodata', niks=(nik,))
         connection.commit()
         flash(f'Data biodata untuk "{nama_lengkap}" (NIK: {nik}) pada kegiatan "{nama_kegiatan}" berhasil dihapus!', 'success')
 
     except sqlite3.Error as e:
         if connection:
             connection.rollback()
-        print(f"Error deleting biodata: {e}")
+        logger.error("Error deleting biodata: %s", e)
         flash(f'Terjadi kesalahan saat menghapus data: {str(e)}', 'error')
     finally:
         if connection:
@@ -0,0 +1,267 @@
+"""
+Generator dataset sintetis untuk benchmark (bench/run_bench.py)
+
+Skema dibuat oleh init_database() dari app.py di file database baru (bukan database asli),
+lalu diisi data acak dengan seed tetap, sehingga dataset yang sama bisa dibuat ulang:
+- kegiatan_master (default 200 kegiatan) tersebar di tahun berjalan dan tahun sebelumnya
+- users + biodata_kegiatan (default 100.000 baris) tersebar di 13 kabupaten/kota Sulawesi Tengah,
+  satu peserta rata-rata ikut beberapa kegiatan (NIK sama, kegiatan berbeda)
+- gambar tanda tangan (JPEG goresan) dan buku tabungan (JPEG foto ber-noise) di static/uploads
+  dengan prefix 'bench_', dipakai bergantian oleh baris biodata
+
+Contoh:
+    python bench/generate_data.py --output /tmp/bench.db --rows 100000 --kegiatan 200 --seed 42
+    python bench/generate_data.py --hapus-gambar   # hapus gambar bench_* setelah selesai
+"""
+
+import os
+import sys
+import io
+import math
+import random
+import argparse
+import contextlib
+from datetime import datetime, timedelta
+from PIL import Image, ImageDraw
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UPLOAD_FOLDER = os.path.join(ROOT_DIR, 'static', 'uploads')
+BENCH_FILE_PREFIX = 'bench_'
+
+# Nilai sesuai pilihan dropdown di templates/user/tambah-data.html.
+# Bobot kira-kira mengikuti jumlah penduduk (Palu paling banyak, Banggai Laut paling sedikit).
+KABUPATEN_BOBOT = [
+    ('PALU', 16), ('PARIGI MOUTONG', 12), ('DONGGALA', 10), ('SIGI', 9), ('BANGGAI', 12),
+    ('POSO', 8), ('TOLI-TOLI', 7), ('MOROWALI', 6), ('MOROWALI UTARA', 5), ('TOJO UNA-UNA', 5),
+    ('BUOL', 5), ('BANGGAI KEPULAUAN', 3), ('BANGGAI LAUT', 2),
+]
+PERAN = ['Peserta Kegiatan'] * 12 + ['Narasumber', 'Fasilitator/Narasumber', 'Pengajar PM', 'Panitia BGTK', 'Panitia Daerah', 'Panitia Sekolah']
+AGAMA = ['Islam'] * 8 + ['Kristen'] * 3 + ['Katolik', 'Hindu', 'Budha']
+PENDIDIKAN = ['S1/D4'] * 6 + ['S2'] * 2 + ['SMA/SMK', 'D3', 'D1/D2', 'S3']
+STATUS_ASN = ['PNS'] * 5 + ['PPPK'] * 3 + ['Non ASN'] * 2
+PANGKAT = ['Penata Muda, III/a', 'Penata Muda Tkt.I, III/b', 'Penata, III/c', 'Penata Tkt.I, III/d',
+           'Pembina, IV/a', 'Pembina Tkt.I, IV/b', 'PPPK Gol. IX', 'PPPK Gol. X', '-']
+BANK = ['BANK BRI'] * 4 + ['BANK SULTENG'] * 3 + ['BANK BNI', 'BANK MANDIRI', 'BANK BSI', 'BANK BCA']
+JABATAN = ['Guru Kelas', 'Guru Mata Pelajaran', 'Kepala Sekolah', 'Pengawas Sekolah', 'Tenaga Administrasi', 'Guru BK']
+NAMA_DEPAN = ['Andi', 'Muhammad', 'Siti', 'Nur', 'Rahmat', 'Dewi', 'Fitri', 'Abdul', 'Sri', 'Agus', 'Yuni',
+              'Hasan', 'Ratna', 'Ikhsan', 'Lina', 'Moh.', 'Sarifah', 'Yohanis', 'Maria', 'Ketut']
+NAMA_BELAKANG = ['Lamasitudju', 'Pettalolo', 'Lasahido', 'Tombolotutu', 'Rahman', 'Hidayat', 'Saputra',
+                 'Wulandari', 'Lapasere', 'Pakaya', 'Tandiari', 'Manoppo', 'Sangadji', 'Lawira', 'Masyhuddin']
+JENIS_KEGIATAN = ['Workshop', 'Bimbingan Teknis', 'Pelatihan', 'Diseminasi', 'Rapat Koordinasi', 'Lokakarya', 'Pendampingan']
+TOPIK_KEGIATAN = ['Kurikulum Merdeka', 'Asesmen Diagnostik', 'Pembelajaran Berdiferensiasi', 'Literasi dan Numerasi',
+                  'Guru Penggerak', 'Projek Penguatan Profil Pelajar Pancasila', 'Kepemimpinan Sekolah', 'Platform Merdeka Mengajar']
+TEMPAT = ['Hotel Santika Palu', 'Hotel Swiss-Belhotel Silae', 'Hotel Best Western Coco Palu', 'Aula BGTK Sulawesi Tengah',
+          'Hotel Jazz Palu', 'Hotel Sutan Raja Palu']
+BULAN = ['Januari', 'Februari', 'Maret', 'April', 'Mei', 'Juni', 'Juli', 'Agustus', 'September', 'Oktober', 'November', 'Desember']
+
+BIODATA_COLUMNS = [
+    'nik', 'user_id', 'nama_lengkap', 'nip_nippk', 'tempat_lahir', 'tanggal_lahir', 'jenis_kelamin', 'agama',
+    'pendidikan_terakhir', 'jurusan', 'alamat_domisili', 'alamat_email', 'no_hp', 'npwp', 'status_asn',
+    'pangkat_golongan', 'jabatan', 'instansi', 'alamat_instansi', 'kabupaten_kota', 'kabko_lainnya', 'peran',
+    'nama_kegiatan', 'waktu_pelaksanaan', 'tempat_pelaksanaan', 'nama_bank', 'nama_bank_lainnya', 'no_rekening',
+    'nama_pemilik_rekening', 'buku_tabungan_path', 'tanda_tangan', 'kegiatan_id', 'created_at', 'updated_at'
+]
+
+def open_scratch_app(db_path):
+    """Import app.py dengan DB_NAME = db_path (skema dibuat init_database saat import); return modul app"""
+    os.environ['DB_NAME'] = os.path.abspath(db_path)
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    import app as app_module
+    return app_module
+
+def buat_tanda_tangan(rng, width=600, height=220):
+    """Gambar tanda tangan sintetis (goresan kurva hitam di atas putih), bytes PNG"""
+    img = Image.new('RGB', (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    for _ in range(rng.randint(2, 4)):
+        x = rng.uniform(40, 120)
+        y = rng.uniform(80, 140)
+        fase = rng.uniform(0, math.pi)
+        points = []
+        for step in range(rng.randint(40, 90)):
+            x += rng.uniform(3, 8)
+            y = height / 2 + math.sin(step / rng.uniform(3, 6) + fase) * rng.uniform(20, 60)
+            points.append((min(x, width - 20), y))
+        draw.line(points, fill=(0, 0, 0), width=rng.randint(3, 5), joint='curve')
+    buffer = io.BytesIO()
+    img.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+def buat_buku_tabungan(rng, width=1200, height=850):
+    """Foto buku tabungan sintetis (latar ber-noise + blok teks), bytes JPEG"""
+    noise = Image.effect_noise((width, height), rng.uniform(20, 40))
+    img = Image.merge('RGB', (
+        noise.point(lambda v: min(255, v + 60)),
+        noise.point(lambda v: min(255, v + 70)),
+        noise.point(lambda v: min(255, v + 40)),
+    ))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((60, 60, width - 60, 180), fill=(20, 60, 140))
+    for baris in range(10):
+        y = 240 + baris * 55
+        draw.rectangle((80, y, 80 + rng.randint(300, width - 200), y + 22), fill=(40, 40, 40))
+    buffer = io.BytesIO()
+    img.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+def tulis_gambar(rng, jumlah):
+    """Tulis pool gambar ke static/uploads; return (list path tanda tangan, list path buku tabungan)"""
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    ttd_paths, buku_paths = [], []
+    for idx in range(jumlah):
+        ttd_name = f'{BENCH_FILE_PREFIX}ttd_{idx:03d}.jpg'
+        Image.open(io.BytesIO(buat_tanda_tangan(rng))).save(os.path.join(UPLOAD_FOLDER, ttd_name), 'JPEG', quality=90)
+        ttd_paths.append(f'uploads/{ttd_name}')
+
+        buku_name = f'{BENCH_FILE_PREFIX}buku_{idx:03d}.jpg'
+        with open(os.path.join(UPLOAD_FOLDER, buku_name), 'wb') as f:
+            f.write(buat_buku_tabungan(rng))
+        buku_paths.append(f'uploads/{buku_name}')
+    return ttd_paths, buku_paths
+
+def buat_kegiatan(rng, jumlah, tahun):
+    """List kegiatan (nama, waktu_pelaksanaan, tempat, created_at); 70% di tahun berjalan"""
+    kegiatan = []
+    for idx in range(jumlah):
+        tahun_kegiatan = tahun if rng.random() < 0.7 else tahun - 1
+        tanggal = datetime(tahun_kegiatan, 1, 1) + timedelta(days=rng.randint(0, 360), hours=rng.randint(7, 16))
+        nama = f"{rng.choice(JENIS_KEGIATAN)} {rng.choice(TOPIK_KEGIATAN)} Angkatan {idx + 1} Tahun {tahun_kegiatan}"
+        waktu = f"{tanggal.day} - {tanggal.day + 2} {BULAN[tanggal.month - 1]} {tahun_kegiatan}"
+        kegiatan.append((nama, waktu, rng.choice(TEMPAT), tanggal))
+    return kegiatan
+
+def buat_peserta(rng, idx):
+    """Data pribadi satu peserta (sama untuk semua kegiatan yang diikuti)"""
+    kabupaten = rng.choices([k for k, _ in KABUPATEN_BOBOT], weights=[b for _, b in KABUPATEN_BOBOT])[0]
+    lahir = datetime(1965, 1, 1) + timedelta(days=rng.randint(0, 365 * 35))
+    jenis_kelamin = rng.choice(['Laki-laki', 'Perempuan'])
+    nama = f"{rng.choice(NAMA_DEPAN)} {rng.choice(NAMA_BELAKANG)}"
+    status_asn = rng.choice(STATUS_ASN)
+    # NIK 16 digit unik: kode provinsi 72 (Sulawesi Tengah) + kabupaten + tanggal lahir + nomor urut
+    return {
+        'nik': f"72{rng.randint(1, 13):02d}{lahir.strftime('%d%m%y')}{idx:06d}",
+        'nama_lengkap': nama,
+        'nip_nippk': '0' * 18 if status_asn == 'Non ASN' else f"{lahir.strftime('%Y%m%d')}{rng.randint(10**9, 10**10 - 1)}",
+        'tempat_lahir': kabupaten.title(),
+        'tanggal_lahir': lahir.strftime('%Y-%m-%d'),
+        'jenis_kelamin': jenis_kelamin,
+        'agama': rng.choice(AGAMA),
+        'pendidikan_terakhir': rng.choice(PENDIDIKAN),
+        'jurusan': rng.choice(['Pendidikan Matematika', 'Pendidikan Bahasa Indonesia', 'PGSD', 'Pendidikan Biologi', 'Manajemen Pendidikan']),
+        'alamat_domisili': f"Jl. {rng.choice(NAMA_BELAKANG)} No. {rng.randint(1, 200)}, {kabupaten.title()}",
+        'alamat_email': f"peserta{idx}@example.com",
+        'no_hp': f"08{rng.randint(10**9, 10**10 - 1)}",
+        'npwp': f"{rng.randint(10**14, 10**15 - 1)}",
+        'status_asn': status_asn,
+        'pangkat_golongan': rng.choice(PANGKAT),
+        'jabatan': rng.choice(JABATAN),
+        'instansi': f"{rng.choice(['SD', 'SMP', 'SMA', 'SMK'])} Negeri {rng.randint(1, 30)} {kabupaten.title()}",
+        'alamat_instansi': f"Jl. Pendidikan No. {rng.randint(1, 99)}, {kabupaten.title()}",
+        'kabupaten_kota': kabupaten,
+        'kabko_lainnya': None,
+        'nama_bank': rng.choice(BANK),
+        'nama_bank_lainnya': None,
+        'no_rekening': f"{rng.randint(10**12, 10**13 - 1)}",
+        'nama_pemilik_rekening': nama,
+    }
+
+def generate(connection, rows=100000, kegiatan=200, seed=42, images=50, tahun=None, kegiatan_per_peserta=2.5):
+    """Isi database (skema sudah dibuat init_database) dengan data sintetis; return ringkasan dataset"""
+    rng = random.Random(seed)
+    tahun = tahun or datetime.now().year
+    ttd_paths, buku_paths = tulis_gambar(rng, images)
+    daftar_kegiatan = buat_kegiatan(rng, kegiatan, tahun)
+
+    cursor = connection.cursor()
+    kegiatan_ids = []
+    for nama, waktu, tempat, tanggal in daftar_kegiatan:
+        cursor.execute("""
+            INSERT INTO kegiatan_master (nama_kegiatan, waktu_pelaksanaan, tempat_pelaksanaan, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (nama, waktu, tempat, tanggal.strftime('%Y-%m-%d %H:%M:%S'), tanggal.strftime('%Y-%m-%d %H:%M:%S')))
+        kegiatan_ids.append(cursor.lastrowid)
+
+    placeholders = ', '.join('?' for _ in BIODATA_COLUMNS)
+    insert_biodata = f"INSERT INTO biodata_kegiatan ({', '.join(BIODATA_COLUMNS)}) VALUES ({placeholders})"
+    batch = []
+    dibuat = 0
+    peserta_idx = 0
+    while dibuat < rows:
+        peserta = buat_peserta(rng, peserta_idx)
+        peserta_idx += 1
+        cursor.execute(
+            "INSERT INTO users (username, password, role, nama, email) VALUES (?, ?, 'user', ?, ?)",
+            (f"peserta_{peserta['nik']}", peserta['nik'], peserta['nama_lengkap'], peserta['alamat_email'])
+        )
+        user_id = cursor.lastrowid
+        # Satu peserta rata-rata mengikuti sekitar kegiatan_per_peserta kegiatan berbeda
+        jumlah_ikut = min(rows - dibuat, kegiatan, 1 + int(rng.expovariate(1 / max(kegiatan_per_peserta - 1, 0.01))))
+        ttd = rng.choice(ttd_paths) if ttd_paths else None
+        buku = rng.choice(buku_paths) if buku_paths else None
+        for kegiatan_idx in rng.sample(range(kegiatan), jumlah_ikut):
+            nama, waktu, tempat, tanggal = daftar_kegiatan[kegiatan_idx]
+            created_at = (tanggal + timedelta(minutes=rng.randint(0, 3 * 24 * 60))).strftime('%Y-%m-%d %H:%M:%S')
+            data = dict(peserta, user_id=user_id, peran=rng.choice(PERAN), nama_kegiatan=nama,
+                        waktu_pelaksanaan=waktu, tempat_pelaksanaan=tempat, buku_tabungan_path=buku,
+                        tanda_tangan=ttd, kegiatan_id=kegiatan_ids[kegiatan_idx],
+                        created_at=created_at, updated_at=created_at)
+            batch.append(tuple(data[column] for column in BIODATA_COLUMNS))
+            dibuat += 1
+        if len(batch) >= 5000:
+            cursor.executemany(insert_biodata, batch)
+            batch = []
+    if batch:
+        cursor.executemany(insert_biodata, batch)
+    connection.commit()
+    cursor.execute("ANALYZE")
+    cursor.close()
+    return {
+        'seed': seed,
+        'tahun': tahun,
+        'kegiatan': kegiatan,
+        'biodata_rows': dibuat,
+        'peserta': peserta_idx,
+        'images': images,
+    }
+
+def hapus_gambar_bench():
+    """Hapus pool gambar 'bench_*' dari static/uploads"""
+    for name in os.listdir(UPLOAD_FOLDER):
+        if name.startswith(BENCH_FILE_PREFIX):
+            os.unlink(os.path.join(UPLOAD_FOLDER, name))
+
+def main():
+    parser = argparse.ArgumentParser(description='Buat database sintetis untuk benchmark')
+    parser.add_argument('--output', help='Path file database baru (tidak boleh sudah ada)')
+    parser.add_argument('--rows', type=int, default=100000, help='Jumlah baris biodata_kegiatan (default 100000)')
+    parser.add_argument('--kegiatan', type=int, default=200, help='Jumlah kegiatan (default 200)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed random (default 42)')
+    parser.add_argument('--images', type=int, default=50, help='Jumlah gambar tanda tangan & buku tabungan (default 50)')
+    parser.add_argument('--tahun', type=int, default=None, help='Tahun berjalan dataset (default tahun sekarang)')
+    parser.add_argument('--hapus-gambar', action='store_true', help='Hapus gambar bench_* dari static/uploads lalu keluar')
+    args = parser.parse_args()
+
+    if args.hapus_gambar:
+        hapus_gambar_bench()
+        print("✅ Gambar benchmark dihapus.")
+        return
+    if not args.output:
+        parser.error('--output wajib diisi')
+
+    if os.path.exists(args.output):
+        print(f"❌ {args.output} sudah ada, pilih path lain.")
+        sys.exit(1)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        app_module = open_scratch_app(args.output)
+    connection = app_module.get_db_connection()
+    try:
+        ringkasan = generate(connection, rows=args.rows, kegiatan=args.kegiatan, seed=args.seed,
+                             images=args.images, tahun=args.tahun)
+    finally:
+        connection.close()
+    print(f"✅ Dataset dibuat di {args.output}: {ringkasan}")
+
+if __name__ == '__main__':
+    main()
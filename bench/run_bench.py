@@ -0,0 +1,476 @@
+"""
+Benchmark route & export app.py dengan dataset sintetis (lihat bench/generate_data.py)
+
+Setiap skenario dijalankan lewat Flask test client di database salinan (folder sementara),
+lalu dilaporkan sebagai JSON: latensi p50/p95 (termasuk membaca seluruh body response),
+jumlah query & waktu DB per request (dari header Server-Timing, profiling.py) dan peak RSS
+proses selama skenario. Render PDF paralel berjalan di proses anak dan tidak ikut peak RSS.
+
+Hanya response 2xx/3xx yang masuk statistik waktu; skenario dengan response lain (atau yang
+hasilnya tidak lolos pengecekan, mis. POST yang tidak menyimpan baris) ditandai gagal ('failed'
+di JSON) dan membuat exit code 1. Skenario yang template halamannya tidak ada di repo dilewati
+('skipped' di JSON) dan tidak membuat exit code 1. Hasil bisa dibandingkan dengan baseline
+yang disimpan sebelumnya; exit code 1 juga jika ada skenario yang p50-nya naik lebih dari
+--threshold atau jumlah query-nya bertambah.
+
+Contoh:
+    python bench/run_bench.py --rows 100000 --kegiatan 200 --output bench_baseline.json
+    python bench/run_bench.py --rows 100000 --kegiatan 200 --baseline bench_baseline.json
+    python bench/run_bench.py --db /tmp/bench.db --only export_all --export-iterations 5
+"""
+
+import os
+import sys
+import io
+import re
+import json
+import math
+import time
+import base64
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+from urllib.parse import quote
+
+from jinja2 import TemplateNotFound
+
+import generate_data
+
+SERVER_TIMING_DB_RE = re.compile(r'db;dur=([\d.]+);desc="(\d+) query"')
+
+def percentile(values, pct):
+    """Persentil dengan interpolasi linear (values tidak perlu terurut)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lower, upper = math.floor(k), math.ceil(k)
+    if lower == upper:
+        return ordered[int(k)]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+def reset_peak_rss():
+    """Reset peak RSS proses (Linux: /proc/self/clear_refs); return False jika tidak didukung"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def peak_rss_mb():
+    """Peak RSS proses dalam MB (VmHWM di Linux, ru_maxrss di platform lain), None jika tidak tersedia"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS melaporkan byte, Linux/BSD kilobyte
+    return maxrss / (1024.0 * 1024.0) if sys.platform == 'darwin' else maxrss / 1024.0
+
+def git_commit():
+    """Commit git yang sedang di-benchmark (None jika bukan repo git)"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=generate_data.ROOT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def dataset_context(app_module, seed):
+    """Parameter skenario dari isi database: tahun, kegiatan median, kabupaten terkecil/terbesar, NIK sampel"""
+    connection = app_module.get_db_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT id FROM users WHERE role = 'admin' ORDER BY id LIMIT 1")
+        admin_id = cursor.fetchone()[0]
+        cursor.execute("SELECT MAX(tahun) FROM biodata_kegiatan")
+        tahun = cursor.fetchone()[0] or datetime.now().year
+
+        cursor.execute("""
+            SELECT nama_kegiatan, COUNT(*) AS jumlah FROM biodata_kegiatan
+            GROUP BY nama_kegiatan ORDER BY jumlah, nama_kegiatan
+        """)
+        kegiatan_rows = cursor.fetchall()
+        kegiatan_median = kegiatan_rows[len(kegiatan_rows) // 2]['nama_kegiatan']
+
+        cursor.execute("""
+            SELECT kabupaten_kota, COUNT(*) AS jumlah FROM biodata_kegiatan
+            GROUP BY kabupaten_kota ORDER BY jumlah, kabupaten_kota
+        """)
+        kabupaten_rows = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT CAST(strftime('%m', created_at) AS INTEGER) AS bulan, COUNT(*) AS jumlah
+            FROM biodata_kegiatan WHERE tahun = ?
+            GROUP BY bulan ORDER BY jumlah, bulan LIMIT 1
+        """, (tahun,))
+        bulan_row = cursor.fetchone()
+
+        cursor.execute("SELECT DISTINCT nik FROM biodata_kegiatan ORDER BY nik")
+        semua_nik = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT nama_lengkap FROM biodata_kegiatan ORDER BY id LIMIT 1000")
+        semua_nama = [row[0] for row in cursor.fetchall()]
+        cursor.execute("""
+            SELECT nik FROM biodata_kegiatan WHERE TRIM(nama_kegiatan) = TRIM(?) ORDER BY id LIMIT 1
+        """, (kegiatan_median,))
+        nik_kegiatan = cursor.fetchone()[0]
+        cursor.close()
+    finally:
+        connection.close()
+
+    return {
+        'admin_id': admin_id,
+        'tahun': tahun,
+        'kegiatan_median': kegiatan_median,
+        'kabupaten_kecil': kabupaten_rows[0]['kabupaten_kota'],
+        'kabupaten_besar': kabupaten_rows[-1]['kabupaten_kota'],
+        'bulan_kecil': bulan_row['bulan'] if bulan_row else 1,
+        'nik_sampel': random.Random(seed).sample(semua_nik, min(len(semua_nik), 200)),
+        'nama_sampel': random.Random(seed).sample(semua_nama, min(len(semua_nama), 200)),
+        'nik_kegiatan': nik_kegiatan,
+    }
+
+def tambah_data_form(ctx, iteration, signature_png, buku_jpeg):
+    """Form POST /tambah-data untuk peserta baru (NIK unik per iterasi)"""
+    nik = f"79{iteration:014d}"
+    return {
+        'NIK': nik,
+        'nama_lengkap': 'Peserta Benchmark',
+        'nip/nippk': '0' * 18,
+        'tempat_lahir': 'Palu',
+        'tanggal_lahir': '1990-01-01',
+        'jenis_kelamin': 'Laki-laki',
+        'agama': 'Islam',
+        'pendidikan_terakhir': 'S1/D4',
+        'jurusan': 'Pendidikan Matematika',
+        'alamat_domisili': 'Jl. Benchmark No. 1, Palu',
+        'alamat_email': f'bench{iteration}@example.com',
+        'nohp': '081234567890',
+        'npwp': '123456789012345',
+        'status_asn': 'Non ASN',
+        'Pangkat/Golongan': '-',
+        'jabatan': 'Guru Kelas',
+        'instansi': 'SD Negeri 1 Palu',
+        'alamat_instansi': 'Jl. Pendidikan No. 1, Palu',
+        'kabupaten/kota': 'PALU',
+        'peran': 'Peserta Kegiatan',
+        'nama_kegiatan': ctx['kegiatan_median'],
+        'waktu_pelaksanaan': '-',
+        'tempat_pelaksanaan': '-',
+        'nama_bank': 'BANK BRI',
+        'no_rekening': '1234567890123',
+        'nama_pemilik_rekening': 'Peserta Benchmark',
+        'ttd': 'data:image/png;base64,' + base64.b64encode(signature_png).decode('ascii'),
+        'buku_tabungan': (io.BytesIO(buku_jpeg), 'buku_tabungan.jpg'),
+        'action': 'save',
+    }
+
+def biodata_tersimpan(app_module, ctx, iteration):
+    """Cek POST tambah_data benar-benar menyimpan baris untuk NIK iterasi ini"""
+    connection = app_module.get_db_connection()
+    try:
+        row = connection.execute("""
+            SELECT 1 FROM biodata_kegiatan WHERE nik = ? AND TRIM(nama_kegiatan) = TRIM(?) LIMIT 1
+        """, (f"79{iteration:014d}", ctx['kegiatan_median'])).fetchone()
+    finally:
+        connection.close()
+    return row is not None
+
+def build_scenarios(ctx, signature_png, buku_jpeg):
+    """Daftar skenario: (nama, jenis 'page'/'export', fungsi(iterasi) -> kwargs client.open, opsi)
+
+    Opsi: anon (tanpa login admin), cold_cache (hapus cache export sebelum tiap iterasi),
+    template (skenario dilewati jika template ini belum ada di repo), verify(app, ctx, iterasi)
+    (response 2xx/3xx tetap dihitung gagal jika return False).
+    """
+    tahun = ctx['tahun']
+    kegiatan = quote(ctx['kegiatan_median'], safe='')
+    kab_kecil = quote(ctx['kabupaten_kecil'], safe='')
+    kab_besar = quote(ctx['kabupaten_besar'], safe='')
+    nik_sampel = ctx['nik_sampel']
+    datatables = 'draw=1&start=0&length=25&order%5B0%5D%5Bcolumn%5D=0&order%5B0%5D%5Bdir%5D=asc'
+
+    def get(url):
+        return lambda iteration: {'path': url, 'method': 'GET'}
+
+    return [
+        ('admin_dashboard', 'page', get('/admin/dashboard'), {}),
+        ('admin_rekap_filter', 'page', get(f'/admin/rekap-filter?tahun={tahun}'), {}),
+        ('api_rekap_filter_data', 'page', get(f'/api/rekap-filter-data?{datatables}&tahun={tahun}'), {}),
+        ('admin_rekap_tahunan', 'page', get(f'/admin/rekap-tahunan?tahun={tahun}'),
+         {'template': 'admin/admin-rekap-tahunan.html'}),
+        ('admin_detail_kegiatan', 'page', get(f'/admin/kegiatan/{kegiatan}'), {}),
+        ('api_detail_kegiatan', 'page', get(f'/api/detail-kegiatan/{kegiatan}?{datatables}'), {}),
+        ('api_search', 'page', lambda iteration: {
+            'path': '/api/search', 'method': 'GET',
+            'query_string': {'q': ctx['nama_sampel'][iteration % len(ctx['nama_sampel'])].split()[0]}
+        }, {}),
+        ('get_latest_by_nik', 'page', lambda iteration: {
+            'path': '/api/get-latest-by-nik', 'method': 'POST',
+            'json': {'nik': nik_sampel[iteration % len(nik_sampel)]}
+        }, {'anon': True}),
+        ('tambah_data_post', 'page', lambda iteration: {
+            'path': '/tambah-data', 'method': 'POST', 'content_type': 'multipart/form-data',
+            'data': tambah_data_form(ctx, iteration, signature_png, buku_jpeg)
+        }, {'anon': True, 'verify': biodata_tersimpan}),
+        ('export_rekap_kabupaten_pdf', 'export', get(f'/admin/export-rekap-kabupaten-pdf/{kab_kecil}'), {'cold_cache': True}),
+        ('export_rekap_kabupaten_excel', 'export', get(f'/admin/export-rekap-kabupaten-excel/{kab_besar}'), {}),
+        ('export_rekap_filter_pdf', 'export', get(f'/admin/export-rekap-filter-pdf?tahun={tahun}&nama_kegiatan={kegiatan}'), {}),
+        ('export_rekap_filter_excel', 'export', get(f'/admin/export-rekap-filter-excel?tahun={tahun}&kabupaten_kota={kab_besar}'), {}),
+        ('export_rekap_tahunan_pdf', 'export', get(
+            f"/admin/export-rekap-tahunan-pdf?tahun={tahun}&bulan_awal={ctx['bulan_kecil']}&bulan_akhir={ctx['bulan_kecil']}"), {}),
+        ('export_rekap_tahunan_excel', 'export', get(f'/admin/export-rekap-tahunan-excel?tahun={tahun}'), {}),
+        ('export_all_pdf', 'export', get(f'/admin/export-all-pdf/{kegiatan}'), {'cold_cache': True}),
+        ('export_all_pdf_cached', 'export', get(f'/admin/export-all-pdf/{kegiatan}'), {}),
+        ('export_all_excel', 'export', get(f'/admin/export-all-excel/{kegiatan}'), {}),
+        ('export_pdf', 'export', get(f"/admin/export-pdf/{ctx['nik_kegiatan']}/{kegiatan}"), {}),
+    ]
+
+def clear_export_cache(folder):
+    """Kosongkan folder cache export (skenario cold cache)"""
+    if os.path.isdir(folder):
+        for name in os.listdir(folder):
+            os.unlink(os.path.join(folder, name))
+
+def template_ada(app_module, template_name):
+    """Cek template halaman ada (route yang templatenya belum ada di repo selalu 500)"""
+    try:
+        app_module.app.jinja_env.get_template(template_name)
+    except TemplateNotFound:
+        return False
+    return True
+
+def status_ok(status_code):
+    """Hanya response 2xx/3xx yang dihitung sebagai hasil benchmark"""
+    return 200 <= status_code < 400
+
+def run_scenario(app_module, ctx, request_kwargs, iterations, warmup, options, export_cache_folder):
+    """Jalankan satu skenario; return dict statistik"""
+    admin_client = app_module.app.test_client()
+    with admin_client.session_transaction() as sess:
+        sess.update(logged_in=True, user_id=ctx['admin_id'], user_role='admin', username='admin',
+                    is_admin=True, user_nama='admin')
+
+    latencies, db_times, query_counts = [], [], []
+    status_counts = {}
+    rss_reset = reset_peak_rss()
+    for iteration in range(-warmup, iterations):
+        # Request anonim memakai client baru agar session tidak terbawa antar iterasi
+        client = app_module.app.test_client() if options.get('anon') else admin_client
+        if options.get('cold_cache'):
+            clear_export_cache(export_cache_folder)
+        kwargs = request_kwargs(iteration + warmup)
+        started = time.perf_counter()
+        response = client.open(**kwargs)
+        response.get_data()
+        elapsed = time.perf_counter() - started
+        response.close()
+        if iteration < 0:
+            continue
+
+        status = str(response.status_code)
+        # Redirect "berhasil" yang ternyata tidak menyimpan data juga dihitung gagal
+        if status_ok(response.status_code) and options.get('verify') \
+                and not options['verify'](app_module, ctx, iteration + warmup):
+            status += ' (cek gagal)'
+        status_counts[status] = status_counts.get(status, 0) + 1
+        # Response error (mis. 500 karena template hilang) jauh lebih cepat dari response normal;
+        # tidak ikut statistik waktu agar tidak terlihat seperti perbaikan performa
+        if not status_ok(response.status_code) or status.endswith('(cek gagal)'):
+            continue
+        latencies.append(elapsed * 1000)
+        match = SERVER_TIMING_DB_RE.search(response.headers.get('Server-Timing', ''))
+        if match:
+            db_times.append(float(match.group(1)))
+            query_counts.append(int(match.group(2)))
+
+    return {
+        'iterations': iterations,
+        'failed': iterations - len(latencies),
+        'p50_ms': round(percentile(latencies, 50), 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95), 2) if latencies else None,
+        'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else None,
+        'min_ms': round(min(latencies), 2) if latencies else None,
+        'max_ms': round(max(latencies), 2) if latencies else None,
+        'db_p50_ms': round(percentile(db_times, 50), 2) if db_times else None,
+        'queries_p50': percentile(query_counts, 50) if query_counts else None,
+        'queries_max': max(query_counts) if query_counts else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1) if rss_reset else None,
+        'status': status_counts,
+    }
+
+def compare_with_baseline(result, baseline, threshold):
+    """Cetak perbandingan dengan baseline; return list nama skenario yang regresi"""
+    regressions = []
+    print()
+    print(f"{'Skenario':<32} {'p50 ms':>10} {'base':>10} {'Δ p50':>8} {'Δ p95':>8} {'query':>12}")
+    for name, stats in result['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if stats.get('skipped'):
+            print(f"{name:<32} {'':>10} {'':>10} {'':>8} {'':>8} {'':>12}  ⏭  dilewati: {stats['skipped']}")
+            continue
+        if stats['failed']:
+            regressions.append(name)
+            print(f"{name:<32} {'':>10} {'':>10} {'':>8} {'':>8} {'':>12}  ❌ GAGAL status {stats['status']}")
+            continue
+        if not base or not base.get('p50_ms') or base.get('failed'):
+            print(f"{name:<32} {stats['p50_ms']:>10.1f} {'(baru)':>10}")
+            continue
+        delta_p50 = stats['p50_ms'] / base['p50_ms'] - 1 if base['p50_ms'] else 0
+        delta_p95 = stats['p95_ms'] / base['p95_ms'] - 1 if base['p95_ms'] else 0
+        queries = f"{base.get('queries_p50')}→{stats.get('queries_p50')}"
+        regresi = delta_p50 > threshold or (
+            stats.get('queries_p50') is not None and base.get('queries_p50') is not None
+            and stats['queries_p50'] > base['queries_p50']
+        )
+        if regresi:
+            regressions.append(name)
+        print(f"{name:<32} {stats['p50_ms']:>10.1f} {base['p50_ms']:>10.1f} {delta_p50:>+8.0%} {delta_p95:>+8.0%} "
+              f"{queries:>12}{'  ❌ REGRESI' if regresi else ''}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark route dan export app.py dengan dataset sintetis')
+    parser.add_argument('--db', help='Database hasil generate_data.py (disalin dulu); tanpa ini dataset dibuat baru')
+    parser.add_argument('--rows', type=int, default=100000, help='Jumlah baris biodata jika dataset dibuat baru (default 100000)')
+    parser.add_argument('--kegiatan', type=int, default=200, help='Jumlah kegiatan jika dataset dibuat baru (default 200)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed dataset dan sampel NIK (default 42)')
+    parser.add_argument('--images', type=int, default=50, help='Jumlah gambar tanda tangan & buku tabungan (default 50)')
+    parser.add_argument('--iterations', type=int, default=20, help='Iterasi per skenario halaman/API (default 20)')
+    parser.add_argument('--export-iterations', type=int, default=3, help='Iterasi per skenario export (default 3)')
+    parser.add_argument('--only', help='Regex nama skenario yang dijalankan')
+    parser.add_argument('--output', help='Simpan hasil JSON ke file ini (default: cetak ke stdout)')
+    parser.add_argument('--baseline', help='File JSON hasil sebelumnya untuk dibandingkan')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Batas kenaikan p50 sebelum dianggap regresi (default 0.2 = 20%%)')
+    parser.add_argument('--no-query-count', action='store_true', help='Matikan profiling SQL (latensi tanpa overhead pencatatan query)')
+    parser.add_argument('--keep-files', action='store_true', help='Jangan hapus file upload/cache yang dibuat benchmark')
+    args = parser.parse_args()
+
+    scratch_dir = tempfile.mkdtemp(prefix='bgtk_bench_')
+    db_path = os.path.join(scratch_dir, 'bench.db')
+    export_cache_folder = os.path.join(scratch_dir, 'cache')
+
+    # Konfigurasi app harus diset sebelum app.py di-import
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['EXPORT_CACHE_FOLDER'] = export_cache_folder
+    os.environ['METRICS_DB'] = os.path.join(scratch_dir, 'metrics.db')
+    os.environ['EXPORT_SENDFILE'] = ''
+    os.environ['PROFILE_REQUESTS'] = '0' if args.no_query_count else '1'
+    os.environ.setdefault('PROFILE_SLOW_QUERY_MS', str(10 ** 9))
+
+    folders_dipantau = [generate_data.UPLOAD_FOLDER, os.path.join(generate_data.ROOT_DIR, 'static', 'ttd_pdf')]
+    file_awal = {folder: set(os.listdir(folder)) if os.path.isdir(folder) else set() for folder in folders_dipantau}
+
+    try:
+        if args.db:
+            shutil.copyfile(args.db, db_path)
+            app_module = generate_data.open_scratch_app(db_path)
+            # Pool gambar dibuat ulang dengan seed yang sama (urutan rng sama seperti generate())
+            generate_data.tulis_gambar(random.Random(args.seed), args.images)
+            dataset = {'source': os.path.abspath(args.db)}
+        else:
+            app_module = generate_data.open_scratch_app(db_path)
+            print(f"⏳ Membuat dataset {args.rows} baris / {args.kegiatan} kegiatan...", file=sys.stderr)
+            connection = app_module.get_db_connection()
+            try:
+                dataset = generate_data.generate(connection, rows=args.rows, kegiatan=args.kegiatan,
+                                                 seed=args.seed, images=args.images)
+            finally:
+                connection.close()
+
+        # Tanda tangan disiapkan saat disimpan (seperti save_tanda_tangan_file), bukan saat export
+        import pdf_report
+        for name in sorted(os.listdir(generate_data.UPLOAD_FOLDER)):
+            if name.startswith(generate_data.BENCH_FILE_PREFIX + 'ttd_'):
+                pdf_report.siapkan_tanda_tangan_pdf(f'uploads/{name}')
+
+        app_module.app.config['WTF_CSRF_ENABLED'] = False
+        ctx = dataset_context(app_module, args.seed)
+        rng = random.Random(args.seed)
+        signature_png = generate_data.buat_tanda_tangan(rng)
+        buku_jpeg = generate_data.buat_buku_tabungan(rng)
+
+        result = {
+            'meta': {
+                'date': datetime.now().isoformat(timespec='seconds'),
+                'git_commit': git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'profiling': not args.no_query_count,
+                'dataset': dataset,
+                'context': {key: value for key, value in ctx.items() if key != 'nik_sampel'},
+            },
+            'scenarios': {},
+        }
+
+        only = re.compile(args.only) if args.only else None
+        failed = []
+        for name, kind, request_kwargs, options in build_scenarios(ctx, signature_png, buku_jpeg):
+            if only and not only.search(name):
+                continue
+            if options.get('template') and not template_ada(app_module, options['template']):
+                alasan = f"template {options['template']} tidak ada"
+                result['scenarios'][name] = {'skipped': alasan}
+                print(f"⏭  {name} dilewati ({alasan})", file=sys.stderr)
+                continue
+            iterations = args.export_iterations if kind == 'export' else args.iterations
+            # Warm-up 1 request, kecuali export cold cache (setiap render sama mahalnya)
+            warmup = 0 if options.get('cold_cache') else 1
+            print(f"▶ {name} ({iterations}x)", file=sys.stderr)
+            stats = run_scenario(app_module, ctx, request_kwargs, iterations, warmup, options, export_cache_folder)
+            result['scenarios'][name] = stats
+            if stats['failed']:
+                failed.append(name)
+                print(f"  ❌ {stats['failed']}/{iterations} request gagal (status {stats['status']}), "
+                      f"tidak dihitung di statistik waktu", file=sys.stderr)
+            if stats['p50_ms'] is not None:
+                print(f"  p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms, "
+                      f"query {stats['queries_p50']}, peak RSS {stats['peak_rss_mb']} MB, status {stats['status']}",
+                      file=sys.stderr)
+
+        output = json.dumps(result, indent=2, ensure_ascii=False)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+            print(f"✅ Hasil disimpan ke {args.output}", file=sys.stderr)
+        else:
+            print(output)
+
+        if args.baseline:
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+            regressions = compare_with_baseline(result, baseline, args.threshold)
+            if regressions:
+                print(f"\n❌ Regresi: {', '.join(regressions)}")
+                sys.exit(1)
+            print("\n✅ Tidak ada regresi dibanding baseline.")
+        if failed:
+            print(f"\n❌ Skenario dengan response selain 2xx/3xx: {', '.join(failed)}", file=sys.stderr)
+            sys.exit(1)
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+        if not args.keep_files:
+            for folder in folders_dipantau:
+                if not os.path.isdir(folder):
+                    continue
+                for name in set(os.listdir(folder)) - file_awal[folder]:
+                    try:
+                        os.unlink(os.path.join(folder, name))
+                    except OSError:
+                        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+Engine laporan Excel biodata peserta (1 peserta 1 baris), mode streaming
+
+Route export Excel di app.py membaca cursor dua kali:
+1. ExcelColumnStats.add() untuk setiap baris -> jumlah baris + statistik panjang teks per kolom
+   (lebar kolom harus sudah diketahui sebelum baris pertama ditulis di mode write-only).
+2. write_biodata_workbook() menulis baris langsung dari cursor ke Workbook(write_only=True)
+   yang disimpan ke file dari export_file.new_export_file() (spool/disk), lalu dikirim
+   lewat export_file.export_file_response().
+
+Tidak ada baris yang disimpan di memori, jadi pemakaian memori tetap datar untuk export besar.
+"""
+
+from copy import copy
+from datetime import datetime
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.worksheet import Worksheet
+
+from pdf_report import FIELD_LABELS, FIELD_ORDER, EXCLUDE_FIELDS
+from profiling import profile_span
+
+EXCEL_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Lebar awal kolom (dipakai juga untuk estimasi tinggi baris)
+LEBAR_KOLOM_NAMA_KEGIATAN = 35
+LEBAR_KOLOM_DEFAULT = 25
+
+# Field yang alignment-nya tengah (lainnya rata kiri), semua dengan wrap text
+FIELD_RATA_TENGAH = frozenset(['tanggal_lahir'])
+
+# Styles
+HEADER_FILL = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
+HEADER_FONT = Font(bold=True, color="000000", size=11)
+TITLE_FONT = Font(bold=True, size=12, color="000000")
+INFO_FONT = Font(bold=True, size=11, color="000000")
+EXPORT_DATE_FONT = Font(size=10, italic=True)
+BORDER_STYLE = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin')
+)
+CENTER_ALIGN = Alignment(horizontal='center', vertical='center')
+LEFT_ALIGN = Alignment(horizontal='left', vertical='top', wrap_text=True)
+CENTER_TOP_ALIGN = Alignment(horizontal='center', vertical='top', wrap_text=True)
+INFO_LABEL_ALIGN = Alignment(horizontal='left', vertical='center')
+INFO_VALUE_ALIGN = Alignment(horizontal='left', vertical='center', wrap_text=True)
+# Alternating row colors untuk readability
+ROW_FILLS = (
+    PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid"),
+    PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
+)
+
+def biodata_excel_fields(dengan_nama_kegiatan=True):
+    """List kolom export Excel: (opsional) Nama Kegiatan, field biodata terurut, lalu Tanda Tangan"""
+    all_fields = []
+    if dengan_nama_kegiatan:
+        all_fields.append({'key': 'nama_kegiatan', 'label': 'Nama Kegiatan'})
+    for key in FIELD_ORDER:
+        if key not in EXCLUDE_FIELDS:
+            label = FIELD_LABELS.get(key, key.replace('_', ' ').title())
+            all_fields.append({'key': key, 'label': label})
+    all_fields.append({'key': 'tanda_tangan', 'label': 'Tanda Tangan'})
+    return all_fields
+
+def excel_display_value(biodata, field_key):
+    """Nilai cell untuk satu field: '-' jika kosong, '[Tersedia]' untuk tanda tangan"""
+    if field_key == 'tanda_tangan':
+        return "[Tersedia]" if biodata.get('tanda_tangan') else "-"
+    value = biodata.get(field_key, '')
+    return str(value) if value and str(value).strip() else '-'
+
+def panjang_teks_kolom(text):
+    """Panjang teks untuk perhitungan lebar kolom (teks > 50 karakter dianggap wrap, maks 40 per baris)"""
+    text_length = len(text)
+    if text_length > 50:
+        lines = text.split('\n') if '\n' in text else [text]
+        return min(max(len(line) for line in lines), 40)
+    return text_length
+
+class ExcelColumnStats:
+    """Statistik yang dikumpulkan saat membaca cursor: jumlah baris, baris pertama, panjang maksimal per kolom"""
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.total_rows = 0
+        self.first_row = None
+        # Lebar minimal kolom = panjang header
+        self.max_lengths = [len(field_info['label']) for field_info in fields]
+
+    def add(self, biodata):
+        if self.first_row is None:
+            self.first_row = biodata
+        self.total_rows += 1
+        for col_idx, field_info in enumerate(self.fields):
+            length = panjang_teks_kolom(excel_display_value(biodata, field_info['key']))
+            if length > self.max_lengths[col_idx]:
+                self.max_lengths[col_idx] = length
+
+    def column_width(self, col_idx):
+        """Lebar optimal kolom ke-col_idx (0-based): panjang maksimal + 2, minimal 12, maksimal 40 (alamat 45)"""
+        max_length = self.max_lengths[col_idx]
+        optimal_width = max(12, min(max_length + 2, 40))
+        if 'Alamat' in self.fields[col_idx]['label']:
+            optimal_width = max(optimal_width, min(max_length + 2, 45))
+        return optimal_width
+
+def styled_cell(ws, value, font=None, fill=None, border=None, alignment=None):
+    """Buat WriteOnlyCell dengan style"""
+    cell = WriteOnlyCell(ws, value=value)
+    if font:
+        cell.font = font
+    if fill:
+        cell.fill = fill
+    if border:
+        cell.border = border
+    if alignment:
+        cell.alignment = alignment
+    return cell
+
+@profile_span('excel')
+def write_biodata_workbook(rows, stats, output, sheet_title, title=None, info_kegiatan=None, progress=None):
+    """Tulis workbook biodata (write-only) dari iterator baris ke output (file-like); return output
+
+    Layout rekap: judul (baris 1) + tanggal export (baris 2), header di baris 3, kolom A = Nama Kegiatan.
+    Layout kegiatan (info_kegiatan = [(label, value), ...]): info kegiatan di baris 1-3,
+    tanggal export di baris 4, header di baris 5.
+    progress(rows_rendered, total_rows) dipanggil sebelum setiap baris ditulis.
+    """
+    fields = stats.fields
+    num_cols = len(fields)
+    last_col_letter = get_column_letter(num_cols)
+    export_date = datetime.now().strftime("%d %B %Y, %H:%M:%S")
+    export_date_text = f"Tanggal Export: {export_date}"
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_title)
+
+    if info_kegiatan:
+        # Kolom A untuk label info kegiatan, lebar dari panjang label (20 - 23)
+        max_label_length = max([len(label) for label, _value in info_kegiatan] + [len(export_date_text)])
+        col_a_width = max(20, min(max_label_length + 3, 23))
+        header_row = len(info_kegiatan) + 2
+    else:
+        col_a_width = LEBAR_KOLOM_NAMA_KEGIATAN
+        header_row = 3
+
+    # Lebar kolom (kolom A tetap, lainnya dari statistik) - wajib di-set sebelum baris pertama ditulis
+    ws.column_dimensions['A'].width = col_a_width
+    for col_idx in range(1, num_cols):
+        ws.column_dimensions[get_column_letter(col_idx + 1)].width = stats.column_width(col_idx)
+    # Estimasi tinggi baris memakai lebar awal kolom (sama seperti sebelum auto-adjust lebar)
+    lebar_estimasi = [col_a_width] + [LEBAR_KOLOM_DEFAULT] * (num_cols - 1)
+
+    # Freeze header, print landscape A4 fit to width
+    ws.freeze_panes = f'A{header_row + 1}'
+    ws.page_setup.orientation = Worksheet.ORIENTATION_LANDSCAPE
+    ws.page_setup.paperSize = Worksheet.PAPERSIZE_A4
+    ws.page_setup.fitToWidth = 1
+    ws.page_setup.fitToHeight = 0
+
+    if info_kegiatan:
+        # Kolom A label, kolom B sampai akhir (merge) untuk titik dua + value
+        for row_idx, (label, value) in enumerate(info_kegiatan, 1):
+            ws.merged_cells.add(f'B{row_idx}:{last_col_letter}{row_idx}')
+            ws.row_dimensions[row_idx].height = 32
+            ws.append([
+                styled_cell(ws, label, font=INFO_FONT, fill=HEADER_FILL, alignment=INFO_LABEL_ALIGN),
+                styled_cell(ws, f": {value}", font=INFO_FONT, fill=HEADER_FILL, alignment=INFO_VALUE_ALIGN)
+            ])
+    else:
+        ws.merged_cells.add(f'A1:{last_col_letter}1')
+        ws.row_dimensions[1].height = 25
+        ws.append([styled_cell(ws, title, font=TITLE_FONT, alignment=CENTER_ALIGN)])
+
+    # Informasi tanggal export
+    export_date_row = header_row - 1
+    ws.merged_cells.add(f'A{export_date_row}:{last_col_letter}{export_date_row}')
+    ws.row_dimensions[export_date_row].height = 18
+    ws.append([styled_cell(ws, export_date_text, font=EXPORT_DATE_FONT, alignment=LEFT_ALIGN)])
+
+    # Header kolom (semua field sebagai kolom)
+    ws.row_dimensions[header_row].height = 22
+    ws.append([
+        styled_cell(ws, field_info['label'], font=HEADER_FONT, fill=HEADER_FILL, border=BORDER_STYLE, alignment=CENTER_ALIGN)
+        for field_info in fields
+    ])
+
+    # Style cell data per (warna baris, kolom) cukup dibuat sekali; tiap cell hanya menyalin StyleArray,
+    # karena set font/fill/border per cell (lookup + hash style di workbook) mendominasi waktu export
+    style_templates = [
+        [
+            styled_cell(ws, None, fill=fill, border=BORDER_STYLE,
+                        alignment=CENTER_TOP_ALIGN if field_info['key'] in FIELD_RATA_TENGAH else LEFT_ALIGN)._style
+            for field_info in fields
+        ]
+        for fill in ROW_FILLS
+    ]
+
+    # Data untuk setiap user (setiap user = 1 baris)
+    current_row = header_row + 1
+    for user_idx, biodata in enumerate(rows):
+        if progress:
+            progress(user_idx, stats.total_rows)
+        row_styles = style_templates[user_idx % 2]
+        values = [excel_display_value(biodata, field_info['key']) for field_info in fields]
+
+        # Auto adjust row height berdasarkan panjang teks dan lebar awal kolom
+        max_height = 18
+        for col_idx, value in enumerate(values):
+            estimated_lines = max(1, (len(value) / max(lebar_estimasi[col_idx] * 0.8, 1)))
+            max_height = max(max_height, min(estimated_lines * 15, 60))
+
+        ws.row_dimensions[current_row].height = max_height
+        row_cells = []
+        for col_idx, value in enumerate(values):
+            cell = WriteOnlyCell(ws, value=value)
+            cell._style = copy(row_styles[col_idx])
+            row_cells.append(cell)
+        ws.append(row_cells)
+        # Dimensi baris sudah ditulis, buang agar memori tidak tumbuh per baris
+        del ws.row_dimensions[current_row]
+        current_row += 1
+
+    # Auto filter untuk header (ditulis setelah sheetData, jadi boleh di-set di akhir)
+    ws.auto_filter.ref = f'A{header_row}:{last_col_letter}{current_row - 1}'
+
+    wb.save(output)
+    return output
@@ -0,0 +1,192 @@
+"""
+File hasil export (PDF/Excel) dan response download-nya
+
+Engine laporan menulis ke file dari new_export_file():
+- default: SpooledTemporaryFile (kecil di memori, besar otomatis pindah ke disk),
+  lalu dikirim per chunk oleh export_file_response() dengan Content-Length yang benar.
+- EXPORT_SENDFILE=x-accel (nginx) / x-sendfile (Apache/lighttpd): file ditulis ke
+  EXPORT_SENDFILE_FOLDER dan pengirimannya diserahkan ke web server lewat header
+  X-Accel-Redirect / X-Sendfile, sehingga worker Python tidak ikut membaca file.
+
+Export yang sering diulang tanpa perubahan data bisa disimpan di EXPORT_CACHE_FOLDER
+(new_export_cache_file() + store_export_cache()). Key cache dibuat dari parameter export,
+scope user, versi data dan versi aset laporan (pdf_report.report_cache_version(): mtime logo
+dan file tanda tangan), dan dipakai juga sebagai ETag: request dengan If-None-Match
+yang cocok dijawab 304, selain itu file cache dikirim tanpa render ulang. Teks "Dicetak pada"
+di footer PDF cache tetap waktu render pertama (beku sampai data/aset berubah).
+
+Contoh konfigurasi nginx untuk x-accel (EXPORT_ACCEL_PREFIX=/_exports/):
+    location /_exports/ {
+        internal;
+        alias /path/ke/app/exports/sendfile/;
+    }
+"""
+
+import os
+import json
+import time
+import logging
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from flask import Response, request, send_file
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# '' (stream dari Python), 'x-accel' (nginx) atau 'x-sendfile' (Apache mod_xsendfile / lighttpd)
+EXPORT_SENDFILE = os.getenv('EXPORT_SENDFILE', '').strip().lower()
+EXPORT_SENDFILE_FOLDER = os.getenv('EXPORT_SENDFILE_FOLDER', os.path.join(BASE_DIR, 'exports', 'sendfile'))
+EXPORT_ACCEL_PREFIX = os.getenv('EXPORT_ACCEL_PREFIX', '/_exports/')
+# File sendfile dihapus setelah umur ini (web server sudah selesai mengirimnya)
+EXPORT_SENDFILE_RETENTION_SECONDS = int(os.getenv('EXPORT_SENDFILE_RETENTION_SECONDS', '1800'))
+
+# Cache export berdasarkan versi data; entry yang tidak dipakai selama ini dihapus
+EXPORT_CACHE_FOLDER = os.getenv('EXPORT_CACHE_FOLDER', os.path.join(BASE_DIR, 'exports', 'cache'))
+EXPORT_CACHE_RETENTION_SECONDS = int(os.getenv('EXPORT_CACHE_RETENTION_SECONDS', str(24 * 3600)))
+
+# File export di bawah ukuran ini tetap di memori, di atasnya pindah ke file temp di disk
+EXPORT_SPOOL_MAX_MEMORY = int(os.getenv('EXPORT_SPOOL_MAX_MEMORY', str(8 * 1024 * 1024)))
+EXPORT_STREAM_CHUNK_SIZE = 64 * 1024
+
+# Maksimal render PDF berjalan bersamaan per proses (ReportLab menyusun seluruh dokumen
+# di memori sebelum ditulis), export lain menunggu giliran agar worker tidak kehabisan memori
+EXPORT_RENDER_SLOTS = int(os.getenv('EXPORT_RENDER_SLOTS', '2'))
+
+_render_slots = threading.BoundedSemaphore(max(EXPORT_RENDER_SLOTS, 1))
+_last_purge = {}
+_purge_lock = threading.Lock()
+
+@contextmanager
+def export_render_slot():
+    """Batasi jumlah render PDF bersamaan dalam satu proses"""
+    with _render_slots:
+        yield
+
+def sendfile_mode():
+    """Mode sendfile yang aktif ('x-accel' / 'x-sendfile'), atau None jika file di-stream dari Python"""
+    if EXPORT_SENDFILE in ('x-accel', 'x-sendfile'):
+        return EXPORT_SENDFILE
+    return None
+
+def purge_export_folder(folder, retention_seconds):
+    """Hapus file di folder yang sudah lewat masa simpan (paling sering sekali per menit per folder)"""
+    with _purge_lock:
+        if time.monotonic() - _last_purge.get(folder, float('-inf')) < 60:
+            return
+        _last_purge[folder] = time.monotonic()
+
+    batas = time.time() - retention_seconds
+    try:
+        entries = list(os.scandir(folder))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < batas:
+                os.unlink(entry.path)
+        except OSError as e:
+            logger.warning("⚠️ Gagal menghapus file export %s: %s", entry.path, e)
+
+def new_export_file(suffix, sendfile=True):
+    """File tujuan export: file bernama di EXPORT_SENDFILE_FOLDER jika sendfile aktif, selain itu spool"""
+    if sendfile and sendfile_mode():
+        os.makedirs(EXPORT_SENDFILE_FOLDER, exist_ok=True)
+        purge_export_folder(EXPORT_SENDFILE_FOLDER, EXPORT_SENDFILE_RETENTION_SECONDS)
+        return tempfile.NamedTemporaryFile(
+            dir=EXPORT_SENDFILE_FOLDER, prefix='export_', suffix=suffix, delete=False
+        )
+    return tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_MEMORY, suffix=suffix)
+
+def iter_file_chunks(export_file):
+    """Generator isi file export per chunk; file ditutup setelah selesai dikirim"""
+    try:
+        while True:
+            chunk = export_file.read(EXPORT_STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        export_file.close()
+
+def export_file_response(export_file, mimetype, content_disposition):
+    """Response download file export: header X-Accel-Redirect/X-Sendfile, atau stream per chunk"""
+    mode = sendfile_mode()
+    path = getattr(export_file, 'name', None)
+    if mode and isinstance(path, str) and os.path.dirname(os.path.abspath(path)) == os.path.abspath(EXPORT_SENDFILE_FOLDER):
+        export_file.close()
+        if mode == 'x-accel':
+            sendfile_header = ('X-Accel-Redirect', EXPORT_ACCEL_PREFIX.rstrip('/') + '/' + os.path.basename(path))
+        else:
+            sendfile_header = ('X-Sendfile', os.path.abspath(path))
+        # Body iterator kosong (bukan b'') agar tidak dikirim Content-Length: 0; web server mengisi sendiri
+        return Response(
+            iter(()),
+            mimetype=mimetype,
+            headers={
+                'Content-Disposition': content_disposition,
+                sendfile_header[0]: sendfile_header[1]
+            }
+        )
+
+    export_file.seek(0, os.SEEK_END)
+    size = export_file.tell()
+    export_file.seek(0)
+    return Response(
+        iter_file_chunks(export_file),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': content_disposition,
+            'Content-Length': str(size)
+        }
+    )
+
+def export_cache_key(*parts):
+    """Key cache (sekaligus ETag) dari parameter export, scope user dan versi data"""
+    return hashlib.sha1(json.dumps(parts, default=str).encode('utf-8')).hexdigest()
+
+def export_cache_path(cache_key, suffix):
+    """Path file cache untuk satu key"""
+    return os.path.join(EXPORT_CACHE_FOLDER, cache_key + suffix)
+
+def cached_file_response(path, cache_key, mimetype, content_disposition):
+    """Kirim file cache dengan ETag; browser wajib revalidasi (If-None-Match) sebelum memakai salinannya"""
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=cache_key)
+    response.headers['Content-Disposition'] = content_disposition
+    # Isi export tergantung hak akses user, jangan disimpan oleh proxy bersama
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def cached_export_response(cache_key, suffix, mimetype, content_disposition):
+    """Response dari cache: 304 jika If-None-Match cocok, file cache jika ada; None jika harus render"""
+    if request.if_none_match.contains(cache_key):
+        # mimetype ikut diisi: Response default text/html akan diberi header no-store oleh
+        # set_cache_headers (app.py), sehingga browser membuang salinan yang baru divalidasi
+        response = Response(status=304, mimetype=mimetype)
+        response.set_etag(cache_key)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    path = export_cache_path(cache_key, suffix)
+    try:
+        # Entry yang masih dipakai diperpanjang masa simpannya
+        os.utime(path)
+    except OSError:
+        return None
+    return cached_file_response(path, cache_key, mimetype, content_disposition)
+
+def new_export_cache_file(suffix):
+    """File tujuan render untuk export yang akan di-cache (ditulis di EXPORT_CACHE_FOLDER)"""
+    os.makedirs(EXPORT_CACHE_FOLDER, exist_ok=True)
+    purge_export_folder(EXPORT_CACHE_FOLDER, EXPORT_CACHE_RETENTION_SECONDS)
+    return tempfile.NamedTemporaryFile(dir=EXPORT_CACHE_FOLDER, prefix='tmp_', suffix=suffix, delete=False)
+
+def store_export_cache(export_file, cache_key, suffix, mimetype, content_disposition):
+    """Simpan hasil render dari new_export_cache_file() sebagai entry cache lalu kirim ke user"""
+    export_file.close()
+    path = export_cache_path(cache_key, suffix)
+    # Rename atomik: request lain tidak pernah membaca file yang belum selesai ditulis
+    os.replace(export_file.name, path)
+    return cached_file_response(path, cache_key, mimetype, content_disposition)
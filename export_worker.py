@@ -0,0 +1,134 @@
+"""
+Worker antrian export PDF/Excel (tabel export_jobs)
+
+Jalankan di samping aplikasi web, misalnya sebagai always-on task:
+    python export_worker.py --workers 2
+
+Setiap proses worker mengambil job 'antri', menjalankan route export yang sama
+dengan hak akses pembuat job, lalu menyimpan hasilnya di folder exports/.
+Selama worker hidup, heartbeat ditulis ke tabel export_workers; route export
+hanya memakai antrian jika ada worker yang heartbeat-nya masih baru.
+"""
+
+import os
+import sys
+import time
+import socket
+import sqlite3
+import logging
+import argparse
+import threading
+import multiprocessing
+
+from logging_setup import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Jeda polling saat antrian kosong (detik)
+POLL_INTERVAL = float(os.getenv('EXPORT_WORKER_POLL_INTERVAL', '1.0'))
+# Jeda antar heartbeat (detik), harus jauh di bawah EXPORT_WORKER_TIMEOUT di app.py
+HEARTBEAT_INTERVAL = 5
+# Jeda antar pembersihan job kedaluwarsa (detik)
+PURGE_INTERVAL = 300
+
+
+def heartbeat_loop(app_module, worker_id, stop_event):
+    """Tulis heartbeat berkala (thread terpisah agar tetap hidup saat job panjang berjalan)"""
+    while not stop_event.is_set():
+        connection = app_module.get_db_connection()
+        if connection:
+            try:
+                connection.execute("""
+                    INSERT INTO export_workers (worker_id, pid, last_seen)
+                    VALUES (?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(worker_id) DO UPDATE SET last_seen = excluded.last_seen
+                """, (worker_id, os.getpid()))
+                connection.commit()
+            except sqlite3.Error as e:
+                logger.warning("⚠️ [%s] Gagal menulis heartbeat: %s", worker_id, e)
+            finally:
+                connection.close()
+        stop_event.wait(HEARTBEAT_INTERVAL)
+
+
+def worker_loop(worker_no):
+    """Loop satu proses worker: claim job, kerjakan, ulangi"""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as app_module
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stop_event = threading.Event()
+    heartbeat = threading.Thread(target=heartbeat_loop, args=(app_module, worker_id, stop_event), daemon=True)
+    heartbeat.start()
+    logger.info("🚀 Worker export #%s berjalan (%s)", worker_no, worker_id)
+
+    last_purge = 0.0
+    try:
+        while True:
+            job = None
+            connection = app_module.get_db_connection()
+            if not connection:
+                time.sleep(POLL_INTERVAL)
+                continue
+            try:
+                if worker_no == 0 and time.monotonic() - last_purge > PURGE_INTERVAL:
+                    last_purge = time.monotonic()
+                    jumlah = app_module.purge_export_jobs(connection)
+                    if jumlah:
+                        logger.info("🧹 %s job export kedaluwarsa dihapus", jumlah)
+
+                job = app_module.claim_export_job(connection, worker_id)
+                if job:
+                    started = time.perf_counter()
+                    logger.info("⚙️  [%s] Job #%s: %s?%s", worker_id, job['id'], job['path'], job['query_string'])
+                    app_module.process_export_job(connection, job)
+                    logger.info("✅ [%s] Job #%s selesai dalam %.1f detik", worker_id, job['id'], time.perf_counter() - started)
+            except sqlite3.Error as e:
+                logger.warning("⚠️ [%s] Error database: %s", worker_id, e)
+            finally:
+                connection.close()
+
+            if not job:
+                time.sleep(POLL_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        connection = app_module.get_db_connection()
+        if connection:
+            try:
+                connection.execute("DELETE FROM export_workers WHERE worker_id = ?", (worker_id,))
+                connection.commit()
+            except sqlite3.Error:
+                pass
+            finally:
+                connection.close()
+        logger.info("👋 Worker export #%s berhenti (%s)", worker_no, worker_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Worker antrian export PDF/Excel')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('EXPORT_WORKERS', '2')),
+                        help='Jumlah proses worker (default: env EXPORT_WORKERS atau 2)')
+    args = parser.parse_args()
+    setup_logging()
+
+    logger.info("WORKER EXPORT (%s proses)", args.workers)
+
+    if args.workers <= 1:
+        worker_loop(0)
+        return
+
+    processes = [multiprocessing.Process(target=worker_loop, args=(worker_no,)) for worker_no in range(args.workers)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""
+Konfigurasi logging aplikasi (app.py, export_worker.py, engine laporan)
+
+Setiap modul memakai logger sendiri (logging.getLogger(__name__)) dan menulis pesan dengan
+argumen gaya %, misalnya logger.debug("Export %s baris", jumlah), sehingga pesan hanya
+diformat jika level-nya aktif. setup_logging() memasang QueueHandler di root logger:
+thread request hanya memasukkan record ke antrian, penulisan ke stdout/file dikerjakan
+QueueListener di thread terpisah. Jika antrian penuh, record dibuang (request tidak pernah
+menunggu output log).
+
+Environment:
+- LOG_LEVEL      : level root logger (default INFO)
+- LOG_LEVELS     : level per logger, misalnya "pdf_report=DEBUG,werkzeug=WARNING"
+- LOG_FORMAT     : 'text' (default) atau 'json' (satu objek JSON per baris)
+- LOG_FILE       : jika diisi, log juga ditulis ke file ini (rotasi otomatis)
+- LOG_SLOW_QUERY_FILE : jika diisi, record logger 'slow_query' (profiling.py) juga ditulis ke file ini
+- LOG_QUEUE_SIZE : kapasitas antrian record (default 10000)
+"""
+
+import os
+import sys
+import copy
+import atexit
+import json
+import queue
+import logging
+import logging.handlers
+import threading
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+# Modul ini bisa di-import sebelum app.py memanggil load_dotenv()
+load_dotenv()
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').strip().upper()
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').strip().lower()
+LOG_FILE = os.getenv('LOG_FILE', '').strip()
+LOG_SLOW_QUERY_FILE = os.getenv('LOG_SLOW_QUERY_FILE', '').strip()
+LOG_FILE_MAX_BYTES = int(os.getenv('LOG_FILE_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_FILE_BACKUPS = int(os.getenv('LOG_FILE_BACKUPS', '5'))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+_setup_lock = threading.Lock()
+_queue_handler = None
+_listener = None
+
+class JsonFormatter(logging.Formatter):
+    """Format record sebagai satu baris JSON (waktu UTC, level, logger, pesan, konteks request)"""
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'pid': record.process
+        }
+        for key in ('request_method', 'request_path', 'user_id'):
+            value = getattr(record, key, None)
+            if value is not None:
+                data[key] = value
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exc_info'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class RequestContextFilter(logging.Filter):
+    """Tambahkan method, path dan user_id request Flask (jika ada) ke setiap record"""
+
+    def filter(self, record):
+        try:
+            from flask import has_request_context, request, session
+            if has_request_context():
+                record.request_method = request.method
+                record.request_path = request.path
+                record.user_id = session.get('user_id')
+        except Exception:
+            pass
+        return True
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler yang membuang record saat antrian penuh, bukan menunggu/menulis error"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        """Gabungkan pesan + argumen dan traceback di thread pemanggil (record aman dipindah thread)"""
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+def valid_log_level(level):
+    """True jika level adalah nama level logging yang dikenal (DEBUG, INFO, ...)"""
+    # logging.getLevelNamesMapping() baru ada di Python 3.11
+    mapping = logging.getLevelNamesMapping() if hasattr(logging, 'getLevelNamesMapping') else logging._nameToLevel
+    return level in mapping
+
+def parse_log_levels(spec):
+    """Parse LOG_LEVELS ("nama=LEVEL,nama2=LEVEL") menjadi dict {nama_logger: level}"""
+    levels = {}
+    for item in spec.split(','):
+        if '=' not in item:
+            continue
+        name, level = item.split('=', 1)
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def _rotating_file_handler(path):
+    """RotatingFileHandler (folder dibuat jika belum ada)"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding='utf-8'
+    )
+
+def _build_output_handlers():
+    """Handler tujuan akhir (dipanggil oleh QueueListener): stdout, file LOG_FILE dan LOG_SLOW_QUERY_FILE"""
+    formatter = JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if LOG_FILE:
+        handlers.append(_rotating_file_handler(LOG_FILE))
+    if LOG_SLOW_QUERY_FILE:
+        slow_query_handler = _rotating_file_handler(LOG_SLOW_QUERY_FILE)
+        slow_query_handler.addFilter(logging.Filter('slow_query'))
+        handlers.append(slow_query_handler)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+def _start_listener(handlers):
+    """Buat antrian baru + QueueListener untuk handler output"""
+    global _listener
+    log_queue = queue.Queue(maxsize=max(LOG_QUEUE_SIZE, 1))
+    _queue_handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+def _restart_listener_after_fork():
+    """Thread listener tidak ikut ter-fork: buat antrian + listener baru di proses anak"""
+    if _listener is not None:
+        _start_listener(_listener.handlers)
+
+def stop_logging():
+    """Kosongkan antrian dan hentikan listener (dipanggil otomatis saat proses selesai)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def setup_logging():
+    """Pasang QueueHandler di root logger dan set level dari env (idempotent per proses)"""
+    global _queue_handler
+    with _setup_lock:
+        if _queue_handler is not None:
+            return
+
+        # Level yang tidak dikenal tidak boleh membuat aplikasi gagal start (setLevel -> ValueError)
+        ditolak = []
+        root = logging.getLogger()
+        if valid_log_level(LOG_LEVEL):
+            root.setLevel(LOG_LEVEL)
+        else:
+            root.setLevel(logging.INFO)
+            ditolak.append(('LOG_LEVEL', LOG_LEVEL, 'INFO'))
+        for name, level in parse_log_levels(LOG_LEVELS).items():
+            if valid_log_level(level):
+                logging.getLogger(name).setLevel(level)
+            else:
+                ditolak.append((f'LOG_LEVELS[{name}]', level, 'level induk'))
+
+        _queue_handler = DroppingQueueHandler(None)
+        _queue_handler.addFilter(RequestContextFilter())
+        _start_listener(_build_output_handlers())
+        root.addHandler(_queue_handler)
+
+        # Warning ditulis setelah handler terpasang agar tidak hilang
+        for env_name, level, fallback in ditolak:
+            logging.getLogger(__name__).warning(
+                "⚠️  %s=%r bukan level logging yang valid, memakai %s", env_name, level, fallback
+            )
+
+        atexit.register(stop_logging)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_restart_listener_after_fork)
@@ -0,0 +1,278 @@
+"""
+Metrics format Prometheus untuk endpoint /metrics (tanpa service eksternal)
+
+Nilai metrik disimpan di file SQLite terpisah (METRICS_DB) sehingga semua worker gunicorn
+dan export_worker.py menulis ke registry yang sama. Setiap proses mengumpulkan perubahan
+(delta) di memori, lalu thread latar menambahkannya ke METRICS_DB setiap
+METRICS_FLUSH_INTERVAL detik dengan satu transaksi UPSERT. Request tidak pernah menunggu
+tulisan ke METRICS_DB; delta proses lain yang belum di-flush muncul paling lambat satu
+interval kemudian. Nilai counter kumulatif sejak file METRICS_DB dibuat (restart worker
+tidak me-reset counter).
+
+Metrik yang dicatat (hook after_request, memakai RequestProfile dari profiling.py):
+- bgtk_http_requests_total{endpoint,method,status}
+- bgtk_http_request_duration_seconds{endpoint}           (histogram)
+- bgtk_db_statements_total / bgtk_db_statement_seconds_total{endpoint}
+- bgtk_db_locked_total{endpoint}                          ("database is locked" setelah busy_timeout habis)
+- bgtk_export_duration_seconds{endpoint,mode}             (histogram, mode sync/job)
+- bgtk_export_phase_duration_seconds{endpoint,phase}      (histogram, phase query/pdf_img/pdf_build/excel_width/...)
+- bgtk_upload_image_duration_seconds{kind}                (histogram, tanda_tangan/buku_tabungan)
+
+Metrik SQL dihitung CountingConnection (profiling.py) tanpa perlu PROFILE_REQUESTS: hanya
+jumlah statement, waktu execute/fetch*() dan error locked. Iterasi baris per baris pada export
+streaming tidak masuk waktu SQL; waktunya tetap tercatat di fase export masing-masing.
+
+Environment:
+- METRICS_ENABLED        : '0' untuk mematikan pencatatan dan endpoint /metrics (default aktif)
+- METRICS_DB             : path file registry (default metrics.db di folder database DB_NAME)
+- METRICS_FLUSH_INTERVAL : interval flush delta ke METRICS_DB dalam detik (default 10)
+- METRICS_TOKEN          : jika diisi, scraper bisa mengakses /metrics dengan header
+                           "Authorization: Bearer <token>"; tanpa token hanya admin yang login
+"""
+
+import os
+import time
+import hmac
+import atexit
+import sqlite3
+import logging
+import threading
+from dotenv import load_dotenv
+
+# Modul ini bisa di-import sebelum app.py memanggil load_dotenv()
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Folder data = folder database aplikasi (DB_NAME relatif terhadap folder aplikasi, sama seperti app.py)
+DATA_DIR = os.path.dirname(os.path.join(BASE_DIR, os.getenv('DB_NAME', 'bgtk_db.db')))
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1').strip().lower() in ('1', 'true', 'yes', 'on')
+METRICS_DB = os.getenv('METRICS_DB', os.path.join(DATA_DIR, 'metrics.db'))
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '10'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '').strip()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Batas bucket histogram (detik): request cepat sampai export PDF besar
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Span profile_span() yang menandai request export, dan fase export yang dicatat
+EXPORT_SPANS = ('pdf', 'excel')
+EXPORT_PHASE_SPANS = ('pdf_img', 'pdf_build', 'pdf', 'excel_width', 'excel')
+# Span upload gambar -> label kind
+UPLOAD_IMAGE_SPANS = {'ttd_img': 'tanda_tangan', 'buku_img': 'buku_tabungan'}
+
+# nama metrik -> (tipe, keterangan HELP)
+METRICS = {
+    'bgtk_http_requests_total': ('counter', 'Jumlah request HTTP per endpoint, method dan status'),
+    'bgtk_http_request_duration_seconds': ('histogram', 'Latensi request HTTP per endpoint (tanpa waktu kirim body streaming)'),
+    'bgtk_db_statements_total': ('counter', 'Jumlah statement SQL per endpoint'),
+    'bgtk_db_statement_seconds_total': ('counter', 'Total waktu statement SQL (execute + fetch) per endpoint'),
+    'bgtk_db_locked_total': ('counter', 'Statement yang gagal "database is locked" setelah busy_timeout habis'),
+    'bgtk_export_duration_seconds': ('histogram', 'Durasi export PDF/Excel per endpoint (mode sync atau job antrian)'),
+    'bgtk_export_phase_duration_seconds': ('histogram', 'Durasi per fase export: query, pdf_img, pdf_build, pdf, excel_width, excel'),
+    'bgtk_upload_image_duration_seconds': ('histogram', 'Waktu proses gambar upload (decode, konversi, simpan)'),
+}
+
+_lock = threading.Lock()
+# Koneksi registry dipakai bergantian oleh thread flush dan request /metrics
+_registry_lock = threading.Lock()
+_pending = {}
+_flush_thread = None
+_connection = None
+
+def _escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+    """Label dict -> string label Prometheus yang urut (key="value",...)"""
+    return ','.join(f'{key}="{_escape_label_value(value)}"' for key, value in sorted(labels.items()))
+
+def _add(name, labels, le, amount):
+    """Tambahkan delta ke antrian proses ini (flush ke METRICS_DB oleh thread latar)"""
+    key = (name, labels, le)
+    with _lock:
+        _pending[key] = _pending.get(key, 0.0) + amount
+        if _flush_thread is None:
+            _start_flush_thread()
+
+def inc_counter(name, labels, amount=1.0):
+    """Naikkan counter `name` dengan label dict `labels`"""
+    if METRICS_ENABLED:
+        _add(name, format_labels(labels), '', amount)
+
+def observe(name, labels, value):
+    """Catat satu observasi histogram `name` (bucket kumulatif, _sum dan _count)"""
+    if not METRICS_ENABLED:
+        return
+    labels = format_labels(labels)
+    for bound in DURATION_BUCKETS:
+        if value <= bound:
+            _add(name + '_bucket', labels, repr(bound), 1.0)
+    _add(name + '_bucket', labels, '+Inf', 1.0)
+    _add(name + '_sum', labels, '', value)
+    _add(name + '_count', labels, '', 1.0)
+
+def _open_registry():
+    """Koneksi ke METRICS_DB (tabel dibuat jika belum ada)"""
+    os.makedirs(os.path.dirname(os.path.abspath(METRICS_DB)), exist_ok=True)
+    connection = sqlite3.connect(METRICS_DB, timeout=5.0, check_same_thread=False)
+    connection.execute('PRAGMA busy_timeout = 5000')
+    try:
+        connection.execute('PRAGMA journal_mode = WAL')
+    except sqlite3.OperationalError:
+        pass
+    connection.execute('PRAGMA synchronous = NORMAL')
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS metric_values (
+            name TEXT NOT NULL,
+            labels TEXT NOT NULL,
+            le TEXT NOT NULL DEFAULT '',
+            value REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (name, labels, le)
+        ) WITHOUT ROWID
+    """)
+    connection.commit()
+    return connection
+
+def _registry():
+    """Koneksi registry proses ini (dibuka saat pertama dipakai)"""
+    global _connection
+    if _connection is None:
+        _connection = _open_registry()
+    return _connection
+
+def flush():
+    """Tulis delta proses ini ke METRICS_DB; delta dikembalikan ke antrian jika gagal"""
+    global _pending
+    with _lock:
+        if not _pending:
+            return
+        pending, _pending = _pending, {}
+    try:
+        with _registry_lock, _registry() as connection:
+            connection.executemany(
+                """
+                INSERT INTO metric_values (name, labels, le, value) VALUES (?, ?, ?, ?)
+                ON CONFLICT (name, labels, le) DO UPDATE SET value = value + excluded.value
+                """,
+                [(name, labels, le, value) for (name, labels, le), value in pending.items()]
+            )
+    except sqlite3.Error as e:
+        logger.warning("⚠️ Gagal menulis metrics ke %s: %s", METRICS_DB, e)
+        with _lock:
+            for key, value in pending.items():
+                _pending[key] = _pending.get(key, 0.0) + value
+
+def _flush_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        flush()
+
+def _start_flush_thread():
+    """Thread flush dimulai saat metrik pertama dicatat (dipanggil dengan _lock dipegang)"""
+    global _flush_thread
+    _flush_thread = threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True)
+    _flush_thread.start()
+
+def _reset_after_fork():
+    """Proses anak (worker gunicorn) mulai dengan antrian, koneksi dan thread flush sendiri"""
+    global _lock, _registry_lock, _pending, _flush_thread, _connection
+    _lock = threading.Lock()
+    _registry_lock = threading.Lock()
+    _pending = {}
+    _flush_thread = None
+    _connection = None
+
+def format_value(value):
+    """Angka sampel: bilangan bulat tanpa desimal, selain itu repr float (presisi penuh)"""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _sort_key(row):
+    name, labels, le, _value = row
+    return (name, labels, float(le) if le else 0.0)
+
+def render_metrics():
+    """Isi endpoint /metrics (format teks Prometheus) dari semua proses"""
+    flush()
+    with _registry_lock:
+        rows = _registry().execute('SELECT name, labels, le, value FROM metric_values').fetchall()
+    rows.sort(key=_sort_key)
+
+    families = {}
+    for row in rows:
+        name = row[0]
+        for suffix in ('_bucket', '_sum', '_count'):
+            if name.endswith(suffix) and name[:-len(suffix)] in METRICS:
+                name = name[:-len(suffix)]
+                break
+        families.setdefault(name, []).append(row)
+
+    lines = []
+    for family in sorted(families):
+        metric_type, help_text = METRICS.get(family, ('untyped', ''))
+        lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {metric_type}')
+        for name, labels, le, value in families[family]:
+            if le:
+                labels = f'{labels},le="{le}"' if labels else f'le="{le}"'
+            value = format_value(value)
+            lines.append(f'{name}{{{labels}}} {value}' if labels else f'{name} {value}')
+    return '\n'.join(lines) + '\n'
+
+def metrics_token_valid(authorization):
+    """Cek header Authorization "Bearer <METRICS_TOKEN>" (selalu False jika token tidak diset)"""
+    if not METRICS_TOKEN or not authorization:
+        return False
+    scheme, _, token = authorization.partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip().encode('utf-8'), METRICS_TOKEN.encode('utf-8'))
+
+def record_request_metrics(response):
+    """after_request: counter & histogram route, SQL, export dan upload gambar dari RequestProfile"""
+    from flask import g, request
+    from profiling import current_profile
+
+    profile = current_profile()
+    if profile is None or request.endpoint == 'metrics':
+        return response
+    total = time.perf_counter() - profile.started
+    # Path yang tidak cocok dengan route mana pun dijadikan satu label (kardinalitas tetap kecil)
+    endpoint = request.endpoint if request.url_rule is not None else 'unmatched'
+    labels = {'endpoint': endpoint}
+
+    inc_counter('bgtk_http_requests_total', {'endpoint': endpoint, 'method': request.method, 'status': response.status_code})
+    observe('bgtk_http_request_duration_seconds', labels, total)
+    if profile.statement_count:
+        inc_counter('bgtk_db_statements_total', labels, profile.statement_count)
+        inc_counter('bgtk_db_statement_seconds_total', labels, profile.db_time)
+    if profile.locked_errors:
+        inc_counter('bgtk_db_locked_total', labels, profile.locked_errors)
+
+    if any(name in profile.spans for name in EXPORT_SPANS):
+        mode = 'job' if g.get('export_job') else 'sync'
+        observe('bgtk_export_duration_seconds', {'endpoint': endpoint, 'mode': mode}, total)
+        if profile.statement_count:
+            observe('bgtk_export_phase_duration_seconds', {'endpoint': endpoint, 'phase': 'query'}, profile.db_time)
+        for phase in EXPORT_PHASE_SPANS:
+            if phase in profile.spans:
+                observe('bgtk_export_phase_duration_seconds', {'endpoint': endpoint, 'phase': phase}, profile.spans[phase])
+
+    for span, kind in UPLOAD_IMAGE_SPANS.items():
+        if span in profile.spans:
+            observe('bgtk_upload_image_duration_seconds', {'kind': kind}, profile.spans[span])
+    return response
+
+def init_metrics(app):
+    """Aktifkan RequestProfile + penghitung statement SQL + hook pencatatan metrik di app Flask (jika METRICS_ENABLED)"""
+    if not METRICS_ENABLED:
+        return
+    from profiling import enable_request_profiles, enable_statement_counts
+    enable_request_profiles(app)
+    enable_statement_counts()
+    app.after_request(record_request_metrics)
+    atexit.register(flush)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_reset_after_fork)
+    logger.info("📈 Metrics aktif (registry %s, flush tiap %s detik)", METRICS_DB, METRICS_FLUSH_INTERVAL)
@@ -0,0 +1,851 @@
+"""
+Engine laporan PDF biodata peserta (kertas F4, 1 peserta 1 halaman)
+
+Semua route export PDF di app.py cukup mengambil baris biodata (dict) lalu
+memanggil render_biodata_pdf(rows, spec). Header/footer, style, label field,
+tabel per peserta, dan tanda tangan siap cetak hanya ada di sini.
+
+Export besar dirender paralel: peserta dibagi per chunk, tiap chunk dirender di
+proses terpisah (ProcessPoolExecutor), lalu PDF parsial digabung berurutan (pypdf).
+"""
+
+import io
+import os
+import logging
+import base64
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from PIL import Image, ImageChops, ImageOps, ImageStat
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage, PageBreak
+from reportlab.lib import colors
+from reportlab.lib.utils import ImageReader
+
+from export_file import export_render_slot
+from profiling import profile_span
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    from pypdf.generic import IndirectObject, NameObject, StreamObject
+except ImportError:  # pypdf opsional: tanpa pypdf, PDF selalu dirender dalam 1 proses
+    PdfReader = PdfWriter = None
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Konstanta untuk ukuran kertas PDF (F4)
+F4_SIZE = (8.27 * inch, 13 * inch)
+PAGE_MARGIN = 25
+
+# =========================
+# Cache logo header/footer PDF
+# =========================
+# Logo diproses sekali per proses (dibuat ulang jika mtime file berubah) dan disimpan
+# sebagai ImageReader ReportLab, jadi export tidak lagi membuka file & menulis temp file.
+LOGO_BLACK_THRESHOLD = 30
+
+_logo_cache = {}
+_logo_cache_lock = threading.Lock()
+
+def hapus_background_hitam(image, threshold=LOGO_BLACK_THRESHOLD):
+    """Jadikan piksel hitam (r, g, b < threshold) transparan lewat operasi band PIL, tanpa loop per piksel"""
+    image = image.convert('RGBA')
+    r, g, b, a = image.split()
+    lut = [255 if v < threshold else 0 for v in range(256)]
+    hitam = ImageChops.multiply(ImageChops.multiply(r.point(lut), g.point(lut)), b.point(lut))
+    image.putalpha(ImageChops.multiply(a, ImageChops.invert(hitam)))
+    return image
+
+def get_pdf_logo(filename, max_height, hapus_hitam=False):
+    """Ambil logo static/<filename> untuk header/footer PDF: dict reader, width, height (reader None jika gagal)"""
+    path = os.path.join(BASE_DIR, 'static', filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {'reader': None, 'width': 0, 'height': 0}
+
+    key = (filename, max_height, hapus_hitam)
+    with _logo_cache_lock:
+        logo = _logo_cache.get(key)
+    if logo and logo['mtime'] == mtime:
+        return logo
+
+    try:
+        with Image.open(path) as logo_pil:
+            logo_pil.load()
+            if hapus_hitam:
+                logo_pil = hapus_background_hitam(logo_pil)
+            # Jangan resize dengan PIL, biarkan reportlab yang handle resize untuk kualitas lebih baik
+            logo_ratio = logo_pil.width / logo_pil.height
+            reader = ImageReader(logo_pil.copy())
+        reader.getRGBData()
+    except Exception as e:
+        logger.error("Error loading logo %s: %s", filename, e)
+        return {'reader': None, 'width': 0, 'height': 0}
+
+    logo = {
+        'reader': reader,
+        'width': max_height * logo_ratio,
+        'height': max_height,
+        'mtime': mtime,
+        # Nama form deterministik (bukan hash()) agar sama di setiap proses render paralel
+        'form_name': 'logo_' + hashlib.sha1(repr((key, mtime)).encode()).hexdigest()[:16]
+    }
+    with _logo_cache_lock:
+        _logo_cache[key] = logo
+    return logo
+
+def draw_pdf_logo(canvas, logo, x, y, mask=None):
+    """Gambar logo dari get_pdf_logo; gambar disimpan sebagai form sekali per dokumen lalu dipakai ulang tiap halaman"""
+    form_name = f"{logo['form_name']}_{mask}"
+    if not canvas.hasForm(form_name):
+        canvas.beginForm(form_name)
+        canvas.drawImage(logo['reader'], 0, 0, width=logo['width'], height=logo['height'],
+                         preserveAspectRatio=True, mask=mask)
+        canvas.endForm()
+    canvas.saveState()
+    canvas.translate(x, y)
+    canvas.doForm(form_name)
+    canvas.restoreState()
+
+# =========================
+# Cache turunan tanda tangan siap cetak
+# =========================
+# Tanda tangan dinormalisasi (goresan hitam di atas putih, resize untuk 300 DPI) sekali saja lalu
+# disimpan sebagai JPEG di TTD_PDF_FOLDER dengan nama = hash isi gambar sumber. Export berikutnya
+# (termasuk worker lain) langsung memakai file jadi tanpa decode/threshold/resize/temp file.
+TTD_PDF_FOLDER = os.path.join(BASE_DIR, 'static', 'ttd_pdf')
+# Naikkan jika cara normalisasi/resize berubah agar file cache lama tidak dipakai lagi
+TTD_PDF_VERSION = 1
+TTD_PDF_DPI = 300
+
+def tanda_tangan_file_path(tanda_tangan_data):
+    """Path file untuk tanda tangan berupa path uploads/static (None untuk data:image/base64)"""
+    if tanda_tangan_data.startswith('data:image'):
+        return None
+    if tanda_tangan_data.startswith('static/'):
+        return os.path.join(BASE_DIR, tanda_tangan_data)
+    if 'uploads/' in tanda_tangan_data:
+        return os.path.join(BASE_DIR, 'static', tanda_tangan_data)
+    return None
+
+def baca_sumber_tanda_tangan(tanda_tangan_data):
+    """
+    Ambil bytes gambar tanda tangan dari data:image, path uploads/static, atau base64 mentah
+    Returns: (bytes, error_message)
+    """
+    if not tanda_tangan_data:
+        return None, "Tanda tangan kosong"
+
+    if not isinstance(tanda_tangan_data, str):
+        return None, f"Format data tidak dikenal: {type(tanda_tangan_data)}"
+
+    # Bersihkan whitespace
+    tanda_tangan_data = tanda_tangan_data.strip()
+    if not tanda_tangan_data:
+        return None, "Tanda tangan kosong setelah pembersihan"
+
+    path = tanda_tangan_file_path(tanda_tangan_data)
+    if tanda_tangan_data.startswith('data:image'):
+        try:
+            header, encoded = tanda_tangan_data.split(',', 1)
+            img_data = base64.b64decode(encoded, validate=True)
+        except Exception as e:
+            return None, f"Gagal decode data:image: {str(e)}"
+    elif path:
+        try:
+            with open(path, 'rb') as f:
+                img_data = f.read()
+        except OSError:
+            return None, f"File tidak ditemukan: {path}"
+    else:
+        try:
+            img_data = base64.b64decode(tanda_tangan_data, validate=True)
+        except Exception as e:
+            return None, f"Gagal decode base64: {str(e)}"
+
+    if not img_data:
+        return None, "Tidak ada data gambar"
+    if len(img_data) < 100:
+        return None, f"Data gambar terlalu kecil: {len(img_data)} bytes"
+    return img_data, None
+
+def normalisasi_tanda_tangan(img_data):
+    """Normalisasi tanda tangan jadi goresan hitam di atas putih (RGB) dengan ukuran pixel untuk 300 DPI"""
+    img = Image.open(io.BytesIO(img_data))
+    if img.mode != 'RGBA':
+        img = img.convert('RGBA')
+
+    # Jika mayoritas gelap (background gelap), invert terlebih dahulu agar background jadi terang
+    img_gray = img.convert('L')
+    median = ImageStat.Stat(img_gray).median[0]
+    if median < 128:
+        img_gray = ImageOps.invert(img_gray)
+
+    # Threshold adaptif: base dari median + offset, dibatasi range aman (lewat LUT, bukan lambda per piksel)
+    stroke_threshold = int(min(230, max(120, median + 40)))
+    binary = img_gray.point([0 if p < stroke_threshold else 255 for p in range(256)])
+    img = Image.merge('RGB', (binary, binary, binary))
+
+    # Ukuran maksimal di tabel 3.0 x 1.5 inch, minimal lebar 1.5 inch
+    max_width_px = int(3.0 * inch * TTD_PDF_DPI / 72.0)
+    max_height_px = int(1.5 * inch * TTD_PDF_DPI / 72.0)
+    min_width_px = int(1.5 * inch * TTD_PDF_DPI / 72.0)
+    img_ratio = img.width / img.height
+
+    if img.width > max_width_px:
+        new_width_px = max_width_px
+        new_height_px = int(new_width_px / img_ratio)
+        if new_height_px > max_height_px:
+            new_height_px = max_height_px
+            new_width_px = int(new_height_px * img_ratio)
+    elif img.height > max_height_px:
+        new_height_px = max_height_px
+        new_width_px = int(new_height_px * img_ratio)
+    elif img.width < min_width_px:
+        # Jika gambar terlalu kecil, perbesar minimal ke ukuran yang wajar
+        new_width_px = min_width_px
+        new_height_px = int(new_width_px / img_ratio)
+        if new_height_px > max_height_px:
+            new_height_px = max_height_px
+            new_width_px = int(new_height_px * img_ratio)
+    else:
+        new_width_px, new_height_px = img.width, img.height
+
+    # Resize dengan LANCZOS untuk kualitas tinggi
+    return img.resize((new_width_px, new_height_px), Image.Resampling.LANCZOS)
+
+def get_tanda_tangan_pdf(img_data):
+    """Path JPEG tanda tangan siap cetak dari cache (dibuat jika belum ada), key = hash isi gambar sumber"""
+    digest = hashlib.sha1(img_data).hexdigest()
+    path = os.path.join(TTD_PDF_FOLDER, f"v{TTD_PDF_VERSION}_{digest}.jpg")
+    if os.path.exists(path):
+        return path
+
+    img = normalisasi_tanda_tangan(img_data)
+    os.makedirs(TTD_PDF_FOLDER, exist_ok=True)
+    # Tulis ke file sementara di folder yang sama lalu rename (atomic, aman dipakai banyak worker)
+    fd, temp_path = tempfile.mkstemp(dir=TTD_PDF_FOLDER, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            img.save(f, format='JPEG', quality=95, optimize=True)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return path
+
+def siapkan_tanda_tangan_pdf(tanda_tangan_data):
+    """Isi cache turunan tanda tangan (dipanggil saat tanda tangan disimpan); return path atau None"""
+    img_data, error_msg = baca_sumber_tanda_tangan(tanda_tangan_data)
+    if error_msg:
+        logger.warning("⚠️ Cache tanda tangan PDF dilewati: %s", error_msg)
+        return None
+    try:
+        return get_tanda_tangan_pdf(img_data)
+    except Exception as e:
+        logger.warning("⚠️ Gagal membuat cache tanda tangan PDF: %s", e)
+        return None
+
+def process_tanda_tangan_for_pdf(tanda_tangan_data):
+    """
+    Memproses tanda tangan untuk PDF export lewat cache turunan siap cetak
+    Returns: (RLImage object, error_message)
+    """
+    img_data, error_msg = baca_sumber_tanda_tangan(tanda_tangan_data)
+    if error_msg:
+        return None, error_msg
+
+    try:
+        path = get_tanda_tangan_pdf(img_data)
+        with Image.open(path) as img:
+            width_px, height_px = img.size
+        # Ukuran di PDF mengikuti 300 DPI (pixel -> point)
+        return RLImage(path, width=width_px * 72.0 / TTD_PDF_DPI, height=height_px * 72.0 / TTD_PDF_DPI), None
+    except Exception as e:
+        error_msg = f"Error processing tanda tangan: {str(e)}"
+        logger.error("❌ process_tanda_tangan_for_pdf: %s", error_msg)
+        return None, error_msg
+
+# =========================
+# Spec laporan
+# =========================
+# Naikkan jika layout PDF berubah agar cache export (export_file) versi lama tidak dipakai lagi
+PDF_REPORT_VERSION = 1
+
+# Field mapping untuk label yang lebih readable dan profesional
+FIELD_LABELS = {
+    'nik': 'NIK',
+    'nama_lengkap': 'Nama Lengkap',
+    'nip_nippk': 'NIP/NIPPK',
+    'tempat_lahir': 'Tempat Lahir',
+    'tanggal_lahir': 'Tanggal Lahir',
+    'jenis_kelamin': 'Jenis Kelamin',
+    'agama': 'Agama',
+    'pendidikan_terakhir': 'Pendidikan Terakhir',
+    'jurusan': 'Jurusan',
+    'status_asn': 'Status Kepegawaian',
+    'pangkat_golongan': 'Pangkat / Golongan',
+    'jabatan': 'Jabatan',
+    'instansi': 'Nama Instansi',
+    'alamat_instansi': 'Alamat Instansi',
+    'alamat_domisili': 'Alamat Domisili',
+    'kabupaten_kota': 'Kabupaten/Kota',
+    'kabko_lainnya': 'Kabupaten/Kota Lainnya',
+    'peran': 'Peran dalam Kegiatan',
+    'no_hp': 'Nomor HP',
+    'alamat_email': 'Alamat Email',
+    'npwp': 'NPWP',
+    'nama_bank': 'Nama Bank',
+    'nama_bank_lainnya': 'Nama Bank Lainnya',
+    'no_rekening': 'Nomor Rekening',
+    'nama_pemilik_rekening': 'Nama Pemilik Rekening'
+}
+
+# Label ringkas yang dipakai export biodata satu peserta
+FIELD_LABELS_RINGKAS = dict(
+    FIELD_LABELS,
+    status_asn='Status ASN',
+    pangkat_golongan='Pangkat/Golongan',
+    instansi='Instansi',
+    peran='Peran',
+    no_hp='No. HP',
+    alamat_email='Email',
+    no_rekening='No. Rekening'
+)
+
+# Urutan field yang diinginkan
+FIELD_ORDER = [
+    'nik', 'nama_lengkap', 'nip_nippk', 'tempat_lahir', 'tanggal_lahir',
+    'jenis_kelamin', 'agama', 'pendidikan_terakhir', 'jurusan',
+    'status_asn', 'pangkat_golongan', 'jabatan', 'instansi',
+    'alamat_instansi', 'alamat_domisili', 'kabupaten_kota', 'kabko_lainnya',
+    'peran',
+    'no_hp', 'alamat_email', 'npwp',
+    'nama_bank', 'nama_bank_lainnya', 'no_rekening', 'nama_pemilik_rekening'
+]
+
+# Exclude fields yang tidak perlu ditampilkan (info kegiatan tampil di atas tabel)
+EXCLUDE_FIELDS = frozenset([
+    'id', 'user_id', 'kegiatan_id', 'tahun', 'bulan', 'buku_tabungan_path', 'tanda_tangan',
+    'created_at', 'updated_at', 'nama_kegiatan', 'waktu_pelaksanaan', 'tempat_pelaksanaan'
+])
+
+# Spec default laporan biodata; route cukup override key yang berbeda lewat report_spec()
+BIODATA_REPORT = {
+    'title': 'BIODATA KEGIATAN',
+    'field_labels': FIELD_LABELS,
+    'field_order': FIELD_ORDER,
+    'exclude_fields': EXCLUDE_FIELDS,
+    'info_bold': True,  # info kegiatan (nama/waktu/tempat) tebal 10pt; False = 9pt seperti isi tabel
+    'wrap_chars': 50,
+}
+
+def report_spec(**overrides):
+    """Buat spec laporan dari BIODATA_REPORT dengan key yang di-override"""
+    unknown = set(overrides) - set(BIODATA_REPORT)
+    if unknown:
+        raise ValueError(f"Key spec laporan tidak dikenal: {', '.join(sorted(unknown))}")
+    spec = dict(BIODATA_REPORT)
+    spec.update(overrides)
+    return spec
+
+# =========================
+# Render laporan
+# =========================
+# Logo header/footer: key -> (file di static/, tinggi, hapus background hitam)
+REPORT_LOGOS = {
+    'bgtk': ('Logo_BGTK.png', 0.6 * inch, False),
+    'pendidikan_bermutu': ('Pendidikan Bermutu untuk Semua.png', 0.5 * inch, True),
+    'ramah': ('Ramah.png', 0.5 * inch, True),
+}
+
+def load_report_logos():
+    """Ambil semua logo header/footer dari cache (sekali per dokumen)"""
+    return {
+        key: get_pdf_logo(filename, max_height, hapus_hitam=hapus_hitam)
+        for key, (filename, max_height, hapus_hitam) in REPORT_LOGOS.items()
+    }
+
+def asset_mtime(path):
+    """mtime file aset laporan (None jika tidak ada)"""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+def report_cache_version(tanda_tangan_values=()):
+    """Versi laporan untuk key cache export: layout, normalisasi tanda tangan, mtime logo dan file tanda tangan
+
+    tanda_tangan_values = isi kolom tanda_tangan baris yang di-export. Tanda tangan data:image/base64
+    sudah tercakup versi data baris, jadi hanya file uploads/static yang dicek: mtime terbaru
+    (file diganti) dan jumlah file yang hilang.
+    """
+    ttd_mtimes = []
+    for value in tanda_tangan_values:
+        path = tanda_tangan_file_path(value.strip()) if isinstance(value, str) else None
+        if path:
+            ttd_mtimes.append(asset_mtime(path))
+    return (
+        PDF_REPORT_VERSION,
+        TTD_PDF_VERSION,
+        [asset_mtime(os.path.join(BASE_DIR, 'static', filename)) for filename, _, _ in REPORT_LOGOS.values()],
+        max((mtime for mtime in ttd_mtimes if mtime is not None), default=None),
+        ttd_mtimes.count(None),
+    )
+
+def make_footer_text():
+    """Teks tanggal cetak (WITA) di footer, dihitung sekali per dokumen
+
+    Export yang disimpan di cache export_file tetap memuat waktu render pertamanya: tanggal
+    cetak di file cache adalah waktu data tersebut dirender, bukan waktu download.
+    """
+    wita_time = datetime.utcnow() + timedelta(hours=8)
+    return f"Dicetak pada: {wita_time.strftime('%d/%m/%Y %H:%M')} WITA"
+
+def make_header_footer(logos, footer_text=None):
+    """Buat callback onPage: logo BGTK + garis di header, logo & tanggal cetak (WITA) di footer"""
+    logo_bgtk = logos['bgtk']
+    logo_pendidikan_bermutu = logos['pendidikan_bermutu']
+    logo_ramah = logos['ramah']
+    footer_text = footer_text or make_footer_text()
+
+    def add_header_footer(canvas, doc):
+        canvas.saveState()
+
+        # Header - Logo BGTK di kiri
+        logo_height = logo_bgtk['height']
+        if logo_bgtk['reader'] and logo_height > 0:
+            try:
+                draw_pdf_logo(canvas, logo_bgtk, PAGE_MARGIN, F4_SIZE[1] - PAGE_MARGIN - logo_height)
+            except Exception as e:
+                logger.error("Error drawing logo: %s", e)
+
+        # Garis header
+        canvas.setStrokeColor(colors.HexColor('#067ac1'))
+        canvas.setLineWidth(1.5)
+        header_line_y = F4_SIZE[1] - PAGE_MARGIN - max(logo_height, 0) - 5
+        canvas.line(PAGE_MARGIN, header_line_y, F4_SIZE[0] - PAGE_MARGIN, header_line_y)
+
+        # Footer - Logo Pendidikan Bermutu dan Ramah di kanan bawah
+        pendidikan_bermutu_width = logo_pendidikan_bermutu['width'] if logo_pendidikan_bermutu['height'] > 0 else 0
+        ramah_width = logo_ramah['width'] if logo_ramah['height'] > 0 else 0
+        footer_logo_y = 45
+
+        if max(logo_pendidikan_bermutu['height'], logo_ramah['height']) > 0:
+            # 10 pt spacing antara logo, rata kanan dengan margin
+            footer_logo_start_x = F4_SIZE[0] - PAGE_MARGIN - (pendidikan_bermutu_width + ramah_width + 10)
+
+            if logo_pendidikan_bermutu['reader'] and logo_pendidikan_bermutu['height'] > 0:
+                try:
+                    draw_pdf_logo(canvas, logo_pendidikan_bermutu, footer_logo_start_x, footer_logo_y, mask='auto')
+                except Exception as e:
+                    logger.error("Error drawing logo Pendidikan Bermutu di footer: %s", e)
+
+            if logo_ramah['reader'] and logo_ramah['height'] > 0:
+                try:
+                    ramah_footer_x = footer_logo_start_x + pendidikan_bermutu_width + 10
+                    draw_pdf_logo(canvas, logo_ramah, ramah_footer_x, footer_logo_y, mask='auto')
+                except Exception as e:
+                    logger.error("Error drawing logo Ramah di footer: %s", e)
+
+        # Garis footer
+        canvas.setStrokeColor(colors.HexColor('#067ac1'))
+        canvas.setLineWidth(1)
+        footer_line_y = footer_logo_y - 10
+        canvas.line(PAGE_MARGIN, footer_line_y, F4_SIZE[0] - PAGE_MARGIN, footer_line_y)
+
+        # Footer - Tanggal dan waktu export WITA (di bawah garis)
+        canvas.setFont('Helvetica', 8)
+        canvas.setFillColor(colors.black)
+        canvas.drawString(PAGE_MARGIN, footer_line_y - 15, footer_text)
+
+        canvas.restoreState()
+
+    return add_header_footer
+
+def make_report_styles(spec):
+    """Style paragraf laporan: title, value (isi tabel), info (nama/waktu/tempat kegiatan)"""
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=20,
+        textColor=colors.black,
+        spaceAfter=12,
+        spaceBefore=0,
+        alignment=1,  # Center
+        fontName='Helvetica-Bold',
+        leading=24
+    )
+    value_style = ParagraphStyle(
+        'ValueStyle',
+        parent=styles['Normal'],
+        fontSize=9,
+        leading=11,
+        textColor=colors.black,
+        alignment=0,  # Left
+        leftIndent=0,
+        rightIndent=0
+    )
+    info_style = value_style
+    if spec['info_bold']:
+        info_style = ParagraphStyle(
+            'InfoStyle',
+            parent=styles['Normal'],
+            fontSize=10,
+            leading=14,
+            textColor=colors.black,
+            alignment=0,  # Left align
+            fontName='Helvetica-Bold'
+        )
+    return {'title': title_style, 'value': value_style, 'info': info_style}
+
+INFO_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('ALIGN', (0, 0), (0, -1), 'LEFT'),   # Left align untuk kolom label agar sejajar dengan border kiri
+    ('ALIGN', (1, 0), (1, -1), 'LEFT'),   # Left align untuk titik dua
+    ('ALIGN', (2, 0), (2, -1), 'LEFT'),   # Left align untuk kolom value
+    ('LEFTPADDING', (0, 0), (0, -1), 0),  # Tidak ada padding kiri agar sejajar dengan border kiri tabel
+    ('LEFTPADDING', (1, 0), (1, -1), 0),
+    ('LEFTPADDING', (2, 0), (2, -1), 0),
+    ('RIGHTPADDING', (0, 0), (0, -1), 4),
+    ('RIGHTPADDING', (1, 0), (1, -1), 0),
+    ('RIGHTPADDING', (2, 0), (2, -1), 6),  # Padding kanan sama dengan tabel utama
+    ('TOPPADDING', (0, 0), (-1, -1), 2),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+])
+
+BIODATA_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, -1), colors.white),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+    ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (0, -1), 4),
+    ('LEFTPADDING', (1, 0), (1, -1), 6),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+    ('TOPPADDING', (0, 0), (-1, -1), 5),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#d1d5db')),
+    ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor('#067ac1')),
+])
+
+def wrap_value_text(value_text, max_chars=50):
+    """Pecah teks panjang per kata menjadi baris <br/> dengan panjang maksimal max_chars"""
+    if len(value_text) <= max_chars:
+        return value_text
+    lines = []
+    current_line = []
+    current_length = 0
+    for word in value_text.split():
+        if current_length + len(word) + 1 > max_chars:
+            if current_line:
+                lines.append(' '.join(current_line))
+            current_line = [word]
+            current_length = len(word)
+        else:
+            current_line.append(word)
+            current_length += len(word) + 1
+    if current_line:
+        lines.append(' '.join(current_line))
+    return '<br/>'.join(lines)
+
+def biodata_field_rows(biodata, spec):
+    """Pasangan (label, nilai tampilan) sesuai urutan spec, lalu field sisa yang tidak di-exclude"""
+    field_labels = spec['field_labels']
+    field_order = spec['field_order']
+    exclude_fields = spec['exclude_fields']
+    keys = [key for key in field_order if key in biodata and key not in exclude_fields]
+    keys += [key for key in biodata if key not in exclude_fields and key not in field_order]
+
+    rows = []
+    for key in keys:
+        value = biodata[key]
+        label = field_labels.get(key, key.replace('_', ' ').title())
+        display_value = str(value) if value and str(value).strip() else '-'
+        rows.append((label, display_value))
+    return rows
+
+def build_biodata_elements(biodata, spec, styles):
+    """Flowable satu halaman peserta: judul, info kegiatan, tabel biodata + tanda tangan"""
+    value_style = styles['value']
+    info_style = styles['info']
+    available_width = F4_SIZE[0] - (PAGE_MARGIN * 2)
+    elements = [Paragraph(spec['title'], styles['title']), Spacer(1, 0.15 * inch)]
+
+    # Info kegiatan di atas tabel dengan titik dua yang sejajar
+    info_table_data = []
+    for label, key in (('Nama Kegiatan', 'nama_kegiatan'),
+                       ('Waktu Pelaksanaan', 'waktu_pelaksanaan'),
+                       ('Tempat Pelaksanaan', 'tempat_pelaksanaan')):
+        value = biodata.get(key, '-')
+        if value and str(value).strip() and str(value).strip() != '-':
+            info_table_data.append([
+                Paragraph(f"<b>{label}</b>", info_style),
+                Paragraph(":", info_style),
+                Paragraph(str(value), info_style)
+            ])
+    if info_table_data:
+        info_table = Table(info_table_data, colWidths=[2.2 * inch, 0.15 * inch, available_width - 2.2 * inch - 0.15 * inch])
+        info_table.setStyle(INFO_TABLE_STYLE)
+        elements.append(info_table)
+        elements.append(Spacer(1, 0.1 * inch))
+
+    field_rows = biodata_field_rows(biodata, spec)
+    tanda_tangan_raw = biodata.get('tanda_tangan')
+    with profile_span('pdf_img'):
+        tanda_tangan_img, error_msg = process_tanda_tangan_for_pdf(tanda_tangan_raw)
+
+    if field_rows:
+        table_data = []
+        for label, value_text in field_rows:
+            value_text = value_text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+            value_text = wrap_value_text(value_text, spec['wrap_chars'])
+            table_data.append([Paragraph(f"<b>{label}</b>", value_style), Paragraph(value_text, value_style)])
+
+        # Tanda tangan: gambar jika berhasil diproses, pesan jika data ada tapi gagal
+        if tanda_tangan_img:
+            table_data.append([Paragraph("<b>Tanda Tangan</b>", value_style), tanda_tangan_img])
+        elif tanda_tangan_raw:
+            table_data.append([
+                Paragraph("<b>Tanda Tangan</b>", value_style),
+                Paragraph("<i>Tanda tangan tidak tersedia</i>", value_style)
+            ])
+
+        table = Table(table_data, colWidths=[2.2 * inch, available_width - 2.2 * inch])
+        table.setStyle(BIODATA_TABLE_STYLE)
+        elements.append(table)
+        elements.append(Spacer(1, 0.08 * inch))
+
+    return elements
+
+class BiodataDocTemplate(SimpleDocTemplate):
+    """SimpleDocTemplate yang melaporkan progres (peserta ke-n sudah tergambar) lewat callback"""
+
+    def __init__(self, *args, progress=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.progress = progress
+        self.total_rows = 0
+
+    def afterFlowable(self, flowable):
+        nomor_peserta = getattr(flowable, 'nomor_peserta', None)
+        if self.progress and nomor_peserta:
+            self.progress(nomor_peserta, self.total_rows)
+
+# =========================
+# Render paralel (multi-proses) untuk export besar
+# =========================
+# Setiap peserta selalu mulai di halaman baru dan footer tidak memuat nomor halaman,
+# jadi chunk peserta bisa dirender terpisah lalu halamannya digabung berurutan.
+# Pool dibuat per proses aplikasi: total proses render = PDF_RENDER_WORKERS x jumlah worker
+# gunicorn, jadi default-nya kecil dan tidak pernah melebihi jumlah CPU.
+PDF_RENDER_WORKERS = max(1, min(int(os.getenv('PDF_RENDER_WORKERS', '2')), os.cpu_count() or 1))
+# Di bawah jumlah ini overhead proses lebih mahal daripada render 1 proses
+PDF_PARALLEL_MIN_ROWS = int(os.getenv('PDF_PARALLEL_MIN_ROWS', '60'))
+PDF_CHUNK_MIN_ROWS = 20
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+def init_render_worker():
+    """Initializer proses render: muat logo sekali per proses (proses hanya mengimpor pdf_report)"""
+    load_report_logos()
+
+def render_pool_context():
+    """Context multiprocessing untuk pool render
+
+    forkserver (Linux/macOS) dengan preload pdf_report saja: proses render di-fork dari server
+    yang sudah memuat reportlab/PIL, bukan interpreter baru per proses. spawn hanya dipakai jika
+    forkserver tidak tersedia (Windows). app.py melewati init_database di proses ini.
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload([__name__])
+    return context
+
+def get_render_pool():
+    """Ambil ProcessPoolExecutor render PDF (dibuat sekali per proses, tanpa fork agar aman di server multi-thread)"""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(
+                max_workers=PDF_RENDER_WORKERS,
+                mp_context=render_pool_context(),
+                initializer=init_render_worker
+            )
+        return _render_pool
+
+def reset_render_pool():
+    """Buang pool yang rusak (mis. worker mati) agar export berikutnya membuat pool baru"""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait=False, cancel_futures=True)
+            _render_pool = None
+
+def split_chunks(rows, jumlah_worker):
+    """Bagi baris menjadi chunk berurutan, minimal PDF_CHUNK_MIN_ROWS peserta per chunk"""
+    chunk_size = max(PDF_CHUNK_MIN_ROWS, -(-len(rows) // jumlah_worker))
+    return [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+
+def render_pdf_chunk(rows, spec, footer_text):
+    """Render satu chunk peserta menjadi PDF parsial (dijalankan di proses worker)"""
+    buffer = io.BytesIO()
+    build_biodata_document(rows, spec, buffer, footer_text)
+    return buffer.getvalue()
+
+def xobject_digest(obj, digest=None):
+    """Hash isi XObject (data stream, atribut, dan XObject/SMask yang dirujuknya)"""
+    digest = digest or hashlib.sha1()
+    obj = obj.get_object()
+    for key in sorted(obj):
+        if key == '/Length':
+            continue
+        value = obj[key]
+        digest.update(key.encode())
+        if key == '/Resources':
+            for name, nested in sorted(value.get_object().get('/XObject', {}).items()):
+                digest.update(name.encode())
+                xobject_digest(nested, digest)
+        elif isinstance(value, IndirectObject) and isinstance(value.get_object(), StreamObject):
+            xobject_digest(value, digest)
+        else:
+            digest.update(repr(value).encode())
+    # Data mentah (masih terenkode): reportlab mengenkode gambar yang sama secara identik,
+    # jadi tidak perlu decode ASCII85/Flate yang mahal
+    digest.update(obj._data)
+    return digest
+
+def page_xobjects(page):
+    """Dict XObject halaman (None jika halaman tidak punya XObject)"""
+    xobjects = page.get('/Resources', {}).get_object().get('/XObject')
+    return xobjects.get_object() if xobjects is not None else None
+
+def merge_pdf_chunks(chunks, output):
+    """Gabungkan PDF parsial berurutan ke output; metadata diambil dari chunk pertama
+
+    Logo dan tanda tangan yang sama ada di setiap chunk. Sebelum chunk berikutnya disalin,
+    XObject halamannya yang isinya sudah ada di writer diarahkan ke objek tersebut, jadi
+    pypdf tidak menyalinnya lagi (tanpa dedup seluruh objek yang jauh lebih lambat).
+    """
+    writer = PdfWriter()
+    xobject_refs = {}
+    for idx, chunk in enumerate(chunks):
+        reader = PdfReader(io.BytesIO(chunk))
+        if idx == 0 and reader.metadata:
+            writer.add_metadata(reader.metadata)
+
+        digests = {}
+        xobject_baru = []
+        for page_idx, page in enumerate(reader.pages):
+            xobjects = page_xobjects(page)
+            for name, ref in list((xobjects or {}).items()):
+                if not isinstance(ref, IndirectObject):
+                    continue
+                if ref.idnum not in digests:
+                    digests[ref.idnum] = xobject_digest(ref).digest()
+                key = (name, digests[ref.idnum])
+                if key in xobject_refs:
+                    xobjects[NameObject(name)] = xobject_refs[key]
+                else:
+                    xobject_baru.append((page_idx, name, key))
+
+        jumlah_halaman = len(writer.pages)
+        writer.append(reader)
+        for page_idx, name, key in xobject_baru:
+            if key not in xobject_refs:
+                xobject_refs[key] = page_xobjects(writer.pages[jumlah_halaman + page_idx]).raw_get(name)
+    writer.write(output)
+
+def render_biodata_pdf_parallel(rows, spec, output, progress=None):
+    """Render chunk peserta di ProcessPoolExecutor lalu gabungkan; progres dilaporkan per chunk selesai"""
+    footer_text = make_footer_text()
+    chunks = split_chunks(rows, PDF_RENDER_WORKERS)
+    pool = get_render_pool()
+    futures = {
+        pool.submit(render_pdf_chunk, chunk, spec, footer_text): idx
+        for idx, chunk in enumerate(chunks)
+    }
+    results = [None] * len(chunks)
+    rows_rendered = 0
+    for future in as_completed(futures):
+        idx = futures[future]
+        results[idx] = future.result()
+        rows_rendered += len(chunks[idx])
+        if progress:
+            progress(rows_rendered, len(rows))
+    merge_pdf_chunks(results, output)
+
+def build_biodata_document(rows, spec, buffer, footer_text=None, progress=None):
+    """Bangun dokumen PDF (1 peserta 1 halaman) ke buffer dalam proses ini"""
+    logos = load_report_logos()
+    styles = make_report_styles(spec)
+
+    # Kertas F4 dengan ruang header setinggi logo BGTK
+    doc = BiodataDocTemplate(
+        buffer,
+        pagesize=F4_SIZE,
+        rightMargin=PAGE_MARGIN,
+        leftMargin=PAGE_MARGIN,
+        topMargin=PAGE_MARGIN + max(logos['bgtk']['height'], 0) + 15,
+        bottomMargin=40,
+        progress=progress
+    )
+
+    elements = []
+    for user_idx, biodata in enumerate(rows):
+        # Tambahkan page break kecuali untuk peserta pertama
+        if user_idx > 0:
+            elements.append(PageBreak())
+        peserta_elements = build_biodata_elements(biodata, spec, styles)
+        # Tandai tabel biodata (elemen sebelum spacer penutup) untuk hitungan progres
+        if len(peserta_elements) > 2:
+            peserta_elements[-2].nomor_peserta = user_idx + 1
+        elements.extend(peserta_elements)
+        doc.total_rows = user_idx + 1
+
+    add_header_footer = make_header_footer(logos, footer_text)
+    with profile_span('pdf_build'):
+        doc.build(elements, onFirstPage=add_header_footer, onLaterPages=add_header_footer)
+
+def render_biodata_pdf(rows, spec=None, output=None, progress=None):
+    """Render PDF biodata dari iterator baris (dict), 1 peserta 1 halaman
+
+    Return bytes PDF; jika output (file-like) diberikan, PDF ditulis ke sana dan output dikembalikan.
+    progress(rows_rendered, total_rows) dipanggil setiap tabel peserta selesai digambar
+    (per chunk selesai jika dirender paralel).
+    """
+    spec = spec or BIODATA_REPORT
+    buffer = output if output is not None else io.BytesIO()
+
+    with export_render_slot(), profile_span('pdf'):
+        rendered = False
+        if PdfWriter is not None and PDF_RENDER_WORKERS > 1:
+            rows = [dict(row) for row in rows]
+            if len(rows) >= PDF_PARALLEL_MIN_ROWS:
+                start_pos = buffer.tell()
+                try:
+                    render_biodata_pdf_parallel(rows, spec, buffer, progress)
+                    rendered = True
+                except Exception as e:
+                    logger.warning("⚠️ Render PDF paralel gagal, dirender ulang dalam 1 proses: %s", e)
+                    reset_render_pool()
+                    buffer.seek(start_pos)
+                    buffer.truncate()
+
+        if not rendered:
+            build_biodata_document(rows, spec, buffer, progress=progress)
+
+    if output is not None:
+        return output
+    return buffer.getvalue()
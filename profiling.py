@@ -0,0 +1,375 @@
+"""
+Profiling request dan query SQL (opt-in, PROFILE_REQUESTS=1)
+
+Jika aktif:
+- Koneksi SQLite dibuka dengan ProfilingConnection: setiap statement mencatat teks SQL,
+  jumlah parameter, durasi dan jumlah baris. Durasi termasuk waktu fetch, karena SQLite
+  baru mengerjakan sebagian besar query saat baris diambil.
+- before_request/after_request mencatat latensi route dan menambahkan header Server-Timing
+  (db, pdf, excel, ttd_img, total) yang terlihat di tab Network devtools browser.
+- Statement yang lebih lama dari PROFILE_SLOW_QUERY_MS ditulis ke logger 'slow_query'
+  beserta EXPLAIN QUERY PLAN-nya (file terpisah lewat LOG_SLOW_QUERY_FILE, lihat logging_setup).
+- Ringkasan per request (latensi, jumlah query, statement yang paling sering diulang)
+  ditulis ke logger modul ini, berguna untuk mencari pola N+1.
+
+Bagian kode non-SQL diukur dengan profile_span('nama') (context manager atau decorator).
+RequestProfile (waktu request + span) juga dipakai metrics.py lewat enable_request_profiles()
+dan enable_statement_counts(). Tanpa PROFILE_REQUESTS, metrics memakai CountingConnection:
+hanya jumlah statement, waktu execute/fetch*() dan error "database is locked" yang dihitung
+(tanpa teks SQL, EXPLAIN atau slow-query log). Tanpa keduanya koneksi tetap sqlite3.Connection.
+"""
+
+import os
+import re
+import time
+import sqlite3
+import logging
+from contextlib import contextmanager
+from flask import g, has_app_context, request
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger('slow_query')
+
+PROFILE_REQUESTS = os.getenv('PROFILE_REQUESTS', '').strip().lower() in ('1', 'true', 'yes', 'on')
+# Statement di atas ambang ini (milidetik) masuk slow-query log
+PROFILE_SLOW_QUERY_MS = float(os.getenv('PROFILE_SLOW_QUERY_MS', '100'))
+# Header Server-Timing bisa dimatikan jika profiling hanya dipakai untuk log
+PROFILE_SERVER_TIMING = os.getenv('PROFILE_SERVER_TIMING', '1').strip().lower() in ('1', 'true', 'yes', 'on')
+# Batas statement yang disimpan detailnya per request (total waktu & jumlah tetap dihitung)
+PROFILE_MAX_STATEMENTS = int(os.getenv('PROFILE_MAX_STATEMENTS', '2000'))
+
+# Statement yang tidak perlu di-EXPLAIN
+_NO_EXPLAIN = re.compile(r'^\s*(PRAGMA|BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE|EXPLAIN|CREATE|DROP|ALTER|VACUUM|ANALYZE)\b', re.IGNORECASE)
+
+# True jika RequestProfile dibuat per request (profiling atau metrics aktif)
+_request_profiles = False
+# True jika koneksi memakai ProfilingConnection (hanya PROFILE_REQUESTS)
+_sql_profiles = False
+# True jika koneksi minimal memakai CountingConnection (metrics aktif)
+_statement_counts = False
+
+class StatementStat:
+    """Catatan satu eksekusi statement (durasi dan baris bertambah selama fetch)"""
+
+    __slots__ = ('sql', 'param_count', 'params', 'connection', 'duration', 'rows')
+
+    def __init__(self, sql, param_count, params, connection):
+        self.sql = sql
+        self.param_count = param_count
+        self.params = params
+        self.connection = connection
+        self.duration = 0.0
+        self.rows = 0
+
+class RequestProfile:
+    """Kumpulan waktu untuk satu request: statement SQL dan span (pdf, excel, ttd_img, ...)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = []
+        self.statement_count = 0
+        self.db_time = 0.0
+        self.locked_errors = 0
+        self.spans = {}
+
+    def add_statement(self, sql, parameters, connection, many=False):
+        self.statement_count += 1
+        if many:
+            param_count = len(parameters) if hasattr(parameters, '__len__') else 0
+            params = None
+        else:
+            param_count = len(parameters) if parameters else 0
+            params = parameters
+        stat = StatementStat(sql, param_count, params, connection)
+        if len(self.statements) < PROFILE_MAX_STATEMENTS:
+            self.statements.append(stat)
+        return stat
+
+    def add_time(self, stat, duration, rows=0):
+        stat.duration += duration
+        stat.rows += rows
+        self.db_time += duration
+
+def current_profile():
+    """RequestProfile request aktif, atau None (di luar request / profiling tidak aktif)"""
+    if not has_app_context():
+        return None
+    return g.get('_request_profile')
+
+@contextmanager
+def profile_span(name):
+    """Ukur durasi blok kode sebagai entry Server-Timing `name` (bisa juga dipakai sebagai decorator)"""
+    profile = current_profile() if _request_profiles else None
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.spans[name] = profile.spans.get(name, 0.0) + time.perf_counter() - started
+
+class ProfilingCursor(sqlite3.Cursor):
+    """Cursor yang mencatat durasi execute + fetch dan jumlah baris ke RequestProfile"""
+
+    _stat = None
+    _profile = None
+
+    def execute(self, sql, parameters=()):
+        profile = current_profile()
+        if profile is None:
+            self._profile = self._stat = None
+            return super().execute(sql, parameters)
+        self._profile = profile
+        self._stat = profile.add_statement(sql, parameters, self.connection)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        except sqlite3.OperationalError as e:
+            count_locked_error(profile, e)
+            raise
+        finally:
+            profile.add_time(self._stat, time.perf_counter() - started, max(self.rowcount, 0))
+
+    def executemany(self, sql, seq_of_parameters):
+        profile = current_profile()
+        if profile is None:
+            self._profile = self._stat = None
+            return super().executemany(sql, seq_of_parameters)
+        if not hasattr(seq_of_parameters, '__len__'):
+            seq_of_parameters = list(seq_of_parameters)
+        self._profile = profile
+        self._stat = profile.add_statement(sql, seq_of_parameters, self.connection, many=True)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        except sqlite3.OperationalError as e:
+            count_locked_error(profile, e)
+            raise
+        finally:
+            profile.add_time(self._stat, time.perf_counter() - started, max(self.rowcount, 0))
+
+    def _timed_fetch(self, fetch, *args):
+        if self._stat is None:
+            return fetch(*args)
+        started = time.perf_counter()
+        result = fetch(*args)
+        if isinstance(result, list):
+            rows = len(result)
+        else:
+            rows = 0 if result is None else 1
+        self._profile.add_time(self._stat, time.perf_counter() - started, rows)
+        return result
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed_fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+    def __next__(self):
+        if self._stat is None:
+            return super().__next__()
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._profile.add_time(self._stat, time.perf_counter() - started)
+            raise
+        self._profile.add_time(self._stat, time.perf_counter() - started, 1)
+        return row
+
+class ProfilingConnection(sqlite3.Connection):
+    """Koneksi SQLite yang semua cursor-nya (termasuk connection.execute) memakai ProfilingCursor"""
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        try:
+            return super().commit()
+        except sqlite3.OperationalError as e:
+            count_locked_error(current_profile(), e)
+            raise
+
+class CountingCursor(sqlite3.Cursor):
+    """Cursor ringan untuk metrics: jumlah statement, waktu execute/fetch*() dan error locked
+
+    Iterasi baris per baris (for row in cursor) tidak diukur agar export streaming tidak
+    membayar overhead per baris.
+    """
+
+    def _timed(self, method, args, statement=False):
+        profile = current_profile()
+        if profile is None:
+            return method(*args)
+        if statement:
+            profile.statement_count += 1
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        except sqlite3.OperationalError as e:
+            count_locked_error(profile, e)
+            raise
+        finally:
+            profile.db_time += time.perf_counter() - started
+
+    def execute(self, sql, parameters=()):
+        return self._timed(super().execute, (sql, parameters), statement=True)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(super().executemany, (sql, seq_of_parameters), statement=True)
+
+    def fetchone(self):
+        return self._timed(super().fetchone, ())
+
+    def fetchmany(self, size=None):
+        return self._timed(super().fetchmany, (self.arraysize if size is None else size,))
+
+    def fetchall(self):
+        return self._timed(super().fetchall, ())
+
+class CountingConnection(sqlite3.Connection):
+    """Koneksi SQLite yang semua cursor-nya (termasuk connection.execute) memakai CountingCursor"""
+
+    def cursor(self, factory=CountingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        try:
+            return super().commit()
+        except sqlite3.OperationalError as e:
+            count_locked_error(current_profile(), e)
+            raise
+
+def count_locked_error(profile, error):
+    """Hitung error "database is locked" (busy_timeout habis) di profil request"""
+    if profile is not None and 'locked' in str(error):
+        profile.locked_errors += 1
+
+def connection_factory():
+    """Class koneksi untuk sqlite3.connect(factory=...): ProfilingConnection jika profiling SQL aktif,
+    CountingConnection jika hanya metrics yang aktif, selain itu sqlite3.Connection"""
+    if _sql_profiles:
+        return ProfilingConnection
+    if _statement_counts:
+        return CountingConnection
+    return sqlite3.Connection
+
+def ringkas_sql(sql, max_length=200):
+    """SQL satu baris (whitespace dirapikan) untuk log"""
+    sql = ' '.join(sql.split())
+    return sql if len(sql) <= max_length else sql[:max_length] + '...'
+
+def explain_query_plan(stat):
+    """EXPLAIN QUERY PLAN statement (indentasi sesuai parent), atau pesan error jika gagal"""
+    try:
+        rows = sqlite3.Connection.execute(stat.connection, 'EXPLAIN QUERY PLAN ' + stat.sql, stat.params or ()).fetchall()
+    except (sqlite3.Error, ValueError) as e:
+        return f'(EXPLAIN gagal: {e})'
+    depth = {0: -1}
+    lines = []
+    for row in rows:
+        node_id, parent_id, detail = row[0], row[1], row[3]
+        depth[node_id] = depth.get(parent_id, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return '\n'.join(lines)
+
+def log_slow_statements(profile):
+    """Tulis statement di atas PROFILE_SLOW_QUERY_MS ke slow-query log (nilai parameter tidak ditulis)"""
+    threshold = PROFILE_SLOW_QUERY_MS / 1000.0
+    for stat in profile.statements:
+        if stat.duration < threshold:
+            continue
+        plan = ''
+        if not _NO_EXPLAIN.match(stat.sql):
+            plan = explain_query_plan(stat)
+        slow_query_logger.warning(
+            "%s %s - %.1f ms, %s parameter, %s baris\n%s\n%s",
+            request.method, request.path, stat.duration * 1000, stat.param_count, stat.rows,
+            ringkas_sql(stat.sql, max_length=2000), plan
+        )
+
+def server_timing_header(profile, total):
+    """Nilai header Server-Timing (durasi dalam milidetik)"""
+    metrics = [f'db;dur={profile.db_time * 1000:.1f};desc="{profile.statement_count} query"']
+    for name, duration in profile.spans.items():
+        metrics.append(f'{name};dur={duration * 1000:.1f}')
+    metrics.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(metrics)
+
+def statement_paling_sering(profile):
+    """(jumlah, sql) statement yang paling sering dieksekusi di request ini"""
+    counts = {}
+    for stat in profile.statements:
+        counts[stat.sql] = counts.get(stat.sql, 0) + 1
+    if not counts:
+        return 0, ''
+    sql = max(counts, key=counts.get)
+    return counts[sql], sql
+
+def start_request_profile():
+    """before_request: mulai profil request"""
+    g._request_profile = RequestProfile()
+
+def finish_request_profile(response):
+    """after_request: Server-Timing, slow-query log dan ringkasan latensi route"""
+    # Profil tetap di g: hook metrics (jika aktif) juga membacanya
+    profile = g.get('_request_profile')
+    if profile is None:
+        return response
+    total = time.perf_counter() - profile.started
+    # Response streaming: waktu kirim body tidak termasuk (header sudah dibuat di sini)
+    if PROFILE_SERVER_TIMING:
+        response.headers['Server-Timing'] = server_timing_header(profile, total)
+    try:
+        log_slow_statements(profile)
+    except Exception as e:
+        logger.warning("⚠️ Gagal menulis slow-query log: %s", e)
+
+    jumlah_ulang, sql_ulang = statement_paling_sering(profile)
+    spans = ''.join(f' {name}={duration * 1000:.1f}ms' for name, duration in profile.spans.items())
+    logger.info(
+        "%s %s %s %.1f ms - db %.1f ms / %s query%s%s",
+        request.method, request.path, response.status_code, total * 1000,
+        profile.db_time * 1000, profile.statement_count, spans,
+        f" - paling sering {jumlah_ulang}x: {ringkas_sql(sql_ulang, max_length=120)}" if jumlah_ulang > 1 else ''
+    )
+    return response
+
+def enable_request_profiles(app):
+    """Buat RequestProfile di setiap request (idempotent, dipakai profiling dan metrics)"""
+    global _request_profiles
+    if start_request_profile not in app.before_request_funcs.setdefault(None, []):
+        app.before_request(start_request_profile)
+    _request_profiles = True
+
+def enable_statement_counts():
+    """Koneksi baru minimal memakai CountingConnection (dipanggil metrics.py saat aplikasi dimulai)"""
+    global _statement_counts
+    _statement_counts = True
+
+def init_profiling(app):
+    """Pasang hook profiling ke app Flask jika PROFILE_REQUESTS aktif"""
+    global _sql_profiles
+    if not PROFILE_REQUESTS:
+        return
+    _sql_profiles = True
+    enable_request_profiles(app)
+    app.after_request(finish_request_profile)
+    logger.info("⏱️  Profiling request aktif (slow query > %s ms)", PROFILE_SLOW_QUERY_MS)
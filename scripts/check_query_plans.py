@@ -0,0 +1,297 @@
+"""
+Script untuk memeriksa query plan (EXPLAIN QUERY PLAN) query-query utama di app.py
+Script gagal (exit code 1) jika ada query yang jatuh ke full table scan.
+
+Database disalin dulu ke file sementara, lalu skema + index dibuat lewat
+init_database() dari app.py, sehingga database asli tidak berubah.
+
+Script tidak menyimpan salinan SQL: setiap cek menjalankan route atau fungsi app.py
+(test client / request context) dengan PROFILE_REQUESTS=1, lalu semua statement yang
+dicatat ProfilingConnection (profiling.py) di-EXPLAIN di koneksi yang sama.
+"""
+
+import os
+import io
+import sys
+import re
+import base64
+import shutil
+import tempfile
+from urllib.parse import quote
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_NAME = os.getenv('DB_NAME', 'bgtk_db.db')
+DB_PATH = os.path.join(ROOT_DIR, DB_NAME)
+
+# "SCAN bk" = full table scan; "SCAN bk USING (COVERING) INDEX ..." = scan index (boleh);
+# "SCAN biodata_fts VIRTUAL TABLE INDEX 0:M..." = MATCH lewat index FTS5 (boleh)
+FULL_SCAN_RE = re.compile(r'^SCAN (\w+)(?!.*\b(USING|VIRTUAL TABLE)\b)')
+
+# Statement yang punya query plan (PRAGMA, BEGIN, CREATE, ... dilewati)
+EXPLAIN_RE = re.compile(r'^\s*(SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+# Nilai contoh jika database masih kosong (query plan tidak bergantung pada isi data)
+SAMPLE_DEFAULT = {'nik': '0000000000000000', 'user_id': 1, 'kegiatan': 'X', 'kabupaten': 'PALU', 'tahun': 2026}
+DATATABLES = 'draw=1&start=0&length=25'
+# NIK baru untuk cek POST /tambah-data (insert ke database salinan)
+NIK_BARU = '7999000000000001'
+
+# Statement yang dicatat selama satu cek: (sql, params, koneksi)
+captured = []
+
+
+def capture_statements(profile):
+    """Simpan statement dari RequestProfile request/cek yang sedang berjalan"""
+    if profile is not None:
+        captured.extend((stat.sql, stat.params, stat.connection) for stat in profile.statements)
+
+
+def route(path, role='admin', method='GET', user_id=1, **kwargs):
+    """Langkah cek: request ke route app.py lewat test client (session admin/operator/user, None = anonim)"""
+    def run(app_module):
+        client = app_module.app.test_client()
+        if role:
+            with client.session_transaction() as sess:
+                sess.update(logged_in=True, user_id=user_id, user_role=role, username=role,
+                            is_admin=role != 'user', user_nama=role)
+        data = kwargs.pop('data', None)
+        client.open(path, method=method, data=data() if callable(data) else data, **kwargs).close()
+    return run
+
+
+def gambar_png(ukuran=(60, 30)):
+    """PNG kecil untuk tanda tangan / buku tabungan di form cek POST"""
+    from PIL import Image
+    output = io.BytesIO()
+    Image.new('RGB', ukuran, 'white').save(output, format='PNG')
+    return output.getvalue()
+
+
+def tambah_data_form(sample):
+    """Form POST /tambah-data peserta baru (dibuat ulang setiap request karena file ikut terbaca)"""
+    png = gambar_png()
+    return lambda: {
+        'NIK': NIK_BARU, 'nama_lengkap': 'Peserta Cek Plan', 'nip/nippk': '-', 'tempat_lahir': 'Palu',
+        'tanggal_lahir': '1990-01-01', 'jenis_kelamin': 'Laki-laki', 'agama': 'Islam',
+        'pendidikan_terakhir': 'S1/D4', 'jurusan': '-', 'alamat_domisili': '-',
+        'alamat_email': 'cek@example.com', 'nohp': '081200000000', 'npwp': '-', 'status_asn': 'Non ASN',
+        'Pangkat/Golongan': '-', 'jabatan': '-', 'instansi': '-', 'alamat_instansi': '-',
+        'kabupaten/kota': sample['kabupaten'], 'peran': 'Peserta', 'nama_kegiatan': sample['kegiatan'],
+        'waktu_pelaksanaan': '-', 'tempat_pelaksanaan': '-', 'nama_bank': 'BANK BRI',
+        'no_rekening': '1234567890', 'nama_pemilik_rekening': 'Peserta Cek Plan',
+        'ttd': 'data:image/png;base64,' + base64.b64encode(png).decode('ascii'),
+        'buku_tabungan': (io.BytesIO(png), 'buku_tabungan.png'), 'action': 'save',
+    }
+
+
+def call(func_name, *args):
+    """Langkah cek: panggil fungsi app.py di dalam request context"""
+    def run(app_module):
+        from flask import g
+        from profiling import start_request_profile
+        with app_module.app.test_request_context():
+            start_request_profile()
+            getattr(app_module, func_name)(*args)
+            capture_statements(g._request_profile)
+    return run
+
+
+def nik_profile_trigger(app_module):
+    """Langkah cek: statement INSERT ... SELECT di trigger nik_latest_profile (dari builder app.py)"""
+    insert_sql = app_module._nik_profile_refresh_sql('?').split(';')[1]
+    connection = app_module.get_db_connection()
+    captured.append((insert_sql, (SAMPLE_DEFAULT['nik'],), connection._connection))
+
+
+def build_checks(sample):
+    """(label, langkah, alias/tabel yang memang boleh di-scan)
+
+    Semua statement yang dijalankan langkah ikut diperiksa. Yang boleh di-scan hanya tabel
+    kecil (kegiatan_master, users, kabupaten_counts) atau query yang hasilnya di-cache per
+    versi data (cached_query).
+    """
+    nik = sample['nik']
+    tahun = sample['tahun']
+    kegiatan = quote(sample['kegiatan'], safe='')
+    kabupaten = quote(sample['kabupaten'], safe='')
+    return [
+        ('get_latest_by_nik (profil autofill)',
+         route('/api/get-latest-by-nik', role=None, method='POST', json={'nik': nik}), ()),
+        ('trigger nik_latest_profile (biodata terbaru per NIK)', nik_profile_trigger, ()),
+        ('check_nik_exists', call('check_nik_exists', nik), ()),
+        ('get_or_create_user_by_nik', call('get_or_create_user_by_nik', nik), ()),
+        ('get_biodata_data (data terakhir user)', call('get_biodata_data', 1), ()),
+        ('get_biodata_data (user + kegiatan, sama dengan cek duplikat insert_biodata_data)',
+         call('get_biodata_data', 1, None, sample['kegiatan']), ()),
+        ('get_biodata_data (NIK + kegiatan, sama dengan cek duplikat tambah_data)',
+         call('get_biodata_data', None, nik, sample['kegiatan']), ()),
+        ('get_kegiatan_id', route(f'/api/get-kegiatan-id/{kegiatan}'), ()),
+        ('admin_dashboard (admin, tabel ringkasan)', route('/admin/dashboard'),
+         ('kabupaten_counts', 'kegiatan_master', 'users')),
+        ('api_kabupaten_summary (operator, tabel ringkasan)',
+         route('/api/kabupaten-summary', role='operator'), ()),
+        ('admin_kegiatan', route('/admin/kegiatan'), ('k',)),
+        ('export_rekap_kabupaten (admin)', route(f'/admin/export-rekap-kabupaten-excel/{kabupaten}'), ()),
+        ('export_rekap_kabupaten (operator)',
+         route(f'/admin/export-rekap-kabupaten-excel/{kabupaten}', role='operator'), ()),
+        ('export_rekap_kabupaten_pdf', route(f'/admin/export-rekap-kabupaten-pdf/{kabupaten}'), ()),
+        ('admin_detail_kegiatan (jumlah per kabupaten)', route(f'/admin/kegiatan/{kegiatan}'), ()),
+        ('api_detail_kegiatan (filter kabupaten)',
+         route(f'/api/detail-kegiatan/{kegiatan}?{DATATABLES}&kabupaten_kota={kabupaten}'), ()),
+        ('api_detail_kegiatan (pencarian DataTables)',
+         route(f'/api/detail-kegiatan/{kegiatan}?{DATATABLES}&search%5Bvalue%5D=budi'), ()),
+        ('get_peserta_kegiatan', route(f'/api/get-peserta-kegiatan/{kegiatan}'), ()),
+        ('export_all_excel_kegiatan',
+         route(f'/admin/export-all-excel/{kegiatan}?kabupaten_kota={kabupaten}'), ()),
+        ('export_all_pdf_kegiatan', route(f'/admin/export-all-pdf/{kegiatan}?kabupaten_kota={kabupaten}'), ()),
+        ('admin_rekap_filter (dropdown dari tabel ringkasan)', route('/admin/rekap-filter'),
+         ('kabupaten_counts', 'km')),
+        ('api_rekap_filter_data (keyset default, id)',
+         route(f'/api/rekap-filter-data?{DATATABLES}&order%5B0%5D%5Bcolumn%5D=1&after_id=100'), ()),
+        ('api_rekap_filter_data (keyset urut nama)',
+         route(f'/api/rekap-filter-data?{DATATABLES}&order%5B0%5D%5Bcolumn%5D=3'
+               f'&order%5B0%5D%5Bdir%5D=asc&after_value=A&after_id=1'), ()),
+        ('api_rekap_filter_data (pencarian DataTables, urut nama)',
+         route(f'/api/rekap-filter-data?{DATATABLES}&order%5B0%5D%5Bcolumn%5D=3&search%5Bvalue%5D=budi'), ()),
+        ('export_rekap_filter_pdf',
+         route(f'/admin/export-rekap-filter-pdf?tahun={tahun}&nama_kegiatan={kegiatan}'), ()),
+        ('export_rekap_filter_excel',
+         route(f'/admin/export-rekap-filter-excel?tahun={tahun}&kabupaten_kota={kabupaten}'), ()),
+        ('admin_rekap_tahunan', route(f'/admin/rekap-tahunan?tahun={tahun}'), ()),
+        ('export_rekap_tahunan (filter tahun + bulan)',
+         route(f'/admin/export-rekap-tahunan-excel?tahun={tahun}&bulan_awal=1&bulan_akhir=12'), ()),
+        ('export_rekap_tahunan_pdf',
+         route(f'/admin/export-rekap-tahunan-pdf?tahun={tahun}&bulan_awal=1&bulan_akhir=12'), ()),
+        ('api_search (admin tanpa filter)', route('/api/search?q=budi'), ('f',)),
+        ('api_search (operator)', route('/api/search?q=budi', role='operator'), ()),
+        ('admin_edit_biodata / export_biodata_pdf', route(f'/admin/edit-biodata/{nik}/{kegiatan}'),
+         ('kegiatan_master',)),
+        ('daftar_kegiatan (user)', route('/user/daftar-kegiatan', role='user', user_id=sample['user_id']), ()),
+        ('check_kegiatan (user)', route('/check-kegiatan', role='user', method='POST', user_id=sample['user_id'],
+                                        json={'nama_kegiatan': sample['kegiatan']}), ()),
+        ('tambah_data POST (peserta baru)',
+         route('/tambah-data', role=None, method='POST', content_type='multipart/form-data',
+               data=tambah_data_form(sample)), ('kegiatan_master',)),
+    ]
+
+
+def prepare_database():
+    """Salin database ke file sementara lalu import app.py (init_database + profiling SQL aktif)"""
+    temp_dir = tempfile.mkdtemp(prefix='bgtk_plan_')
+    temp_db = os.path.join(temp_dir, 'plan_check.db')
+    if os.path.exists(DB_PATH):
+        shutil.copy(DB_PATH, temp_db)
+
+    # DB_NAME absolut -> os.path.join di app.py akan memakai path ini apa adanya
+    os.environ['DB_NAME'] = temp_db
+    # Konfigurasi ini harus diset sebelum app.py di-import
+    os.environ['PROFILE_REQUESTS'] = '1'
+    os.environ['PROFILE_SERVER_TIMING'] = '0'
+    os.environ['PROFILE_SLOW_QUERY_MS'] = str(10 ** 9)
+    os.environ['EXPORT_CACHE_FOLDER'] = os.path.join(temp_dir, 'cache')
+    os.environ['EXPORT_SENDFILE'] = ''
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    sys.path.insert(0, ROOT_DIR)
+    import app
+    app.app.config['WTF_CSRF_ENABLED'] = False
+    # File upload dari cek POST /tambah-data tidak ikut masuk static/uploads
+    app.app.config['UPLOAD_FOLDER'] = os.path.join(temp_dir, 'uploads')
+    os.makedirs(app.app.config['UPLOAD_FOLDER'])
+    # Statement setiap request dicatat sebelum koneksinya kembali ke pool
+    app.app.after_request(record_request_statements)
+    return temp_dir, app
+
+
+def record_request_statements(response):
+    """after_request: catat statement request yang sedang diperiksa"""
+    from flask import g
+    capture_statements(g.get('_request_profile'))
+    return response
+
+
+def load_sample(app_module):
+    """Ambil NIK/kegiatan/kabupaten/tahun contoh dari database (default jika masih kosong)"""
+    sample = dict(SAMPLE_DEFAULT)
+    connection = app_module.get_db_connection()
+    try:
+        row = connection.execute("""
+            SELECT nik, user_id, nama_kegiatan, kabupaten_kota, tahun FROM biodata_kegiatan
+            WHERE TRIM(nama_kegiatan) != '' AND TRIM(kabupaten_kota) != ''
+            LIMIT 1
+        """).fetchone()
+    finally:
+        connection.close()
+    if row:
+        sample.update(nik=row[0], user_id=row[1], kegiatan=row[2], kabupaten=row[3], tahun=row[4] or sample['tahun'])
+    return sample
+
+
+def find_full_scans(connection, query, params, allowed):
+    """Return (plan_lines, full_scan_lines) untuk satu query"""
+    if params is None:
+        # executemany: nilai tidak dicatat profiler, query plan tidak bergantung pada nilainya
+        params = (None,) * query.count('?')
+    rows = connection.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+    plan_lines = [row[3] for row in rows]
+    full_scans = []
+    for detail in plan_lines:
+        match = FULL_SCAN_RE.match(detail)
+        if match and match.group(1) not in allowed:
+            full_scans.append(detail)
+    return plan_lines, full_scans
+
+
+def main():
+    print("=" * 50)
+    print("CEK QUERY PLAN (EXPLAIN QUERY PLAN)")
+    print("=" * 50)
+    print(f"Database: {DB_PATH}")
+    print("=" * 50)
+
+    temp_dir, app_module = prepare_database()
+    from profiling import ringkas_sql
+    failures = 0
+    jumlah_query = 0
+    try:
+        checks = build_checks(load_sample(app_module))
+        for label, run, allowed in checks:
+            captured.clear()
+            run(app_module)
+
+            hasil = []
+            dicek = set()
+            for sql, params, connection in captured:
+                if not EXPLAIN_RE.match(sql) or sql in dicek:
+                    continue
+                dicek.add(sql)
+                hasil.append((sql,) + find_full_scans(connection, sql, params, allowed))
+            jumlah_query += len(hasil)
+
+            if not hasil or any(full_scans for _, _, full_scans in hasil):
+                failures += 1
+                print(f"\n❌ {label}" + ("" if hasil else " (tidak ada query yang tercatat)"))
+            else:
+                print(f"\n✅ {label}")
+            for sql, plan_lines, full_scans in hasil:
+                print(f"   {ringkas_sql(sql, max_length=110)}")
+                for detail in plan_lines:
+                    marker = '   !!' if detail in full_scans else '     '
+                    print(f"{marker} {detail}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    print("\n" + "=" * 50)
+    if failures:
+        print(f"❌ {failures} cek masih melakukan full table scan (atau tidak menjalankan query)!")
+        print("=" * 50)
+        sys.exit(1)
+    print(f"✅ Semua {jumlah_query} query dari {len(checks)} cek memakai index.")
+    print("=" * 50)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Script migrasi ke skema peserta_profile + participation
+Data pribadi/rekening peserta tidak lagi disalin ke setiap baris kegiatan: satu versi profil
+per NIK (versi baru hanya jika isinya berubah) dan satu baris participation per kegiatan.
+biodata_kegiatan menjadi view dengan kolom yang sama, sehingga aplikasi tetap berjalan.
+
+Hentikan aplikasi dan export_worker.py sebelum menjalankan script ini. Salinan database
+dibuat dulu di samping file database (kembalikan salinan ini untuk membatalkan migrasi).
+
+Pemakaian:
+    python scripts/migrate_peserta_profile.py [--vacuum]
+"""
+
+import os
+import sys
+import argparse
+import sqlite3
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_NAME = os.getenv('DB_NAME', 'bgtk_db.db')
+DB_PATH = os.path.join(ROOT_DIR, DB_NAME)
+
+
+def backup_database():
+    """Salin database (aman untuk mode WAL) ke <nama>.sebelum_peserta_profile_<waktu>.db"""
+    base, ext = os.path.splitext(DB_PATH)
+    backup_path = f"{base}.sebelum_peserta_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}{ext or '.db'}"
+    source = sqlite3.connect(DB_PATH)
+    target = sqlite3.connect(backup_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return backup_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrasi biodata_kegiatan ke peserta_profile + participation')
+    parser.add_argument('--vacuum', action='store_true', help='VACUUM setelah migrasi agar ukuran file ikut mengecil')
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("MIGRASI SKEMA PESERTA_PROFILE")
+    print("=" * 50)
+    print(f"Database: {DB_PATH}")
+    print("=" * 50)
+
+    if not os.path.exists(DB_PATH):
+        print("❌ File database tidak ditemukan!")
+        sys.exit(1)
+
+    # Skema lama dilengkapi dulu (kolom, tabel ringkasan) oleh init_database() saat import
+    os.environ['DB_NAME'] = DB_PATH
+    # Banner startup (INFO) disembunyikan; peringatan/error init_database tetap tampil
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    sys.path.insert(0, ROOT_DIR)
+    import app
+
+    connection = app.get_db_connection()
+    if connection is None:
+        print("❌ Gagal membuka koneksi database!")
+        sys.exit(1)
+
+    try:
+        if app.peserta_profile_schema_aktif(connection):
+            print("✅ Database sudah memakai skema peserta_profile, tidak ada yang dimigrasi.")
+            return
+
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        ukuran_awal = os.path.getsize(DB_PATH)
+        backup_path = backup_database()
+        print(f"💾 Backup: {backup_path}")
+
+        jumlah_participation, jumlah_profil = app.migrate_to_peserta_profile(connection)
+        print(f"✅ {jumlah_participation} baris biodata -> {jumlah_profil} versi profil peserta")
+
+        hasil = connection.execute("PRAGMA foreign_key_check").fetchall()
+        if hasil:
+            print(f"⚠️  PRAGMA foreign_key_check menemukan {len(hasil)} pelanggaran")
+
+        if args.vacuum:
+            print("🧹 VACUUM...")
+            connection.execute("VACUUM")
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            print(f"✅ Ukuran database: {ukuran_awal / 1024:.0f} KB -> {os.path.getsize(DB_PATH) / 1024:.0f} KB")
+    except (sqlite3.Error, ValueError) as e:
+        print(f"❌ Migrasi gagal (database tidak berubah): {e}")
+        sys.exit(1)
+    finally:
+        connection.close()
+
+    print("=" * 50)
+    print("✅ Migrasi selesai. Jalankan ulang aplikasi dan export_worker.py.")
+    print("=" * 50)
+
+
+if __name__ == '__main__':
+    main()
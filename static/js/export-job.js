@@ -0,0 +1,82 @@
+// Export PDF/Excel lewat antrian background job (export_jobs)
+// Link dengan atribut data-export-job dikirim dengan header X-Export-Job.
+// Jika server mengantrikan job (HTTP 202), progres dipolling sampai file siap diunduh;
+// jika tidak ada worker aktif, link dibuka seperti biasa (export langsung).
+document.addEventListener('DOMContentLoaded', function() {
+    const POLL_INTERVAL = 1500;
+
+    function showProgress(status) {
+        const total = status.total_rows || 0;
+        const rendered = status.rows_rendered || 0;
+        let text = 'Menunggu antrian...';
+        if (status.status === 'proses') {
+            text = total > 0
+                ? `${rendered} / ${total} peserta (${status.percent}%)`
+                : 'Menyiapkan data...';
+        }
+        Swal.update({ text: text });
+    }
+
+    function pollJob(statusUrl) {
+        fetch(statusUrl, { headers: { 'Accept': 'application/json' }, credentials: 'same-origin' })
+            .then(response => response.json())
+            .then(status => {
+                if (status.status === 'selesai') {
+                    Swal.fire({
+                        icon: 'success',
+                        title: 'Export Selesai',
+                        text: 'File sedang diunduh.',
+                        confirmButtonText: 'OK',
+                        confirmButtonColor: '#067ac1'
+                    });
+                    window.location = status.download_url;
+                } else if (status.status === 'gagal' || !status.status) {
+                    Swal.fire({
+                        icon: 'error',
+                        title: 'Export Gagal',
+                        text: status.error || 'Terjadi kesalahan saat membuat file export.',
+                        confirmButtonText: 'OK',
+                        confirmButtonColor: '#067ac1'
+                    });
+                } else {
+                    showProgress(status);
+                    setTimeout(() => pollJob(statusUrl), POLL_INTERVAL);
+                }
+            })
+            .catch(() => setTimeout(() => pollJob(statusUrl), POLL_INTERVAL * 2));
+    }
+
+    document.addEventListener('click', function(event) {
+        const link = event.target.closest('a[data-export-job]');
+        if (!link || !link.href || link.getAttribute('href') === '#') {
+            return;
+        }
+        event.preventDefault();
+        const href = link.href;
+
+        fetch(href, { headers: { 'X-Export-Job': '1' }, credentials: 'same-origin' })
+            .then(response => {
+                const contentType = response.headers.get('Content-Type') || '';
+                if (response.status !== 202 || !contentType.includes('application/json')) {
+                    return null;
+                }
+                return response.json();
+            })
+            .then(job => {
+                if (!job || !job.async) {
+                    // Tidak ada worker aktif: export langsung seperti biasa
+                    window.open(href, link.target || '_self');
+                    return;
+                }
+                Swal.fire({
+                    title: 'Membuat File Export',
+                    text: 'Menunggu antrian...',
+                    allowOutsideClick: false,
+                    allowEscapeKey: false,
+                    didOpen: () => Swal.showLoading()
+                });
+                pollJob(job.status_url);
+            })
+            .catch(() => window.open(href, link.target || '_self'));
+    });
+});
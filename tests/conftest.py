@@ -0,0 +1,24 @@
+"""
+Fixture bersama: app.py diimpor sekali per sesi test dengan database sementara
+
+app.py menjalankan init_database() saat diimpor, jadi DB_NAME harus diatur sebelum impor
+pertama agar bgtk_db.db tidak ikut tersentuh.
+"""
+
+import os
+import sys
+import importlib
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    os.environ['DB_NAME'] = str(tmp_path_factory.mktemp('db') / 'test.db')
+    os.environ['METRICS_ENABLED'] = '0'
+    sys.path.insert(0, ROOT_DIR)
+    app = importlib.import_module('app')
+    app.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    return app
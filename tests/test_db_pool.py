@@ -0,0 +1,65 @@
+"""
+Test koneksi bersama per request (PooledConnection)
+
+Di dalam request semua get_db_connection() memakai satu koneksi. close() dari helper tidak
+boleh membatalkan transaksi route yang belum di-commit; transaksi tanpa pemilik dibatalkan
+saat pembungkus terakhir ditutup (atau saat teardown).
+"""
+
+import pytest
+
+
+def jumlah_kegiatan(app_module, nama):
+    connection = app_module.get_db_connection()
+    try:
+        return connection.execute(
+            "SELECT COUNT(*) FROM kegiatan_master WHERE nama_kegiatan = ?", (nama,)
+        ).fetchone()[0]
+    finally:
+        connection.close()
+
+
+def insert_kegiatan(connection, nama):
+    connection.execute(
+        "INSERT INTO kegiatan_master (nama_kegiatan, waktu_pelaksanaan, tempat_pelaksanaan) VALUES (?, '-', '-')",
+        (nama,)
+    )
+
+
+@pytest.fixture
+def request_context(app_module):
+    with app_module.app.test_request_context():
+        yield app_module
+
+
+def test_close_helper_tidak_membatalkan_transaksi_route(request_context):
+    app_module = request_context
+    route_connection = app_module.get_db_connection()
+    insert_kegiatan(route_connection, 'Pool Route')
+
+    helper_connection = app_module.get_db_connection()
+    helper_connection.execute("SELECT 1").fetchone()
+    helper_connection.close()
+
+    assert route_connection.in_transaction
+    route_connection.commit()
+    route_connection.close()
+    assert jumlah_kegiatan(app_module, 'Pool Route') == 1
+
+
+def test_close_terakhir_membatalkan_transaksi(request_context):
+    app_module = request_context
+    connection = app_module.get_db_connection()
+    insert_kegiatan(connection, 'Pool Batal')
+    connection.close()
+    # close() kedua kali tidak mengurangi hitungan pembungkus lagi
+    connection.close()
+
+    assert jumlah_kegiatan(app_module, 'Pool Batal') == 0
+
+
+def test_teardown_membatalkan_transaksi_yang_tidak_ditutup(app_module):
+    with app_module.app.test_request_context():
+        connection = app_module.get_db_connection()
+        insert_kegiatan(connection, 'Pool Bocor')
+    assert jumlah_kegiatan(app_module, 'Pool Bocor') == 0
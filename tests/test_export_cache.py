@@ -0,0 +1,125 @@
+"""
+Test cache export PDF + ETag (export_file.py)
+
+Key cache dipakai sebagai ETag: request ulang dengan If-None-Match dijawab 304, edit baris
+(updated_at dinaikkan trg_biodata_updated_at) mengganti ETag, dan scope operator/admin
+tidak pernah berbagi entry cache.
+"""
+
+import sqlite3
+
+import pytest
+
+import export_file
+
+KEGIATAN = 'Kegiatan_Cache_Uji'
+URL = f'/admin/export-all-pdf/{KEGIATAN}'
+OPERATOR_ID = 90
+OPERATOR_LAIN_ID = 91
+
+BIODATA = {
+    'nik': '7271000000000201', 'user_id': 1, 'nama_lengkap': 'Citra Cache', 'nip_nippk': '-',
+    'tempat_lahir': 'Palu', 'tanggal_lahir': '1985-05-05', 'jenis_kelamin': 'Perempuan',
+    'agama': 'Islam', 'pendidikan_terakhir': 'S1', 'jurusan': 'Biologi', 'alamat_domisili': 'Jl. Cache 1',
+    'alamat_email': 'citra@example.com', 'no_hp': '081200000001', 'npwp': '-', 'status_asn': 'PNS',
+    'pangkat_golongan': 'III/b', 'jabatan': 'Guru', 'instansi': 'SMA Cache', 'alamat_instansi': 'Jl. Sekolah',
+    'kabupaten_kota': 'KOTA PALU', 'kabko_lainnya': None, 'peran': 'Peserta',
+    'nama_kegiatan': KEGIATAN, 'waktu_pelaksanaan': '2 Februari 2026', 'tempat_pelaksanaan': 'Aula',
+    'nama_bank': 'BRI', 'nama_bank_lainnya': None, 'no_rekening': '222333',
+    'nama_pemilik_rekening': 'Citra Cache', 'buku_tabungan_path': None, 'tanda_tangan': None,
+}
+
+
+@pytest.fixture(scope='module')
+def data_kegiatan(app_module):
+    connection = sqlite3.connect(app_module.DB_PATH)
+    cursor = connection.cursor()
+    cursor.execute(
+        "INSERT INTO kegiatan_master (nama_kegiatan, waktu_pelaksanaan, tempat_pelaksanaan) VALUES (?, ?, ?)",
+        (KEGIATAN, BIODATA['waktu_pelaksanaan'], BIODATA['tempat_pelaksanaan'])
+    )
+    kegiatan_id = cursor.lastrowid
+    for user_id in (OPERATOR_ID, OPERATOR_LAIN_ID):
+        cursor.execute(
+            "INSERT INTO users (id, username, password, role) VALUES (?, ?, 'x', 'operator')",
+            (user_id, f'operator{user_id}')
+        )
+        cursor.execute("INSERT INTO operator_kegiatan (user_id, kegiatan_id) VALUES (?, ?)", (user_id, kegiatan_id))
+    data = dict(BIODATA, kegiatan_id=kegiatan_id)
+    cursor.execute(
+        f"INSERT INTO biodata_kegiatan ({', '.join(data)}) VALUES ({', '.join('?' * len(data))})",
+        tuple(data.values())
+    )
+    connection.commit()
+    connection.close()
+    return app_module
+
+
+@pytest.fixture
+def client_untuk(data_kegiatan, tmp_path, monkeypatch):
+    monkeypatch.setattr(export_file, 'EXPORT_CACHE_FOLDER', str(tmp_path / 'cache'))
+
+    def buat(role='admin', user_id=1):
+        client = data_kegiatan.app.test_client()
+        with client.session_transaction() as sess:
+            sess.update(logged_in=True, user_id=user_id, user_role=role, username=role, is_admin=True)
+        return client
+    return buat
+
+
+def export_etag(client, etag=None):
+    headers = {'If-None-Match': f'"{etag}"'} if etag else {}
+    response = client.get(URL, headers=headers)
+    assert response.status_code in (200, 304)
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    status, tag = response.status_code, response.get_etag()[0]
+    response.close()
+    return status, tag
+
+
+def test_if_none_match_dijawab_304(client_untuk):
+    client = client_untuk()
+    status, etag = export_etag(client)
+    assert status == 200 and etag
+
+    status_ulang, etag_ulang = export_etag(client, etag)
+    assert status_ulang == 304
+    assert etag_ulang == etag
+
+
+def test_edit_baris_mengganti_etag(data_kegiatan, client_untuk):
+    client = client_untuk()
+    _, etag_lama = export_etag(client)
+
+    connection = sqlite3.connect(data_kegiatan.DB_PATH)
+    updated_at_lama = connection.execute(
+        "SELECT updated_at FROM biodata_kegiatan WHERE nama_kegiatan = ?", (KEGIATAN,)
+    ).fetchone()[0]
+    # Kolom yang tidak ikut key cache: hanya updated_at (trigger) yang membedakan versi data
+    connection.execute("UPDATE biodata_kegiatan SET no_hp = '081299999999' WHERE nama_kegiatan = ?", (KEGIATAN,))
+    connection.commit()
+    updated_at_baru = connection.execute(
+        "SELECT updated_at FROM biodata_kegiatan WHERE nama_kegiatan = ?", (KEGIATAN,)
+    ).fetchone()[0]
+    connection.close()
+    assert updated_at_baru != updated_at_lama
+
+    status, etag_baru = export_etag(client, etag_lama)
+    assert status == 200
+    assert etag_baru != etag_lama
+
+
+def test_scope_operator_dan_admin_tidak_berbagi_cache(client_untuk):
+    _, etag_admin = export_etag(client_untuk())
+    operator = client_untuk('operator', OPERATOR_ID)
+    status, etag_operator = export_etag(operator, etag_admin)
+    assert status == 200
+    assert etag_operator != etag_admin
+
+    status, etag_operator_lain = export_etag(client_untuk('operator', OPERATOR_LAIN_ID), etag_operator)
+    assert status == 200
+    assert etag_operator_lain not in (etag_admin, etag_operator)
+
+    # Admin lain memakai scope yang sama dengan admin pertama
+    status, _ = export_etag(client_untuk('admin', 2), etag_admin)
+    assert status == 304
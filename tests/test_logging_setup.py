@@ -0,0 +1,44 @@
+"""
+Test level logging dari env (logging_setup.setup_logging)
+
+LOG_LEVEL / LOG_LEVELS dengan nama level yang tidak dikenal tidak boleh membuat aplikasi
+gagal start: root kembali ke INFO, logger di LOG_LEVELS memakai level induk, dan warning
+menyebut nilai yang ditolak.
+"""
+
+import os
+import sys
+import logging
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import logging_setup
+
+
+def test_level_tidak_dikenal_memakai_default(monkeypatch):
+    root = logging.getLogger()
+    handlers_awal = list(root.handlers)
+    monkeypatch.setattr(root, 'level', root.level)
+    monkeypatch.setattr(logging.getLogger('uji_level'), 'level', logging.NOTSET)
+    monkeypatch.setattr(logging.getLogger('uji_level_valid'), 'level', logging.NOTSET)
+    monkeypatch.setattr(logging_setup, '_queue_handler', None)
+    monkeypatch.setattr(logging_setup, '_listener', None)
+    monkeypatch.setattr(logging_setup, 'LOG_LEVEL', 'VERBOSE')
+    monkeypatch.setattr(logging_setup, 'LOG_LEVELS', 'uji_level=LOUD,uji_level_valid=debug')
+
+    warnings = []
+    monkeypatch.setattr(logging.getLogger('logging_setup'), 'warning', lambda msg, *args: warnings.append(msg % args))
+    try:
+        logging_setup.setup_logging()
+    finally:
+        logging_setup.stop_logging()
+        for handler in root.handlers:
+            if handler not in handlers_awal:
+                root.removeHandler(handler)
+
+    assert root.level == logging.INFO
+    assert logging.getLogger('uji_level').level == logging.NOTSET
+    assert logging.getLogger('uji_level_valid').level == logging.DEBUG
+    assert any("LOG_LEVEL='VERBOSE'" in pesan for pesan in warnings)
+    assert any("LOG_LEVELS[uji_level]='LOUD'" in pesan for pesan in warnings)
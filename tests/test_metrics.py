@@ -0,0 +1,87 @@
+"""
+Test metrik SQL /metrics tanpa PROFILE_REQUESTS
+
+Dengan METRICS_ENABLED saja, koneksi memakai CountingConnection (profiling.py): jumlah statement,
+waktu SQL dan error "database is locked" tetap tercatat per endpoint.
+"""
+
+import os
+import sys
+import sqlite3
+
+import pytest
+from flask import Flask
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import metrics
+import profiling
+
+
+@pytest.fixture
+def metrics_app(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, '_sql_profiles', False)
+    monkeypatch.setattr(profiling, '_statement_counts', False)
+    monkeypatch.setattr(profiling, '_request_profiles', False)
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', True)
+    monkeypatch.setattr(metrics, '_pending', {})
+    # Thread flush tidak dijalankan: delta dibaca langsung dari antrian proses
+    monkeypatch.setattr(metrics, '_flush_thread', object())
+
+    db_path = str(tmp_path / 'test.db')
+    setup = sqlite3.connect(db_path)
+    setup.execute("CREATE TABLE t (x INTEGER)")
+    setup.commit()
+    setup.close()
+
+    app = Flask(__name__)
+    profiling.enable_request_profiles(app)
+    profiling.enable_statement_counts()
+    app.after_request(metrics.record_request_metrics)
+
+    @app.route('/query')
+    def query():
+        connection = sqlite3.connect(db_path, factory=profiling.connection_factory())
+        connection.execute("INSERT INTO t (x) VALUES (1)")
+        connection.commit()
+        connection.execute("SELECT x FROM t").fetchall()
+        connection.close()
+        return 'ok'
+
+    @app.route('/locked')
+    def locked():
+        connection = sqlite3.connect(db_path, timeout=0, factory=profiling.connection_factory())
+        try:
+            connection.execute("INSERT INTO t (x) VALUES (2)")
+        except sqlite3.OperationalError:
+            pass
+        connection.close()
+        return 'ok'
+
+    yield app, db_path
+
+
+def pending_value(name, endpoint):
+    return metrics._pending.get((name, metrics.format_labels({'endpoint': endpoint}), ''), 0)
+
+
+def test_statement_dihitung_tanpa_profile_requests(metrics_app):
+    app, _ = metrics_app
+    assert profiling.connection_factory() is profiling.CountingConnection
+
+    app.test_client().get('/query')
+    assert pending_value('bgtk_db_statements_total', 'query') == 2
+    assert pending_value('bgtk_db_statement_seconds_total', 'query') > 0
+
+
+def test_database_locked_dihitung(metrics_app):
+    app, db_path = metrics_app
+    blocker = sqlite3.connect(db_path)
+    blocker.execute("BEGIN EXCLUSIVE")
+    try:
+        app.test_client().get('/locked')
+    finally:
+        blocker.rollback()
+        blocker.close()
+    assert pending_value('bgtk_db_locked_total', 'locked') == 1
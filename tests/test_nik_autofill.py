@@ -0,0 +1,98 @@
+"""
+Test payload /api/get-latest-by-nik (autofill form pendaftaran)
+
+Endpoint harus mengembalikan semua kolom baris biodata terakhir NIK tersebut, sama seperti
+sebelum memakai tabel nik_latest_profile: templates/user/tambah-data.html juga mengisi
+rekening, buku tabungan dan tanda tangan dari payload ini.
+"""
+
+import sqlite3
+
+import pytest
+
+NIK = '7271000000000001'
+NIK_LAIN = '7271000000000002'
+
+BIODATA = {
+    'nik': NIK, 'user_id': 1, 'nama_lengkap': 'Peserta Uji', 'nip_nippk': '198001012005011001',
+    'tempat_lahir': 'Palu', 'tanggal_lahir': '1980-01-01 00:00:00', 'jenis_kelamin': 'Laki-laki',
+    'agama': 'Islam', 'pendidikan_terakhir': 'S1', 'jurusan': 'Matematika', 'alamat_domisili': 'Jl. Uji 1',
+    'alamat_email': 'uji@example.com', 'no_hp': '081200000000', 'npwp': '-', 'status_asn': 'PNS',
+    'pangkat_golongan': 'III/a', 'jabatan': 'Guru', 'instansi': 'SMP Uji', 'alamat_instansi': 'Jl. Sekolah',
+    'kabupaten_kota': 'KOTA PALU', 'kabko_lainnya': None, 'peran': 'Peserta',
+    'nama_kegiatan': 'Kegiatan Uji', 'waktu_pelaksanaan': '1 Januari 2026', 'tempat_pelaksanaan': 'Aula',
+    'nama_bank': 'BRI', 'nama_bank_lainnya': None, 'no_rekening': '1234567890',
+    'nama_pemilik_rekening': 'Peserta Uji', 'buku_tabungan_path': 'uploads/buku_uji.jpg',
+    'tanda_tangan': 'static/uploads/ttd_uji.png',
+}
+
+
+@pytest.fixture(scope='module')
+def app_module(app_module):
+    db_path = app_module.DB_PATH
+    connection = sqlite3.connect(db_path)
+    kolom = ', '.join(BIODATA)
+    for nik, user_id in ((NIK, 1), (NIK_LAIN, 2)):
+        connection.execute(
+            f"INSERT INTO biodata_kegiatan ({kolom}) VALUES ({', '.join('?' * len(BIODATA))})",
+            tuple(dict(BIODATA, nik=nik, user_id=user_id).values())
+        )
+    connection.commit()
+    connection.close()
+    yield app_module
+
+
+def get_autofill(app_module, nik=NIK):
+    response = app_module.app.test_client().post('/api/get-latest-by-nik', json={'nik': nik})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_payload_berisi_semua_kolom_biodata(app_module):
+    connection = sqlite3.connect(app_module.DB_PATH)
+    kolom_biodata = {row[1] for row in connection.execute("PRAGMA table_xinfo(biodata_kegiatan)")}
+    connection.close()
+
+    result = get_autofill(app_module)
+    assert result['success'] is True
+    assert set(result['data']) == kolom_biodata
+
+
+def test_payload_field_rekening_buku_tabungan_dan_tanda_tangan(app_module):
+    data = get_autofill(app_module)['data']
+    assert data['nama_bank'] == 'BRI'
+    assert data['no_rekening'] == '1234567890'
+    assert data['nama_pemilik_rekening'] == 'Peserta Uji'
+    assert data['buku_tabungan_path'] == 'static/uploads/buku_uji.jpg'
+    assert data['tanda_tangan'] == 'static/uploads/ttd_uji.png'
+    assert data['tanggal_lahir'] == '1980-01-01'
+
+
+def update_no_rekening(app_module, no_rekening, niks_invalidate):
+    connection = app_module.get_db_connection()
+    cursor = connection.cursor()
+    cursor.execute("UPDATE biodata_kegiatan SET no_rekening = ? WHERE nik IN (?, ?)", (no_rekening, NIK, NIK_LAIN))
+    app_module.invalidate_cache(cursor, 'biodata', niks=niks_invalidate)
+    connection.commit()
+    connection.close()
+
+
+def test_payload_ikut_berubah_setelah_update(app_module):
+    update_no_rekening(app_module, '999', None)
+    assert get_autofill(app_module)['data']['no_rekening'] == '999'
+
+
+def test_write_nik_lain_tidak_membuang_cache(app_module):
+    # Isi LRU untuk kedua NIK
+    get_autofill(app_module)
+    assert get_autofill(app_module, NIK_LAIN)['data']['no_rekening'] == '999'
+
+    # Kedua baris berubah di database, tetapi hanya NIK yang ditulis yang dibuang dari LRU
+    update_no_rekening(app_module, '555', (NIK,))
+    assert get_autofill(app_module)['data']['no_rekening'] == '555'
+    assert get_autofill(app_module, NIK_LAIN)['data']['no_rekening'] == '999'
+    assert NIK_LAIN in app_module._nik_profile_cache
+
+
+def test_nik_belum_terdaftar(app_module):
+    assert get_autofill(app_module, '7271999999999999')['success'] is False
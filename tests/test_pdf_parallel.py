@@ -0,0 +1,84 @@
+"""
+Test render PDF paralel (pdf_report.render_biodata_pdf)
+
+PDF dari beberapa proses render (PDF_RENDER_WORKERS > 1, chunk digabung pypdf) harus sama
+dengan render 1 proses: jumlah halaman dan teks setiap halaman, termasuk footer. Footer
+tidak memuat nomor halaman ("Halaman X dari Y"); jika nanti ditambahkan, nomor per chunk
+akan berbeda dari render 1 proses dan test ini gagal.
+"""
+
+import io
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import pdf_report
+
+pypdf = pytest.importorskip('pypdf')
+
+FOOTER = 'Dicetak pada: 01/01/2026 08:00 WITA'
+
+
+def biodata(nomor):
+    return {
+        'nik': f'72710000000003{nomor:02d}', 'nama_lengkap': f'Peserta Paralel {nomor}',
+        'nip_nippk': '-', 'tempat_lahir': 'Palu', 'tanggal_lahir': '1990-01-01', 'jenis_kelamin': 'Laki-laki',
+        'agama': 'Islam', 'pendidikan_terakhir': 'S1', 'jurusan': 'Fisika',
+        # Alamat panjang untuk peserta genap: tabel lebih tinggi, halaman tetap 1 per peserta
+        'alamat_domisili': 'Jl. Panjang ' * (40 if nomor % 2 == 0 else 1),
+        'alamat_email': f'paralel{nomor}@example.com', 'no_hp': '0812', 'npwp': '-', 'status_asn': 'PNS',
+        'pangkat_golongan': 'III/a', 'jabatan': 'Guru', 'instansi': 'SMA Paralel', 'alamat_instansi': '-',
+        'kabupaten_kota': 'KOTA PALU', 'kabko_lainnya': None, 'peran': 'Peserta',
+        'nama_kegiatan': 'Kegiatan Paralel', 'waktu_pelaksanaan': '1 Januari 2026', 'tempat_pelaksanaan': 'Aula',
+        'nama_bank': 'BRI', 'nama_bank_lainnya': None, 'no_rekening': str(1000 + nomor),
+        'nama_pemilik_rekening': f'Peserta Paralel {nomor}', 'buku_tabungan_path': None, 'tanda_tangan': None,
+    }
+
+
+ROWS = [biodata(nomor) for nomor in range(1, 8)]
+
+
+def teks_halaman(pdf_bytes):
+    return [page.extract_text() for page in pypdf.PdfReader(io.BytesIO(pdf_bytes)).pages]
+
+
+@pytest.fixture
+def render(monkeypatch):
+    # Tanggal cetak tetap agar dua render bisa dibandingkan
+    monkeypatch.setattr(pdf_report, 'make_footer_text', lambda: FOOTER)
+    merged = []
+    merge_asli = pdf_report.merge_pdf_chunks
+
+    def merge_pdf_chunks(chunks, output):
+        merge_asli(chunks, output)
+        merged.append(len(chunks))
+    monkeypatch.setattr(pdf_report, 'merge_pdf_chunks', merge_pdf_chunks)
+
+    def jalankan(workers):
+        monkeypatch.setattr(pdf_report, 'PDF_RENDER_WORKERS', workers)
+        monkeypatch.setattr(pdf_report, 'PDF_PARALLEL_MIN_ROWS', 2)
+        monkeypatch.setattr(pdf_report, 'PDF_CHUNK_MIN_ROWS', 2)
+        return pdf_report.render_biodata_pdf(ROWS)
+
+    yield jalankan, merged
+    pdf_report.reset_render_pool()
+
+
+def test_render_paralel_sama_dengan_satu_proses(render):
+    jalankan, merged = render
+    satu_proses = teks_halaman(jalankan(1))
+    assert merged == []
+
+    paralel = teks_halaman(jalankan(3))
+    # Render paralel benar-benar dipakai (tidak jatuh ke render 1 proses)
+    assert merged == [3]
+
+    assert len(paralel) == len(satu_proses) == len(ROWS)
+    assert paralel == satu_proses
+    for nomor, teks in enumerate(paralel, start=1):
+        assert f'Peserta Paralel {nomor}' in teks
+        assert FOOTER in teks
@@ -0,0 +1,180 @@
+"""
+Test migrasi skema peserta_profile + INSTEAD OF trigger view biodata_kegiatan
+
+Setelah migrate_to_peserta_profile(), SELECT * dari view harus sama persis dengan tabel lama,
+biodata_write() harus mengembalikan jumlah baris yang terkena, dan tabel ringkasan
+(biodata_fts, kabupaten_counts, nik_latest_profile) tetap sesuai isi biodata setelah
+INSERT/UPDATE/DELETE lewat view.
+"""
+
+import queue
+import sqlite3
+
+import pytest
+
+NIK_A = '7271000000000101'
+NIK_B = '7271000000000102'
+
+BIODATA = {
+    'nik': NIK_A, 'user_id': 1, 'nama_lengkap': 'Andi Uji', 'nip_nippk': '198001012005011001',
+    'tempat_lahir': 'Palu', 'tanggal_lahir': '1980-01-01 00:00:00', 'jenis_kelamin': 'Laki-laki',
+    'agama': 'Islam', 'pendidikan_terakhir': 'S1', 'jurusan': 'Matematika', 'alamat_domisili': 'Jl. Uji 1',
+    'alamat_email': 'andi@example.com', 'no_hp': '081200000000', 'npwp': '-', 'status_asn': 'PNS',
+    'pangkat_golongan': 'III/a', 'jabatan': 'Guru', 'instansi': 'SMP Uji', 'alamat_instansi': 'Jl. Sekolah',
+    'kabupaten_kota': 'KOTA PALU', 'kabko_lainnya': None, 'peran': 'Peserta',
+    'nama_kegiatan': 'Kegiatan Satu', 'waktu_pelaksanaan': '1 Januari 2026', 'tempat_pelaksanaan': 'Aula',
+    'nama_bank': 'BRI', 'nama_bank_lainnya': None, 'no_rekening': '1234567890',
+    'nama_pemilik_rekening': 'Andi Uji', 'buku_tabungan_path': 'uploads/buku_andi.jpg',
+    'tanda_tangan': 'static/uploads/ttd_andi.png', 'created_at': '2026-01-01 08:00:00',
+}
+
+BARIS_AWAL = (
+    BIODATA,
+    # Profil sama di kegiatan lain -> versi profil dipakai bersama
+    dict(BIODATA, nama_kegiatan='Kegiatan Dua', created_at='2026-02-01 08:00:00'),
+    # Rekening & tanda tangan baru -> versi profil kedua
+    dict(BIODATA, nama_kegiatan='Kegiatan Tiga', no_rekening='5555', tanda_tangan='static/uploads/ttd_andi_2.png',
+         created_at='2026-03-01 08:00:00'),
+    dict(BIODATA, nik=NIK_B, user_id=2, nama_lengkap='Budi Coba', kabupaten_kota='KAB. DONGGALA',
+         buku_tabungan_path='uploads/buku_budi.jpg', tanda_tangan='static/uploads/ttd_budi.png',
+         created_at='2026-01-15 08:00:00'),
+)
+
+
+def insert_sql(data):
+    return f"INSERT INTO biodata_kegiatan ({', '.join(data)}) VALUES ({', '.join('?' * len(data))})"
+
+
+@pytest.fixture
+def database(app_module, tmp_path, monkeypatch):
+    """Database skema lama berisi BARIS_AWAL (koneksi app diarahkan ke file sementara)"""
+    db_path = str(tmp_path / 'profil.db')
+    pool = queue.LifoQueue(maxsize=app_module._db_pool.maxsize)
+    monkeypatch.setattr(app_module, 'DB_PATH', db_path)
+    monkeypatch.setattr(app_module, '_db_pool', pool)
+    monkeypatch.setattr(app_module, 'PESERTA_PROFILE_SCHEMA', False)
+    assert app_module.init_database()
+
+    connection = sqlite3.connect(db_path)
+    connection.execute("PRAGMA foreign_keys = ON")
+    for user_id in (1, 2):
+        connection.execute(
+            "INSERT OR IGNORE INTO users (id, username, password) VALUES (?, ?, 'x')", (user_id, f'uji{user_id}')
+        )
+    for data in BARIS_AWAL:
+        connection.execute(insert_sql(data), tuple(data.values()))
+    connection.commit()
+    yield connection
+
+    connection.close()
+    while not pool.empty():
+        pool.get_nowait().close()
+
+
+@pytest.fixture
+def migrated(app_module, database, monkeypatch):
+    app_module.migrate_to_peserta_profile(database)
+    monkeypatch.setattr(app_module, 'PESERTA_PROFILE_SCHEMA', True)
+    return database
+
+
+def semua_baris(connection):
+    return connection.execute("SELECT * FROM biodata_kegiatan ORDER BY id").fetchall()
+
+
+def assert_ringkasan_konsisten(app_module, connection):
+    """biodata_fts, kabupaten_counts dan nik_latest_profile sama dengan hasil hitung ulang dari view"""
+    fts_kolom = ', '.join(app_module.BIODATA_FTS_COLUMNS)
+    # Tabel FTS external content: isi index dicek lewat MATCH per kata, bukan SELECT kolom
+    baris = connection.execute(f"SELECT id, {fts_kolom} FROM biodata_kegiatan").fetchall()
+    for row in baris:
+        for nilai in row[1:]:
+            query = app_module.fts_match_query(str(nilai), app_module.BIODATA_FTS_COLUMNS)
+            ids = {r[0] for r in connection.execute(
+                "SELECT rowid FROM biodata_fts WHERE biodata_fts MATCH ?", (query,)
+            )}
+            assert row[0] in ids
+    cocok_semua = connection.execute(
+        "SELECT COUNT(*) FROM biodata_fts WHERE biodata_fts MATCH 'kabupaten_kota : (\"KOTA\" OR \"KAB\")'"
+    ).fetchone()[0]
+    assert cocok_semua == len(baris)
+
+    counts = connection.execute(
+        "SELECT kegiatan_id, kabupaten_kota, jumlah_peserta FROM kabupaten_counts WHERE jumlah_peserta > 0 ORDER BY 1, 2"
+    ).fetchall()
+    expected_counts = connection.execute("""
+        SELECT COALESCE(kegiatan_id, 0), COALESCE(kabupaten_kota, ''), COUNT(*)
+        FROM biodata_kegiatan GROUP BY 1, 2 ORDER BY 1, 2
+    """).fetchall()
+    assert counts == expected_counts
+
+    profil = connection.execute("SELECT nik, biodata_id, data FROM nik_latest_profile ORDER BY nik").fetchall()
+    expected_profil = connection.execute(f"""
+        SELECT nik, id, data FROM (
+            SELECT nik, id, {app_module._nik_profile_json_sql()} AS data, MAX(created_at)
+            FROM biodata_kegiatan GROUP BY nik
+        ) ORDER BY nik
+    """).fetchall()
+    assert profil == expected_profil
+
+
+def test_migrasi_round_trip_baris_sama(app_module, database):
+    sebelum = semua_baris(database)
+    ringkasan_sebelum = [
+        database.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall()
+        for table in ('kabupaten_counts', 'nik_latest_profile')
+    ]
+
+    jumlah_participation, jumlah_profil = app_module.migrate_to_peserta_profile(database)
+
+    assert app_module.peserta_profile_schema_aktif(database)
+    assert jumlah_participation == len(BARIS_AWAL)
+    # Andi: 2 versi (rekening/tanda tangan berubah), Budi: 1 versi
+    assert jumlah_profil == 3
+    assert semua_baris(database) == sebelum
+    assert [
+        database.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall()
+        for table in ('kabupaten_counts', 'nik_latest_profile')
+    ] == ringkasan_sebelum
+    assert_ringkasan_konsisten(app_module, database)
+
+
+def test_tanda_tangan_dan_buku_tabungan_ikut_versi_profil(migrated):
+    kolom = {row[1] for row in migrated.execute("PRAGMA table_info(participation)")}
+    assert 'tanda_tangan' not in kolom and 'buku_tabungan_path' not in kolom
+    versi = migrated.execute(
+        "SELECT versi, no_rekening, tanda_tangan FROM peserta_profile WHERE nik = ? ORDER BY versi", (NIK_A,)
+    ).fetchall()
+    assert versi == [(1, '1234567890', 'static/uploads/ttd_andi.png'), (2, '5555', 'static/uploads/ttd_andi_2.png')]
+
+
+def test_biodata_write_rowcount_dan_ringkasan(app_module, migrated):
+    cursor = migrated.cursor()
+    baru = dict(BIODATA, nama_kegiatan='Kegiatan Empat', created_at='2026-04-01 08:00:00')
+    assert app_module.biodata_write(cursor, insert_sql(baru), tuple(baru.values())) == 1
+    migrated.commit()
+    assert_ringkasan_konsisten(app_module, migrated)
+    # Profil sama dengan versi 1 -> tidak membuat versi baru
+    assert migrated.execute("SELECT COUNT(*) FROM peserta_profile WHERE nik = ?", (NIK_A,)).fetchone()[0] == 2
+
+    jumlah = app_module.biodata_write(cursor, """
+        UPDATE biodata_kegiatan SET kabupaten_kota = 'KAB. SIGI', nama_lengkap = 'Andi Ubah' WHERE nik = ?
+    """, (NIK_A,))
+    migrated.commit()
+    assert jumlah == 4
+    assert_ringkasan_konsisten(app_module, migrated)
+    assert migrated.execute(
+        "SELECT COUNT(*) FROM biodata_kegiatan WHERE nama_lengkap = 'Andi Ubah' AND kabupaten_kota = 'KAB. SIGI'"
+    ).fetchone()[0] == 4
+    # Versi lama yang tidak dipakai lagi dibersihkan
+    assert migrated.execute(
+        "SELECT COUNT(*) FROM peserta_profile WHERE nik = ? AND nama_lengkap = 'Andi Uji'", (NIK_A,)
+    ).fetchone()[0] == 0
+
+    assert app_module.biodata_write(cursor, "UPDATE biodata_kegiatan SET peran = 'Narasumber' WHERE id = -1") == 0
+
+    assert app_module.biodata_write(cursor, "DELETE FROM biodata_kegiatan WHERE nik = ?", (NIK_B,)) == 1
+    migrated.commit()
+    assert_ringkasan_konsisten(app_module, migrated)
+    assert migrated.execute("SELECT COUNT(*) FROM nik_latest_profile WHERE nik = ?", (NIK_B,)).fetchone()[0] == 0
+    assert migrated.execute("SELECT COUNT(*) FROM peserta_profile WHERE nik = ?", (NIK_B,)).fetchone()[0] == 0